@@ -0,0 +1,170 @@
+"""
+추론 백엔드 비교 벤치마크
+백엔드마다 별도 프로세스에서 모델을 로드해 지연 시간, 처리량, 최대 RSS를 측정
+--parity: 샘플 이미지의 감지 결과를 torch 결과와 비교 (클래스가 같고 박스 IoU가 기준 이상인 감지를 짝지음)
+
+실행: python -m benchmarks.bench_backends --backends torch onnx onnx-int8 --iterations 50
+      python -m benchmarks.bench_backends --backends torch onnx --parity bus.jpg
+"""
+import argparse
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from config import Config
+from core.result_cache import CONFIDENCE, IOU
+from models.model_loader import BACKENDS, ModelLoader
+
+
+def measure(backend, iterations, batch_size, imgsz, threads):
+    """ 현재 프로세스에서 백엔드 하나를 측정해 결과 dict 반환 """
+    config = Config()
+    start = time.perf_counter()
+    model = ModelLoader(config.model_path, backend, imgsz, threads, 1 if threads else 0).load_model()
+    load_time = time.perf_counter() - start
+
+    rng = np.random.default_rng(0)
+    images = [rng.integers(0, 256, (1080, 1920, 3), dtype=np.uint8) for _ in range(batch_size)]
+    model(images[0], conf=0.25, verbose=False)   # 워밍업 (지연 초기화 비용 제외)
+
+    # 단일 이미지 지연 시간
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        model(images[0], conf=0.25, verbose=False)
+        latencies.append(time.perf_counter() - start)
+
+    # 배치 처리량
+    start = time.perf_counter()
+    rounds = max(1, iterations // batch_size)
+    for _ in range(rounds):
+        model(images, conf=0.25, verbose=False)
+    throughput = rounds * batch_size / (time.perf_counter() - start)
+
+    latencies.sort()
+    return {
+        "backend": backend,
+        "load_s": round(load_time, 3),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 2),
+        "images_per_s": round(throughput, 2),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def detect(backend, image_path, imgsz):
+    """ 현재 프로세스에서 백엔드 하나로 샘플 이미지를 감지해 [[클래스, 신뢰도, x1, y1, x2, y2]] 반환 """
+    config = Config()
+    model = ModelLoader(config.model_path, backend, imgsz).load_model()
+    img = cv2.imread(image_path)
+    if img is None:
+        raise SystemExit(f"Cannot read image: {image_path}")
+    # ImageTagger.detect와 같은 임계값
+    result = model([img], conf=CONFIDENCE, iou=IOU, verbose=False)[0]
+    return [[int(d.cls), float(d.conf), *[float(v) for v in np.asarray(d.xyxy).reshape(4)]] for d in result.boxes]
+
+
+def box_iou(a, b):
+    """ xyxy 박스 두 개의 IoU """
+    inter_w = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    inter_h = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = inter_w * inter_h
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def compare(reference, detections, min_iou):
+    """
+    기준 감지 결과와 비교해 (짝지은 수, 최대 신뢰도 차, 기준에만 있는 감지, 비교 대상에만 있는 감지) 반환
+    신뢰도가 높은 기준 감지부터 같은 클래스에서 IoU가 가장 큰 감지와 짝지음
+    """
+    unmatched = list(detections)
+    matched, conf_diff, missing = 0, 0.0, []
+    for ref in sorted(reference, key=lambda d: -d[1]):
+        candidates = [(box_iou(ref[2:], d[2:]), i) for i, d in enumerate(unmatched) if d[0] == ref[0]]
+        best = max(candidates, default=(0.0, None))
+        if best[0] < min_iou:
+            missing.append(ref)
+            continue
+        conf_diff = max(conf_diff, abs(ref[1] - unmatched[best[1]][1]))
+        unmatched.pop(best[1])
+        matched += 1
+    return matched, conf_diff, missing, unmatched
+
+
+def parity(args):
+    """ 백엔드별 감지 결과를 첫 번째 백엔드 결과와 비교, 어긋나면 종료 코드 1 """
+    results = {}
+    for backend in args.backends:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_backends", "--worker", backend, "--parity", args.parity,
+             "--imgsz", str(args.imgsz)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        results[backend] = json.loads(output.strip().splitlines()[-1])
+
+    reference_backend = args.backends[0]
+    reference = results[reference_backend]
+    print(f"{reference_backend}: {len(reference)} detections (conf={CONFIDENCE}, iou={IOU})")
+    ok = True
+    for backend in args.backends[1:]:
+        matched, conf_diff, missing, extra = compare(reference, results[backend], args.min_iou)
+        # 임계값 근처의 감지는 백엔드 사이 수치 오차로 한쪽에만 남을 수 있으므로 여유를 둠
+        borderline = [d for d in missing + extra if d[1] < CONFIDENCE + args.conf_tolerance]
+        passed = len(missing) + len(extra) == len(borderline) and conf_diff <= args.conf_tolerance
+        ok &= passed
+        print(f"{backend}: {len(results[backend])} detections, matched {matched}, "
+              f"max conf diff {conf_diff:.3f}, only in {reference_backend} {len(missing)}, "
+              f"only in {backend} {len(extra)} [{'PASS' if passed else 'FAIL'}]")
+    if not ok:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inference backend benchmark")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"], choices=BACKENDS)
+    parser.add_argument("--iterations", type=int, default=50, help="측정 반복 횟수")
+    parser.add_argument("--batch-size", type=int, default=8, help="처리량 측정 배치 크기")
+    parser.add_argument("--imgsz", type=int, default=640, help="모델 입력 크기")
+    parser.add_argument("--threads", type=int, default=0, help="ONNX Runtime intra-op 스레드 수 (0이면 기본값)")
+    parser.add_argument("--parity", metavar="IMAGE", help="샘플 이미지로 첫 번째 백엔드와 감지 결과 비교")
+    parser.add_argument("--min-iou", type=float, default=0.9, help="같은 감지로 볼 박스 IoU 최솟값")
+    parser.add_argument("--conf-tolerance", type=float, default=0.05, help="허용하는 신뢰도 차이")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)   # 내부용: 한 백엔드만 측정
+    args = parser.parse_args()
+
+    if args.worker and args.parity:
+        print(json.dumps(detect(args.worker, args.parity, args.imgsz)))
+        return
+    if args.parity:
+        parity(args)
+        return
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.iterations, args.batch_size, args.imgsz, args.threads)))
+        return
+
+    # RSS가 섞이지 않도록 백엔드마다 새 프로세스에서 측정
+    results = []
+    for backend in args.backends:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_backends", "--worker", backend,
+             "--iterations", str(args.iterations), "--batch-size", str(args.batch_size),
+             "--imgsz", str(args.imgsz), "--threads", str(args.threads)],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{'backend':<10} {'load_s':>7} {'p50_ms':>8} {'p99_ms':>8} {'img/s':>8} {'rss_mb':>8}")
+    for r in results:
+        print(f"{r['backend']:<10} {r['load_s']:>7} {r['p50_ms']:>8} {r['p99_ms']:>8} "
+              f"{r['images_per_s']:>8} {r['max_rss_mb']:>8}")
+
+
+if __name__ == "__main__":
+    main()
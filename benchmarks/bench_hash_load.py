@@ -0,0 +1,70 @@
+"""
+ES 해시 로드 벤치마크
+가짜 ES 세션에 해시를 채워두고 HashUtil.load_hashes_from_es의 처리량과 메모리 사용량 측정
+--scaling을 주면 ES 없이 페이지 크기 단위로 CompactHashSet에 직접 넣어 해시 수별 로드 시간 측정
+(가짜 ES는 요청마다 전체 문서를 복사하므로 수천만 건 측정에는 쓰지 않음)
+
+실행: python -m benchmarks.bench_hash_load --count 200000 --slices 4
+      python -m benchmarks.bench_hash_load --scaling 1000000,2000000,5000000,10000000
+"""
+import argparse
+import hashlib
+import os
+import time
+
+from benchmarks.fakes import FakeEsSession
+from utils.hash_set import DIGEST_SIZE, CompactHashSet
+from utils.hash_util import HashUtil
+
+
+def scaling(counts, page_size):
+    """ 해시 수별로 페이지 단위 add_many + finish_load 시간 측정 (거의 선형이어야 함) """
+    base = None
+    for count in counts:
+        pages = [os.urandom(min(page_size, count - offset) * DIGEST_SIZE) for offset in range(0, count, page_size)]
+        hash_set = CompactHashSet()
+        start = time.perf_counter()
+        for page in pages:
+            hash_set.add_many(page)
+        added = time.perf_counter() - start
+        hash_set.finish_load()
+        elapsed = time.perf_counter() - start
+        per_million = elapsed / count * 1e6
+        base = base or per_million
+        probe = pages[-1][:DIGEST_SIZE]
+        print(f"hashes={count:>10} pages={len(pages):>5} elapsed={elapsed:6.2f}s (pages {added:.2f}s, "
+              f"finish {elapsed - added:.2f}s) per_million={per_million:.2f}s x{per_million / base:.2f} "
+              f"set_mb={hash_set.nbytes() / 2 ** 20:.0f} found={probe in hash_set}")
+        del pages, hash_set
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ES hash preload benchmark")
+    parser.add_argument("--count", type=int, default=200000, help="저장해 둘 해시 수")
+    parser.add_argument("--page-size", type=int, default=10000, help="페이지당 문서 수")
+    parser.add_argument("--slices", type=int, default=4, help="동시 슬라이스 수")
+    parser.add_argument("--latency", type=float, default=0.0, help="요청당 지연 시간(초)")
+    parser.add_argument("--scaling", help="쉼표로 구분한 해시 수 목록 (ES 없이 집합 로드 시간만 측정)")
+    args = parser.parse_args()
+    if args.scaling:
+        scaling([int(count) for count in args.scaling.split(",")], args.page_size)
+        return
+
+    hashes = [hashlib.sha256(str(i).encode()).hexdigest() for i in range(args.count)]
+    session = FakeEsSession(hashes, latency=args.latency)
+    hash_util = HashUtil("http://fake-es:9200", session=session,
+                         page_size=args.page_size, load_slices=args.slices)
+
+    start = time.perf_counter()
+    hash_util.load_hashes_from_es()
+    elapsed = time.perf_counter() - start
+
+    loaded = hash_util.processed_hashes
+    missing = sum(1 for h in hashes[::max(1, args.count // 1000)] if h not in loaded)
+    print(f"hashes={len(loaded)} elapsed={elapsed:.2f}s rate={len(loaded) / elapsed:.0f}/s "
+          f"requests={len(session.requests)} set_bytes={loaded.nbytes()} "
+          f"hex_set_estimate={args.count * 180} missing_sample={missing}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+지각 해시 인덱스 벤치마크
+인덱스 크기별로 구성 시간(ES 페이지 단위 대량 로드 후 finish_load), 메모리, 해밍 반경 검색 지연 시간,
+실시간 추가(add) 지연 시간(버퍼가 차서 백그라운드 병합이 도는 동안 포함)을 측정하고
+전수 비교(NumPy XOR + popcount) 결과와 일치하는지 확인
+
+실행: python -m benchmarks.bench_phash_index --sizes 100000 1000000 10000000 --radius 4
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from utils.perceptual_hash import PerceptualIndex, _popcount
+
+
+def random_codes(rng, count):
+    """ 무작위 64비트 해시 배열 """
+    return rng.integers(0, 2 ** 63, count, dtype=np.uint64) * np.uint64(2) + rng.integers(0, 2, count, dtype=np.uint64)
+
+
+def make_queries(rng, codes, count, radius):
+    """ 절반은 저장된 해시에서 radius 이내로 비트를 뒤집은 근사 중복, 절반은 무작위 해시 """
+    queries = []
+    for i in range(count):
+        if i % 2:
+            queries.append(int(random_codes(rng, 1)[0]))
+            continue
+        code = int(codes[rng.integers(0, len(codes))])
+        for bit in rng.choice(64, int(rng.integers(0, radius + 1)), replace=False):
+            code ^= 1 << int(bit)
+        queries.append(code)
+    return queries
+
+
+def percentile(values, pct):
+    """ 정렬된 목록의 백분위 값 """
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def run(size, radius, query_count, verify, page_size, live_adds):
+    """ 인덱스 크기 하나에 대한 측정 결과 dict 반환 """
+    rng = np.random.default_rng(size)
+    codes = random_codes(rng, size)
+
+    index = PerceptualIndex()
+    start = time.perf_counter()
+    for offset in range(0, size, page_size):
+        index.add_many(codes[offset:offset + page_size])
+    index.finish_load()
+    build_s = time.perf_counter() - start
+
+    # 실시간 추가: 파이프라인 스레드가 기다리는 시간만 측정 (병합은 백그라운드 스레드)
+    live = random_codes(rng, live_adds)
+    add_latencies = []
+    for code in live:
+        start = time.perf_counter()
+        index.add(int(code))
+        add_latencies.append(time.perf_counter() - start)
+    codes = np.concatenate([codes, live])
+    add_latencies.sort()
+
+    queries = make_queries(rng, codes, query_count, radius)
+    latencies, matches, mismatches = [], 0, 0
+    for query in queries:
+        start = time.perf_counter()
+        found = index.nearest(query, radius)
+        latencies.append(time.perf_counter() - start)
+        matches += found is not None
+        if verify:
+            # 전수 비교로 가장 가까운 거리 확인
+            best = int(_popcount(codes ^ np.uint64(query)).min())
+            expected = best if best <= radius else None
+            mismatches += (found[1] if found else None) != expected
+
+    brute_ms = None
+    if verify:
+        start = time.perf_counter()
+        for query in queries[:20]:
+            _popcount(codes ^ np.uint64(query)).min()
+        brute_ms = (time.perf_counter() - start) / min(20, len(queries)) * 1000
+
+    latencies.sort()
+    return {
+        "size": size,
+        "build_s": build_s,
+        "add_p99_us": percentile(add_latencies, 0.99) * 1e6 if add_latencies else 0.0,
+        "add_max_us": add_latencies[-1] * 1e6 if add_latencies else 0.0,
+        "rebuilds": index.rebuilds,
+        "mb": index.nbytes() / 2 ** 20,
+        "p50_us": statistics.median(latencies) * 1e6,
+        "p99_us": percentile(latencies, 0.99) * 1e6,
+        "matches": matches,
+        "mismatches": mismatches if verify else None,
+        "brute_ms": brute_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perceptual hash index benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000], help="인덱스 크기 목록")
+    parser.add_argument("--radius", type=int, default=4, help="해밍 반경")
+    parser.add_argument("--queries", type=int, default=1000, help="크기별 검색 횟수")
+    parser.add_argument("--page-size", type=int, default=10000, help="대량 로드 페이지 크기 (ES 검색 페이지와 같음)")
+    parser.add_argument("--live-adds", type=int, default=20000, help="로드 후 실시간으로 추가할 해시 수")
+    parser.add_argument("--no-verify", action="store_true", help="전수 비교 검증 생략 (큰 인덱스에서 빠르게 측정)")
+    args = parser.parse_args()
+
+    print(f"{'size':>10} {'build_s':>8} {'mb':>8} {'p50_us':>8} {'p99_us':>8} {'matches':>8} {'wrong':>6} {'brute_ms':>9}"
+          f" {'add_p99_us':>10} {'add_max_us':>10} {'rebuilds':>8}")
+    for size in args.sizes:
+        r = run(size, args.radius, args.queries, not args.no_verify, args.page_size, args.live_adds)
+        wrong = "-" if r["mismatches"] is None else r["mismatches"]
+        brute = "-" if r["brute_ms"] is None else f"{r['brute_ms']:.2f}"
+        print(f"{r['size']:>10} {r['build_s']:>8.2f} {r['mb']:>8.1f} {r['p50_us']:>8.1f} {r['p99_us']:>8.1f} "
+              f"{r['matches']:>8} {wrong:>6} {brute:>9} {r['add_p99_us']:>10.1f} {r['add_max_us']:>10.1f} {r['rebuilds']:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+전체 파이프라인 벤치마크 하니스
+합성 코퍼스를 만들어 main.build_components로 만든 실제 구성(해시/디코딩/추론/색상/이동/발행)에 흘려보내고
+ES/Kafka는 로컬 가짜 구현으로 대체해 초당 이미지 수, 지연 시간(p50/p99), 최대 RSS, 단계별 시간 측정
+결과는 JSON으로 기록하고, 기준 결과(baseline)가 있으면 비교해 허용 범위를 넘는 성능 저하를 표시
+
+입력 패턴
+- backlog: 모든 파일을 한 번에 투입 (시작 시 쌓여 있던 파일)
+- steady: --rate 개/초 간격으로 투입
+- burst: --burst-interval 초마다 --burst-size 개씩 투입
+
+실행: python -m benchmarks.bench_pipeline --count 200 --pattern burst --output result.json --baseline baseline.json
+      python -m benchmarks.bench_pipeline --count 200 --save-baseline baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import main as app
+from benchmarks import corpus
+from benchmarks.fakes import FakeEsSession, FakeKafkaProducer
+from config import Config
+from interface.directory_watcher import DirectoryWatcher
+from utils.log_util import setup_logging
+from utils.metrics import REGISTRY
+
+# 기준 결과와 비교할 항목: (이름, 클수록 좋은지)
+COMPARED = (
+    ("images_per_sec", True),
+    ("latency_p50_ms", False),
+    ("latency_p99_ms", False),
+    ("peak_rss_mb", False),
+)
+
+
+def percentile(values, pct):
+    """ 정렬된 목록의 백분위 값 """
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def schedule(names, pattern, rate, burst_size, burst_interval):
+    """ 파일별 투입 시각(시작 기준 초) 목록 """
+    if pattern == "steady":
+        return [(name, index / rate) for index, name in enumerate(names)]
+    if pattern == "burst":
+        return [(name, (index // burst_size) * burst_interval) for index, name in enumerate(names)]
+    return [(name, 0.0) for name in names]
+
+
+def bench_config(args, workdir):
+    """ 벤치마크용 설정 (모든 상태 파일은 작업 디렉터리 안에 두고, 메트릭 서버/설정 감시는 끔) """
+    config = Config()
+    config.input_dir = str(workdir / "in")
+    config.output_dir = str(workdir / "out")
+    config.hash_cache_path = str(workdir / "hash_cache.sqlite3")
+    config.result_cache_path = str(workdir / "result_cache.sqlite3") if args.result_cache else None
+    config.file_move_journal_path = str(workdir / "file_moves.jsonl")
+    config.tag_index_path = str(workdir / "tag_index.sqlite3")
+    config.kafka_spool_path = str(workdir / "kafka_spool.jsonl")
+    config.backfill_checkpoint_path = None
+    config.tag_reload_interval = 0
+    config.metrics_port = 0
+    config.metrics_snapshot_path = None
+    config.log_level = args.log_level
+    config.inference_workers = args.workers
+    config.perceptual_dedup = args.perceptual_dedup
+    config.triage = args.triage is not None
+    config.triage_path = args.triage or None
+    if args.batch_size:
+        config.batch_size = args.batch_size
+    return config
+
+
+class Recorder:
+    """ 파일별 투입 시각과 완료 시각/결과 기록 """
+    def __init__(self, total):
+        self.total = total
+        self.landed = {}
+        self.latencies = []
+        self.outcomes = {}
+        self.first_landed = None
+        self.last_done = None
+        self._lock = threading.Lock()
+        self.finished = threading.Event()
+
+    def land(self, path):
+        now = time.perf_counter()
+        with self._lock:
+            self.landed[path] = now
+            if self.first_landed is None:
+                self.first_landed = now
+
+    def on_done(self, path):
+        def done(item):
+            now = time.perf_counter()
+            outcome = "error" if item.error else item.outcome
+            with self._lock:
+                self.latencies.append(now - self.landed.get(path, now))
+                self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+                self.last_done = now
+                if len(self.latencies) >= self.total:
+                    self.finished.set()
+        return done
+
+
+def stage_times():
+    """ 메트릭 레지스트리의 단계/세부 단계 시간 (ms) """
+    result = {}
+    for key, value in REGISTRY.snapshot().items():
+        if not isinstance(value, dict) or not value.get("count"):
+            continue
+        if key.startswith(("imgtag_stage_seconds", "imgtag_step_seconds", "imgtag_file_move_seconds",
+                           "imgtag_es_bulk_seconds", "imgtag_kafka_delivery_seconds")):
+            result[key] = {
+                "count": value["count"],
+                "avg_ms": value["sum"] / value["count"] * 1000,
+                "p50_ms": value["p50"] * 1000,
+                "p99_ms": value["p99"] * 1000,
+            }
+    return result
+
+
+def git_commit():
+    """ 현재 커밋 (git 저장소가 아니면 None) """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def peak_rss_mb():
+    """ 현재 프로세스와 종료된 자식 프로세스(추론 워커) 중 최대 RSS (Linux는 KB 단위) """
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    scale = 1 / 2 ** 20 if sys.platform == "darwin" else 1 / 1024
+    return own * scale, children * scale
+
+
+def run(args, workdir):
+    """ 코퍼스를 투입해 측정 결과 dict 반환 """
+    corpus_dir = Path(args.corpus) if args.corpus else workdir / "corpus"
+    manifest = corpus.load_manifest(corpus_dir)
+    wanted = {"count": args.count, "sizes": [f"{w}x{h}" for w, h in args.sizes], "formats": args.formats,
+              "duplicate_ratio": args.duplicate_ratio, "near_duplicate_ratio": args.near_duplicate_ratio,
+              "seed": args.seed}
+    if manifest is None or any(manifest.get(key) != value for key, value in wanted.items()):
+        print(f"Generating corpus in {corpus_dir}...")
+        manifest = corpus.generate(corpus_dir, args.count, args.sizes, args.formats, args.duplicate_ratio,
+                                   args.near_duplicate_ratio, args.seed)
+
+    # 파이프라인이 파일을 옮기므로 코퍼스 사본을 입력 디렉터리와 같은 파일시스템에 준비
+    stage_dir, input_dir = workdir / "stage", workdir / "in"
+    for directory in (stage_dir, input_dir, workdir / "out"):
+        shutil.rmtree(directory, ignore_errors=True)
+        directory.mkdir(parents=True)
+    names = [f["name"] for f in manifest["files"]]
+    for name in names:
+        shutil.copyfile(corpus_dir / name, stage_dir / name)
+
+    config = bench_config(args, workdir)
+    rss_before, _ = peak_rss_mb()
+    start = time.perf_counter()
+    components = app.build_components(config, FakeEsSession(index_exists=False, latency=args.es_latency),
+                                      FakeKafkaProducer(latency=args.kafka_latency))
+    startup_s = time.perf_counter() - start
+
+    recorder = Recorder(len(names))
+
+    def submit(path):
+        components.scheduler.submit(path, recorder.on_done(path))
+
+    watcher = None
+    if args.watch:
+        # 실제 감시 경로(watchdog 이벤트 -> 쓰기 완료 확인 -> 등록)까지 포함해 측정
+        watcher = DirectoryWatcher(config.input_dir, args.settle_time, config.file_poll_interval)
+        watcher.start(submit)
+
+    start = time.perf_counter()
+    for name, at in schedule(names, args.pattern, args.rate, args.burst_size, args.burst_interval):
+        delay = start + at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        path = str(input_dir / name)
+        recorder.land(path)
+        os.rename(stage_dir / name, path)
+        if not watcher:
+            submit(path)
+
+    finished = recorder.finished.wait(args.timeout)
+    if watcher:
+        watcher.stop()
+    components.close()
+    rss_peak, rss_children = peak_rss_mb()
+
+    latencies = sorted(recorder.latencies)
+    elapsed = (recorder.last_done or time.perf_counter()) - (recorder.first_landed or start)
+    return {
+        "timestamp": time.time(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "params": {
+            **wanted, "pattern": args.pattern, "rate": args.rate, "burst_size": args.burst_size,
+            "burst_interval": args.burst_interval, "watch": args.watch, "workers": args.workers,
+            "batch_size": config.batch_size, "model_backend": config.model_backend,
+            "result_cache": args.result_cache, "perceptual_dedup": args.perceptual_dedup,
+            "triage": args.triage,
+        },
+        "corpus": {"kinds": manifest["kinds"], "total_mb": manifest["total_bytes"] / 2 ** 20},
+        "completed": len(latencies),
+        "timed_out": not finished,
+        "startup_s": startup_s,
+        "elapsed_s": elapsed,
+        "images_per_sec": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "latency_p50_ms": percentile(latencies, 0.5) * 1000,
+        "latency_p99_ms": percentile(latencies, 0.99) * 1000,
+        "latency_max_ms": (latencies[-1] * 1000) if latencies else 0.0,
+        "peak_rss_mb": rss_peak,
+        "rss_before_mb": rss_before,
+        "worker_peak_rss_mb": rss_children,
+        "outcomes": recorder.outcomes,
+        "stages": stage_times(),
+    }
+
+
+def compare(result, baseline, tolerance):
+    """ 기준 결과 대비 변화율 출력, 허용 범위를 넘게 나빠진 항목 이름 목록 반환 """
+    regressions = []
+    print(f"{'metric':>16} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, higher_is_better in COMPARED:
+        old, new = baseline.get(name), result.get(name)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        worse = -change if higher_is_better else change
+        flag = ""
+        if worse > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:>16} {old:>10.1f} {new:>10.1f} {change:>+7.1%}{flag}")
+    if baseline.get("params") != result.get("params"):
+        print("Warning: baseline was recorded with different parameters")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark")
+    corpus.add_arguments(parser)
+    parser.add_argument("--corpus", help="코퍼스 디렉터리 (설정이 같으면 재사용, 없으면 작업 디렉터리에 생성)")
+    parser.add_argument("--workdir", help="작업 디렉터리 (없으면 임시 디렉터리)")
+    parser.add_argument("--pattern", choices=["backlog", "steady", "burst"], default="backlog", help="입력 패턴")
+    parser.add_argument("--rate", type=float, default=20.0, help="steady 패턴의 초당 투입 수")
+    parser.add_argument("--burst-size", type=int, default=50, help="burst 패턴의 한 번 투입 수")
+    parser.add_argument("--burst-interval", type=float, default=2.0, help="burst 패턴의 투입 간격(초)")
+    parser.add_argument("--watch", action="store_true", help="DirectoryWatcher 이벤트로 등록 (없으면 직접 등록)")
+    parser.add_argument("--settle-time", type=float, default=0.05, help="--watch일 때 쓰기 완료 판단 시간(초)")
+    parser.add_argument("--workers", type=int, default=0, help="추론 워커 프로세스 수 (0이면 현재 프로세스)")
+    parser.add_argument("--batch-size", type=int, default=0, help="추론 배치 크기 (0이면 설정값)")
+    parser.add_argument("--result-cache", action="store_true", help="감지 결과 캐시 사용")
+    parser.add_argument("--perceptual-dedup", action="store_true", help="근사 중복 건너뛰기 사용")
+    parser.add_argument("--triage", nargs="?", const="", metavar="CALIBRATION",
+                        help="추론 전 분류 사용 (보정 JSON을 지정하지 않으면 기본 임계값)")
+    parser.add_argument("--es-latency", type=float, default=0.002, help="가짜 ES 요청 지연(초)")
+    parser.add_argument("--kafka-latency", type=float, default=0.002, help="가짜 Kafka 왕복 지연(초)")
+    parser.add_argument("--timeout", type=float, default=600, help="전체 처리 대기 시간 제한(초)")
+    parser.add_argument("--log-level", default="WARNING", help="로그 레벨")
+    parser.add_argument("--output", help="결과 JSON 파일")
+    parser.add_argument("--baseline", help="비교할 기준 결과 JSON 파일")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="허용할 성능 저하 비율")
+    parser.add_argument("--save-baseline", help="이번 결과를 기준 결과로 저장할 파일")
+    args = parser.parse_args()
+
+    setup_logging(args.log_level)
+    if args.workdir:
+        workdir = Path(args.workdir)
+        workdir.mkdir(parents=True, exist_ok=True)
+        result = run(args, workdir)
+    else:
+        with tempfile.TemporaryDirectory(prefix="imgtag-bench-") as tmp:
+            result = run(args, Path(tmp))
+
+    print(f"completed {result['completed']}/{args.count} in {result['elapsed_s']:.2f}s: "
+          f"{result['images_per_sec']:.1f} img/s, p50 {result['latency_p50_ms']:.1f} ms, "
+          f"p99 {result['latency_p99_ms']:.1f} ms, peak RSS {result['peak_rss_mb']:.0f} MB, "
+          f"outcomes {result['outcomes']}")
+    for key, value in result["stages"].items():
+        print(f"  {key:<48} n={value['count']:<6} avg={value['avg_ms']:.2f}ms p99={value['p99_ms']:.2f}ms")
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            Path(path).write_text(json.dumps(result, indent=1))
+
+    status = 1 if result["timed_out"] else 0
+    if args.baseline:
+        regressions = compare(result, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        if regressions:
+            print(f"Regressions beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            status = 1
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+축소 디코딩 벤치마크
+같은 이미지 묶음을 원본 해상도와 축소 디코딩으로 각각 처리해
+디코딩 시간, 디코딩된 이미지 크기, (--tags 지정 시) 태그 일치 여부 비교
+
+실행: python -m benchmarks.bench_reduced_decode --corpus ./regression_images --tags
+      python -m benchmarks.bench_reduced_decode --images 16 --size 6000 4000
+"""
+import argparse
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from config import Config
+from core.preprocess import decode_reduced
+
+IMAGE_GLOBS = ("*.jpg", "*.jpeg", "*.png")
+
+
+def load_corpus(corpus):
+    """ 디렉터리의 이미지 파일을 (이름, 바이트) 목록으로 읽기 """
+    paths = sorted(p for pattern in IMAGE_GLOBS for p in Path(corpus).glob(pattern))
+    return [(str(p), p.read_bytes()) for p in paths]
+
+
+def make_jpegs(count, width, height):
+    """ 무작위 도형을 그린 고해상도 JPEG 바이트 목록 생성 """
+    rng = np.random.default_rng(0)
+    jpegs = []
+    for i in range(count):
+        img = np.full((height, width, 3), rng.integers(0, 256, 3), dtype=np.uint8)
+        for _ in range(8):
+            x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+            cv2.circle(img, (x, y), int(rng.integers(width // 20, width // 4)), rng.integers(0, 256, 3).tolist(), -1)
+        jpegs.append((f"synthetic-{i}.jpg", cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()))
+    return jpegs
+
+
+def measure_decode(images, size):
+    """ 이미지별 디코딩 시간(ms)과 디코딩된 크기(MB) 합계 """
+    elapsed, nbytes, peak = 0.0, 0, 0
+    for _, data in images:
+        start = time.perf_counter()
+        if size:
+            img, _ = decode_reduced(data, size)
+        else:
+            img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        elapsed += time.perf_counter() - start
+        nbytes += img.nbytes
+        peak = max(peak, img.nbytes)
+    return elapsed * 1000, nbytes / 2 ** 20, peak / 2 ** 20
+
+
+def compare_tags(config, images):
+    """ 원본/축소 디코딩 태그 비교, 달라진 이미지 목록 반환 """
+    from core.tagger import ImageTagger
+    from models.model_loader import ModelLoader
+
+    loader = ModelLoader(config.model_path, config.model_backend, config.model_imgsz,
+                         config.ort_intra_op_threads, config.ort_inter_op_threads)
+    tagger = ImageTagger(loader, config.tag_mapping, config.color_ranges, None, config.color_threshold,
+                         config.color_max_pixels, config.color_integral_ratio)
+    changed = []
+    for name, data in images:
+        outcomes = []
+        for size in (None, config.model_imgsz):
+            img = tagger.decode(data, size)
+            result = tagger.detect([img])[0]
+            primary_tag, tags = tagger.tag_result(name, img, result)
+            outcomes.append((primary_tag, sorted(tags)))
+        if outcomes[0] != outcomes[1]:
+            changed.append((name, *outcomes))
+    return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reduced-resolution decode benchmark")
+    parser.add_argument("--corpus", help="회귀 테스트용 이미지 디렉터리 (없으면 합성 JPEG 사용)")
+    parser.add_argument("--images", type=int, default=16, help="합성 이미지 수")
+    parser.add_argument("--size", type=int, nargs=2, default=[6000, 4000], metavar=("W", "H"), help="합성 이미지 크기")
+    parser.add_argument("--tags", action="store_true", help="모델을 로드해 태그 일치 여부도 비교")
+    args = parser.parse_args()
+
+    config = Config()
+    images = load_corpus(args.corpus) if args.corpus else make_jpegs(args.images, *args.size)
+    print(f"{len(images)} images")
+
+    print(f"{'decode':<8} {'total_ms':>9} {'ms/img':>8} {'total_mb':>9} {'peak_mb':>8}")
+    for label, size in (("full", None), ("reduced", config.model_imgsz)):
+        total_ms, total_mb, peak_mb = measure_decode(images, size)
+        print(f"{label:<8} {total_ms:>9.1f} {total_ms / len(images):>8.2f} {total_mb:>9.1f} {peak_mb:>8.1f}")
+
+    if args.tags:
+        changed = compare_tags(config, images)
+        print(f"tags changed: {len(changed)}/{len(images)}")
+        for name, full, reduced in changed:
+            print(f"  {name}: full={full} reduced={reduced}")
+
+
+if __name__ == "__main__":
+    main()
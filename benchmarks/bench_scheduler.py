@@ -0,0 +1,197 @@
+"""
+스케줄러 부하 벤치마크 (합성 burst)
+백필이 흐르는 중에 대량 복사(--bulk개)가 한꺼번에 들어오고, 그동안 사용자가 파일을 하나씩(--interactive-interval초마다) 넣는 상황 재현
+추론은 파이프라인 Stage에 (배치 고정 비용 + 항목별 비용)만큼 대기하는 가짜 처리로 대체
+
+모드별로 새 프로세스에서 실행해 메트릭 레지스트리에 기록된 클래스별 대기 시간(imgtag_sched_wait_seconds)과
+사용자 파일의 처리 완료 시간을 비교
+- fifo: 들어온 순서대로 처리 (새 파일 > 백필 우선순위만 유지, 배치 크기 고정) - 스케줄러 도입 전 동작
+- adaptive: 크기 클래스, 마감 시간, 과부하 시 최근 파일 우선, 배치 크기 자동 조절
+
+실행: python -m benchmarks.bench_scheduler --bulk 3000 --backfill 2000 --slo-ms 1000
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+
+from core.pipeline import Stage
+from core.scheduler import CLASSES, BatchTuner, Scheduler
+from utils.metrics import REGISTRY
+
+MODES = ("fifo", "adaptive")
+
+
+class SimItem:
+    """ 가짜 파이프라인 항목 (Stage가 사용하는 속성만) """
+    __slots__ = ("path", "size", "on_done", "span", "error")
+
+    def __init__(self, path, size, on_done):
+        self.path = path
+        self.size = size
+        self.on_done = on_done
+        self.span = None
+        self.error = None
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def child(args):
+    """ 한 모드를 실행해 결과를 JSON 한 줄로 출력 """
+    rng = random.Random(args.seed)
+    sizes = {}
+
+    def infer(items):
+        cost = args.batch_overhead_ms + sum(
+            args.item_ms * (args.large_cost if item.size > args.large_bytes else 1) for item in items)
+        time.sleep(cost / 1000)
+        return items
+
+    adaptive = args.mode == "adaptive"
+    stage = Stage("infer", infer, workers=1, queue_size=args.in_flight, batch_size=args.batch_size,
+                  max_wait=args.batch_max_wait)
+    lock = threading.Lock()
+    submitted_at, latencies = {}, {}
+
+    def finish(item):
+        # 감시 이벤트처럼 완료 콜백 없이 등록한 파일도 기록하도록 가짜 파이프라인 끝에서 측정
+        with lock:
+            latencies[item.path] = time.perf_counter() - submitted_at[item.path]
+        item.on_done(item)
+
+    stage.finish = finish
+    if adaptive:
+        BatchTuner(args.target_ms / 1000, 1, args.batch_size_max).attach(stage)
+    stage.start()
+
+    def submit(path, on_done):
+        stage.put(SimItem(path, sizes[path], on_done))
+
+    if adaptive:
+        scheduler = Scheduler(submit, args.in_flight, args.large_bytes,
+                              {"live": args.live_deadline, "live_large": args.live_deadline * 6},
+                              {"live": args.live_limit, "live_large": args.live_limit // 10, "backfill": 256},
+                              args.lifo_depth, args.overflow)
+    else:
+        scheduler = Scheduler(submit, args.in_flight, None, None, {"backfill": 256}, None)
+    scheduler.start()
+
+    def request(path, backlog=False):
+        large = not path.startswith("interactive") and rng.random() < args.large_ratio
+        sizes[path] = args.large_bytes * 2 if large else args.large_bytes // 20
+        with lock:
+            submitted_at[path] = time.perf_counter()
+        # 백필만 완료 콜백(체크포인트 기록)이 있음 (main과 같음)
+        scheduler.submit(path, (lambda item: None) if backlog else None, backlog=backlog, size=sizes[path])
+
+    def feed_backfill():
+        for i in range(args.backfill):
+            request(f"backfill_{i:06d}.jpg", backlog=True)
+
+    start = time.perf_counter()
+    threading.Thread(target=feed_backfill, daemon=True).start()
+    time.sleep(args.bulk_at)
+    for i in range(args.bulk):
+        request(f"bulk_{i:06d}.jpg")
+    # 대량 복사가 쌓인 동안 사용자가 파일을 하나씩 넣음
+    for i in range(args.interactive):
+        request(f"interactive_{i:04d}.jpg")
+        time.sleep(args.interactive_interval)
+
+    # 버린 파일을 빼고 모두 끝날 때까지 대기
+    expected = args.backfill + args.bulk + args.interactive
+    deadline = time.perf_counter() + args.timeout
+    while len(latencies) + scheduler.shed < expected and time.perf_counter() < deadline:
+        time.sleep(0.05)
+    finished = len(latencies) + scheduler.shed >= expected
+    elapsed = time.perf_counter() - start
+    scheduler.stop()
+    stage.stop()
+
+    snapshot = REGISTRY.snapshot()
+    waits = {}
+    for cls in CLASSES:
+        value = snapshot.get(f"imgtag_sched_wait_seconds[class={cls}]")
+        if value and value["count"]:
+            waits[cls] = {"count": value["count"], "p50_ms": value["p50"] * 1000, "p99_ms": value["p99"] * 1000}
+    interactive = [v for k, v in latencies.items() if k.startswith("interactive")]
+    bulk = [v for k, v in latencies.items() if k.startswith("bulk")]
+    stats = scheduler.stats()
+    print(json.dumps({
+        "mode": args.mode,
+        "finished": finished,
+        "elapsed_s": elapsed,
+        "images_per_sec": len(latencies) / elapsed,
+        "interactive_p50_ms": percentile(interactive, 0.5) * 1000,
+        "interactive_p99_ms": percentile(interactive, 0.99) * 1000,
+        "interactive_max_ms": max(interactive, default=0.0) * 1000,
+        "bulk_p50_ms": percentile(bulk, 0.5) * 1000,
+        "bulk_p99_ms": percentile(bulk, 0.99) * 1000,
+        "final_batch_size": stage.batch_size,
+        "deferred": stats["deferred"],
+        "shed": stats["shed"],
+        "wait_by_class": waits,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scheduler burst benchmark")
+    parser.add_argument("--mode", choices=MODES, help="한 모드만 실행 (없으면 모든 모드를 각각 새 프로세스에서 실행)")
+    parser.add_argument("--backfill", type=int, default=2000, help="백필 파일 수 (처음부터 흘려보냄)")
+    parser.add_argument("--bulk", type=int, default=3000, help="한꺼번에 들어오는 새 파일 수")
+    parser.add_argument("--bulk-at", type=float, default=0.5, help="대량 복사 시작 시각(초)")
+    parser.add_argument("--interactive", type=int, default=20, help="사용자가 하나씩 넣는 파일 수")
+    parser.add_argument("--interactive-interval", type=float, default=0.25, help="사용자 파일 간격(초)")
+    parser.add_argument("--large-ratio", type=float, default=0.1, help="큰 파일 비율")
+    parser.add_argument("--large-bytes", type=int, default=20 * 2 ** 20, help="큰 파일 기준 크기")
+    parser.add_argument("--large-cost", type=float, default=4.0, help="큰 파일의 추론 비용 배수")
+    parser.add_argument("--batch-overhead-ms", type=float, default=10.0, help="배치 하나의 고정 비용(ms)")
+    parser.add_argument("--item-ms", type=float, default=1.5, help="항목 하나의 추론 비용(ms)")
+    parser.add_argument("--batch-size", type=int, default=8, help="배치 크기 (adaptive는 시작 값)")
+    parser.add_argument("--batch-size-max", type=int, default=32, help="adaptive 최대 배치 크기")
+    parser.add_argument("--batch-max-wait", type=float, default=0.05, help="배치를 채우기 위해 기다리는 최대 시간(초)")
+    parser.add_argument("--target-ms", type=float, default=100.0, help="adaptive 배치 목표 처리 시간(ms)")
+    parser.add_argument("--in-flight", type=int, default=48, help="파이프라인에 넣어 둘 최대 항목 수")
+    parser.add_argument("--live-deadline", type=float, default=1.0, help="live 클래스 마감 시간(초)")
+    parser.add_argument("--live-limit", type=int, default=10000, help="live 클래스 최대 대기 수")
+    parser.add_argument("--lifo-depth", type=int, default=64, help="이보다 쌓이면 최근 파일부터 처리")
+    parser.add_argument("--overflow", choices=("defer", "shed"), default="defer", help="live 클래스 한도 초과 정책")
+    parser.add_argument("--slo-ms", type=float, default=1000.0, help="사용자 파일 p99 목표(ms)")
+    parser.add_argument("--timeout", type=float, default=300.0, help="모드별 제한 시간(초)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+    if args.mode:
+        child(args)
+        return
+
+    results = []
+    for mode in MODES:
+        command = [sys.executable, "-m", "benchmarks.bench_scheduler", "--mode", mode] + sys.argv[1:]
+        out = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+
+    for r in results:
+        slo = "PASS" if r["interactive_p99_ms"] <= args.slo_ms else "FAIL"
+        print(f"{r['mode']:>8}: {r['images_per_sec']:7.0f} img/s, elapsed {r['elapsed_s']:.1f}s, "
+              f"interactive p50 {r['interactive_p50_ms']:.0f}ms p99 {r['interactive_p99_ms']:.0f}ms [{slo}], "
+              f"bulk p50 {r['bulk_p50_ms']:.0f}ms p99 {r['bulk_p99_ms']:.0f}ms, batch {r['final_batch_size']}")
+        for cls, w in r["wait_by_class"].items():
+            print(f"          wait[{cls}] n={w['count']} p50 {w['p50_ms']:.0f}ms p99 {w['p99_ms']:.0f}ms")
+        if r["deferred"] or r["shed"]:
+            print(f"          deferred {r['deferred']}, shed {r['shed']}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+시작 시간 벤치마크
+새 프로세스를 띄워 main 모듈 import부터 준비 완료까지의 단계별 시간과
+시작 도중 들어온 첫 이미지가 처리될 때까지의 시간을 측정 (동시 초기화 vs 순차 초기화)
+ES/Kafka는 가짜 구현으로 대체하고, ES에는 --hashes개의 해시를 미리 넣어 로드 시간을 재현
+
+실행: python -m benchmarks.bench_startup --repeat 3 --hashes 200000 --es-latency 0.005
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def child(args):
+    """ 자식 프로세스: main과 같은 순서로 시작해 측정 결과를 JSON 한 줄로 출력 """
+    import_start = time.perf_counter()
+    import main as app
+    from core.startup import ReadinessGate, StartupTimer
+    from interface.directory_watcher import DirectoryWatcher
+    import_s = time.perf_counter() - import_start
+
+    import threading
+    from benchmarks.fakes import FakeEsSession, FakeKafkaProducer
+    from config import Config
+    from utils.log_util import setup_logging
+
+    workdir = Path(args.workdir)
+    config = Config()
+    config.input_dir = str(workdir / "in")
+    config.output_dir = str(workdir / "out")
+    config.hash_cache_path = str(workdir / "hash_cache.sqlite3")
+    config.result_cache_path = None
+    config.file_move_journal_path = str(workdir / "file_moves.jsonl")
+    config.tag_index_path = str(workdir / "tag_index.sqlite3")
+    config.kafka_spool_path = str(workdir / "kafka_spool.jsonl")
+    config.tag_reload_interval = 0
+    config.concurrent_startup = not args.sequential
+    config.model_warmup = not args.no_warmup
+    config.inference_workers = args.workers
+    setup_logging("WARNING")
+
+    # 가짜 ES 데이터 준비는 측정에서 제외
+    es_session = FakeEsSession((f"{i:064x}" for i in range(args.hashes)), latency=args.es_latency)
+    timer = StartupTimer()
+    gate = ReadinessGate()
+    watcher = DirectoryWatcher(config.input_dir, 0.05, config.file_poll_interval)
+    watcher.start(gate.submit)
+    timer.record("watcher", timer.elapsed())
+
+    # 시작 도중 새 이미지가 들어온 상황 재현
+    image_path = str(workdir / "in" / "first.jpg")
+    os.rename(workdir / "first.jpg", image_path)
+    first_done = threading.Event()
+
+    components = app.build_components(config, es_session, FakeKafkaProducer(), timer)
+    gate.open(lambda path: components.scheduler.submit(path, lambda item: first_done.set()))
+    timer.report()
+    ready_at = time.time()
+    first_done.wait(60)
+    first_image_s = timer.elapsed()
+
+    watcher.stop()
+    components.close()
+    print(json.dumps({
+        "spawn_to_ready_s": ready_at - args.spawned_at,
+        "import_main_s": import_s,
+        "phases": timer.phases,
+        "first_image_s": first_image_s,
+    }))
+
+
+def run_child(args, workdir, sequential):
+    """ 자식 프로세스 한 번 실행 후 결과 dict 반환 """
+    for directory in ("in", "out"):
+        (workdir / directory).mkdir(parents=True, exist_ok=True)
+    (workdir / "first.jpg").write_bytes(args.image_bytes)
+    command = [sys.executable, "-m", "benchmarks.bench_startup", "--child", "--workdir", str(workdir),
+               "--hashes", str(args.hashes), "--es-latency", str(args.es_latency),
+               "--workers", str(args.workers), "--spawned-at", repr(time.time())]
+    if sequential:
+        command.append("--sequential")
+    if args.no_warmup:
+        command.append("--no-warmup")
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(results):
+    """ 반복 결과의 단계별 중앙값 """
+    summary = {
+        "spawn_to_ready_s": statistics.median(r["spawn_to_ready_s"] for r in results),
+        "import_main_s": statistics.median(r["import_main_s"] for r in results),
+        "first_image_s": statistics.median(r["first_image_s"] for r in results),
+    }
+    for phase in results[0]["phases"]:
+        summary[phase] = statistics.median(r["phases"].get(phase, 0.0) for r in results)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="모드별 반복 횟수")
+    parser.add_argument("--hashes", type=int, default=100000, help="가짜 ES에 미리 넣어둘 해시 수")
+    parser.add_argument("--es-latency", type=float, default=0.005, help="가짜 ES 요청 지연(초)")
+    parser.add_argument("--workers", type=int, default=0, help="추론 워커 프로세스 수")
+    parser.add_argument("--no-warmup", action="store_true", help="모델 워밍업 생략")
+    parser.add_argument("--output", help="결과 JSON 파일")
+    # 자식 프로세스용 인자
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    parser.add_argument("--sequential", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--spawned-at", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    import cv2
+    import numpy as np
+    img = np.random.default_rng(0).integers(0, 256, (1080, 1920, 3), dtype=np.uint8)
+    args.image_bytes = cv2.imencode(".jpg", img)[1].tobytes()
+
+    summaries = {}
+    with tempfile.TemporaryDirectory(prefix="imgtag-startup-") as tmp:
+        for mode, sequential in (("sequential", True), ("concurrent", False)):
+            results = [run_child(args, Path(tmp) / f"{mode}-{i}", sequential) for i in range(args.repeat)]
+            summaries[mode] = summarize(results)
+
+    phases = list(dict.fromkeys(key for summary in summaries.values() for key in summary))
+    print(f"{'phase':>18} " + " ".join(f"{mode:>11}" for mode in summaries))
+    for phase in phases:
+        print(f"{phase:>18} " + " ".join(f"{summary.get(phase, 0.0):>10.3f}s" for summary in summaries.values()))
+    if args.output:
+        Path(args.output).write_text(json.dumps({"params": {"hashes": args.hashes, "es_latency": args.es_latency,
+                                                            "workers": args.workers, "warmup": not args.no_warmup},
+                                                 "results": summaries}, indent=1))
+
+
+if __name__ == "__main__":
+    main()
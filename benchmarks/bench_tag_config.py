@@ -0,0 +1,98 @@
+"""
+태그/색상 설정 마이크로벤치마크
+- 설정 컴파일(다시 로드) 지연 시간: 파일 변경 -> 새 설정 교체까지
+- 감지 하나당 태그 변환 비용: 클래스 이름 dict 조회 vs 컴파일된 클래스 번호 배열
+
+실행: python -m benchmarks.bench_tag_config --detections 1000000
+"""
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from config import Config
+from core.tag_config import CompiledTags, TagConfig, TagConfigWatcher
+
+# COCO 80개 클래스 중 tags.json에 없는 클래스도 섞이도록 번호만 있는 이름 사용
+COCO_CLASSES = 80
+
+
+def class_names(tag_mapping):
+    """ tags.json의 클래스 이름을 앞 번호에 두고 나머지는 매핑 없는 이름으로 채운 클래스 목록 """
+    names = list(tag_mapping)[:COCO_CLASSES]
+    names += [f"unmapped_{i}" for i in range(COCO_CLASSES - len(names))]
+    return dict(enumerate(names))
+
+
+def bench_mapping(tag_mapping, names, count):
+    """ 감지 하나당 변환 시간(ns): (dict 조회, 컴파일된 배열) """
+    class_ids = np.random.default_rng(0).integers(0, len(names), count).tolist()
+
+    start = time.perf_counter()
+    for class_id in class_ids:
+        label = names[class_id]
+        if label in tag_mapping:
+            mapping = tag_mapping[label]
+            mapping["category"], mapping["subcategory"]
+    dict_ns = (time.perf_counter() - start) / count * 1e9
+
+    compiled = CompiledTags(tag_mapping, names)
+    start = time.perf_counter()
+    for class_id in class_ids:
+        compiled.lookup(class_id)
+    compiled_ns = (time.perf_counter() - start) / count * 1e9
+    return dict_ns, compiled_ns
+
+
+def bench_reload(config, names, repeats):
+    """ 파일 변경 감지 후 로드/컴파일/교체까지 걸린 시간(ms) 목록 """
+    with tempfile.TemporaryDirectory() as tmp:
+        tag_path = Path(tmp) / "tags.json"
+        colors_path = Path(tmp) / "colors.json"
+        shutil.copy(config.tag_mapping_file, tag_path)
+        shutil.copy(config.colors_file, colors_path)
+
+        current = {}
+
+        def apply(tag_mapping, color_ranges):
+            current["config"] = TagConfig(tag_mapping, color_ranges, names, config.color_threshold,
+                                          config.color_max_pixels, config.color_integral_ratio)
+
+        watcher = TagConfigWatcher(str(tag_path), str(colors_path), apply)
+        latencies = []
+        for _ in range(repeats):
+            # 편집기처럼 파일을 다시 써서 수정 시각을 바꿈
+            tag_path.write_text(tag_path.read_text())
+            start = time.perf_counter()
+            if watcher.check():
+                latencies.append((time.perf_counter() - start) * 1000)
+        return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tag config compile/reload benchmark")
+    parser.add_argument("--detections", type=int, default=1000000, help="변환할 감지 수")
+    parser.add_argument("--reloads", type=int, default=20, help="다시 로드 반복 횟수")
+    args = parser.parse_args()
+
+    config = Config()
+    names = class_names(config.tag_mapping)
+
+    dict_ns, compiled_ns = bench_mapping(config.tag_mapping, names, args.detections)
+    print(f"per-detection mapping: dict {dict_ns:.1f} ns, compiled {compiled_ns:.1f} ns "
+          f"({dict_ns / compiled_ns:.2f}x)")
+
+    latencies = bench_reload(config, names, args.reloads)
+    if latencies:
+        print(f"reload: p50 {statistics.median(latencies):.2f} ms, max {max(latencies):.2f} ms "
+              f"({len(latencies)} reloads)")
+    else:
+        print("reload: no change detected (file system timestamp resolution too coarse)")
+
+
+if __name__ == "__main__":
+    main()
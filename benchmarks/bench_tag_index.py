@@ -0,0 +1,95 @@
+"""
+태그 색인 벤치마크
+tags.json/colors.json의 태그로 합성 문서를 만들어 색인에 추가하고
+추가 처리량, 압축 시간, 다시 열 때 걸리는 시간, 조건별 조회 시간 측정
+
+실행: python -m benchmarks.bench_tag_index --docs 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from config import Config
+from core.tag_index import TagIndex
+
+QUERIES = (
+    "red AND vehicle AND person",
+    "primary:vehicle",
+    "(car OR bus OR truck) AND NOT red",
+    "person OR dog",
+    "NOT primary:human",
+)
+
+
+def synthetic_docs(count, seed=0):
+    """ (경로, 대분류, 태그 목록) 생성기: 태그 빈도는 실제처럼 치우치게 (앞쪽 태그일수록 자주 등장) """
+    config = Config()
+    rng = random.Random(seed)
+    mappings = list(config.tag_mapping.values())
+    colors = list(config.color_ranges)
+    weights = [1 / (rank + 1) for rank in range(len(mappings))]
+    for index in range(count):
+        objects = rng.choices(mappings, weights, k=rng.randint(1, 4))
+        primary_tag = objects[0]["category"]
+        tags = {tag for obj in objects for tag in (obj["category"], obj["subcategory"])}
+        tags.update(rng.sample(colors, rng.randint(0, 3)))
+        tags.discard(primary_tag)
+        yield f"/data/output/{primary_tag}/img_{index:08d}.jpg", primary_tag, sorted(tags)
+
+
+def timed_queries(index, repeat):
+    """ 조건별 (결과 수, 중앙값 ms) """
+    results = {}
+    for expression in QUERIES:
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            count = index.count(expression)
+            times.append((time.perf_counter() - start) * 1000)
+        results[expression] = (count, statistics.median(times))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tag index benchmark")
+    parser.add_argument("--docs", type=int, default=1000000, help="색인할 문서 수")
+    parser.add_argument("--repeat", type=int, default=5, help="조건별 조회 반복 횟수")
+    parser.add_argument("--db", help="색인 DB 경로 (없으면 임시 파일)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="imgtag-tag-index-") as tmp:
+        db_path = args.db or os.path.join(tmp, "tag_index.sqlite3")
+        index = TagIndex(db_path, compact_docs=args.docs + 1, queue_size=args.docs + 1)
+        index.start()
+        start = time.perf_counter()
+        for path, primary_tag, tags in synthetic_docs(args.docs):
+            index.add(path, primary_tag, tags)
+        enqueue_s = time.perf_counter() - start
+        index.flush()
+        write_s = time.perf_counter() - start
+        print(f"Added {args.docs} docs: enqueue {enqueue_s:.2f}s ({args.docs / enqueue_s:,.0f}/s), "
+              f"written {write_s:.2f}s ({args.docs / write_s:,.0f}/s)")
+
+        for expression, (count, ms) in timed_queries(index, args.repeat).items():
+            print(f"  {ms:8.2f} ms  {count:>9}  {expression}")
+
+        start = time.perf_counter()
+        index.compact()
+        print(f"Compacted in {time.perf_counter() - start:.2f}s")
+        index.log_stats()
+        index.close(compact=False)
+
+        start = time.perf_counter()
+        index = TagIndex(db_path)
+        print(f"Reopened in {time.perf_counter() - start:.2f}s, db {os.path.getsize(db_path) / 2 ** 20:.0f} MB")
+        start = time.perf_counter()
+        rows = index.query(QUERIES[0], limit=100)
+        print(f"Fetched {len(rows)} rows for '{QUERIES[0]}' in {(time.perf_counter() - start) * 1000:.1f} ms")
+        index.close(compact=False)
+
+
+if __name__ == "__main__":
+    main()
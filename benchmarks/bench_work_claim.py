@@ -0,0 +1,189 @@
+"""
+여러 노드 작업 분배 벤치마크
+로컬 프로세스 여러 개를 노드로 띄워 같은 입력 디렉터리를 WorkClaimer로 나눠 처리
+(처리는 --process-ms만큼 대기하는 가짜 처리, 파이프라인처럼 크기가 정해진 큐로 backpressure 재현)
+- 처리 도중 노드 하나를 SIGKILL로 종료해 lease 만료 후 회수되는지 확인
+- 늦게 합류한 노드에게 작업이 재분배되는지 확인
+- 모든 파일이 한 번씩 처리되었는지 확인 (죽은 노드가 처리하던 파일만 두 번 처리 허용)
+결과는 노드별 처리 수와 함께 JSON으로 출력
+
+실행: python -m benchmarks.bench_work_claim --nodes 3 --files 600 --process-ms 20
+"""
+import argparse
+import json
+import os
+import queue
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from interface.work_claim import WorkClaimer
+
+
+def child(args):
+    """ 자식 프로세스: 노드 하나로 선점/처리하다가 정지 파일이 생기면 통계를 JSON 한 줄로 출력 """
+    workdir = Path(args.workdir)
+    claimer = WorkClaimer(workdir / "in", args.node, heartbeat_interval=args.heartbeat,
+                          lease_timeout=args.lease, scan_interval=args.scan, settle_time=0.1)
+    tasks = queue.Queue(maxsize=8)      # 파이프라인 첫 단계 큐처럼 가득 차면 선점 쪽이 대기
+    log_fd = os.open(workdir / "processed.log", os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+
+    def work():
+        while True:
+            path, on_done = tasks.get()
+            time.sleep(args.process_ms / 1000)
+            # 한 줄을 한 번의 write로 기록 (O_APPEND라 프로세스 사이에서 섞이지 않음)
+            os.write(log_fd, f"{args.node}\t{os.path.basename(path)}\n".encode())
+            on_done(None)
+            tasks.task_done()
+
+    for _ in range(args.threads):
+        threading.Thread(target=work, daemon=True).start()
+    claimer.start(lambda path, on_done, backlog: tasks.put((path, on_done)))
+
+    stop_path = workdir / "stop"
+    while not stop_path.exists():
+        time.sleep(0.05)
+    claimer.stop()
+    tasks.join()
+    claimer.close()
+    print(json.dumps(claimer.stats()))
+
+
+def spawn(args, workdir, node):
+    command = [sys.executable, "-m", "benchmarks.bench_work_claim", "--child", "--workdir", str(workdir),
+               "--node", node, "--process-ms", str(args.process_ms), "--threads", str(args.threads),
+               "--heartbeat", str(args.heartbeat), "--lease", str(args.lease), "--scan", str(args.scan)]
+    return subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+
+
+def write_files(input_dir, names):
+    """ 다른 이름으로 쓴 뒤 rename해서 들어오게 함 (쓰는 중인 파일을 선점하지 않도록) """
+    for name in names:
+        tmp_path = input_dir / (name + ".part")
+        tmp_path.write_bytes(b"\xff\xd8" + os.urandom(64))
+        os.replace(tmp_path, input_dir / name)
+
+
+def read_log(path):
+    """ 처리 기록 -> [(노드, 파일 이름)] """
+    if not path.exists():
+        return []
+    return [tuple(line.split("\t")) for line in path.read_text().splitlines() if line]
+
+
+def remaining(workdir):
+    """ 아직 처리되지 않은 파일 수 (입력 디렉터리 + 모든 노드의 선점 디렉터리) """
+    count = sum(1 for p in (workdir / "in").iterdir() if p.is_file())
+    work_dir = workdir / "in" / ".claims" / "work"
+    if work_dir.exists():
+        count += sum(len(os.listdir(d)) for d in work_dir.iterdir() if d.is_dir())
+    return count
+
+
+def wait_for(condition, timeout, interval=0.05):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(interval)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-node work claim benchmark")
+    parser.add_argument("--nodes", type=int, default=3, help="처음에 띄울 노드 수 (이 중 하나를 도중에 종료)")
+    parser.add_argument("--files", type=int, default=600, help="처리할 파일 수 (절반은 시작 전, 절반은 처리 도중 추가)")
+    parser.add_argument("--process-ms", type=float, default=20, help="파일 하나의 가짜 처리 시간(ms)")
+    parser.add_argument("--threads", type=int, default=2, help="노드 하나의 처리 스레드 수")
+    parser.add_argument("--heartbeat", type=float, default=0.2, help="heartbeat 주기(초)")
+    parser.add_argument("--lease", type=float, default=1.0, help="lease 만료 시간(초)")
+    parser.add_argument("--scan", type=float, default=0.3, help="입력 디렉터리 훑기 주기(초)")
+    parser.add_argument("--timeout", type=float, default=120, help="전체 제한 시간(초)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    parser.add_argument("--node", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args)
+        return
+
+    with tempfile.TemporaryDirectory(prefix="imgtag-work-claim-") as tmp:
+        workdir = Path(tmp)
+        input_dir = workdir / "in"
+        input_dir.mkdir()
+        log_path = workdir / "processed.log"
+        names = [f"img_{i:06d}.jpg" for i in range(args.files)]
+        write_files(input_dir, names[:args.files // 2])
+
+        start = time.monotonic()
+        procs = {f"node{i}": spawn(args, workdir, f"node{i}") for i in range(args.nodes)}
+        victim = "node0"
+
+        # 처리 도중 새 파일 추가
+        write_files(input_dir, names[args.files // 2:])
+
+        # 전체의 약 1/4이 처리되면 한 노드를 강제 종료
+        wait_for(lambda: len(read_log(log_path)) >= args.files // 4, args.timeout)
+        procs[victim].send_signal(signal.SIGKILL)
+        procs[victim].wait()
+        killed_at = time.monotonic() - start
+        print(f"Killed {victim} at {killed_at:.2f}s")
+
+        # 회수가 진행되는 동안 늦게 합류하는 노드 추가
+        time.sleep(args.lease / 2)
+        late = f"node{args.nodes}"
+        procs[late] = spawn(args, workdir, late)
+        print(f"Joined {late} at {time.monotonic() - start:.2f}s")
+
+        finished = wait_for(lambda: remaining(workdir) == 0, args.timeout)
+        elapsed = time.monotonic() - start
+        (workdir / "stop").touch()
+        stats = {}
+        for node, proc in procs.items():
+            out, _ = proc.communicate(timeout=30)
+            if node != victim and out.strip():
+                stats[node] = json.loads(out.strip().splitlines()[-1])
+
+        records = read_log(log_path)
+        per_name = defaultdict(list)
+        for node, name in records:
+            per_name[name].append(node)
+        missing = [name for name in names if name not in per_name]
+        duplicates = {name: nodes for name, nodes in per_name.items() if len(nodes) > 1}
+        # 죽은 노드가 처리 기록을 남기고 정리하기 전에 죽은 파일만 두 번 처리될 수 있음
+        unexpected = {name: nodes for name, nodes in duplicates.items() if victim not in nodes}
+        parked = len(os.listdir(input_dir / ".claims" / "done"))
+
+        report = {
+            "files": args.files,
+            "finished": finished,
+            "elapsed_s": round(elapsed, 2),
+            "files_per_s": round(len(per_name) / elapsed, 1),
+            "single_node_files_per_s": round(args.threads * 1000 / args.process_ms, 1),
+            "killed": victim,
+            "killed_at_s": round(killed_at, 2),
+            "late_joiner": late,
+            "processed_by_node": dict(sorted(Counter(node for node, _ in records).items())),
+            "recovered_by_node": {node: s["recovered"] for node, s in sorted(stats.items())},
+            "lost_races_by_node": {node: s["lost"] for node, s in sorted(stats.items())},
+            "parked": parked,
+            "missing": len(missing),
+            "duplicates": len(duplicates),
+            "unexpected_duplicates": len(unexpected),
+        }
+        print(json.dumps(report, indent=2))
+        ok = finished and not missing and not unexpected and parked == args.files
+        print("OK: every file processed exactly once (at-least-once for the killed node's in-flight files)"
+              if ok else "FAILED")
+        if not ok:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
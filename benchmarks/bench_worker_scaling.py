@@ -0,0 +1,67 @@
+"""
+추론 워커 풀 확장성 벤치마크
+워커 수를 바꿔가며 같은 JPEG 묶음을 처리해 초당 이미지 수 측정
+
+실행: python -m benchmarks.bench_worker_scaling --workers 1 2 4 8 --images 256
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from config import Config
+from core.worker_pool import InferenceWorkerPool
+
+
+def make_jpegs(count, width, height):
+    """ 무작위 도형을 그린 (이름, JPEG 바이트, 해시) 목록 생성 """
+    rng = np.random.default_rng(0)
+    jpegs = []
+    for i in range(count):
+        img = np.full((height, width, 3), rng.integers(0, 256, 3), dtype=np.uint8)
+        for _ in range(5):
+            x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+            cv2.circle(img, (x, y), int(rng.integers(20, 200)), rng.integers(0, 256, 3).tolist(), -1)
+        # 결과 캐시를 거치지 않도록 해시는 None
+        jpegs.append((f"synthetic-{i}.jpg", cv2.imencode(".jpg", img)[1].tobytes(), None))
+    return jpegs
+
+
+def run(config, workers, threads, jpegs, batch_size):
+    """ 워커 workers개로 jpegs 전체를 처리한 초당 이미지 수 반환 """
+    pool = InferenceWorkerPool(config, workers, threads)
+    try:
+        pool.analyze(jpegs[:batch_size])    # 워밍업
+        batches = [jpegs[i:i + batch_size] for i in range(0, len(jpegs), batch_size)]
+        start = time.perf_counter()
+        # 모든 배치를 한꺼번에 보내 워커가 쉬지 않도록 함
+        pending = [pool.analyze_async(batch) for batch in batches]
+        for result in pending:
+            result.get(timeout=pool.task_timeout)
+        return len(jpegs) / (time.perf_counter() - start)
+    finally:
+        pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inference worker pool scaling benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="측정할 워커 수 목록")
+    parser.add_argument("--threads", type=int, default=1, help="워커별 연산 스레드 수")
+    parser.add_argument("--images", type=int, default=256, help="처리할 이미지 수")
+    parser.add_argument("--batch-size", type=int, default=8, help="배치 크기")
+    parser.add_argument("--size", type=int, nargs=2, default=[1920, 1080], metavar=("W", "H"), help="이미지 크기")
+    args = parser.parse_args()
+
+    config = Config()
+    jpegs = make_jpegs(args.images, *args.size)
+    baseline = None
+    print(f"{'workers':>7} {'img/s':>8} {'speedup':>8}")
+    for workers in args.workers:
+        rate = run(config, workers, args.threads, jpegs, args.batch_size)
+        baseline = baseline or rate
+        print(f"{workers:>7} {rate:>8.1f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
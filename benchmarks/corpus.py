@@ -0,0 +1,139 @@
+"""
+벤치마크용 합성 이미지 코퍼스 생성 모듈
+크기/형식/중복 비율을 지정해 같은 시드면 항상 같은 파일을 만들고, 구성은 manifest.json에 기록
+- unique: 무작위 배경과 도형을 그린 새 이미지
+- duplicate: 앞의 이미지와 바이트가 같은 사본 (SHA-256 중복)
+- near: 앞의 이미지를 축소/재인코딩한 사본 (지각 해시 근사 중복)
+
+실행: python -m benchmarks.corpus /tmp/corpus --count 500 --sizes 640x480 1920x1080 --duplicate-ratio 0.1
+"""
+import argparse
+import json
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+MANIFEST = "manifest.json"
+
+
+def parse_size(text):
+    """ '1920x1080' -> (1920, 1080) """
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def draw_image(rng, width, height):
+    """ 무작위 배경에 원/사각형을 그린 BGR 이미지 """
+    img = np.empty((height, width, 3), dtype=np.uint8)
+    img[:] = rng.integers(0, 256, 3)
+    scale = max(width, height)
+    for _ in range(int(rng.integers(3, 9))):
+        color = rng.integers(0, 256, 3).tolist()
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        size = int(rng.integers(scale // 20, scale // 4))
+        if rng.random() < 0.5:
+            cv2.circle(img, (x, y), size, color, -1)
+        else:
+            cv2.rectangle(img, (x, y), (x + size, y + size), color, -1)
+    return img
+
+
+def encode(img, fmt, quality=90):
+    """ 이미지를 형식에 맞게 인코딩한 바이트 """
+    params = [cv2.IMWRITE_JPEG_QUALITY, quality] if fmt == "jpg" else []
+    ok, buffer = cv2.imencode(f".{fmt}", img, params)
+    if not ok:
+        raise ValueError(f"Could not encode image as {fmt}")
+    return buffer.tobytes()
+
+
+def generate(directory, count, sizes=((1920, 1080),), formats=("jpg",), duplicate_ratio=0.0,
+             near_duplicate_ratio=0.0, seed=0):
+    """
+    코퍼스 생성 후 manifest dict 반환
+    directory (str): 이미지를 만들 디렉터리 (없으면 생성)
+    count (int): 만들 파일 수
+    sizes (list): (너비, 높이) 목록, 새 이미지마다 무작위 선택
+    formats (list): 'jpg', 'png' 중 사용할 형식 목록
+    duplicate_ratio (float): 바이트가 같은 사본 비율
+    near_duplicate_ratio (float): 축소/재인코딩 사본 비율
+    seed (int): 난수 시드 (같으면 같은 코퍼스)
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    files = []
+    originals = []      # (파일 이름, 형식) 사본의 원본 후보 (메모리 사용을 줄이려고 이미지는 다시 읽음)
+    for index in range(count):
+        roll = rng.random()
+        if originals and roll < duplicate_ratio:
+            source, fmt = originals[int(rng.integers(0, len(originals)))]
+            data = (directory / source).read_bytes()
+            kind = "duplicate"
+        elif originals and roll < duplicate_ratio + near_duplicate_ratio:
+            source, _ = originals[int(rng.integers(0, len(originals)))]
+            img = cv2.imread(str(directory / source))
+            factor = float(rng.uniform(0.5, 0.9))
+            resized = cv2.resize(img, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+            fmt = "jpg"
+            data = encode(resized, fmt, int(rng.integers(60, 85)))
+            kind = "near"
+        else:
+            width, height = sizes[int(rng.integers(0, len(sizes)))]
+            fmt = formats[int(rng.integers(0, len(formats)))]
+            img = draw_image(rng, width, height)
+            data = encode(img, fmt)
+            source = None
+            kind = "unique"
+        name = f"img_{index:06d}.{fmt}"
+        (directory / name).write_bytes(data)
+        if kind == "unique":
+            originals.append((name, fmt))
+        files.append({"name": name, "kind": kind, "source": source, "bytes": len(data)})
+
+    manifest = {
+        "count": count,
+        "sizes": [f"{w}x{h}" for w, h in sizes],
+        "formats": list(formats),
+        "duplicate_ratio": duplicate_ratio,
+        "near_duplicate_ratio": near_duplicate_ratio,
+        "seed": seed,
+        "kinds": {kind: sum(f["kind"] == kind for f in files) for kind in ("unique", "duplicate", "near")},
+        "total_bytes": sum(f["bytes"] for f in files),
+        "files": files,
+    }
+    (directory / MANIFEST).write_text(json.dumps(manifest, indent=1))
+    return manifest
+
+
+def load_manifest(directory):
+    """ 생성된 코퍼스의 manifest (없으면 None) """
+    path = Path(directory) / MANIFEST
+    return json.loads(path.read_text()) if path.exists() else None
+
+
+def add_arguments(parser):
+    """ 코퍼스 옵션을 argparse 파서에 추가 (벤치마크 하니스와 공유) """
+    parser.add_argument("--count", type=int, default=200, help="만들 파일 수")
+    parser.add_argument("--sizes", type=parse_size, nargs="+", default=[(1920, 1080)], help="이미지 크기 목록 (예: 640x480)")
+    parser.add_argument("--formats", nargs="+", default=["jpg"], choices=["jpg", "png"], help="이미지 형식 목록")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.1, help="바이트가 같은 사본 비율")
+    parser.add_argument("--near-duplicate-ratio", type=float, default=0.0, help="축소/재인코딩 사본 비율")
+    parser.add_argument("--seed", type=int, default=0, help="난수 시드")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic image corpus generator")
+    parser.add_argument("directory", help="이미지를 만들 디렉터리")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    manifest = generate(args.directory, args.count, args.sizes, args.formats, args.duplicate_ratio,
+                        args.near_duplicate_ratio, args.seed)
+    print(f"Generated {manifest['count']} files ({manifest['kinds']}, "
+          f"{manifest['total_bytes'] / 2 ** 20:.1f} MB) in {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
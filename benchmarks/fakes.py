@@ -0,0 +1,229 @@
+"""
+벤치마크용 가짜 외부 의존성 모듈
+브로커나 Elasticsearch 없이 로컬에서 컴포넌트를 측정하기 위한 대체 구현
+"""
+import itertools
+import json
+import queue
+import random
+import threading
+import time
+from urllib.parse import urlparse, parse_qs
+
+
+class FakeResponse:
+    """ requests.Response 중 사용하는 속성만 흉내낸 응답 객체 """
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self._body = body if body is not None else {}
+
+    def json(self):
+        return self._body
+
+    @property
+    def text(self):
+        return json.dumps(self._body)
+
+
+class FakeEsSession:
+    """
+    image_hashes 인덱스 하나만 다루는 메모리 기반 Elasticsearch 대체 세션
+    HashUtil이 사용하는 PIT/search_after, scroll, 인덱스 생성, 문서 저장 API를 지원
+    """
+    def __init__(self, hashes=(), index_exists=True, latency=0.0):
+        """
+        hashes (iterable): 미리 저장해 둘 해시 목록
+        index_exists (bool): 인덱스 존재 여부 (False면 조회 시 404)
+        latency (float): 요청마다 추가할 지연 시간(초)
+        """
+        self.index_exists = index_exists
+        self.latency = latency
+        self.docs = {}                      # _id -> source
+        self.requests = []                  # (method, path) 요청 기록
+        self._ids = itertools.count()
+        self._scrolls = {}
+        self._lock = threading.Lock()
+        for img_hash in hashes:
+            self.docs[str(next(self._ids))] = {"hash": img_hash}
+
+    # requests.Session 인터페이스
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self):
+        pass
+
+    def request(self, method, url, json=None, data=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        parsed = urlparse(url)
+        path, query = parsed.path, parse_qs(parsed.query)
+        with self._lock:
+            self.requests.append((method, path))
+            docs = list(self.docs.items())
+
+        if path == "/image_hashes" and method == "PUT":
+            if self.index_exists:
+                return FakeResponse(400, {"error": "resource_already_exists_exception"})
+            self.index_exists = True
+            return FakeResponse(200, {"acknowledged": True})
+        if not self.index_exists and path.startswith("/image_hashes"):
+            return FakeResponse(404, {"error": "index_not_found_exception"})
+        if path == "/image_hashes/_pit":
+            return FakeResponse(200, {"id": "fake-pit"})
+        if path == "/_pit":
+            return FakeResponse(200, {"succeeded": True})
+        if path == "/_search":
+            return FakeResponse(200, self._search_after(docs, json or {}))
+        if path == "/image_hashes/_search" and "scroll" in query:
+            return FakeResponse(200, self._open_scroll(docs, json or {}))
+        if path == "/_search/scroll":
+            if method == "DELETE":
+                self._scrolls.pop((json or {}).get("scroll_id"), None)
+                return FakeResponse(200, {"succeeded": True})
+            return FakeResponse(200, self._next_scroll((json or {})["scroll_id"]))
+        if path == "/image_hashes/_doc" and method == "POST":
+            with self._lock:
+                self.docs[str(next(self._ids))] = json
+            return FakeResponse(201, {"result": "created"})
+        if path == "/_bulk" and method == "POST":
+            return FakeResponse(200, self._bulk(data))
+        return FakeResponse(400, {"error": f"unsupported request {method} {path}"})
+
+    @staticmethod
+    def _hit(doc_id, source, sort):
+        return {"_id": doc_id, "fields": {k: [v] for k, v in source.items()}, "sort": sort}
+
+    def _search_after(self, docs, body):
+        """ PIT 검색: 문서 순번을 _shard_doc 정렬 값으로 사용 """
+        size = body.get("size", 10)
+        after = body.get("search_after", [-1])[0]
+        slicing = body.get("slice")
+        hits = []
+        for seq, (doc_id, source) in enumerate(docs):
+            if seq <= after:
+                continue
+            if slicing and seq % slicing["max"] != slicing["id"]:
+                continue
+            hits.append(self._hit(doc_id, source, [seq]))
+            if len(hits) >= size:
+                break
+        return {"pit_id": "fake-pit", "hits": {"hits": hits}}
+
+    def _bulk(self, data):
+        """ _bulk 요청의 index 동작만 처리 (_id 기준 덮어쓰기) """
+        lines = [line for line in (data.decode("utf-8") if isinstance(data, bytes) else data).splitlines() if line]
+        items = []
+        with self._lock:
+            for action_line, source_line in zip(lines[::2], lines[1::2]):
+                action = json.loads(action_line)["index"]
+                doc_id = action.get("_id") or str(next(self._ids))
+                self.docs[doc_id] = json.loads(source_line)
+                items.append({"index": {"_id": doc_id, "status": 200}})
+        return {"errors": False, "items": items}
+
+    def _open_scroll(self, docs, body):
+        scroll_id = f"scroll-{len(self._scrolls)}"
+        self._scrolls[scroll_id] = (docs, 0, body.get("size", 10))
+        return self._next_scroll(scroll_id)
+
+    def _next_scroll(self, scroll_id):
+        docs, offset, size = self._scrolls[scroll_id]
+        page = docs[offset:offset + size]
+        self._scrolls[scroll_id] = (docs, offset + size, size)
+        hits = [self._hit(doc_id, source, [offset + i]) for i, (doc_id, source) in enumerate(page)]
+        return {"_scroll_id": scroll_id, "hits": {"hits": hits}}
+
+
+class FakeFuture:
+    """ kafka-python FutureRecordMetadata 중 콜백 등록 부분만 흉내낸 객체 """
+    def __init__(self):
+        self._callbacks = []
+        self._errbacks = []
+        self._result = None
+        self._error = None
+        self._done = False
+        self._lock = threading.Lock()
+
+    def add_callback(self, fn, *args):
+        with self._lock:
+            if not self._done:
+                self._callbacks.append((fn, args))
+                return self
+        if self._error is None:
+            fn(*args, self._result)
+        return self
+
+    def add_errback(self, fn, *args):
+        with self._lock:
+            if not self._done:
+                self._errbacks.append((fn, args))
+                return self
+        if self._error is not None:
+            fn(*args, self._error)
+        return self
+
+    def resolve(self, result=None, error=None):
+        with self._lock:
+            self._result, self._error, self._done = result, error, True
+            callbacks = self._errbacks if error is not None else self._callbacks
+        for fn, args in callbacks:
+            fn(*args, error if error is not None else result)
+
+
+class FakeKafkaProducer:
+    """
+    브로커 없이 동작하는 KafkaProducer 대체 구현
+    send는 즉시 반환하고, 별도 스레드가 latency 후 배치 단위로 전송 완료 처리
+    """
+    def __init__(self, latency=0.002, failure_rate=0.0, batch_size=100):
+        """
+        latency (float): 배치 하나의 왕복 시간(초)
+        failure_rate (float): 전송 실패 확률 (0~1)
+        batch_size (int): 한 번의 왕복으로 완료 처리할 최대 메시지 수
+        """
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.batch_size = batch_size
+        self.messages = []
+        self._pending = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def send(self, topic, value=None, **kwargs):
+        future = FakeFuture()
+        self._pending.put((topic, value, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._pending.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            time.sleep(self.latency)
+            for topic, value, future in batch:
+                if random.random() < self.failure_rate:
+                    future.resolve(error=RuntimeError("fake delivery failure"))
+                else:
+                    self.messages.append((topic, value))
+                    future.resolve(result={"topic": topic})
+                self._pending.task_done()
+
+    def flush(self, timeout=None):
+        """ 대기 중인 메시지가 모두 처리될 때까지 대기 """
+        self._pending.join()
+
+    def close(self, timeout=None):
+        self.flush(timeout)
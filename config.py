@@ -1,5 +1,7 @@
 """설정 관리"""
 import json
+import os
+import socket
 from pathlib import Path
 
 class Config:
@@ -20,22 +22,130 @@ class Config:
         self.input_dir = self.base_dir
         # 출력 디렉터리 (분류된 파일 저장)
         self.output_dir = self.base_dir
+        # 파일 이동 설정
+        self.file_io_workers = 2            # 다른 파일시스템으로 복사할 백그라운드 스레드 수
+        self.file_move_journal_path = "file_moves.jsonl"    # 진행 중인 복사 기록 (중단 후 재시작 시 마무리, None이면 사용 안 함)
 
         # 모델 설정
         # yolo8n.pt는 YOLOv8 Nano 모델 (가장 작고 빠른 버전)
         self.model_path = "./models/yolov8n.pt"
+        self.model_backend = "torch"        # 추론 백엔드 ('torch', 'onnx', 'onnx-int8', 'openvino')
+        self.model_imgsz = 640              # 모델 입력 크기
+        self.ort_intra_op_threads = 0       # ONNX Runtime 연산자 내부 스레드 수 (0이면 기본값)
+        self.ort_inter_op_threads = 0       # ONNX Runtime 연산자 간 스레드 수 (0이면 기본값)
+        self.reduced_decode = True          # 모델 입력보다 충분히 큰 JPEG는 1/2, 1/4, 1/8로 축소 디코딩
+                                            # 색상 분석도 축소된 이미지에서 수행 (긴 변은 model_imgsz 이상 유지)
+                                            # 작은 박스일수록 색상 판단에 쓰는 픽셀이 적어짐, 색상 정확도가 더 중요하면 False
+        self.model_warmup = True            # 시작 시 빈 이미지로 한 번 추론해 첫 이미지의 지연 초기화 비용을 미리 지불
+        self.concurrent_startup = True      # 모델 로드, ES 해시 로드, Kafka 연결을 동시에 실행 (False면 순서대로)
 
         # Kafka 설정
         self.kafka_bootstrap_servers = ["localhost:9092"]     # Kafka 브로커 주소
         self.kafka_topic_name = "image_tags"     # 태그 데이터를 발행할 토픽
+        self.kafka_linger_ms = 5                 # 배치를 채우기 위해 기다리는 시간(ms)
+        self.kafka_batch_size = 16384            # 파티션별 배치 최대 크기(바이트)
+        self.kafka_compression_type = None       # 압축 방식 (None, 'gzip', 'snappy', 'lz4', 'zstd')
+        self.kafka_acks = 1                      # 전송 확인 수준 (0, 1, 'all')
+        self.kafka_max_in_flight = 1000          # 확인되지 않은 메시지 최대 개수
+        self.kafka_spool_path = "kafka_spool.jsonl"  # 전송 실패 메시지 보관 파일
+        self.kafka_close_timeout = 10            # 종료 시 남은 메시지 전송 대기 시간(초)
 
         # 태그 매핑 (YOLO 클래스 이름 -> 내부 태그)
         self.tag_mapping_file = "tags.json"
         self.colors_file = "colors.json"
+        self.tag_reload_interval = 2.0  # 태그/색상 파일 변경 확인 주기(초), 바뀌면 재시작 없이 다시 적용 (0이면 사용 안 함)
 
         # ES URL
         self.es_url = "http://localhost:9200"
 
+        # ES 해시 로드 설정
+        self.es_load_page_size = 10000  # 페이지당 문서 수
+        self.es_load_slices = 4         # 동시에 읽을 슬라이스 수
+
+        # ES 해시 일괄 저장 설정
+        self.es_bulk_size = 500         # 한 번에 보낼 최대 해시 수
+        self.es_bulk_interval = 1.0     # 해시가 있으면 최소 이 간격(초)마다 저장
+        self.es_bulk_max_retries = 5    # 실패한 배치의 최대 재시도 횟수
+
+        # 근사 중복(재인코딩/리사이즈된 사본) 확인 설정
+        self.perceptual_dedup = False   # 지각 해시(dHash)를 ES에 함께 저장하고 근사 중복은 모델 실행 전에 건너뜀
+        self.phash_radius = 4           # 이 해밍 거리(64비트 중) 이내면 같은 이미지로 판단
+
+        # 추론 전 분류 설정 (빈 화면/단색/아주 작은 이미지는 모델을 실행하지 않고 no_detection 처리)
+        self.triage = False                 # 사용 여부 (먼저 python -m core.triage calibrate로 임계값 보정 권장)
+        self.triage_path = "triage.json"    # 보정된 임계값 파일 (없으면 기본 임계값)
+        self.triage_audit_rate = 0.01       # 건너뛸 이미지 중 확인용으로 모델을 실행할 비율 (잘못 건너뛴 비율 추정)
+
+        # 해시 캐시 파일 (장치/inode/크기/수정시각 기준으로 해시 재사용)
+        self.hash_cache_path = "hash_cache.sqlite3"
+
+        # 감지 결과 캐시 (내용 해시 + 모델/추론 설정 fingerprint -> 감지 결과)
+        self.result_cache_path = "result_cache.sqlite3"     # 캐시 DB 경로 (None이면 사용 안 함)
+        self.result_cache_max_entries = 1000000             # 최대 저장 개수 (넘으면 오래 쓰지 않은 항목부터 삭제)
+
+        # 로컬 태그 색인 (이동된 파일의 태그를 기록하고 python -m core.tag_index query로 조회)
+        self.tag_index_path = "tag_index.sqlite3"   # 색인 DB 경로 (None이면 사용 안 함)
+        self.tag_index_compact_docs = 100000        # 마지막 압축 이후 이만큼 추가되면 태그별 비트맵을 다시 저장
+
+        # 배치 추론 설정
+        self.batch_size = 8         # 한 번에 모델에 넣을 최대 이미지 수 (자동 조절하면 시작 값)
+        self.batch_max_wait = 0.5   # 배치를 채우기 위해 기다리는 최대 시간(초)
+        self.batch_target_latency = 1.0     # 배치 하나의 목표 추론 시간(초), 관측 시간에 맞춰 배치 크기 조절 (None이면 고정)
+        self.batch_size_min = 1             # 자동 조절 시 최소 배치 크기
+        self.batch_size_max = 32            # 자동 조절 시 최대 배치 크기
+
+        # 색상 분석 설정
+        self.color_threshold = 0.1          # ROI 픽셀 중 이 비율을 넘으면 해당 색상으로 판단
+        self.color_max_pixels = 1000000     # 이미지가 이보다 크면 간격을 두고 샘플링한 뒤 HSV 변환 (None이면 전체 사용)
+        self.color_integral_ratio = 1.0     # 박스 면적 합이 이미지 면적의 이 배수를 넘으면 누적합으로 계산
+
+        # 파일 쓰기 완료 감지 설정
+        self.file_settle_time = 1.0         # 크기가 이 시간(초) 동안 변하지 않으면 쓰기 완료로 판단
+        self.file_poll_interval = 0.25      # 쓰기 중인 파일 상태 확인 주기(초)
+
+        # 파이프라인 설정
+        self.decode_workers = 4             # 해시/디코딩 워커 수
+        self.color_workers = 2              # 색상 분석/태깅 워커 수
+        self.sink_workers = 1               # 파일 이동/발행 워커 수
+        self.stage_queue_size = 64          # 단계 사이 큐의 최대 크기
+        self.pipeline_stats_interval = 30   # 파이프라인 통계 출력 주기(초)
+
+        # 스케줄러 설정 (파이프라인 앞에서 우선순위/마감 시간/부하 제한 적용)
+        self.sched_max_in_flight = 48       # 파이프라인에 넣어 둘 최대 이미지 수 (stage_queue_size 이하, 나머지는 스케줄러에서 대기)
+        self.sched_large_file_bytes = 20 * 2 ** 20     # 이보다 큰 새 파일은 작은 파일 뒤에 처리 (None이면 구분 안 함)
+        self.sched_deadlines = {"live": 10.0, "live_large": 60.0}   # 클래스별 마감 시간(초), 넘기면 deferred로 미룸
+        self.sched_limits = {"live": 10000, "live_large": 1000, "deferred": 200000, "backfill": 256}  # 클래스별 최대 대기 수
+        self.sched_lifo_depth = 64          # 새 파일 큐가 이보다 길면 최근 파일부터 처리 (None이면 항상 들어온 순서)
+        self.sched_overflow = "defer"       # 새 파일 큐가 한도를 넘을 때: 'defer'면 뒤로 미룸, 'shed'면 버림 (다음 백필에서 처리)
+
+        # 기존 파일 백필 설정
+        self.backfill_recursive = False     # 하위 디렉터리까지 백필 (출력 디렉터리가 입력 아래에 있으면 분류된 파일도 다시 확인)
+        self.backfill_checkpoint_path = "backfill_checkpoint.sqlite3"   # 중단된 백필을 이어가기 위한 체크포인트 (None이면 사용 안 함)
+
+        # 여러 노드 작업 분배 설정 (같은 입력 디렉터리를 공유 볼륨으로 여러 노드가 나눠 처리)
+        self.work_claim = False             # True면 파일을 선점(rename)한 노드만 처리 (백필 대신 주기적인 훑기 사용)
+        self.node_id = os.environ.get("IMGTAG_NODE_ID") or socket.gethostname()    # 노드 이름 (재시작해도 같아야 함)
+        self.claim_dir = None               # 선점 제어 디렉터리 (입력과 같은 파일시스템, None이면 입력 디렉터리/.claims)
+        self.claim_heartbeat_interval = 2.0     # 노드 heartbeat 갱신 주기(초)
+        self.claim_lease_timeout = 10.0     # heartbeat가 이 시간(초)보다 오래되면 죽은 노드로 보고 선점 파일 회수
+        self.claim_scan_interval = 5.0      # 입력 디렉터리를 다시 훑는 주기(초) (다른 호스트가 쓴 파일은 감시 이벤트가 없을 수 있음)
+
+        # 로그/메트릭 설정
+        self.log_level = "INFO"             # 기록할 최소 로그 레벨 ('DEBUG'면 이미지별 로그도 출력)
+        self.log_rate_burst = 10            # 같은 위치의 로그를 log_rate_interval초 동안 이만큼만 출력 (0이면 제한 없음)
+        self.log_rate_interval = 10.0       # 로그 출력 수 제한 구간(초)
+        self.metrics_port = 9464            # Prometheus 텍스트 형식 메트릭 HTTP 포트 (0이면 사용 안 함)
+        self.metrics_host = "127.0.0.1"     # 메트릭 HTTP 서버 주소 (로컬에서만 접근)
+        self.metrics_snapshot_path = "metrics.json"     # 메트릭 JSON 스냅샷 파일 (None이면 사용 안 함)
+        self.metrics_snapshot_interval = 30.0           # 스냅샷 기록 주기(초)
+        self.trace_sample_rate = 0.0        # 단계별 시간을 로그로 남길 이미지 비율 (0.01이면 1%)
+
+        # 멀티 프로세스 추론 설정
+        self.inference_workers = 0          # 추론 워커 프로세스 수 (0이면 현재 프로세스에서 추론)
+        self.worker_threads = 1             # 워커 하나가 사용할 연산 스레드 수
+        self.worker_task_timeout = 120      # 배치 하나의 최대 처리 시간(초)
+        self.frame_ring_slots = 32          # 워커에 넘길 letterbox 프레임 공유 메모리 슬롯 수 (0이면 파일 바이트 전달)
+
         # 태그 매핑 로드
         try:
             with open(self.tag_mapping_file, 'r') as f:
@@ -0,0 +1,177 @@
+"""
+색상 분류 모듈
+colors.json의 HSV 범위를 미리 룩업 테이블로 변환해 두고
+ROI를 한 번만 훑어 모든 색상의 픽셀 수를 함께 계산
+"""
+import math
+
+import cv2
+import numpy as np
+
+from utils.log_util import get_logger
+
+logger = get_logger(__name__)
+
+AXIS_SIZE = 256     # 8비트 채널 값 범위 (H는 0~179만 사용)
+
+
+class ColorClassifier:
+    """
+    HSV 색상 범위 집합을 구간 룩업 테이블로 변환한 분류기
+
+    각 축(H, S, V)을 모든 범위의 경계값으로 잘라 구간으로 나누면
+    (H구간, S구간, V구간) 조합 하나는 각 색상 범위에 완전히 포함되거나 완전히 벗어남.
+    픽셀마다 조합 번호를 구해 np.bincount로 세고, 조합 x 색상 포함 행렬을 곱하면
+    cv2.inRange를 색상마다 반복한 것과 같은 픽셀 수를 한 번에 얻을 수 있음
+    """
+    def __init__(self, color_ranges, threshold=0.1, max_pixels=None, integral_ratio=1.0):
+        """
+        color_ranges (dict): 색상 이름 -> {"lower": [h, s, v], "upper": [h, s, v]}
+        threshold (float): ROI 픽셀 중 이 비율을 넘으면 해당 색상으로 판단
+        max_pixels (int): 이미지(ROI) 픽셀 수가 이보다 많으면 간격을 두고 샘플링 (None이면 전체 사용)
+        integral_ratio (float): 박스 면적 합이 이미지 면적의 이 배수를 넘으면 (겹침이 많으면)
+                                색상별 누적합(summed-area table)으로 박스를 계산
+        """
+        self.names = list(color_ranges)
+        self.threshold = threshold
+        self.max_pixels = max_pixels
+        self.integral_ratio = integral_ratio
+
+        lowers = np.array([color_ranges[name]["lower"] for name in self.names], dtype=np.int64).reshape(-1, 3)
+        uppers = np.array([color_ranges[name]["upper"] for name in self.names], dtype=np.int64).reshape(-1, 3)
+
+        # 축별로 경계값 기준 구간 룩업 테이블과 구간별 색상 포함 여부 계산
+        luts, inside = [], []
+        for axis in range(3):
+            cuts = {0, AXIS_SIZE}
+            cuts.update(np.clip(lowers[:, axis], 0, AXIS_SIZE).tolist())
+            cuts.update(np.clip(uppers[:, axis] + 1, 0, AXIS_SIZE).tolist())
+            cuts = sorted(cuts)
+            starts = np.array(cuts[:-1])
+
+            lut = np.zeros(AXIS_SIZE, dtype=np.int32)
+            for index, (begin, end) in enumerate(zip(cuts, cuts[1:])):
+                lut[begin:end] = index
+            luts.append(lut)
+            # 구간 x 색상: 구간 시작값이 범위 안이면 구간 전체가 범위 안
+            inside.append((starts[:, None] >= lowers[None, :, axis]) & (starts[:, None] <= uppers[None, :, axis]))
+
+        n_h, n_s, n_v = (len(axis_inside) for axis_inside in inside)
+        self.region_count = n_h * n_s * n_v
+        # 축별 테이블에 자리값을 미리 곱해 두어 조합 번호 = 세 테이블 값의 합
+        self._lut_h = luts[0] * (n_s * n_v)
+        self._lut_s = luts[1] * n_v
+        self._lut_v = luts[2]
+        # 조합 수가 uint16 범위면 cv2.LUT로 세 채널을 한 번에 변환 (numpy 인덱싱보다 빠름)
+        self._lut_hsv = None
+        if self.region_count <= np.iinfo(np.uint16).max:
+            self._lut_hsv = np.stack([self._lut_h, self._lut_s, self._lut_v], axis=-1) \
+                .reshape(1, AXIS_SIZE, 3).astype(np.uint16)
+        # 조합 x 색상 포함 행렬
+        self._membership = (inside[0][:, None, None, :] & inside[1][None, :, None, :]
+                            & inside[2][None, None, :, :]).reshape(self.region_count, -1).astype(np.int64)
+
+    def sample_step(self, img):
+        """ 픽셀 수를 max_pixels 이하로 줄이기 위한 샘플링 간격 (1이면 전체 사용) """
+        pixels = img.shape[0] * img.shape[1]
+        if not self.max_pixels or pixels <= self.max_pixels:
+            return 1
+        return math.ceil(math.sqrt(pixels / self.max_pixels))
+
+    def sample(self, roi):
+        """ 픽셀 수가 max_pixels를 넘으면 일정 간격으로 샘플링한 뷰 반환 (복사 없음) """
+        step = self.sample_step(roi)
+        return roi[::step, ::step] if step > 1 else roi
+
+    def region_labels(self, hsv):
+        """ HSV 이미지의 픽셀별 구간 조합 번호 """
+        if self._lut_hsv is not None:
+            h, s, v = cv2.split(cv2.LUT(hsv, self._lut_hsv))
+            return cv2.add(cv2.add(h, s), v)
+        return self._lut_h[hsv[..., 0]] + self._lut_s[hsv[..., 1]] + self._lut_v[hsv[..., 2]]
+
+    def count_regions(self, labels):
+        """ 구간 조합 번호 배열 -> 조합별 픽셀 수 """
+        return np.bincount(labels.ravel(), minlength=self.region_count)
+
+    def count(self, hsv):
+        """ HSV 이미지에서 색상별 픽셀 수 (colors.json 순서) """
+        return self.count_regions(self.region_labels(hsv)) @ self._membership
+
+    def colors_from_counts(self, counts, pixels):
+        """ 색상별 픽셀 수 중 임계 비율을 넘는 색상 이름 목록 """
+        if pixels <= 0:
+            return []
+        limit = pixels * self.threshold
+        return [name for name, count in zip(self.names, counts) if count > limit]
+
+    def label_map(self, img):
+        """
+        이미지 전체를 한 번만 HSV로 변환한 구간 조합 번호 맵
+        returns: (ndarray, int): 조합 번호 맵, 원본 대비 샘플링 간격
+        """
+        step = self.sample_step(img)
+        sampled = img[::step, ::step] if step > 1 else img
+        hsv = cv2.cvtColor(np.ascontiguousarray(sampled), cv2.COLOR_BGR2HSV)  # BGR to HSV 변환
+        return self.region_labels(hsv), step
+
+    def _integral(self, labels):
+        """ 색상별 픽셀 수 누적합 (H+1, W+1, 색상 수), 임의 박스의 색상별 픽셀 수를 O(1)로 계산 """
+        height, width = labels.shape
+        integral = np.zeros((height + 1, width + 1, len(self.names)), dtype=np.int32)
+        member = self._membership.astype(np.uint8)[labels]
+        np.cumsum(member, axis=0, dtype=np.int32, out=integral[1:, 1:])
+        np.cumsum(integral[1:, 1:], axis=1, out=integral[1:, 1:])
+        return integral
+
+    def classify_boxes(self, img, boxes):
+        """
+        이미지 한 장의 여러 바운딩 박스 색상을 한 번의 HSV 변환으로 계산
+        img (ndarray): BGR 이미지
+        boxes (list): 박스별 (x1, y1, x2, y2) 원본 좌표
+        returns: list: 박스별 색상 이름 목록
+        """
+        if not self.names or not boxes:
+            return [[] for _ in boxes]
+        labels, step = self.label_map(img)
+        h, w = img.shape[:2]
+
+        # 박스를 이미지 안으로 자르고 샘플 좌표로 변환 (원본 [x1, x2) 범위에 속하는 샘플 인덱스)
+        rects = []
+        for box in boxes:
+            x1, y1, x2, y2 = (int(v) for v in box)
+            x1, y1, x2, y2 = max(0, x1), max(0, y1), min(w, x2), min(h, y2)
+            if x1 >= x2 or y1 >= y2:
+                logger.warning("Invalid bounding box: (%d, %d, %d, %d) - skipping color analysis", x1, y1, x2, y2)
+                rects.append(None)
+                continue
+            rects.append((-(-y1 // step), -(-y2 // step), -(-x1 // step), -(-x2 // step)))
+
+        valid = [rect for rect in rects if rect]
+        area = sum((y2 - y1) * (x2 - x1) for y1, y2, x1, x2 in valid)
+        # 박스가 많이 겹치면 누적합을 한 번 만들어 재사용, 아니면 박스별 뷰(복사 없는 슬라이스)를 직접 셈
+        integral = self._integral(labels) if len(valid) > 1 and area > labels.size * self.integral_ratio else None
+
+        colors = []
+        for rect in rects:
+            if rect is None:
+                colors.append([])
+                continue
+            y1, y2, x1, x2 = rect
+            if integral is not None:
+                counts = integral[y2, x2] - integral[y1, x2] - integral[y2, x1] + integral[y1, x1]
+            else:
+                counts = self.count_regions(labels[y1:y2, x1:x2]) @ self._membership
+            colors.append(self.colors_from_counts(counts, (y2 - y1) * (x2 - x1)))
+        return colors
+
+    def classify(self, roi):
+        """
+        BGR ROI의 주요 색상 목록 반환
+        임계값은 채널 수가 포함된 roi.size가 아닌 픽셀 수 기준
+        """
+        if not self.names:
+            return []
+        roi = self.sample(roi)
+        hsv = cv2.cvtColor(np.ascontiguousarray(roi), cv2.COLOR_BGR2HSV)  # BGR to HSV 변환
+        return self.colors_from_counts(self.count(hsv), hsv.shape[0] * hsv.shape[1])
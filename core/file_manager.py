@@ -1,44 +1,283 @@
 """
 파일 이동/관리 로직
 태그에 따른 디렉터리 생성 및 파일 이동
+같은 파일시스템이면 os.rename으로 바로 옮기고, 다른 파일시스템이면 백그라운드 I/O 스레드에서 복사
+이름이 겹치면 내용 해시를 붙인 이름을 사용하고, 진행 중인 복사는 저널에 기록해 중단 후 복구
 """
-import shutil # 파일 이동 기능
+import errno
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path # 경로 처리용 라이브러리
 
+from utils.file_utils import copy_file
+from utils.log_util import get_logger
+from utils.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+HASH_SUFFIX_LENGTH = 12     # 이름 충돌 시 붙이는 내용 해시 길이
+PART_SUFFIX = ".part"       # 복사 중인 파일에 붙이는 확장자
+
+
+def file_sha256(file_path):
+    """ 파일 내용의 SHA-256 (이름 충돌 시 해시가 전달되지 않았을 때만 계산) """
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+class MoveJournal:
+    """
+    다른 파일시스템으로 복사 중인 이동을 기록하는 저널 (JSON Lines)
+    시작 기록은 fsync 후 복사를 시작하고, 끝나면 완료 기록을 남김
+    진행 중인 이동이 없으면 파일을 비워 크기를 유지
+    """
+    def __init__(self, journal_path):
+        """ journal_path (str): 저널 파일 경로 """
+        self.journal_path = Path(journal_path)
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._open = 0      # 완료 기록이 없는 이동 수
+
+    def pending(self):
+        """ 완료 기록이 없는 이동 목록 (시작 기록 dict) """
+        if not self.journal_path.exists():
+            return []
+        moves = {}
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue    # 기록 도중 중단된 마지막 줄
+                if record.get("op") == "begin":
+                    moves[record["id"]] = record
+                else:
+                    moves.pop(record.get("id"), None)
+        return list(moves.values())
+
+    def _append(self, record, sync):
+        """ 기록 한 줄 추가 (락을 잡은 상태에서 호출) """
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            if sync:
+                os.fsync(f.fileno())
+
+    def begin(self, src, dest, context=None):
+        """ 이동 시작 기록 (디스크에 기록된 뒤 반환), 기록 번호 반환 """
+        with self._lock:
+            move_id = self._next_id
+            self._next_id += 1
+            self._open += 1
+            self._append({"op": "begin", "id": move_id, "src": src, "dest": dest, "context": context}, True)
+        return move_id
+
+    def finish(self, move_id):
+        """ 이동 완료(또는 포기) 기록, 진행 중인 이동이 없으면 저널 비우기 """
+        with self._lock:
+            self._open -= 1
+            if self._open == 0:
+                # 완료 기록은 fsync하지 않음 (유실되면 복구 시 이미 옮겨진 것을 확인하고 넘어감)
+                self.journal_path.write_text("")
+            else:
+                self._append({"op": "done", "id": move_id}, False)
+
+    def clear(self):
+        """ 복구가 끝난 저널 비우기 """
+        with self._lock:
+            self._next_id = 0
+            self._open = 0
+            self.journal_path.unlink(missing_ok=True)
 
 
 class FileManager:
     """ 태그 기반 파일 관리 기능을 제공하는 클래스 """
-    def __init__(self, base_output_dir):
-        """ 생성자: 기본 출력 디렉터리 저장"""
+    def __init__(self, base_output_dir, io_workers=2, journal_path=None):
+        """
+        생성자: 기본 출력 디렉터리 저장
+        base_output_dir (str): 기본 출력 디렉터리
+        io_workers (int): 다른 파일시스템으로 복사할 백그라운드 스레드 수
+        journal_path (str): 진행 중인 복사를 기록할 저널 경로 (없으면 기록 안 함)
+        """
         # 문자열 경로를 Path 객체로 변환 (크로스 플랫폼 경로 처리 용이)
         self.base_output_dir = Path(base_output_dir)
+        self.journal = MoveJournal(journal_path) if journal_path else None
+        self._executor = ThreadPoolExecutor(max_workers=max(1, io_workers), thread_name_prefix="file-io")
 
+        self._lock = threading.Lock()
+        self._created_dirs = set()      # 이미 만든 태그 디렉터리 (이미지마다 mkdir 호출 방지)
+        self._reserved = set()          # 이동 중인 대상 경로 (동시에 같은 이름을 고르지 않도록)
+        # 통계
+        self.renamed = 0        # os.rename으로 옮긴 수
+        self.copied = 0         # 다른 파일시스템으로 복사한 수
+        self.collisions = 0     # 이름이 겹쳐 해시를 붙인 수
+        self.failed = 0         # 복사 실패 수
+        self.rename_latency = REGISTRY.histogram("imgtag_file_move_seconds", "File move time", method="rename")
+        self.copy_latency = REGISTRY.histogram("imgtag_file_move_seconds", "File move time", method="copy")
+        REGISTRY.gauge("imgtag_file_moves_pending", "Moves not finished yet (mostly cross-device copies)").set_function(
+            lambda: len(self._reserved))
 
     def ensure_output_dir(self, tag):
         """
-        태그에 맞는 출력 디렉터리 생성
+        태그에 맞는 출력 디렉터리 생성 (한 번 만든 디렉터리는 다시 확인하지 않음)
         tag (str): 파일 분류 태그
         Path: 생성된 디렉터리 경로 객체
         """
         # 기본 디렉터리 아래에 태그 이름의 서브 디렉터리 경로 생성
         output_dir = self.base_output_dir / tag
-        # 디렉터리가 없으면 생성 (부모 디렉터리도 함께)
-        output_dir.mkdir(parents=True, exist_ok=True)
+        if tag not in self._created_dirs:
+            # 디렉터리가 없으면 생성 (부모 디렉터리도 함께)
+            output_dir.mkdir(parents=True, exist_ok=True)
+            self._created_dirs.add(tag)
         return output_dir
 
-    def move_file(self, file_path, tag):
+    def _reserve_dest(self, file_path, output_dir, content_hash):
+        """
+        겹치지 않는 대상 경로를 골라 예약
+        원본 이름이 이미 있으면 '이름_내용해시.확장자', 그것도 있으면 뒤에 번호를 붙임
+        """
+        name = Path(file_path)
+        candidate = str(output_dir / name.name)
+        with self._lock:
+            if candidate not in self._reserved and not os.path.lexists(candidate):
+                self._reserved.add(candidate)
+                return candidate
+        # 충돌 시에만 해시 계산 (파이프라인에서 계산한 해시가 있으면 재사용)
+        suffix = (content_hash or file_sha256(file_path))[:HASH_SUFFIX_LENGTH]
+        with self._lock:
+            self.collisions += 1
+            index = 0
+            while True:
+                stem = f"{name.stem}_{suffix}" + (f"_{index}" if index else "")
+                candidate = str(output_dir / (stem + name.suffix))
+                if candidate not in self._reserved and not os.path.lexists(candidate):
+                    self._reserved.add(candidate)
+                    return candidate
+                index += 1
+
+    def _release_dest(self, dest_path):
+        with self._lock:
+            self._reserved.discard(dest_path)
+
+    def move_file(self, file_path, tag, content_hash=None, on_done=None, context=None):
         """
         파일을 해당 태그 디렉터리로 이동
+        같은 파일시스템이면 바로 이동하고, 다른 파일시스템이면 백그라운드에서 복사한 뒤 원본 삭제
         file_path (str): 이동할 파일 경로
         tag (str): 대상 태그 디렉터리
+        content_hash (str): 파일 내용 해시 (이름 충돌 시 사용, 없으면 필요할 때 계산)
+        on_done (function): 파일이 새 경로에 자리 잡으면 (새 경로, context)로 호출
+        context: on_done에 그대로 넘길 값 (저널에 기록되므로 JSON으로 변환 가능해야 함)
         returns: str: 이동할 파일의 새 경로
         """
         # 태그 디렉터리 확인/생성
         output_dir = self.ensure_output_dir(tag)
-        # 대상 파일의 새 경로 (원본 파일명 유지)
-        dest_path = output_dir / Path(file_path).name
-        # 파일 이동
-        shutil.move(file_path, dest_path)
-        # 새 경로 문자열 반환
-        return str(dest_path)
\ No newline at end of file
+        dest_path = self._reserve_dest(file_path, output_dir, content_hash)
+        start = time.perf_counter()
+        try:
+            try:
+                os.rename(file_path, dest_path)
+            except FileNotFoundError:
+                if os.path.exists(file_path):
+                    # 태그 디렉터리가 밖에서 지워진 경우 다시 만들고 재시도
+                    self._created_dirs.discard(tag)
+                    self.ensure_output_dir(tag)
+                    os.rename(file_path, dest_path)
+                else:
+                    raise
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                self._release_dest(dest_path)
+                raise
+            # 다른 파일시스템: 저널에 기록하고 백그라운드 복사
+            move_id = self.journal.begin(file_path, dest_path, context) if self.journal else None
+            self._executor.submit(self._copy_move, file_path, dest_path, move_id, on_done, context)
+            return dest_path
+
+        self._release_dest(dest_path)
+        self.rename_latency.observe(time.perf_counter() - start)
+        with self._lock:
+            self.renamed += 1
+        if on_done:
+            on_done(dest_path, context)
+        return dest_path
+
+    def _copy_move(self, file_path, dest_path, move_id, on_done, context):
+        """ 임시 파일로 복사 -> 대상 이름으로 변경 -> 원본 삭제 (백그라운드 스레드) """
+        part_path = dest_path + PART_SUFFIX
+        start = time.perf_counter()
+        try:
+            copy_file(file_path, part_path)
+            os.rename(part_path, dest_path)
+            os.unlink(file_path)
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            logger.error("파일 복사 오류: %s -> %s (%s)", file_path, dest_path, e)
+            try:
+                os.unlink(part_path)
+            except OSError:
+                pass
+            return
+        finally:
+            self._release_dest(dest_path)
+            if move_id is not None:
+                self.journal.finish(move_id)
+
+        self.copy_latency.observe(time.perf_counter() - start)
+        with self._lock:
+            self.copied += 1
+        if on_done:
+            try:
+                on_done(dest_path, context)
+            except Exception as e:
+                logger.error("이동 완료 콜백 오류: %s", e)
+
+    def recover(self, on_done=None):
+        """
+        이전 실행에서 복사 도중 중단된 이동을 마무리 (시작 시 이미지 처리 전에 호출)
+        on_done (function): 마무리된 이동마다 (새 경로, context)로 호출
+        returns: int: 마무리한 이동 수
+        """
+        if not self.journal:
+            return 0
+        recovered = 0
+        for move in self.journal.pending():
+            src, dest = move["src"], move["dest"]
+            part_path = dest + PART_SUFFIX
+            try:
+                if os.path.exists(src):
+                    if not (os.path.exists(dest) and os.path.getsize(dest) == os.path.getsize(src)):
+                        # 복사가 끝나지 않았으면 처음부터 다시 복사
+                        copy_file(src, part_path)
+                        os.rename(part_path, dest)
+                    os.unlink(src)
+                elif not os.path.exists(dest):
+                    logger.warning("복구할 수 없는 이동 (원본/대상 모두 없음): %s -> %s", src, dest)
+                    continue
+            except OSError as e:
+                logger.error("이동 복구 오류: %s -> %s (%s)", src, dest, e)
+                continue
+            finally:
+                if os.path.exists(part_path):
+                    os.unlink(part_path)
+            recovered += 1
+            if on_done:
+                on_done(dest, move.get("context"))
+        self.journal.clear()
+        if recovered:
+            logger.info("Recovered %d interrupted file moves", recovered)
+        return recovered
+
+    def close(self):
+        """ 진행 중인 복사를 모두 마친 뒤 종료 """
+        self._executor.shutdown(wait=True)
+        logger.info("FileManager closed (renamed: %d, copied: %d, collisions: %d, failed: %d)",
+                    self.renamed, self.copied, self.collisions, self.failed)
@@ -0,0 +1,153 @@
+"""
+공유 메모리 프레임 링 모듈
+letterbox된 모델 입력 크기의 슬롯을 multiprocessing.shared_memory에 미리 할당해 두고
+디코딩 쪽은 슬롯에 바로 쓰고, 추론 워커 프로세스는 같은 메모리를 ndarray 뷰로 읽음
+(이미지를 pickle로 복사해 프로세스 사이로 보내지 않음)
+"""
+import os
+import queue
+import secrets
+import threading
+import weakref
+from multiprocessing import shared_memory
+
+import numpy as np
+
+NAME_PREFIX = "imgtag-frames"   # 공유 메모리 이름 접두사 (생성한 프로세스 pid 포함)
+
+
+def _release_memory(shm, owner):
+    """ 공유 메모리 매핑 해제, 생성한 쪽이면 삭제까지 수행 """
+    try:
+        shm.close()
+    except BufferError:
+        # 아직 살아있는 뷰가 있으면 매핑은 프로세스 종료 시 해제됨
+        pass
+    if owner:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def cleanup_stale(shm_dir="/dev/shm"):
+    """
+    비정상 종료된 프로세스가 남긴 프레임 링 삭제
+    이름에 기록된 pid의 프로세스가 없으면 남은 세그먼트로 판단
+    returns: list: 삭제한 세그먼트 이름
+    """
+    removed = []
+    try:
+        names = os.listdir(shm_dir)
+    except FileNotFoundError:
+        return removed  # /dev/shm이 없는 플랫폼
+
+    for name in names:
+        if not name.startswith(NAME_PREFIX + "-"):
+            continue
+        try:
+            pid = int(name[len(NAME_PREFIX) + 1:].split("-")[0])
+        except ValueError:
+            continue
+        if _pid_alive(pid):
+            continue
+        try:
+            os.unlink(os.path.join(shm_dir, name))
+            removed.append(name)
+        except OSError:
+            pass
+    if removed:
+        print(f"Removed stale frame rings: {removed}")
+    return removed
+
+
+def _pid_alive(pid):
+    """ 프로세스 존재 여부 """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True     # 다른 사용자의 프로세스
+    return True
+
+
+class FrameRing:
+    """
+    (size, size, 3) uint8 프레임 슬롯 링 버퍼
+    생성한 프로세스가 빈 슬롯 목록을 관리 (acquire/release),
+    다른 프로세스는 attach로 같은 메모리를 열어 view로만 접근
+    """
+    def __init__(self, slots, size=640, name=None):
+        """
+        slots (int): 슬롯 수 (동시에 처리 중일 수 있는 프레임 최대 개수)
+        size (int): 모델 입력 크기
+        name (str): 이미 만들어진 링에 연결할 때의 공유 메모리 이름 (없으면 새로 생성)
+        """
+        self.slots = slots
+        self.size = size
+        self.frame_shape = (size, size, 3)
+        self.owner = name is None
+        if self.owner:
+            name = f"{NAME_PREFIX}-{os.getpid()}-{secrets.token_hex(4)}"
+            self._shm = shared_memory.SharedMemory(name=name, create=True,
+                                                   size=slots * size * size * 3)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self.name = self._shm.name
+        self.frames = np.ndarray((slots,) + self.frame_shape, dtype=np.uint8, buffer=self._shm.buf)
+
+        # 빈 슬롯 목록과 사용 중인 슬롯 (생성한 프로세스 안에서만 사용)
+        self._free = queue.Queue()
+        self._held = set()
+        self._held_lock = threading.Lock()
+        if self.owner:
+            for index in range(slots):
+                self._free.put(index)
+
+        # 정상 종료나 가비지 컬렉션 시 공유 메모리 정리 (강제 종료 시에는 cleanup_stale)
+        self._finalizer = weakref.finalize(self, _release_memory, self._shm, self.owner)
+
+    @classmethod
+    def attach(cls, name, slots, size=640):
+        """ 다른 프로세스가 만든 링에 연결 """
+        return cls(slots, size, name)
+
+    def acquire(self, timeout=None):
+        """
+        빈 슬롯 번호 반환, 모든 슬롯이 사용 중이면 반환될 때까지 대기 (backpressure)
+        timeout (float): 최대 대기 시간(초), 초과하면 TimeoutError
+        """
+        if not self.owner:
+            raise RuntimeError("Only the process that created the ring can acquire slots")
+        try:
+            index = self._free.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No free frame slot within {timeout}s ({self.slots} slots in use)") from None
+        with self._held_lock:
+            self._held.add(index)
+        return index
+
+    def release(self, index):
+        """
+        사용이 끝난 슬롯 반환
+        이미 반환된 슬롯이면 무시 (두 번 반환해 같은 슬롯이 두 곳에 나눠지지 않도록)
+        """
+        with self._held_lock:
+            if index not in self._held:
+                return
+            self._held.remove(index)
+        self._free.put(index)
+
+    def view(self, index):
+        """ 슬롯의 (size, size, 3) ndarray 뷰 (복사 없음) """
+        return self.frames[index]
+
+    def available(self):
+        """ 현재 빈 슬롯 수 """
+        return self._free.qsize()
+
+    def close(self):
+        """ 매핑 해제 (생성한 프로세스면 공유 메모리 삭제) """
+        self.frames = None
+        self._finalizer()
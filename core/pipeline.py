@@ -0,0 +1,396 @@
+"""
+동시 처리 파이프라인 모듈
+디코딩 -> 추론 -> 색상 분석/태깅 -> 이동/발행 단계를 크기 제한 큐로 연결해
+각 단계가 서로 겹쳐서 실행되도록 함
+"""
+import queue
+import threading
+import time
+
+from core.tagger import ImageTagger
+from utils.log_util import get_logger
+from utils.metrics import REGISTRY, SpanSampler
+from utils.perceptual_hash import decode_gray, dhash, dhash_bytes
+
+logger = get_logger(__name__)
+
+_STOP = object()    # 워커 종료 신호
+
+
+class WorkItem:
+    """ 파이프라인을 통과하는 이미지 한 건의 처리 상태 """
+    __slots__ = ("path", "on_done", "submitted_at", "img_hash", "phash", "data", "slot", "meta", "img", "result",
+                 "primary_tag", "tags", "error", "outcome", "span", "triage")
+
+    def __init__(self, path, on_done=None, span=None):
+        """
+        path (str): 처리할 이미지 파일 경로
+        on_done (function): 처리가 끝나면(성공/건너뜀/오류) 호출할 함수, WorkItem을 인자로 받음
+        span (Span): 샘플링된 경우 단계별 시간 기록 (아니면 None)
+        """
+        self.path = path
+        self.on_done = on_done
+        self.submitted_at = time.monotonic()
+        self.img_hash = None
+        self.phash = None       # 64비트 지각 해시 (근사 중복 확인을 켠 경우)
+        self.data = None        # 파일 바이트 (워커 풀 모드에서 디코딩 전 상태로 전달)
+        self.slot = None        # letterbox 프레임을 기록한 프레임 링 슬롯 번호
+        self.meta = None        # 슬롯 프레임의 LetterboxMeta (원본 좌표 복원용)
+        self.img = None
+        self.result = None
+        self.primary_tag = None
+        self.tags = []
+        self.error = None
+        self.outcome = "skipped"    # 중복/로드 실패로 중간에 끝나면 skipped, 태깅까지 가거나 분류 단계에서 걸러지면 tagged/no_detection
+        self.span = span
+        self.triage = None      # 분류 단계에서 건너뛸 후보였지만 확인용으로 모델을 실행하는 경우 그 이유
+
+
+class Stage:
+    """
+    크기 제한 입력 큐와 워커 스레드로 구성된 파이프라인 단계
+    handler는 항목 리스트를 받아 다음 단계로 넘길 항목 리스트를 반환
+    batch_size가 1보다 크면 batch_size 또는 max_wait 기준으로 항목을 모아 한 번에 처리
+    """
+    def __init__(self, name, handler, workers=1, queue_size=64, batch_size=1, max_wait=0.0):
+        """
+        name (str): 단계 이름 (통계 출력용)
+        handler (function): 항목 리스트 -> 다음 단계로 넘길 항목 리스트
+        workers (int): 워커 스레드 수
+        queue_size (int): 입력 큐 최대 크기 (가득 차면 이전 단계가 대기)
+        batch_size (int): 한 번에 처리할 최대 항목 수
+        max_wait (float): 배치를 채우기 위해 기다리는 최대 시간(초)
+        """
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        self.next_stage = None
+        self.finish = None      # 더 넘길 단계가 없을 때 항목 완료 처리 함수
+        self.on_batch = None    # 배치 처리 후 (항목 수, 처리 시간)을 받을 함수 (배치 크기 자동 조절용)
+        self._threads = []
+
+        # 통계
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.latency = REGISTRY.histogram("imgtag_stage_seconds", "Stage handler time per batch", stage=name)
+        self.items = REGISTRY.counter("imgtag_stage_items_total", "Items handled by stage", stage=name)
+        REGISTRY.gauge("imgtag_queue_depth", "Items waiting in stage input queue",
+                       stage=name).set_function(self.queue.qsize)
+
+    def start(self):
+        """ 워커 스레드 시작 """
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def put(self, item):
+        """ 항목 등록 (큐가 가득 차면 대기) """
+        self.queue.put(item)
+
+    def _collect(self, first):
+        """ 첫 항목 이후 배치 조건까지 항목을 모아 반환, 종료 신호 수신 여부도 반환 """
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        """ 큐에서 항목을 꺼내 처리하고 다음 단계로 전달 """
+        while True:
+            first = self.queue.get()
+            if first is _STOP:
+                return
+            batch, stopping = self._collect(first)
+            for item in batch:
+                if item.span:
+                    item.span.mark(f"{self.name}_wait")
+
+            start = time.perf_counter()
+            try:
+                forward = self.handler(batch)
+            except Exception as e:
+                logger.error("[%s] 처리 오류: %s", self.name, e)
+                for item in batch:
+                    item.error = e
+                forward = []
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.processed += len(batch)
+                self.total_time += elapsed
+                self.max_time = max(self.max_time, elapsed)
+            self.latency.observe(elapsed)
+            self.items.inc(len(batch))
+            if self.on_batch:
+                self.on_batch(len(batch), elapsed)
+            for item in batch:
+                if item.span:
+                    item.span.mark(self.name)
+
+            # 넘기지 않은 항목은 여기서 처리 종료
+            forwarded = set(map(id, forward))
+            for item in batch:
+                if id(item) not in forwarded:
+                    self.finish(item)
+            for item in forward:
+                if self.next_stage:
+                    self.next_stage.put(item)   # 다음 단계 큐가 가득 차면 대기 (backpressure)
+                else:
+                    self.finish(item)
+
+            if stopping:
+                return
+
+    def stop(self):
+        """ 남은 항목을 모두 처리한 뒤 워커 종료 """
+        for _ in self._threads:
+            self.queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def stats(self):
+        """ 큐 깊이 및 처리 시간 통계 반환 """
+        with self._lock:
+            avg = self.total_time / self.processed if self.processed else 0.0
+            return {
+                "queue": self.queue.qsize(),
+                "processed": self.processed,
+                "avg_ms": avg * 1000,
+                "max_ms": self.max_time * 1000,
+            }
+
+
+class Pipeline:
+    """
+    이미지 처리 파이프라인
+    decode (스레드 풀) -> infer (모델을 가진 단일 워커, 배치) -> color (스레드 풀) -> sink (이동/발행)
+    워커 풀 모드에서는 decode 단계는 해시/중복 확인만 하고, 디코딩/추론/색상 분석은 워커 프로세스가 수행
+    워커 풀에 프레임 링이 있으면 decode 단계가 letterbox 프레임을 공유 메모리 슬롯에 기록하고 슬롯 번호만 전달
+    """
+    def __init__(self, tagger, sink, hash_util, decode_workers=4, color_workers=2, sink_workers=1,
+                 queue_size=64, batch_size=8, batch_max_wait=0.5, worker_pool=None,
+                 trace_sample_rate=0.0, triage=None, batch_tuner=None):
+        """
+        tagger (ImageTagger): 이미지 로드/감지/태깅을 수행할 태거 (워커 풀 모드에서는 None)
+        sink (function): (image_path, primary_tag, tags, img_hash)를 받아 이동 및 발행을 수행할 함수
+        hash_util (HashUtil): 중복 확인 및 해시 저장
+        decode_workers (int): 해시/디코딩 워커 수
+        color_workers (int): 색상 분석/태깅 워커 수
+        sink_workers (int): 파일 이동/발행 워커 수
+        queue_size (int): 단계 사이 큐의 최대 크기
+        batch_size (int): 추론 배치 최대 크기
+        batch_max_wait (float): 추론 배치를 채우기 위해 기다리는 최대 시간(초)
+        worker_pool (InferenceWorkerPool): 추론을 맡길 워커 프로세스 풀 (없으면 현재 프로세스에서 추론)
+        trace_sample_rate (float): 단계별 시간을 로그로 남길 이미지 비율 (0이면 기록 안 함)
+        triage (Triage): 모델 실행 전에 객체가 없을 이미지를 걸러낼 분류기 (없으면 사용 안 함)
+        batch_tuner (BatchTuner): 추론 시간에 맞춰 추론 배치 크기를 조절 (없으면 batch_size 고정)
+        """
+        self.tagger = tagger
+        self.sink = sink
+        self.hash_util = hash_util
+        self.worker_pool = worker_pool
+        self.triage = triage
+        self.ring = worker_pool.ring if worker_pool else None
+        # 워커 풀 모드에서는 워커 수만큼 배치를 동시에 보내도록 infer 단계 스레드를 늘림
+        infer_workers = worker_pool.workers if worker_pool else 1
+        self.stages = [
+            Stage("decode", self._decode, decode_workers, queue_size),
+            Stage("infer", self._infer, infer_workers, queue_size, batch_size, batch_max_wait),
+            Stage("color", self._color, color_workers, queue_size),
+            Stage("sink", self._sink, sink_workers, queue_size),
+        ]
+        for stage, next_stage in zip(self.stages, self.stages[1:] + [None]):
+            stage.next_stage = next_stage
+            stage.finish = self._finish
+        if batch_tuner:
+            batch_tuner.attach(self.stages[1])
+
+        self._lock = threading.Lock()
+        self.in_flight = 0      # 등록되었지만 아직 끝나지 않은 항목 수
+        self.completed = 0
+
+        self.sampler = SpanSampler(trace_sample_rate)
+        self.latency = REGISTRY.histogram("imgtag_image_seconds", "Time from submit to finish per image")
+        self.phash_latency = REGISTRY.histogram("imgtag_step_seconds", "Time per image spent in a step", step="phash")
+        REGISTRY.gauge("imgtag_in_flight", "Images submitted but not finished").set_function(lambda: self.in_flight)
+
+    def start(self):
+        """ 모든 단계 시작 """
+        for stage in self.stages:
+            stage.start()
+
+    def submit(self, image_path, on_done=None):
+        """
+        이미지 처리 요청 등록 (들어온 순서대로 처리, 새 파일/백필 사이의 순서는 Scheduler가 결정)
+        첫 단계 큐가 가득 차면 호출한 쪽이 대기하여 backpressure 전달
+        """
+        with self._lock:
+            self.in_flight += 1
+        self.stages[0].put(WorkItem(image_path, on_done, self.sampler.start(image_path)))
+
+    def _finish(self, item):
+        """ 항목 처리 종료 (성공/건너뜀/오류 공통) """
+        item.img = item.data = None     # 이미지 메모리 해제
+        self._release_slot(item)
+        if item.img_hash:
+            # 해시를 저장하지 않고 끝났으면(태그 없음/걸러짐/오류) 처리 중 표시 해제
+            self.hash_util.release_hash(item.img_hash)
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+        outcome = "error" if item.error else item.outcome
+        REGISTRY.counter("imgtag_images_total", "Finished images by outcome", outcome=outcome).inc()
+        self.latency.observe(time.monotonic() - item.submitted_at)
+        if item.span:
+            self.sampler.finish(item.span, outcome)
+        if item.on_done:
+            try:
+                item.on_done(item)
+            except Exception as e:
+                logger.error("완료 콜백 오류: %s", e)
+
+    def _release_slot(self, item):
+        """ 항목이 쓰던 프레임 링 슬롯 반환 """
+        if item.slot is not None:
+            self.ring.release(item.slot)
+            item.slot = None
+
+    def _near_duplicate(self, item, img=None, data=None):
+        """ 지각 해시 계산 후 이미 처리된 이미지의 재인코딩/리사이즈 사본인지 확인 (모델 실행 전) """
+        if self.hash_util.perceptual_index is None:
+            return False
+        with self.phash_latency.time():
+            item.phash = dhash(img) if img is not None else dhash_bytes(data)
+        return self.hash_util.is_near_duplicate(item.phash, item.path)
+
+    def _screen(self, item, data):
+        """
+        디코딩 전 확인: 근사 중복이거나 분류 단계에서 객체가 없다고 판단하면 False
+        분류 단계를 쓰면 축소 흑백 디코딩 결과를 지각 해시 계산과 함께 사용
+        """
+        gray = size = None
+        if self.triage:
+            gray, size = decode_gray(data)
+        if self._near_duplicate(item, img=gray, data=data):
+            return False
+        if gray is None:
+            return True     # 분류 안 함 (디코딩 실패는 다음 디코딩에서 처리)
+        reason = self.triage.check(gray, size)
+        if reason is None:
+            return True
+        if self.triage.audit():
+            item.triage = reason    # 확인용으로 모델 실행 (결과는 _color에서 기록)
+            return True
+        logger.debug("Triage skipped %s (%s)", item.path, reason)
+        item.outcome = "no_detection"
+        return False
+
+    # 단계별 처리 함수
+    def _decode(self, items):
+        """ 중복 확인 및 디코딩, 중복/근사 중복/로드 실패/분류 단계에서 걸러진 항목은 넘기지 않음 """
+        forward = []
+        for item in items:
+            loaded = self.hash_util.read_if_new(item.path)
+            if loaded is None:
+                continue
+            item.img_hash, data = loaded
+            if not self._screen(item, data):
+                continue
+            if self.ring:
+                # 빈 슬롯이 없으면 워커가 슬롯을 돌려줄 때까지 대기 (backpressure)
+                item.slot = self.ring.acquire()
+                item.meta = ImageTagger.decode_frame(data, self.ring.view(item.slot))
+                if item.meta is None:
+                    logger.warning("Could not load image %s", item.path)
+                    self._release_slot(item)
+                    continue
+            elif self.worker_pool:
+                # 디코딩은 워커 프로세스에서 수행 (파일 바이트만 전달)
+                item.data = data
+            else:
+                item.img = self.tagger.decode(data, self.tagger.decode_size)
+                if item.img is None:
+                    logger.warning("Could not load image %s", item.path)
+                    continue
+            forward.append(item)
+        return forward
+
+    def _infer(self, items):
+        """
+        모인 이미지를 한 번의 배치로 감지 (결과 캐시에 있는 이미지는 모델 실행 생략)
+        워커 풀 모드에서는 색상 분석/태깅까지 워커에서 수행
+        """
+        if self.ring:
+            frames = [(item.path, item.slot, item.img_hash, item.meta) for item in items]
+            # 슬롯 반환은 워커 풀이 워커의 작업이 끝난 뒤 수행 (시간 초과로 먼저 포기해도 읽는 중인 슬롯은 반환하지 않음)
+            for item in items:
+                item.slot = None
+            outcomes = self.worker_pool.analyze_frames(frames)
+            for item, (primary_tag, tags) in zip(items, outcomes):
+                item.primary_tag, item.tags = primary_tag, tags
+            return items
+
+        if self.worker_pool:
+            outcomes = self.worker_pool.analyze([(item.path, item.data, item.img_hash) for item in items])
+            for item, (primary_tag, tags) in zip(items, outcomes):
+                item.primary_tag, item.tags = primary_tag, tags
+                item.data = None
+            return items
+
+        results = self.tagger.detect_cached([item.img for item in items], [item.img_hash for item in items])
+        for item, result in zip(items, results):
+            item.result = result
+        return items
+
+    def _color(self, items):
+        """ 감지 결과를 태그로 변환 (색상 분석 포함), 태그가 있으면 해시 저장 """
+        for item in items:
+            if not self.worker_pool:
+                item.primary_tag, item.tags = self.tagger.tag_result(item.path, item.img, item.result)
+                item.img = None
+                item.result = None
+            item.outcome = "tagged" if item.primary_tag else "no_detection"
+            if item.triage:
+                self.triage.record_audit(item.triage, item.primary_tag is not None)
+            if item.primary_tag:
+                self.hash_util.save_hash_to_es(item.img_hash, item.phash)
+        return items
+
+    def _sink(self, items):
+        """ 파일 이동 및 Kafka 발행 """
+        for item in items:
+            self.sink(item.path, item.primary_tag, item.tags, item.img_hash)
+        return []
+
+    def stats(self):
+        """ 단계별 큐 깊이 및 처리 시간 통계 반환 """
+        return {stage.name: stage.stats() for stage in self.stages}
+
+    def log_stats(self):
+        """ 단계별 통계 출력 """
+        parts = [f"{name}: q={s['queue']} n={s['processed']} avg={s['avg_ms']:.1f}ms max={s['max_ms']:.1f}ms"
+                 for name, s in self.stats().items()]
+        logger.info("Pipeline (in-flight %d, done %d) | %s", self.in_flight, self.completed, " | ".join(parts))
+        if self.triage:
+            self.triage.log_stats()
+
+    def stop(self):
+        """ 앞 단계부터 순서대로 남은 항목을 모두 처리한 뒤 종료 """
+        for stage in self.stages:
+            stage.stop()
+        if self.worker_pool:
+            self.worker_pool.close()
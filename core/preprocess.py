@@ -0,0 +1,137 @@
+"""
+추론 전처리 모듈
+모델 입력 크기에 맞춘 축소 디코딩, letterbox 변환과 좌표 복원
+"""
+import struct
+
+import cv2
+import numpy as np
+
+PAD_VALUE = 114     # letterbox 여백 색상 (YOLO 학습 시 사용한 값)
+
+# 축소 배율 -> OpenCV 축소 디코딩 플래그 (JPEG는 DCT 단계에서 바로 축소되어 빠르고 메모리도 적게 사용)
+REDUCED_FLAGS = {
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+}
+
+# 크기 정보를 담은 JPEG SOF 마커 (DHT C4, JPG C8, DAC CC 제외)
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def image_size(data):
+    """
+    디코딩 없이 JPEG/PNG 헤더에서 이미지 크기 읽기
+    data (bytes): 이미지 파일 바이트
+    returns: (str, int, int): (형식, 너비, 높이), 알 수 없는 형식이면 None
+    """
+    if data[:8] == _PNG_SIGNATURE and len(data) >= 24:
+        width, height = struct.unpack(">II", data[16:24])     # IHDR 청크
+        return "png", width, height
+    if data[:2] != b"\xff\xd8":
+        return None
+
+    # JPEG: SOF 세그먼트가 나올 때까지 세그먼트 길이만큼 건너뜀
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:      # 채움 바이트
+            pos += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:    # 길이 없는 마커
+            pos += 2
+            continue
+        length = struct.unpack(">H", data[pos + 2:pos + 4])[0]
+        if marker in _SOF_MARKERS and pos + 9 <= len(data):
+            height, width = struct.unpack(">HH", data[pos + 5:pos + 9])
+            return "jpeg", width, height
+        if marker == 0xDA:      # 스캔 데이터 시작 (SOF 없음)
+            return None
+        pos += 2 + length
+    return None
+
+
+def reduce_factor(width, height, size=640):
+    """
+    축소해도 긴 변이 모델 입력 크기 이상으로 남는 가장 큰 배율 (8, 4, 2), 없으면 1
+    (YOLO는 긴 변을 size로 줄이므로 그 이상의 해상도는 결과에 영향이 없음)
+    """
+    for factor in REDUCED_FLAGS:
+        if max(width, height) // factor >= size:
+            return factor
+    return 1
+
+
+def decode_reduced(data, size=640):
+    """
+    모델 입력 크기보다 충분히 큰 JPEG는 1/2, 1/4, 1/8로 축소 디코딩
+    data (bytes): 이미지 파일 바이트
+    size (int): 모델 입력 크기
+    returns: (ndarray, float): BGR 이미지와 원본 대비 배율 (축소하지 않았으면 1.0), 실패 시 (None, 1.0)
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    info = image_size(data)
+    factor = reduce_factor(info[1], info[2], size) if info and info[0] == "jpeg" else 1
+    if factor == 1:
+        return cv2.imdecode(buffer, cv2.IMREAD_COLOR), 1.0
+
+    img = cv2.imdecode(buffer, REDUCED_FLAGS[factor])
+    if img is None:
+        return None, 1.0
+    # EXIF 회전이 적용되었을 수 있으므로 긴 변끼리 비교해 실제 배율 계산
+    return img, max(img.shape[:2]) / max(info[1], info[2])
+
+
+class LetterboxMeta:
+    """ letterbox 변환 정보 (모델 좌표 -> 원본 좌표 복원용) """
+    __slots__ = ("ratio", "pad_x", "pad_y", "width", "height")
+
+    def __init__(self, ratio, pad_x, pad_y, width, height):
+        """
+        ratio (float): 원본 -> 모델 입력 축소 비율
+        pad_x, pad_y (int): 왼쪽/위쪽 여백
+        width, height (int): 원본 이미지 크기
+        """
+        self.ratio = ratio
+        self.pad_x = pad_x
+        self.pad_y = pad_y
+        self.width = width
+        self.height = height
+
+    def to_original(self, boxes):
+        """ 모델 입력 좌표의 (N, 4) xyxy 박스를 원본 이미지 좌표로 변환 """
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4).copy()
+        boxes[:, [0, 2]] = (boxes[:, [0, 2]] - self.pad_x) / self.ratio
+        boxes[:, [1, 3]] = (boxes[:, [1, 3]] - self.pad_y) / self.ratio
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, self.width)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, self.height)
+        return boxes
+
+
+def letterbox(img, size=640, out=None, scale=1.0):
+    """
+    비율을 유지한 채 size x size 정사각형으로 축소하고 남는 부분은 여백으로 채움
+    img (ndarray): BGR 이미지
+    size (int): 모델 입력 크기
+    out (ndarray): 결과를 쓸 (size, size, 3) uint8 배열 (없으면 새로 할당)
+    scale (float): img가 원본을 축소 디코딩한 것이면 그 배율 (좌표를 원본 기준으로 복원하기 위해 사용)
+    returns: (ndarray, LetterboxMeta)
+    """
+    height, width = img.shape[:2]
+    ratio = min(size / height, size / width)
+    new_w, new_h = max(1, round(width * ratio)), max(1, round(height * ratio))
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+
+    if out is None:
+        out = np.empty((size, size, 3), dtype=np.uint8)
+    out[...] = PAD_VALUE
+    target = out[pad_y:pad_y + new_h, pad_x:pad_x + new_w]
+    if (new_w, new_h) == (width, height):
+        target[...] = img
+    else:
+        cv2.resize(img, (new_w, new_h), dst=target, interpolation=cv2.INTER_AREA if ratio < 1 else cv2.INTER_LINEAR)
+    return out, LetterboxMeta(ratio * scale, pad_x, pad_y, round(width / scale), round(height / scale))
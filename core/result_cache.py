@@ -0,0 +1,329 @@
+"""
+감지 결과 캐시 모듈
+이미지 내용 해시 + 모델/추론 설정 fingerprint를 키로 YOLO 감지 결과(클래스, 신뢰도, 박스)를 SQLite에 저장
+같은 이미지를 다시 처리할 때 모델을 실행하지 않고, tags.json/colors.json 변경은 캐시된 감지 결과에 다시 적용
+
+실행: python -m core.result_cache stats
+      python -m core.result_cache warm ./images --recursive
+      python -m core.result_cache invalidate --stale
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from models.onnx_backend import OnnxBox, OnnxResult
+
+CONFIDENCE = 0.25                   # ImageTagger.detect의 신뢰도 임계값 (fingerprint에 포함)
+IOU = 0.7                           # ImageTagger.detect의 NMS IoU 임계값 (ultralytics 기본값, 모든 백엔드에 같은 값 전달)
+RECORD_DTYPE = np.float32           # 레코드 한 행: [클래스, 신뢰도, x1, y1, x2, y2] (좌표는 원본 크기 대비 0~1)
+
+
+def model_fingerprint(model_loader, decode_size=None, conf=CONFIDENCE, iou=IOU, letterbox=False):
+    """
+    모델 가중치와 추론 설정으로 캐시 fingerprint 생성
+    가중치 파일이나 백엔드, 입력 크기, 신뢰도/IoU 임계값, 축소 디코딩 여부,
+    디코딩 방식(프레임 링의 letterbox 프레임인지)이 바뀌면 다른 fingerprint
+    letterbox (bool): 메인 프로세스가 letterbox한 프레임을 모델에 넣으면 True
+    """
+    hasher = hashlib.sha256()
+    model_path = Path(model_loader.model_path)
+    if model_path.exists():
+        with open(model_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                hasher.update(chunk)
+    else:
+        hasher.update(model_path.name.encode())    # ultralytics가 이름으로 내려받는 모델
+    hasher.update(f"|{model_loader.backend}|{model_loader.imgsz}|{conf}|{iou}|{decode_size}".encode())
+    if letterbox:
+        hasher.update(b"|letterbox")    # 기존 방식의 fingerprint는 그대로 유지
+    return hasher.hexdigest()[:16]
+
+
+def uses_frame_ring(config):
+    """ 서비스가 프레임 링(메인 프로세스에서 letterbox한 프레임)으로 추론하는 설정인지 """
+    return config.inference_workers > 0 and config.frame_ring_slots > 0
+
+
+def to_record(result, width, height, meta=None):
+    """
+    모델 결과 하나를 원본 크기 대비 좌표의 레코드 배열로 변환
+    width, height (int): 모델에 넣은 이미지 크기
+    meta (LetterboxMeta): 모델에 넣은 이미지가 letterbox 프레임이면 원본 좌표 복원 정보
+    """
+    rows = [[float(d.cls), float(d.conf), *[float(v) for v in d.xyxy[0]]] for d in result.boxes]
+    record = np.array(rows, dtype=RECORD_DTYPE).reshape(-1, 6)
+    if meta is not None:
+        record[:, 2:] = meta.to_original(record[:, 2:])
+        width, height = meta.width, meta.height
+    record[:, [2, 4]] /= width
+    record[:, [3, 5]] /= height
+    return record
+
+
+def from_record(record, width, height, meta=None):
+    """
+    레코드 배열을 모델 결과와 같은 형태(OnnxResult)로 복원
+    width, height (int): 결과를 적용할 이미지 크기
+    meta (LetterboxMeta): 결과를 적용할 이미지가 letterbox 프레임이면 원본 좌표 복원 정보
+    """
+    boxes = record[:, 2:].copy()
+    if meta is not None:
+        boxes[:, [0, 2]] = boxes[:, [0, 2]] * meta.width * meta.ratio + meta.pad_x
+        boxes[:, [1, 3]] = boxes[:, [1, 3]] * meta.height * meta.ratio + meta.pad_y
+    else:
+        boxes[:, [0, 2]] *= width
+        boxes[:, [1, 3]] *= height
+    return OnnxResult([OnnxBox(int(row[0]), float(row[1]), box) for row, box in zip(record, boxes)])
+
+
+class ResultCache:
+    """
+    (내용 해시, fingerprint) -> 감지 결과 레코드를 저장하는 SQLite 캐시
+    최근 사용 시각 기준 LRU로 max_entries 개수를 유지
+    적중 시 최근 사용 시각은 메모리에 모아 두었다가 touch_batch개가 모이거나 touch_interval이 지나면 한 번에 기록
+    (삭제/무효화/종료 전에도 기록하므로 LRU 순서는 최대 touch_interval만큼만 늦게 반영)
+    """
+    def __init__(self, db_path, fingerprint, max_entries=1000000, touch_batch=1000, touch_interval=60.0):
+        """
+        db_path (str): 캐시 DB 파일 경로
+        fingerprint (str): 현재 모델/추론 설정의 fingerprint
+        max_entries (int): 최대 저장 개수 (넘으면 오래 쓰지 않은 항목부터 삭제)
+        touch_batch (int): 최근 사용 시각을 모아 한 번에 기록할 적중 수
+        touch_interval (float): 모아 둔 최근 사용 시각을 기록하는 최대 간격(초)
+        """
+        self.db_path = str(db_path)
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+        self.touch_batch = max(1, touch_batch)
+        self.touch_interval = touch_interval
+        # 여러 스레드(워커 프로세스면 여러 프로세스)에서 접근하므로 연결은 하나만 두고 락으로 보호
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS detections ("
+            " hash TEXT NOT NULL,"
+            " fingerprint TEXT NOT NULL,"
+            " record BLOB NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (hash, fingerprint))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS detections_last_used ON detections (last_used)")
+        self._conn.commit()
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM detections").fetchone()[0]
+        self._touched = {}      # 해시 -> 아직 기록하지 않은 최근 사용 시각
+        self._touched_at = time.monotonic()
+
+        # 통계
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, img_hash):
+        """ 캐시된 레코드 배열 반환 (최근 사용 시각은 모아서 갱신), 없으면 None """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record FROM detections WHERE hash = ? AND fingerprint = ?",
+                (img_hash, self.fingerprint),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched[img_hash] = time.time()
+            if len(self._touched) >= self.touch_batch or time.monotonic() - self._touched_at >= self.touch_interval:
+                self._flush_touched()
+        return np.frombuffer(row[0], dtype=RECORD_DTYPE).reshape(-1, 6)
+
+    def _flush_touched(self):
+        """ 모아 둔 최근 사용 시각을 한 번의 트랜잭션으로 기록 (락을 잡은 상태에서 호출) """
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE detections SET last_used = ? WHERE hash = ? AND fingerprint = ?",
+                [(used, img_hash, self.fingerprint) for img_hash, used in self._touched.items()],
+            )
+            self._conn.commit()
+            self._touched = {}
+        self._touched_at = time.monotonic()
+
+    def put(self, img_hash, record):
+        """ 레코드 저장, 최대 개수를 넘으면 오래 쓰지 않은 항목 삭제 """
+        with self._lock:
+            self._touched.pop(img_hash, None)   # 저장하면서 최근 사용 시각도 기록
+            values = (np.ascontiguousarray(record, dtype=RECORD_DTYPE).tobytes(), time.time(), img_hash, self.fingerprint)
+            updated = self._conn.execute(
+                "UPDATE detections SET record = ?, last_used = ? WHERE hash = ? AND fingerprint = ?", values
+            ).rowcount
+            if not updated:
+                self._conn.execute(
+                    "INSERT INTO detections (record, last_used, hash, fingerprint) VALUES (?, ?, ?, ?)", values
+                )
+                self._entries += 1
+            if self._entries > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """ 최대 개수의 90%가 되도록 오래 쓰지 않은 항목 삭제 (락을 잡은 상태에서 호출) """
+        self._flush_touched()   # 최근 적중한 항목이 먼저 삭제되지 않도록
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM detections").fetchone()[0]
+        excess = self._entries - int(self.max_entries * 0.9)
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM detections WHERE rowid IN "
+                "(SELECT rowid FROM detections ORDER BY last_used LIMIT ?)", (excess,)
+            )
+            self._entries -= excess
+
+    def invalidate(self, fingerprint=None, stale=False, older_than=None):
+        """
+        캐시 항목 삭제, 삭제한 개수 반환
+        fingerprint (str): 이 fingerprint의 항목만 삭제
+        stale (bool): 현재 fingerprint가 아닌 항목 모두 삭제
+        older_than (float): 이 시간(초) 동안 사용되지 않은 항목 삭제
+        조건이 없으면 전체 삭제
+        """
+        conditions, params = [], []
+        if fingerprint:
+            conditions.append("fingerprint = ?")
+            params.append(fingerprint)
+        if stale:
+            conditions.append("fingerprint != ?")
+            params.append(self.fingerprint)
+        if older_than is not None:
+            conditions.append("last_used < ?")
+            params.append(time.time() - older_than)
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        with self._lock:
+            self._flush_touched()
+            deleted = self._conn.execute(f"DELETE FROM detections{where}", params).rowcount
+            self._conn.commit()
+            self._entries = self._conn.execute("SELECT COUNT(*) FROM detections").fetchone()[0]
+        return deleted
+
+    def stats(self):
+        """ 캐시 크기 및 적중률 통계 반환 """
+        with self._lock:
+            by_fingerprint = dict(self._conn.execute(
+                "SELECT fingerprint, COUNT(*) FROM detections GROUP BY fingerprint").fetchall())
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._entries,
+            "current": by_fingerprint.get(self.fingerprint, 0),
+            "fingerprints": by_fingerprint,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def log_stats(self):
+        """ 캐시 통계 출력 """
+        s = self.stats()
+        print(f"Result cache: {s['entries']} entries ({s['current']} current), "
+              f"hits {s['hits']}, misses {s['misses']}, hit rate {s['hit_rate']:.1%}")
+
+    def close(self):
+        """ 모아 둔 최근 사용 시각을 기록한 뒤 DB 연결 종료 """
+        with self._lock:
+            self._flush_touched()
+            self._conn.close()
+
+
+def _warm(config, cache, directory, recursive, batch_size):
+    """ 디렉터리의 이미지를 감지해 캐시에 채우기 (이미 있는 항목은 건너뜀) """
+    from core.tagger import ImageTagger
+    from interface.directory_watcher import IMAGE_SUFFIXES
+    from models.model_loader import ModelLoader
+    from utils.hash_util import HashUtil
+
+    loader = ModelLoader(config.model_path, config.model_backend, config.model_imgsz,
+                         config.ort_intra_op_threads, config.ort_inter_op_threads)
+    tagger = ImageTagger(loader, config.tag_mapping, config.color_ranges, None, config.color_threshold,
+                         config.color_max_pixels, config.color_integral_ratio,
+                         config.model_imgsz if config.reduced_decode else None, cache)
+    hash_util = HashUtil(config.es_url, config.hash_cache_path)
+    letterbox = uses_frame_ring(config)     # 서비스와 같은 방식으로 디코딩해야 캐시 항목이 적중
+
+    def detect(batch):
+        tagger.detect_cached([img for _, img, _ in batch], [h for h, _, _ in batch], [m for _, _, m in batch])
+        return len(batch)
+
+    paths = Path(directory).rglob("*") if recursive else Path(directory).glob("*")
+    batch, warmed = [], 0
+    for path in paths:
+        if path.suffix.lower() not in IMAGE_SUFFIXES or not path.is_file():
+            continue
+        img_hash, data = hash_util.read_image(str(path))
+        meta = None
+        if letterbox:
+            img = np.empty((config.model_imgsz, config.model_imgsz, 3), dtype=np.uint8)
+            meta = ImageTagger.decode_frame(data, img)
+            if meta is None:
+                img = None
+        else:
+            img = tagger.decode(data, tagger.decode_size)
+        if img is not None:
+            batch.append((img_hash, img, meta))
+        if len(batch) >= batch_size:
+            warmed += detect(batch)
+            batch = []
+    if batch:
+        warmed += detect(batch)
+    hash_util.close()
+    return warmed
+
+
+def main():
+    from config import Config
+    from models.model_loader import ModelLoader
+
+    parser = argparse.ArgumentParser(description="Detection result cache")
+    parser.add_argument("--db", help="캐시 DB 경로 (기본값: Config.result_cache_path)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="캐시 크기와 fingerprint별 항목 수 출력")
+    warm = commands.add_parser("warm", help="디렉터리의 이미지를 감지해 캐시 채우기")
+    warm.add_argument("directory")
+    warm.add_argument("--recursive", action="store_true", help="하위 디렉터리 포함")
+    warm.add_argument("--batch-size", type=int, default=8, help="추론 배치 크기")
+    invalidate = commands.add_parser("invalidate", help="캐시 항목 삭제 (조건이 없으면 전체)")
+    invalidate.add_argument("--fingerprint", help="이 fingerprint의 항목만 삭제")
+    invalidate.add_argument("--stale", action="store_true", help="현재 모델/설정이 아닌 항목 삭제")
+    invalidate.add_argument("--older-than", type=float, metavar="DAYS", help="이 기간 동안 사용되지 않은 항목 삭제")
+    args = parser.parse_args()
+
+    config = Config()
+    loader = ModelLoader(config.model_path, config.model_backend, config.model_imgsz)
+    if uses_frame_ring(config):
+        fingerprint = model_fingerprint(loader, config.model_imgsz, letterbox=True)
+    else:
+        fingerprint = model_fingerprint(loader, config.model_imgsz if config.reduced_decode else None)
+    cache = ResultCache(args.db or config.result_cache_path, fingerprint, config.result_cache_max_entries)
+    try:
+        if args.command == "warm":
+            start = time.perf_counter()
+            warmed = _warm(config, cache, args.directory, args.recursive, args.batch_size)
+            print(f"Warmed {warmed} images in {time.perf_counter() - start:.1f}s")
+            cache.log_stats()
+        elif args.command == "invalidate":
+            older_than = args.older_than * 86400 if args.older_than is not None else None
+            deleted = cache.invalidate(args.fingerprint, args.stale, older_than)
+            print(f"Deleted {deleted} entries")
+        else:
+            s = cache.stats()
+            print(f"{cache.db_path}: {s['entries']} entries, current fingerprint {fingerprint}")
+            for fp, count in sorted(s["fingerprints"].items(), key=lambda x: -x[1]):
+                print(f"  {fp} {count}{' (current)' if fp == fingerprint else ''}")
+            size = os.path.getsize(cache.db_path) if os.path.exists(cache.db_path) else 0
+            print(f"  file size {size / 1024 / 1024:.1f} MB")
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""
+처리 요청 스케줄러 모듈
+파이프라인 앞에서 요청을 클래스별 큐에 모아 두고, 파이프라인 안의 항목 수를 max_in_flight로 유지하면서
+우선순위와 마감 시간에 따라 다음 항목을 골라 넘김 (순서는 파이프라인에 넣는 순간에 결정)
+
+클래스 (앞쪽이 먼저)
+- live: 감시 이벤트로 들어온 파일
+- live_large: 감시 이벤트로 들어온 큰 파일 (large_file_bytes 초과)
+- deferred: 마감 시간이 지났거나 클래스 한도를 넘어 뒤로 미룬 감시 이벤트 파일
+- backfill: 시작 시 이미 있던 파일/다른 노드에게서 회수한 파일 (한도가 차면 등록하는 쪽이 대기)
+
+과부하 처리
+- live 클래스에 lifo_depth개보다 많이 쌓이면 가장 최근 항목부터 처리 (대량 복사 중에 넣은 파일이 뒤에 밀리지 않게)
+- 마감 시간이 지난 live 항목은 deferred로 옮겨 새 항목을 막지 않게 함
+- live 클래스가 한도를 넘으면 overflow 정책에 따라 가장 오래된 항목을 deferred로 미루거나(defer) 버림(shed)
+  버린 파일은 입력 디렉터리에 그대로 남으므로 다음 시작 시 백필에서 처리
+  (on_shed로 감시 쪽에 알려 같은 파일의 다음 이벤트가 중복으로 무시되지 않게 함)
+- 완료 콜백(on_done)이 있는 요청은 버리지 않음
+  deferred가 한도를 넘으면 콜백 없는 항목 중 가장 오래된 것을 버리고,
+  deferred가 한도에 차 있는 동안 콜백이 있는 요청의 등록은 대기 (deferred 길이가 한도 + live 클래스 한도를 넘지 않음)
+"""
+import collections
+import os
+import threading
+import time
+
+from utils.log_util import get_logger
+from utils.metrics import LATENCY_BUCKETS, REGISTRY
+
+logger = get_logger(__name__)
+
+CLASSES = ("live", "live_large", "deferred", "backfill")
+LIVE_CLASSES = ("live", "live_large")
+OVERFLOW_POLICIES = ("defer", "shed")
+
+# 대기 시간 히스토그램 버킷(초): 백필/미룬 항목은 몇 분 이상 기다릴 수 있으므로 1시간까지
+WAIT_BUCKETS = LATENCY_BUCKETS + (60.0, 300.0, 900.0, 3600.0)
+
+
+class _Entry:
+    """ 스케줄러 큐의 요청 한 건 """
+    __slots__ = ("path", "on_done", "cls", "queued_at", "deadline")
+
+    def __init__(self, path, on_done, cls, queued_at, deadline):
+        self.path = path
+        self.on_done = on_done
+        self.cls = cls
+        self.queued_at = queued_at
+        self.deadline = deadline    # 처리가 끝나야 하는 시각 (time.monotonic 기준, 없으면 None)
+
+
+class Scheduler:
+    """
+    우선순위/마감 시간/부하 제한 스케줄러
+    submit으로 받은 요청을 클래스별 큐에 넣고, 전달 스레드가 파이프라인 안의 항목 수가 max_in_flight보다 적을 때
+    가장 우선순위가 높은 클래스에서 하나씩 꺼내 넘김
+    """
+    def __init__(self, submit, max_in_flight=32, large_file_bytes=20 * 2 ** 20, deadlines=None, limits=None,
+                 lifo_depth=64, overflow="defer"):
+        """
+        submit (function): (경로, 완료 콜백)을 받아 처리 경로에 등록하는 함수 (Pipeline.submit)
+        max_in_flight (int): 파이프라인에 넣어 둘 최대 항목 수
+            (작을수록 순서를 늦게 결정, 추론 배치보다 크고 첫 단계 큐 크기 이하여야 넘길 때 대기하지 않음)
+        large_file_bytes (int): 이보다 큰 감시 이벤트 파일은 live_large 클래스 (None이면 구분 안 함)
+        deadlines (dict): 클래스 -> 마감 시간(초), live 클래스에만 적용 (없는 클래스는 마감 없음)
+        limits (dict): 클래스 -> 큐 최대 길이 (없는 클래스는 제한 없음)
+        lifo_depth (int): live 클래스 큐가 이보다 길면 최근 항목부터 처리 (None이면 항상 들어온 순서)
+        overflow (str): live 클래스가 한도를 넘었을 때 정책 ('defer' 또는 'shed')
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"unknown overflow policy: {overflow}")
+        self.submit_fn = submit
+        self.max_in_flight = max(1, max_in_flight)
+        self.large_file_bytes = large_file_bytes
+        self.deadlines = dict(deadlines or {})
+        self.limits = dict(limits or {})
+        self.lifo_depth = lifo_depth
+        self.overflow = overflow
+
+        self.queues = {cls: collections.deque() for cls in CLASSES}
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = None
+        self.in_flight = 0
+        self.on_shed = None     # 버린 파일 경로를 받을 함수 (락을 잡은 상태에서 호출되므로 대기하지 않아야 함)
+
+        # 통계
+        self.dispatched = collections.Counter()
+        self.deferred = collections.Counter()   # 사유별 미룬 수
+        self.shed = 0
+        self.missed = collections.Counter()     # 클래스별 마감 시간을 넘겨 끝난 수
+        self.wait_total = collections.Counter()
+        self.waits = {cls: REGISTRY.histogram("imgtag_sched_wait_seconds", "Time queued in scheduler before dispatch",
+                                              WAIT_BUCKETS, **{"class": cls}) for cls in CLASSES}
+        self.latencies = {cls: REGISTRY.histogram("imgtag_sched_latency_seconds",
+                                                  "Time from schedule to finish per dispatch class",
+                                                  WAIT_BUCKETS, **{"class": cls}) for cls in CLASSES}
+        for cls, q in self.queues.items():
+            REGISTRY.gauge("imgtag_sched_queue_depth", "Items waiting in scheduler class queue",
+                           **{"class": cls}).set_function(q.__len__)
+        REGISTRY.gauge("imgtag_sched_in_flight", "Items dispatched to the pipeline and not finished"
+                       ).set_function(lambda: self.in_flight)
+
+    def _classify(self, path, backlog, size):
+        if backlog:
+            return "backfill"
+        if self.large_file_bytes is None:
+            return "live"
+        if size is None:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = 0
+        return "live_large" if size > self.large_file_bytes else "live"
+
+    def submit(self, path, on_done=None, backlog=False, deadline=None, size=None):
+        """
+        처리 요청 등록
+        감시 이벤트(backlog=False)는 대기하지 않고 큐에 넣음 (한도를 넘으면 overflow 정책 적용)
+        backlog=True인 요청은 backfill 클래스가 한도에 차 있으면 빌 때까지 대기 (백필 스캔에 backpressure 전달)
+        on_done이 있는 요청은 버릴 수 없으므로 deferred 클래스가 한도에 차 있으면 빌 때까지 대기
+
+        path (str): 처리할 이미지 파일 경로
+        on_done (function): 처리가 끝나면 WorkItem을 받아 호출할 함수
+        backlog (bool): 백필/회수/재시작으로 찾은 파일이면 True
+        deadline (float): 처리가 끝나야 하는 시간(초, 지금부터), 없으면 클래스 기본값
+        size (int): 파일 크기 (없으면 stat으로 확인)
+        """
+        cls = self._classify(path, backlog, size)
+        now = time.monotonic()
+        budget = deadline if deadline is not None else self.deadlines.get(cls)
+        entry = _Entry(path, on_done, cls, now, now + budget if budget is not None else None)
+        limit = self.limits.get(cls)
+        with self._cond:
+            while not self._stopping and ((cls == "backfill" and limit and len(self.queues[cls]) >= limit)
+                                          or (on_done and self._deferred_full())):
+                self._cond.wait()
+            self.queues[cls].append(entry)
+            if cls in LIVE_CLASSES and limit and len(self.queues[cls]) > limit:
+                self._overflow(self.queues[cls].popleft())
+            self._cond.notify_all()
+        REGISTRY.counter("imgtag_sched_submitted_total", "Requests submitted to scheduler", **{"class": cls}).inc()
+
+    def _deferred_full(self):
+        limit = self.limits.get("deferred")
+        return bool(limit) and len(self.queues["deferred"]) >= limit
+
+    def _defer(self, entry, reason):
+        """ live 항목을 deferred 클래스로 옮김 (락을 잡은 상태에서 호출) """
+        entry.cls = "deferred"
+        self.queues["deferred"].append(entry)
+        self.deferred[reason] += 1
+        REGISTRY.counter("imgtag_sched_deferred_total", "Live requests moved to the deferred class",
+                         reason=reason).inc()
+        q = self.queues["deferred"]
+        limit = self.limits.get("deferred")
+        if limit and len(q) > limit:
+            # 완료 콜백을 기다리는 항목은 버릴 수 없으므로 콜백 없는 항목 중 가장 오래된 것을 버림
+            # (모두 콜백이 있으면 한도를 잠시 넘기고, 콜백 있는 요청의 등록이 대기하므로 더 늘지 않음)
+            victim = next((e for e in q if not e.on_done), None)
+            if victim is not None:
+                q.remove(victim)
+                self._shed(victim)
+
+    def _shed(self, entry):
+        """ 요청을 버림 (락을 잡은 상태에서 호출, 완료 콜백이 없는 항목만) """
+        self.shed += 1
+        REGISTRY.counter("imgtag_sched_shed_total", "Requests dropped by load shedding").inc()
+        logger.warning("Shed %s (queue over limit, left for the next backfill)", entry.path)
+        if self.on_shed:
+            try:
+                self.on_shed(entry.path)
+            except Exception as e:
+                logger.error("Shed callback error for %s: %s", entry.path, e)
+
+    def _overflow(self, entry):
+        if self.overflow == "shed" and not entry.on_done:
+            self._shed(entry)
+        else:
+            self._defer(entry, "overflow")
+
+    def _expire(self, now):
+        """ 마감 시간이 지난 live 항목을 deferred로 옮김 (큐는 들어온 순서이므로 앞쪽만 확인) """
+        for cls in LIVE_CLASSES:
+            q = self.queues[cls]
+            while q and q[0].deadline is not None and q[0].deadline < now:
+                self._defer(q.popleft(), "deadline")
+
+    def _pick(self):
+        """ 다음에 넘길 항목 (락을 잡은 상태에서 호출, 없으면 None) """
+        self._expire(time.monotonic())
+        for cls in CLASSES:
+            q = self.queues[cls]
+            if not q:
+                continue
+            if cls in LIVE_CLASSES and self.lifo_depth is not None and len(q) > self.lifo_depth:
+                return q.pop()
+            return q.popleft()
+        return None
+
+    def _run(self):
+        """ 파이프라인에 자리가 나면 다음 항목을 골라 넘김 """
+        while True:
+            with self._cond:
+                entry = None
+                while not self._stopping:
+                    if self.in_flight < self.max_in_flight:
+                        entry = self._pick()
+                        if entry:
+                            break
+                    self._cond.wait(0.5)    # 마감 시간 확인을 위해 주기적으로 깨어남
+                if entry is None:
+                    return
+                self.in_flight += 1
+                self._cond.notify_all()     # 대기 중인 백필 등록 깨움
+            wait = time.monotonic() - entry.queued_at
+            self.waits[entry.cls].observe(wait)
+            self.dispatched[entry.cls] += 1
+            self.wait_total[entry.cls] += wait
+            try:
+                # 순서는 여기서 정했으므로 파이프라인은 넘긴 순서대로 처리
+                self.submit_fn(entry.path, self._on_done(entry))
+            except Exception as e:
+                logger.error("Dispatch error for %s: %s", entry.path, e)
+                self._release()
+
+    def _release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def _on_done(self, entry):
+        """ 항목 완료 콜백 (클래스별 지연 시간/마감 시간 기록 후 원래 콜백 호출) """
+        def done(item):
+            now = time.monotonic()
+            self.latencies[entry.cls].observe(now - entry.queued_at)
+            if entry.deadline is not None and now > entry.deadline:
+                self.missed[entry.cls] += 1
+                REGISTRY.counter("imgtag_sched_deadline_missed_total", "Requests finished after their deadline",
+                                 **{"class": entry.cls}).inc()
+            self._release()
+            if entry.on_done:
+                entry.on_done(item)
+        return done
+
+    def start(self):
+        """ 전달 스레드 시작 """
+        self._thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+        self._thread.start()
+
+    def stats(self):
+        """ 클래스별 큐 길이, 넘긴 수, 평균 대기 시간 """
+        with self._cond:
+            classes = {cls: {"queue": len(self.queues[cls]), "dispatched": self.dispatched[cls],
+                             "avg_wait_ms": (self.wait_total[cls] / self.dispatched[cls] * 1000
+                                             if self.dispatched[cls] else 0.0),
+                             "missed": self.missed[cls]} for cls in CLASSES}
+            return {"in_flight": self.in_flight, "deferred": dict(self.deferred), "shed": self.shed,
+                    "classes": classes}
+
+    def log_stats(self):
+        """ 클래스별 통계 출력 """
+        s = self.stats()
+        parts = [f"{cls}: q={c['queue']} n={c['dispatched']} wait={c['avg_wait_ms']:.0f}ms missed={c['missed']}"
+                 for cls, c in s["classes"].items()]
+        logger.info("Scheduler (in-flight %d, deferred %d, shed %d) | %s",
+                    s['in_flight'], sum(s['deferred'].values()), s['shed'], " | ".join(parts))
+
+    def stop(self):
+        """
+        전달 중지 (이미 넘긴 항목은 파이프라인에서 마무리)
+        큐에 남은 파일은 입력 디렉터리(작업 선점 모드면 선점 디렉터리)에 그대로 남아 다음 시작 시 처리
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        remaining = sum(len(q) for q in self.queues.values())
+        if remaining:
+            logger.info("Scheduler stopped with %d queued files (left for the next start)", remaining)
+
+
+class BatchTuner:
+    """
+    관측한 추론 시간으로 배치 크기를 조절 (AIMD)
+    배치 처리 시간이 목표보다 길면 배치 크기를 곱셈으로 줄이고,
+    꽉 찬 배치가 목표의 grow_ratio보다 빨리 끝나면 하나씩 늘림
+    """
+    def __init__(self, target_latency, min_size=1, max_size=32, decrease=0.75, grow_ratio=0.8):
+        """
+        target_latency (float): 배치 하나의 목표 처리 시간(초)
+        min_size (int): 최소 배치 크기
+        max_size (int): 최대 배치 크기
+        decrease (float): 목표를 넘었을 때 곱할 비율
+        grow_ratio (float): 꽉 찬 배치가 목표의 이 비율보다 빨리 끝나면 하나 늘림
+        """
+        self.target_latency = target_latency
+        self.min_size = max(1, min_size)
+        self.max_size = max(self.min_size, max_size)
+        self.decrease = decrease
+        self.grow_ratio = grow_ratio
+        self.stage = None
+        self._lock = threading.Lock()
+        self.size_gauge = REGISTRY.gauge("imgtag_batch_size", "Current adaptive inference batch size")
+
+    def attach(self, stage):
+        """ 단계의 배치 크기를 조절 대상으로 등록 (현재 배치 크기를 범위 안으로 맞춤) """
+        self.stage = stage
+        stage.batch_size = min(max(stage.batch_size, self.min_size), self.max_size)
+        stage.on_batch = self.observe
+        self.size_gauge.set(stage.batch_size)
+
+    def observe(self, count, elapsed):
+        """ 배치 하나의 항목 수와 처리 시간(초) 반영 """
+        with self._lock:
+            size = self.stage.batch_size
+            if elapsed > self.target_latency:
+                size = max(self.min_size, min(size - 1, int(size * self.decrease)))
+            elif count >= size and elapsed < self.target_latency * self.grow_ratio:
+                size = min(self.max_size, size + 1)
+            if size != self.stage.batch_size:
+                logger.debug("Batch size %d -> %d (%d items in %.0f ms)",
+                             self.stage.batch_size, size, count, elapsed * 1000)
+                self.stage.batch_size = size
+                self.size_gauge.set(size)
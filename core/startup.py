@@ -0,0 +1,112 @@
+"""
+빠른 시작 지원 모듈
+- StartupTimer: 시작 단계별 소요 시간 기록/출력 (동시에 실행되는 단계도 각각 기록)
+- run_phases: 서로 독립적인 초기화 단계(모델 로드, 해시 로드, Kafka 연결)를 동시에 실행
+- ReadinessGate: 의존성이 준비되기 전에 들어온 파일 이벤트를 모아 두었다가 준비되면 순서대로 전달
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.metrics import REGISTRY
+
+
+class StartupTimer:
+    """ 시작 단계별 소요 시간 기록 """
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self._lock = threading.Lock()
+        self.phases = {}    # 단계 이름 -> 소요 시간(초), 기록 순서 유지
+
+    def phase(self, name):
+        """ with 블록의 실행 시간을 name 단계로 기록하는 컨텍스트 매니저 """
+        return _Phase(self, name)
+
+    def record(self, name, seconds):
+        with self._lock:
+            self.phases[name] = seconds
+        REGISTRY.gauge("imgtag_startup_seconds", "Startup phase duration", phase=name).set(seconds)
+
+    def elapsed(self):
+        """ 시작 이후 경과 시간(초) """
+        return time.perf_counter() - self.started_at
+
+    def report(self, name="ready"):
+        """ 지금까지의 경과 시간을 name 단계로 기록하고 단계별 시간 출력 """
+        self.record(name, self.elapsed())
+        with self._lock:
+            parts = [f"{phase} {seconds:.2f}s" for phase, seconds in self.phases.items()]
+        print("Startup: " + ", ".join(parts))
+
+
+class _Phase:
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.record(self.name, time.perf_counter() - self.start)
+
+
+def run_phases(tasks, timer, concurrent=True):
+    """
+    초기화 단계를 실행하고 단계 이름 -> 반환값 dict 반환
+    tasks (dict): 단계 이름 -> 인자 없는 함수
+    timer (StartupTimer): 단계별 시간을 기록할 타이머
+    concurrent (bool): True면 단계마다 스레드를 두고 동시에 실행, False면 순서대로 실행
+    실패한 단계가 있으면 모든 단계가 끝난 뒤 첫 오류를 다시 발생시킴
+    """
+    def timed(name, fn):
+        with timer.phase(name):
+            return fn()
+
+    if not concurrent:
+        return {name: timed(name, fn) for name, fn in tasks.items()}
+    with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="startup") as executor:
+        futures = {name: executor.submit(timed, name, fn) for name, fn in tasks.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+
+class ReadinessGate:
+    """
+    준비 전에 들어온 항목을 모아 두고, open() 이후에는 바로 전달하는 관문
+    감시는 시작하자마자 이벤트를 받되 모델/해시가 준비되기 전에는 처리하지 않도록 사용
+    """
+    def __init__(self, forward=None):
+        """ forward (function): 준비된 뒤 항목을 넘길 함수 (open에서 지정해도 됨) """
+        self.forward = forward
+        self._lock = threading.Lock()
+        self._pending = []
+        self._ready = False
+
+    def submit(self, item):
+        """ 준비됐으면 바로 전달, 아니면 대기 목록에 추가 """
+        with self._lock:
+            if not self._ready:
+                self._pending.append(item)
+                return
+        self.forward(item)
+
+    def open(self, forward=None):
+        """
+        대기 중인 항목을 들어온 순서대로 전달한 뒤 바로 전달 모드로 전환
+        전달하는 동안 새로 들어온 항목도 순서대로 이어서 전달, 전달한 대기 항목 수 반환
+        """
+        if forward is not None:
+            self.forward = forward
+        flushed = 0
+        while True:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                if not pending:
+                    self._ready = True
+                    return flushed
+            for item in pending:
+                self.forward(item)
+            flushed += len(pending)
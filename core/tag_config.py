@@ -0,0 +1,143 @@
+"""
+태그/색상 설정 컴파일 및 핫 리로드 모듈
+tags.json은 YOLO 클래스 번호로 바로 찾을 수 있는 배열로, colors.json은 색상 룩업 테이블로 미리 변환하고
+파일이 바뀌면 새로 컴파일한 설정으로 통째로 교체 (프로세스 재시작이나 모델 재로드 없음)
+"""
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from core.color_classifier import ColorClassifier
+from utils.log_util import get_logger
+
+logger = get_logger(__name__)
+
+UNMAPPED = -1   # tags.json에 없는 클래스
+
+
+class CompiledTags:
+    """
+    YOLO 클래스 번호 -> 대분류/소분류 번호 배열
+    감지마다 클래스 이름 문자열로 dict를 찾는 대신 배열 인덱싱으로 변환
+    (배열은 여러 감지를 한 번에 변환할 때, pairs는 감지 하나씩 변환할 때 사용)
+    """
+    def __init__(self, tag_mapping, class_names):
+        """
+        tag_mapping (dict): 클래스 이름 -> {"category": ..., "subcategory": ...}
+        class_names (dict): 모델의 클래스 번호 -> 클래스 이름
+        """
+        self.categories = sorted({mapping["category"] for mapping in tag_mapping.values()})
+        self.subcategories = sorted({mapping["subcategory"] for mapping in tag_mapping.values()})
+        category_ids = {name: index for index, name in enumerate(self.categories)}
+        subcategory_ids = {name: index for index, name in enumerate(self.subcategories)}
+
+        size = max(class_names, default=-1) + 1
+        self.category_of = np.full(size, UNMAPPED, dtype=np.int16)
+        self.subcategory_of = np.full(size, UNMAPPED, dtype=np.int16)
+        for class_id, label in class_names.items():
+            mapping = tag_mapping.get(label)
+            if mapping:
+                self.category_of[class_id] = category_ids[mapping["category"]]
+                self.subcategory_of[class_id] = subcategory_ids[mapping["subcategory"]]
+
+        # 클래스 번호 -> (대분류, 소분류) 이름 튜플 (매핑이 없으면 None)
+        self.pairs = [
+            (self.categories[category], self.subcategories[subcategory]) if category != UNMAPPED else None
+            for category, subcategory in zip(self.category_of.tolist(), self.subcategory_of.tolist())
+        ]
+
+    def lookup(self, class_id):
+        """ 클래스 번호 -> (대분류, 소분류) 이름, 매핑이 없으면 None """
+        if 0 <= class_id < len(self.pairs):
+            return self.pairs[class_id]
+        return None
+
+
+class TagConfig:
+    """
+    한 시점의 태그/색상 설정 (만든 뒤에는 바꾸지 않음)
+    처리 중인 이미지는 시작할 때 가져온 설정을 끝까지 사용하므로 교체 도중에도 섞이지 않음
+    """
+    def __init__(self, tag_mapping, color_ranges, class_names, color_threshold=0.1,
+                 color_max_pixels=None, color_integral_ratio=1.0, version=0):
+        self.tag_mapping = tag_mapping
+        self.color_ranges = color_ranges
+        self.tags = CompiledTags(tag_mapping, class_names)
+        # 색상 범위를 미리 룩업 테이블로 변환한 분류기
+        self.color_classifier = ColorClassifier(color_ranges, color_threshold, color_max_pixels,
+                                                color_integral_ratio)
+        self.version = version
+
+
+def load_json(path):
+    """ JSON 파일 로드 (오류는 호출한 쪽에서 처리) """
+    with open(path, "r") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path} must contain a JSON object")
+    return data
+
+
+class TagConfigWatcher:
+    """
+    tags.json/colors.json의 수정 시각을 주기적으로 확인해 바뀌면 다시 로드하는 스레드
+    로드나 컴파일에 실패하면 기존 설정을 그대로 사용
+    """
+    def __init__(self, tag_path, colors_path, apply, interval=2.0):
+        """
+        tag_path (str): 태그 매핑 파일 경로
+        colors_path (str): 색상 범위 파일 경로
+        apply (function): (tag_mapping, color_ranges)를 받아 새 설정을 적용하는 함수
+        interval (float): 파일 확인 주기(초)
+        """
+        self.paths = (tag_path, colors_path)
+        self.apply = apply
+        self.interval = interval
+        self._signatures = self._stat()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def _stat(self):
+        """ 파일별 (수정시각, 크기), 없으면 None """
+        signatures = []
+        for path in self.paths:
+            try:
+                stat_result = os.stat(path)
+                signatures.append((stat_result.st_mtime_ns, stat_result.st_size))
+            except OSError:
+                signatures.append(None)
+        return signatures
+
+    def start(self):
+        """ 확인 스레드 시작 """
+        self._thread = threading.Thread(target=self._run, name="tag-config-watcher", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            self.check()
+
+    def check(self):
+        """ 파일이 바뀌었으면 다시 로드해 적용, 적용했으면 True """
+        signatures = self._stat()
+        if signatures == self._signatures:
+            return False
+        self._signatures = signatures
+        start = time.perf_counter()
+        try:
+            tag_mapping, color_ranges = (load_json(path) for path in self.paths)
+            self.apply(tag_mapping, color_ranges)
+        except Exception as e:
+            logger.error("Tag config reload failed, keeping current config: %s", e)
+            return False
+        logger.info("Tag config reloaded in %.1fms", (time.perf_counter() - start) * 1000)
+        return True
+
+    def stop(self):
+        """ 확인 스레드 종료 """
+        self._stopping.set()
+        if self._thread:
+            self._thread.join()
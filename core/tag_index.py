@@ -0,0 +1,426 @@
+"""
+로컬 태그 색인 모듈
+처리된(이동된) 파일마다 대분류 태그, 나머지 태그(소분류/색상)를 기록하고
+태그별 문서 번호 목록을 압축 비트맵(utils.bitmap)으로 유지해 AND/OR/NOT 태그 조건을 빠르게 조회
+
+- 문서는 SQLite docs 테이블에 추가만 하고(같은 경로를 다시 색인하면 이전 문서는 삭제 표시),
+  태그별 비트맵은 postings 테이블에 압축(compaction) 시점의 상태로 저장
+- 열 때 postings를 읽고, 마지막 압축 이후 추가된 문서만 다시 읽어 비트맵에 반영
+- 추가는 큐에 넣기만 하고 백그라운드 스레드가 모아서 기록/반영/압축 (파이프라인을 막지 않음)
+- 조회는 현재 비트맵 참조를 그대로 사용 (비트맵은 변경하지 않고 새로 만들어 교체하므로 락 불필요)
+
+조건 문법: 태그 이름, AND, OR, NOT, 괄호 (AND는 생략 가능, 우선순위 NOT > AND > OR)
+  'primary:vehicle'은 대분류가 vehicle인 파일, '*'는 모든 파일
+  예) red AND vehicle AND person / (car OR bus) NOT primary:human
+
+실행: python -m core.tag_index query "red AND vehicle AND person" --limit 20
+      python -m core.tag_index tags
+      python -m core.tag_index compact
+"""
+import json
+import queue
+import re
+import sqlite3
+import threading
+import time
+
+from utils.bitmap import Bitmap
+from utils.log_util import get_logger
+from utils.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+ALL = "*"                   # 모든 문서 비트맵의 키
+PRIMARY_PREFIX = "primary:"
+_STOP = object()            # 기록 스레드 종료 신호
+_TOKEN = re.compile(r"\s*(\(|\)|[^\s()]+)")
+
+
+def terms(primary_tag, tags):
+    """ 문서 하나가 속하는 비트맵 키 목록 (대분류는 일반 태그로도 색인) """
+    keys = {ALL}
+    if primary_tag:
+        keys.add(primary_tag)
+        keys.add(PRIMARY_PREFIX + primary_tag)
+    keys.update(tags)
+    return keys
+
+
+def parse(expression):
+    """
+    조건 문자열을 구문 트리로 변환
+    returns: ('term', 이름) | ('and', a, b) | ('or', a, b) | ('not', a)
+    잘못된 문법이면 ValueError
+    """
+    tokens = _TOKEN.findall(expression)
+    pos = 0
+
+    def peek():
+        return tokens[pos] if pos < len(tokens) else None
+
+    def keyword(token):
+        return token.upper() if token and token.upper() in ("AND", "OR", "NOT") else None
+
+    def parse_or():
+        nonlocal pos
+        node = parse_and()
+        while keyword(peek()) == "OR":
+            pos += 1
+            node = ("or", node, parse_and())
+        return node
+
+    def parse_and():
+        nonlocal pos
+        node = parse_not()
+        while True:
+            token = peek()
+            if keyword(token) == "AND":
+                pos += 1
+            elif token is None or token == ")" or keyword(token) == "OR":
+                return node
+            node = ("and", node, parse_not())   # AND 생략 (나란히 쓴 조건)
+
+    def parse_not():
+        nonlocal pos
+        if keyword(peek()) == "NOT":
+            pos += 1
+            return ("not", parse_not())
+        return parse_atom()
+
+    def parse_atom():
+        nonlocal pos
+        token = peek()
+        if token is None:
+            raise ValueError(f"unexpected end of query: {expression!r}")
+        pos += 1
+        if token == "(":
+            node = parse_or()
+            if peek() != ")":
+                raise ValueError(f"missing ')' in query: {expression!r}")
+            pos += 1
+            return node
+        if token == ")" or keyword(token):
+            raise ValueError(f"unexpected {token!r} in query: {expression!r}")
+        return ("term", token)
+
+    node = parse_or()
+    if pos != len(tokens):
+        raise ValueError(f"unexpected {tokens[pos]!r} in query: {expression!r}")
+    return node
+
+
+def _evaluate(node, postings, universe):
+    """
+    구문 트리를 비트맵 연산으로 계산 (NOT은 전체 문서 기준 차집합)
+    태그 비트맵에는 삭제된 문서가 남아 있을 수 있으므로 호출한 쪽에서 마지막에 universe와 교집합
+    """
+    kind = node[0]
+    if kind == "term":
+        return universe if node[1] == ALL else postings.get(node[1], Bitmap())
+    if kind == "and":
+        left = _evaluate(node[1], postings, universe)
+        return left & _evaluate(node[2], postings, universe) if left else left
+    if kind == "or":
+        return _evaluate(node[1], postings, universe) | _evaluate(node[2], postings, universe)
+    return universe - _evaluate(node[1], postings, universe)
+
+
+class TagIndex:
+    """
+    파일별 태그를 SQLite에 기록하고 태그별 압축 비트맵으로 조건 조회하는 색인
+    add()는 큐에 넣기만 하고, start()로 시작한 기록 스레드가 모아서 반영
+    """
+    def __init__(self, db_path, compact_docs=100000, flush_interval=1.0, batch_size=1000, queue_size=100000):
+        """
+        db_path (str): 색인 DB 파일 경로
+        compact_docs (int): 마지막 압축 이후 이만큼 문서가 추가되면 비트맵을 다시 저장
+        flush_interval (float): 추가된 문서를 모아 기록하는 최대 간격(초)
+        batch_size (int): 한 번에 기록하는 최대 문서 수
+        queue_size (int): 기록 대기 큐 크기 (가득 차면 추가를 버리고 경고, 파이프라인은 기다리지 않음)
+        """
+        self.db_path = str(db_path)
+        self.compact_docs = compact_docs
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        # 기록 스레드와 조회(경로 조회)가 함께 쓰므로 연결은 하나만 두고 락으로 보호
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"   # 압축으로 지운 번호를 다시 쓰지 않도록
+            " path TEXT NOT NULL,"
+            " primary_tag TEXT,"
+            " tags TEXT NOT NULL,"
+            " indexed_at REAL NOT NULL,"
+            " deleted INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS docs_path ON docs (path)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS postings (tag TEXT PRIMARY KEY, bitmap BLOB NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+
+        # 조회는 아래 두 참조만 읽음 (기록 스레드가 새 dict/Bitmap으로 교체)
+        self._postings = {}         # 키 -> Bitmap
+        self._deleted = Bitmap()    # 삭제 표시된 문서 번호
+        self._since_compact = 0
+        self._last_id = 0           # 비트맵에 반영한 마지막 문서 번호
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self.dropped = 0
+
+        self.query_latency = REGISTRY.histogram("imgtag_tag_index_query_seconds", "Tag index query time")
+        self.write_latency = REGISTRY.histogram("imgtag_tag_index_write_seconds", "Tag index batch write time")
+        self.compact_latency = REGISTRY.histogram("imgtag_tag_index_compact_seconds", "Tag index compaction time")
+        self.docs_counter = REGISTRY.counter("imgtag_tag_index_docs_total", "Documents added to the tag index")
+        REGISTRY.gauge("imgtag_tag_index_pending", "Documents waiting to be written to the tag index"
+                       ).set_function(self._queue.qsize)
+        self._load()
+
+    def _load(self):
+        """ 압축된 비트맵을 읽고 그 이후 추가된 문서를 반영 """
+        start = time.perf_counter()
+        with self._db_lock:
+            postings = {tag: Bitmap.deserialize(blob)
+                        for tag, blob in self._conn.execute("SELECT tag, bitmap FROM postings")}
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'compacted_through'").fetchone()
+            compacted_through = int(row[0]) if row else 0
+            rows = self._conn.execute("SELECT id, primary_tag, tags FROM docs WHERE id > ? ORDER BY id",
+                                      (compacted_through,)).fetchall()
+            deleted = [doc_id for (doc_id,) in self._conn.execute("SELECT id FROM docs WHERE deleted = 1")]
+        self._postings = self._merge(postings, ((doc_id, primary, json.loads(tags)) for doc_id, primary, tags in rows))
+        self._deleted = Bitmap.from_ids(deleted)
+        self._since_compact = len(rows)
+        self._last_id = rows[-1][0] if rows else compacted_through
+        if postings or rows:
+            logger.info("Tag index: %d files, %d tags loaded in %.2fs (%d replayed)",
+                        self.count(ALL), len(self._postings) - 1, time.perf_counter() - start, len(rows))
+
+    @staticmethod
+    def _merge(postings, docs):
+        """ (문서 번호, 대분류, 태그 목록)을 반영한 새 postings dict 반환 (기존 dict/Bitmap은 그대로) """
+        ids_by_term = {}
+        for doc_id, primary_tag, tags in docs:
+            for term in terms(primary_tag, tags):
+                ids_by_term.setdefault(term, []).append(doc_id)
+        if not ids_by_term:
+            return postings
+        merged = dict(postings)
+        for term, ids in ids_by_term.items():
+            merged[term] = merged.get(term, Bitmap()) | Bitmap.from_ids(ids)
+        return merged
+
+    # 기록
+    def start(self):
+        """ 기록 스레드 시작 """
+        self._thread = threading.Thread(target=self._run, name="tag-index", daemon=True)
+        self._thread.start()
+
+    def add(self, path, primary_tag, tags):
+        """
+        파일 색인 요청 (바로 반환)
+        path (str): 이동된 파일 경로 (같은 경로를 다시 색인하면 이전 태그는 대체)
+        primary_tag (str): 대분류 태그
+        tags (list): 나머지 태그 목록
+        """
+        try:
+            self._queue.put_nowait((path, primary_tag, list(tags), time.time()))
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("Tag index queue full, dropped %s", path)
+
+    def _run(self):
+        while True:
+            batch = []
+            stopping = False
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    entry = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    stopping = True
+                    break
+                batch.append(entry)
+            if batch:
+                try:
+                    self._write(batch)
+                except sqlite3.Error as e:
+                    logger.error("Tag index write failed (%d files): %s", len(batch), e)
+                for _ in batch:
+                    self._queue.task_done()
+            if self._since_compact >= self.compact_docs:
+                self.compact()
+            if stopping:
+                self._queue.task_done()
+                return
+
+    def _write(self, batch):
+        """ 문서를 DB에 기록하고 비트맵에 반영 """
+        with self.write_latency.time():
+            docs, replaced = [], []
+            with self._db_lock:
+                for path, primary_tag, tags, indexed_at in batch:
+                    old = self._conn.execute("SELECT id FROM docs WHERE path = ? AND deleted = 0", (path,)).fetchall()
+                    if old:
+                        replaced.extend(doc_id for (doc_id,) in old)
+                        self._conn.execute("UPDATE docs SET deleted = 1 WHERE path = ? AND deleted = 0", (path,))
+                    cursor = self._conn.execute(
+                        "INSERT INTO docs (path, primary_tag, tags, indexed_at) VALUES (?, ?, ?, ?)",
+                        (path, primary_tag, json.dumps(tags, ensure_ascii=False), indexed_at))
+                    docs.append((cursor.lastrowid, primary_tag, tags))
+                self._conn.commit()
+            self._postings = self._merge(self._postings, docs)
+            self._last_id = docs[-1][0]
+            if replaced:
+                self._deleted = self._deleted | Bitmap.from_ids(replaced)
+            self._since_compact += len(docs)
+        self.docs_counter.inc(len(docs))
+
+    def compact(self):
+        """
+        삭제 표시된 문서를 비트맵과 DB에서 제거하고 현재 비트맵을 postings 테이블에 저장
+        (기록 스레드에서 호출, 조회는 압축 중에도 이전 비트맵으로 계속 가능)
+        """
+        with self.compact_latency.time():
+            postings, deleted = self._postings, self._deleted
+            if deleted:
+                postings = {term: bitmap - deleted for term, bitmap in postings.items()}
+                postings = {term: bitmap for term, bitmap in postings.items() if bitmap or term == ALL}
+            with self._db_lock:
+                # 다른 프로세스(CLI)가 압축해도 이 인스턴스가 반영하지 않은 문서는 다음에 다시 읽도록 자신의 번호 사용
+                compacted_through = self._last_id
+                self._conn.execute("DELETE FROM postings")
+                self._conn.executemany("INSERT INTO postings (tag, bitmap) VALUES (?, ?)",
+                                       [(term, bitmap.serialize()) for term, bitmap in postings.items()])
+                self._conn.executemany("DELETE FROM docs WHERE id = ?",
+                                       [(doc_id,) for doc_id in deleted.to_array().tolist()])
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('compacted_through', ?)",
+                                   (str(compacted_through),))
+                self._conn.commit()
+            self._postings = postings
+            self._deleted = self._deleted - deleted
+            self._since_compact = 0
+
+    def flush(self):
+        """ 지금까지 추가한 문서가 모두 반영될 때까지 대기 (기록 스레드가 실행 중이어야 함) """
+        self._queue.join()
+
+    # 조회
+    def match(self, expression):
+        """ 조건에 맞는 문서 번호 비트맵 """
+        node = parse(expression)
+        postings, deleted = self._postings, self._deleted
+        universe = postings.get(ALL, Bitmap()) - deleted
+        with self.query_latency.time():
+            return _evaluate(node, postings, universe) & universe
+
+    def count(self, expression):
+        """ 조건에 맞는 파일 수 """
+        return len(self.match(expression))
+
+    def query(self, expression, limit=100):
+        """
+        조건에 맞는 파일 목록 (최근에 색인된 순)
+        returns: list: {'path', 'primary_tag', 'tags', 'indexed_at'} dict 목록
+        """
+        ids = self.match(expression).to_array()
+        if limit is not None:
+            ids = ids[-limit:]
+        ids = ids[::-1].tolist()
+        rows = {}
+        with self._db_lock:
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for doc_id, path, primary_tag, tags, indexed_at in self._conn.execute(
+                        f"SELECT id, path, primary_tag, tags, indexed_at FROM docs WHERE id IN ({placeholders})",
+                        chunk):
+                    rows[doc_id] = {"path": path, "primary_tag": primary_tag, "tags": json.loads(tags),
+                                    "indexed_at": indexed_at}
+        return [rows[doc_id] for doc_id in ids if doc_id in rows]
+
+    def tag_counts(self):
+        """ 태그별 파일 수 (많은 순) """
+        postings, deleted = self._postings, self._deleted
+        counts = {term: len(bitmap - deleted) for term, bitmap in postings.items() if term != ALL}
+        return dict(sorted(counts.items(), key=lambda x: -x[1]))
+
+    def stats(self):
+        postings = self._postings
+        return {
+            "files": self.count(ALL),
+            "tags": len(postings) - (ALL in postings),
+            "deleted": len(self._deleted),
+            "since_compact": self._since_compact,
+            "pending": self._queue.qsize(),
+            "dropped": self.dropped,
+            "bitmap_mb": sum(bitmap.nbytes() for bitmap in postings.values()) / 2 ** 20,
+        }
+
+    def log_stats(self):
+        s = self.stats()
+        logger.info("Tag index: %d files, %d tags, %.1f MB bitmaps, %d pending, %d dropped",
+                    s['files'], s['tags'], s['bitmap_mb'], s['pending'], s['dropped'])
+
+    def close(self, compact=True):
+        """ 남은 문서를 기록하고 (compact가 True면 압축한 뒤) 종료 """
+        if self._thread and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        if compact and (self._since_compact or self._deleted):
+            self.compact()
+        with self._db_lock:
+            self._conn.close()
+
+
+def main():
+    import argparse
+
+    from config import Config
+
+    parser = argparse.ArgumentParser(description="Local tag index")
+    parser.add_argument("--db", help="색인 DB 경로 (기본값: Config.tag_index_path)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    query = commands.add_parser("query", help="조건에 맞는 파일 출력")
+    query.add_argument("expression", help="예: 'red AND vehicle AND person'")
+    query.add_argument("--limit", type=int, default=100, help="최대 출력 수 (최근 색인 순)")
+    query.add_argument("--count", action="store_true", help="파일 수만 출력")
+    query.add_argument("--json", action="store_true", help="JSON 줄 형식으로 출력")
+    commands.add_parser("tags", help="태그별 파일 수 출력")
+    commands.add_parser("stats", help="색인 통계 출력")
+    commands.add_parser("compact", help="삭제 표시된 문서를 정리하고 비트맵 저장")
+    args = parser.parse_args()
+
+    index = TagIndex(args.db or Config().tag_index_path)
+    try:
+        if args.command == "query":
+            start = time.perf_counter()
+            if args.count:
+                print(index.count(args.expression))
+            else:
+                for row in index.query(args.expression, args.limit):
+                    if args.json:
+                        print(json.dumps(row, ensure_ascii=False))
+                    else:
+                        print(f"{row['path']}\t{row['primary_tag']}\t{','.join(row['tags'])}")
+            print(f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+        elif args.command == "tags":
+            for tag, count in index.tag_counts().items():
+                print(f"{count:>10}  {tag}")
+        elif args.command == "compact":
+            index.compact()
+            index.log_stats()
+        else:
+            print(json.dumps(index.stats(), indent=1))
+    except ValueError as e:
+        print(f"Invalid query: {e}")
+    finally:
+        index.close(compact=False)     # 실행 중인 어플리케이션이 쓰는 색인일 수 있으므로 조회만 하고 닫음
+
+
+if __name__ == "__main__":
+    main()
@@ -5,86 +5,199 @@
 import cv2
 import numpy as np
 
+from core.preprocess import decode_reduced, letterbox
+from core.result_cache import CONFIDENCE, IOU, from_record, to_record
+from core.tag_config import TagConfig
 from utils.hash_util import HashUtil
+from utils.log_util import get_logger
+from utils.metrics import REGISTRY
+
+logger = get_logger(__name__)
+DECODE_SECONDS = REGISTRY.histogram("imgtag_step_seconds", "Time per image spent in a step", step="decode")
 
 
 class ImageTagger:
     """ 이미지 분석 및 태깅 수행하는 클래스 """
-    def __init__(self, model_loader, tag_mapping, color_ranges, hash_util: HashUtil):
+    def __init__(self, model_loader, tag_mapping, color_ranges, hash_util: HashUtil,
+                 color_threshold=0.1, color_max_pixels=None, color_integral_ratio=1.0, decode_size=None,
+                 result_cache=None):
         # 모델 로더로부터 모델 가져오기
         self.model = model_loader.load_model()  # YOLO 모델 로드 추가
 
-        # 태그 사전을 외부에서 주입받음 (Config에서 로드된 데이터)
-        self.tag_mapping = tag_mapping  # 태그 매핑
+        # 모델 클래스 번호 -> 클래스 이름 (버전에 따라 list일 수 있음)
+        names = self.model.names
+        self.class_names = dict(enumerate(names)) if isinstance(names, (list, tuple)) else dict(names)
+
+        # 색상 분석 설정 (설정 파일이 바뀌어 다시 컴파일할 때도 사용)
+        self.color_threshold = color_threshold
+        self.color_max_pixels = color_max_pixels
+        self.color_integral_ratio = color_integral_ratio
 
-        # 색상 사전을 외부에서 주입받음 (Config에서 로드된 데이터)
-        self.color_ranges = color_ranges  # 색상 범위
+        # 태그/색상 사전을 외부에서 주입받아 클래스 번호 배열과 색상 룩업 테이블로 컴파일 (Config에서 로드된 데이터)
+        self.tag_config = None
+        self.apply_config(tag_mapping, color_ranges)
 
         # 중복 체크용 해시 저장
         self.hash_util: HashUtil = hash_util
 
+        # 축소 디코딩 기준 크기 (보통 모델 입력 크기, None이면 원본 해상도로 디코딩)
+        # 박스와 색상 분석 모두 디코딩된 이미지 좌표 기준 (박스를 원본 좌표로 바꿔 원본에서 색상을 보려면 원본 디코딩이 필요)
+        # 색상은 축소된 이미지(긴 변 decode_size 이상)의 픽셀로 판단하므로 원본 대비 작은 박스의 표본 픽셀 수가 줄어듦
+        # (원본 디코딩도 color_max_pixels를 넘으면 간격을 두고 샘플링하므로 큰 사진에서는 차이가 작음)
+        self.decode_size = decode_size
 
-    def analyze_color(self, img, box):
-        """ 바운딩 박스 내 주요 색상 분석 """
-        # 바운딩 박스 좌표 추출 (x1, y1, x2, y2) - YOLO xyxy 순서에 맞게 수정
-        x1, y1, x2, y2 = map(int, box.xyxy[0])  # [x_min, y_min, x_max, y_max]
+        # 내용 해시별 감지 결과 캐시 (없으면 항상 모델 실행)
+        self.result_cache = result_cache
 
-        # 좌표 유효성 검사 및 조정
-        h, w = img.shape[:2]  # 이미지 높이와 너비
-        x1 = max(0, x1)  # 음수 방지
-        y1 = max(0, y1)
-        x2 = min(w, x2)  # 이미지 크기 초과 방지
-        y2 = min(h, y2)
 
-        # 슬라이싱 전에 크기 확인
-        if x1 >= x2 or y1 >= y2:
-            print(f"Invalid bounding box: ({x1}, {y1}, {x2}, {y2}) - skipping color analysis")
-            return []
+    def apply_config(self, tag_mapping, color_ranges):
+        """
+        태그 매핑과 색상 범위를 컴파일해 현재 설정으로 교체 (모델은 다시 로드하지 않음)
+        참조 하나만 바꾸므로 처리 중인 이미지는 이전 설정을 끝까지 사용
+        """
+        version = self.tag_config.version + 1 if self.tag_config else 0
+        self.tag_config = TagConfig(tag_mapping, color_ranges, self.class_names, self.color_threshold,
+                                    self.color_max_pixels, self.color_integral_ratio, version)
 
-        roi = img[y1:y2, x1:x2]  # 바운딩 박스 영역 추출
-        hsv = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)  # BGR to HSV 변환
+    @property
+    def tag_mapping(self):
+        """ 현재 태그 매핑 """
+        return self.tag_config.tag_mapping
 
-        colors = []  # 감지된 색상 저장
-        for color_name, range_data in self.color_ranges.items():
-            lower = np.array(range_data["lower"])  # 하한값
-            upper = np.array(range_data["upper"])  # 상한값
-            mask = cv2.inRange(hsv, lower, upper)  # 범위 내 픽셀 마스크
-            if cv2.countNonZero(mask) > (roi.size * 0.1):  # 10% 이상이면 색상 추가
-                colors.append(color_name)
-        return colors
+    @property
+    def color_ranges(self):
+        """ 현재 색상 범위 """
+        return self.tag_config.color_ranges
 
-    def analyze_image(self, image_path):
-        """이미지 분석 후 대분류 태그와 나머지 태그 반환"""
-        # 이미지 해시 확인
-        hu = self.hash_util
-        if hu.is_duplicate(image_path):
-            img_hash = hu.get_image_hash(image_path)
-            print(f"Duplicate image detected: {img_hash}, skipping...")
-            return None, []
+    @property
+    def color_classifier(self):
+        """ 현재 색상 분류기 """
+        return self.tag_config.color_classifier
+
+    def analyze_colors(self, img, boxes):
+        """
+        객체별 바운딩 박스 내 주요 색상 분석
+        이미지 전체를 한 번만 HSV로 변환하고 각 박스는 그 결과의 뷰로 계산
+        boxes (list): 박스별 (x1, y1, x2, y2) 좌표 - YOLO xyxy 순서
+        returns: list: 박스별 색상 목록
+        """
+        return self.color_classifier.classify_boxes(img, boxes)
 
-        # OpenCV로 이미지 로드
-        img = cv2.imread(str(image_path))
+    def load_image(self, image_path):
+        """
+        중복 확인 후 이미지 로드
+        returns: (str, ndarray): 이미지 해시와 디코딩된 이미지, 중복이거나 로드 실패 시 None
+        """
+        # 파일을 한 번만 읽어 해시 계산과 디코딩에 함께 사용
+        loaded = self.hash_util.read_if_new(image_path)
+        if loaded is None:
+            return None
+        img_hash, data = loaded
+
+        # 읽어둔 바이트를 OpenCV로 디코딩
+        img = self.decode(data, self.decode_size)
         if img is None:
-            print(f"Error: Could not load image {image_path}")
-            return None, []
+            logger.warning("Could not load image %s", image_path)
+            self.hash_util.release_hash(img_hash)
+            return None
+        return img_hash, img
 
-        # YOLO 모델로 객체 감지 수행
-        results = self.model(img, conf=0.25, verbose=False)   # verbose: 상세 출력 여부
-        detections = results[0].boxes   # 감지 결과에서 바운딩 박스 정보 추출
+    @staticmethod
+    def decode(data, size=None):
+        """
+        파일 바이트를 BGR 이미지로 디코딩, 실패 시 None
+        size (int): 지정하면 이 크기보다 충분히 큰 JPEG는 1/2, 1/4, 1/8로 축소 디코딩
+        """
+        with DECODE_SECONDS.time():
+            if size:
+                return decode_reduced(data, size)[0]
+            return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    @staticmethod
+    def decode_frame(data, frame):
+        """
+        파일 바이트를 디코딩해 모델 입력 크기로 letterbox한 결과를 frame에 바로 기록
+        프레임 크기보다 충분히 큰 JPEG는 축소 디코딩 (프레임 해상도는 그대로)
+        data (bytes): 이미지 파일 바이트
+        frame (ndarray): 결과를 쓸 (size, size, 3) uint8 배열 (공유 메모리 슬롯 뷰)
+        returns: LetterboxMeta: 원본 좌표 복원 정보, 디코딩 실패 시 None
+        """
+        with DECODE_SECONDS.time():
+            img, scale = decode_reduced(data, frame.shape[0])
+            if img is None:
+                return None
+            _, meta = letterbox(img, frame.shape[0], out=frame, scale=scale)
+        return meta
+
+    def detect(self, images):
+        """
+        이미지 목록을 한 번의 forward pass로 객체 감지
+        images (list): 디코딩된 이미지 목록
+        returns: list: 이미지별 YOLO 결과
+        """
+        # 백엔드마다 NMS 기본값이 다르므로 임계값을 항상 직접 전달
+        return self.model(images, conf=CONFIDENCE, iou=IOU, verbose=False)   # verbose: 상세 출력 여부
+
+    def detect_cached(self, images, hashes, metas=None):
+        """
+        결과 캐시에 있는 이미지는 캐시된 감지 결과를 쓰고, 나머지만 한 번의 forward pass로 감지
+        images (list): 디코딩된 이미지 목록
+        hashes (list): 이미지별 내용 해시 (None이면 캐시 사용 안 함)
+        metas (list): 이미지가 letterbox 프레임이면 이미지별 LetterboxMeta
+        returns: list: 이미지별 감지 결과 (YOLO 결과 또는 같은 형태의 OnnxResult)
+        """
+        if self.result_cache is None:
+            return self.detect(images)
+        metas = metas or [None] * len(images)
+
+        results = [None] * len(images)
+        misses = []
+        for index, (img, img_hash, meta) in enumerate(zip(images, hashes, metas)):
+            record = self.result_cache.get(img_hash) if img_hash else None
+            if record is None:
+                misses.append(index)
+            else:
+                results[index] = from_record(record, img.shape[1], img.shape[0], meta)
+        if not misses:
+            return results
+
+        detected = self.detect([images[index] for index in misses])
+        for index, result in zip(misses, detected):
+            results[index] = result
+            if hashes[index]:
+                img = images[index]
+                self.result_cache.put(hashes[index], to_record(result, img.shape[1], img.shape[0], metas[index]))
+        return results
+
+    def build_tags(self, image_path, img_hash, img, result):
+        """ 모델 결과 하나를 대분류 태그와 나머지 태그로 변환하고, 태그가 있으면 해시 저장 """
+        primary_tag, tags = self.tag_result(image_path, img, result)
+
+        # 태그 생성 후 해시 저장
+        if primary_tag:
+            self.hash_util.save_hash_to_es(img_hash)
+
+        return primary_tag, tags
+
+    def tag_result(self, image_path, img, result):
+        """ 모델 결과 하나를 대분류 태그와 나머지 태그로 변환 (해시 저장 없음) """
+        detections = result.boxes   # 감지 결과에서 바운딩 박스 정보 추출
 
         # 감지 결과 로깅
         if len(detections) == 0:
-            print(f"=================================================================")
-            print(f"No objects detected in {image_path} (confidence threshold: 0.25)")
+            logger.debug("No objects detected in %s (confidence threshold: 0.25)", image_path)
             return None, []
 
+        # 이미지 하나는 처음 가져온 설정으로 끝까지 처리 (도중에 설정이 교체되어도 섞이지 않음)
+        config = self.tag_config
+
         # confidence 순으로 객체 정렬
         detected_objects = []
         for detection in detections:
-            label = self.model.names[int(detection.cls)]  # 클래스 이름
             confidence = float(detection.conf)  # 신뢰도
-            if label in self.tag_mapping and confidence >= 0.25:
-                detected_objects.append((label, confidence, detection))
+            mapping = config.tags.lookup(int(detection.cls))   # 클래스 번호 -> (대분류, 소분류)
+            if mapping and confidence >= 0.25:
+                detected_objects.append((mapping, confidence, detection))
 
         # confidence 기준 내림차순 정렬
         detected_objects.sort(key=lambda x: x[1], reverse=True)
@@ -92,27 +205,63 @@ class ImageTagger:
         # 대분류: 가장 높은 confidence를 가진 객체
         primary_tag = None
         if detected_objects:
-            primary_label = detected_objects[0][0]
-            primary_tag = self.tag_mapping[primary_label]["category"]
-            print(f"Primary tag (highest confidence): {primary_tag}")
+            primary_tag = detected_objects[0][0][0]
+            logger.debug("Primary tag (highest confidence): %s", primary_tag)
+
+        # 색상 분석 (각 객체의 자기 박스 기준)
+        boxes = [[float(v) for v in detection.xyxy[0]] for _, _, detection in detected_objects]
+        box_colors = config.color_classifier.classify_boxes(img, boxes)
 
         # 나머지 태그 생성
         tags = set()
-        for label, confidence, section in detected_objects:
-            mapping = self.tag_mapping[label]
-            tags.add(mapping["category"]) # 대분류 추가
-            tags.add(mapping["subcategory"]) # 소분류 추가
-
-            # 색상 분석
-            colors = self.analyze_color(img, detection)
+        for ((category, subcategory), confidence, detection), colors in zip(detected_objects, box_colors):
+            tags.add(category) # 대분류 추가
+            tags.add(subcategory) # 소분류 추가
             tags.update(colors)
 
         # 대분류는 태그 목록에서 제외 (중복 방지)
         if primary_tag in tags:
             tags.remove(primary_tag)
 
-        # 태그 생성 후 해시 저장
-        if primary_tag:
-            hu.save_hash_to_es(hu.get_image_hash(image_path))
+        return primary_tag, list(tags) # 대분류와 나머지 태그 반환
+
+    def analyze_image(self, image_path):
+        """이미지 분석 후 대분류 태그와 나머지 태그 반환"""
+        loaded = self.load_image(image_path)
+        if loaded is None:
+            return None, []
+        img_hash, img = loaded
+
+        try:
+            # YOLO 모델로 객체 감지 수행 (캐시에 있으면 생략)
+            results = self.detect_cached([img], [img_hash])
+            return self.build_tags(image_path, img_hash, img, results[0])
+        finally:
+            self.hash_util.release_hash(img_hash)   # 태그가 없어 저장하지 않은 해시의 처리 중 표시 해제
+
+    def analyze_images(self, image_paths):
+        """
+        여러 이미지를 하나의 배치로 분석
+        image_paths (list): 분석할 이미지 경로 목록
+        returns: list: 입력 순서대로 (대분류 태그, 나머지 태그) 튜플
+        """
+        outcomes = [(None, [])] * len(image_paths)
+
+        # 중복이 아니고 정상적으로 로드된 이미지만 배치에 포함
+        loaded = []
+        for index, image_path in enumerate(image_paths):
+            image = self.load_image(image_path)
+            if image is not None:
+                loaded.append((index, image_path, *image))
+        if not loaded:
+            return outcomes
 
-        return primary_tag, list(tags) # 대분류와 나머지 태그 반환
\ No newline at end of file
+        try:
+            # 이미지 목록을 한 번의 forward pass로 처리 (캐시에 있는 이미지는 제외)
+            results = self.detect_cached([img for _, _, _, img in loaded], [img_hash for _, _, img_hash, _ in loaded])
+            for (index, image_path, img_hash, img), result in zip(loaded, results):
+                outcomes[index] = self.build_tags(image_path, img_hash, img, result)
+        finally:
+            for _, _, img_hash, _ in loaded:
+                self.hash_util.release_hash(img_hash)
+        return outcomes
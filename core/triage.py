@@ -0,0 +1,388 @@
+"""
+추론 전 분류(triage) 모듈
+작은 흑백 썸네일의 크기/밝기 분산/엣지 밀도(와 선택적으로 작은 로지스틱 분류기)로
+빈 화면, 단색에 가까운 이미지, 아주 작은 썸네일처럼 감지 결과가 나올 수 없는 이미지를 모델 실행 전에 걸러냄
+- 걸러낸 이미지는 no_detection으로 끝내고, audit_rate 비율만큼은 그래도 모델을 실행해 잘못 걸러낸 비율 추정
+- 임계값은 따로 떼어둔 이미지 묶음으로 보정 (python -m core.triage calibrate DIR)
+"""
+import json
+import os
+import random
+import threading
+
+import cv2
+import numpy as np
+
+from utils.log_util import get_logger
+from utils.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+REASONS = ("small", "flat", "no_edges", "classifier")   # 건너뛴 이유
+
+
+class Features:
+    """ 이미지 한 장의 분류용 특징 """
+    __slots__ = ("width", "height", "std", "edge_density")
+
+    def __init__(self, width, height, std, edge_density):
+        """
+        width, height (int): 원본 이미지 크기
+        std (float): 썸네일 밝기 표준편차 (0~255)
+        edge_density (float): 썸네일에서 이웃 픽셀과 밝기 차이가 큰 픽셀 비율 (0~1)
+        """
+        self.width = width
+        self.height = height
+        self.std = std
+        self.edge_density = edge_density
+
+    @property
+    def min_side(self):
+        return min(self.width, self.height)
+
+    def vector(self):
+        """ 분류기 입력 벡터 (크기/분산은 로그, 엣지 밀도는 제곱근으로 분포를 펼침) """
+        aspect = max(self.width, 1) / max(self.height, 1)
+        return np.array([np.log1p(self.min_side), np.log1p(self.std), np.sqrt(self.edge_density),
+                         abs(np.log(aspect))], dtype=np.float64)
+
+
+def measure(gray, size, thumb_size=64, edge_threshold=16):
+    """
+    흑백 이미지에서 분류용 특징 계산
+    gray (ndarray): 흑백 이미지 (축소 디코딩된 것이어도 됨)
+    size (tuple): 원본 (너비, 높이)
+    thumb_size (int): 분산/엣지를 계산할 정사각형 썸네일 크기 (INTER_AREA로 줄여 센서 노이즈는 평균화)
+    edge_threshold (int): 이웃 픽셀과의 밝기 차이가 이 값을 넘으면 엣지로 판단
+    returns: Features
+    """
+    thumb = cv2.resize(gray, (thumb_size, thumb_size), interpolation=cv2.INTER_AREA).astype(np.int16)
+    dx = np.abs(np.diff(thumb, axis=1))[:-1, :]
+    dy = np.abs(np.diff(thumb, axis=0))[:, :-1]
+    edges = (dx > edge_threshold) | (dy > edge_threshold)
+    return Features(size[0], size[1], float(thumb.std()), float(edges.mean()))
+
+
+class TinyClassifier:
+    """ 특징 벡터 -> 객체가 있을 확률을 계산하는 로지스틱 회귀 (numpy만 사용) """
+    def __init__(self, mean, scale, weights, bias, threshold):
+        """
+        mean, scale (list): 특징 표준화 값
+        weights (list), bias (float): 모델 가중치
+        threshold (float): 확률이 이 값보다 낮으면 건너뜀
+        """
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+        self.threshold = float(threshold)
+
+    def probability(self, vectors):
+        """ (N, 4) 또는 (4,) 특징 벡터의 객체 확률 """
+        z = ((np.asarray(vectors) - self.mean) / self.scale) @ self.weights + self.bias
+        return 1.0 / (1.0 + np.exp(-z))
+
+    @classmethod
+    def fit(cls, vectors, labels, epochs=500, lr=0.5, l2=1e-3):
+        """
+        경사 하강법으로 학습 (임계값은 0으로 두고 보정 단계에서 정함)
+        vectors (ndarray): (N, 4) 특징 벡터
+        labels (ndarray): (N,) 객체가 있으면 1
+        """
+        vectors = np.asarray(vectors, dtype=np.float64)
+        labels = np.asarray(labels, dtype=np.float64)
+        mean = vectors.mean(axis=0)
+        scale = vectors.std(axis=0)
+        scale[scale == 0] = 1.0
+        x = (vectors - mean) / scale
+        weights = np.zeros(x.shape[1])
+        bias = 0.0
+        for _ in range(epochs):
+            p = 1.0 / (1.0 + np.exp(-(x @ weights + bias)))
+            error = p - labels
+            weights -= lr * (x.T @ error / len(x) + l2 * weights)
+            bias -= lr * error.mean()
+        return cls(mean, scale, weights, bias, 0.0)
+
+    def to_dict(self):
+        return {"mean": self.mean.tolist(), "scale": self.scale.tolist(), "weights": self.weights.tolist(),
+                "bias": self.bias, "threshold": self.threshold}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["mean"], d["scale"], d["weights"], d["bias"], d["threshold"])
+
+
+class Triage:
+    """
+    모델 실행 전 분류
+    check()가 이유를 반환하면 건너뛸 후보이고, audit()이 True면 확인용으로 모델을 실행한 뒤
+    record_audit()으로 실제 감지 여부를 기록해 잘못 건너뛴 비율(false skip rate)을 추정
+    """
+    def __init__(self, min_side=32, min_std=2.0, min_edge_density=0.001, edge_threshold=16, thumb_size=64,
+                 classifier=None, audit_rate=0.0):
+        """
+        min_side (int): 짧은 변이 이보다 작으면 건너뜀 (아이콘/썸네일)
+        min_std (float): 썸네일 밝기 표준편차가 이보다 작으면 건너뜀 (빈 화면/단색)
+        min_edge_density (float): 엣지 픽셀 비율이 이보다 작으면 건너뜀 (흐릿한 그라데이션)
+        edge_threshold (int), thumb_size (int): 특징 계산 설정 (measure 참고)
+        classifier (TinyClassifier): 규칙을 통과한 이미지에 추가로 적용할 분류기 (없으면 규칙만 사용)
+        audit_rate (float): 건너뛸 이미지 중 확인용으로 모델을 실행할 비율
+        """
+        self.min_side = min_side
+        self.min_std = min_std
+        self.min_edge_density = min_edge_density
+        self.edge_threshold = edge_threshold
+        self.thumb_size = thumb_size
+        self.classifier = classifier
+        self.audit_rate = audit_rate
+
+        self._lock = threading.Lock()
+        self.passed = 0
+        self.skipped = {reason: 0 for reason in REASONS}
+        self.audited = 0
+        self.false_skips = 0
+        self.latency = REGISTRY.histogram("imgtag_step_seconds", "Time per image spent in a step", step="triage")
+        REGISTRY.gauge("imgtag_triage_skip_rate", "Fraction of screened images skipped before inference"
+                       ).set_function(lambda: self.stats()["skip_rate"])
+        REGISTRY.gauge("imgtag_triage_false_skip_rate", "Fraction of audited skips that had a detection"
+                       ).set_function(lambda: self.stats()["false_skip_rate"])
+
+    @classmethod
+    def load(cls, path, audit_rate=0.0):
+        """ 보정 결과 JSON으로 생성 (파일이 없으면 기본 임계값) """
+        if not path or not os.path.exists(path):
+            if path:
+                print(f"Triage calibration {path} not found, using default thresholds")
+            return cls(audit_rate=audit_rate)
+        with open(path, "r", encoding="utf-8") as f:
+            d = json.load(f)
+        classifier = TinyClassifier.from_dict(d["classifier"]) if d.get("classifier") else None
+        return cls(d["min_side"], d["min_std"], d["min_edge_density"], d.get("edge_threshold", 16),
+                   d.get("thumb_size", 64), classifier, audit_rate)
+
+    def to_dict(self):
+        return {
+            "min_side": self.min_side,
+            "min_std": self.min_std,
+            "min_edge_density": self.min_edge_density,
+            "edge_threshold": self.edge_threshold,
+            "thumb_size": self.thumb_size,
+            "classifier": self.classifier.to_dict() if self.classifier else None,
+        }
+
+    def measure(self, gray, size):
+        return measure(gray, size, self.thumb_size, self.edge_threshold)
+
+    def reason(self, features):
+        """ 건너뛸 이유 (통과하면 None), 통계는 기록하지 않음 """
+        if features.min_side < self.min_side:
+            return "small"
+        if features.std < self.min_std:
+            return "flat"
+        if features.edge_density < self.min_edge_density:
+            return "no_edges"
+        if self.classifier and self.classifier.probability(features.vector()) < self.classifier.threshold:
+            return "classifier"
+        return None
+
+    def check(self, gray, size):
+        """
+        이미지 한 장 분류 후 건너뛸 이유 반환 (통과하면 None)
+        gray (ndarray): 흑백 이미지 (decode_gray 결과)
+        size (tuple): 원본 (너비, 높이)
+        """
+        with self.latency.time():
+            reason = self.reason(self.measure(gray, size))
+        with self._lock:
+            if reason:
+                self.skipped[reason] += 1
+            else:
+                self.passed += 1
+        REGISTRY.counter("imgtag_triage_total", "Images screened before inference by result",
+                         result=reason or "pass").inc()
+        return reason
+
+    def audit(self):
+        """ 건너뛸 이미지를 확인용으로 모델에 넘길지 여부 """
+        return self.audit_rate > 0 and random.random() < self.audit_rate
+
+    def record_audit(self, reason, detected):
+        """
+        확인용으로 실행한 이미지의 결과 기록
+        reason (str): check()가 반환한 이유
+        detected (bool): 태그로 매핑되는 객체가 감지되었는지 (True면 잘못 건너뛸 뻔한 이미지)
+        """
+        with self._lock:
+            self.audited += 1
+            if detected:
+                self.false_skips += 1
+        REGISTRY.counter("imgtag_triage_audits_total", "Audited triage skips by result",
+                         reason=reason, result="false_skip" if detected else "correct").inc()
+        if detected:
+            logger.info("Triage false skip (%s): detector found objects", reason)
+
+    def stats(self):
+        with self._lock:
+            skipped = sum(self.skipped.values())
+            screened = skipped + self.passed
+            return {
+                "screened": screened,
+                "skipped": dict(self.skipped),
+                "skip_rate": skipped / screened if screened else 0.0,
+                "audited": self.audited,
+                "false_skips": self.false_skips,
+                "false_skip_rate": self.false_skips / self.audited if self.audited else 0.0,
+            }
+
+    def log_stats(self):
+        """ 건너뛴 비율과 확인 결과 출력 """
+        s = self.stats()
+        reasons = ", ".join(f"{reason} {count}" for reason, count in s["skipped"].items() if count)
+        print(f"Triage: screened {s['screened']}, skip rate {s['skip_rate']:.1%} ({reasons or 'none'}), "
+              f"false skips {s['false_skips']}/{s['audited']} audited ({s['false_skip_rate']:.1%})")
+
+
+def evaluate(triage, features, labels):
+    """
+    정답(감지 여부)과 비교한 건너뜀 통계
+    skip_rate: 건너뛴 비율, false_skip_rate: 건너뛴 이미지 중 객체가 있던 비율,
+    missed_rate: 객체가 있는 이미지 중 건너뛴 비율
+    """
+    reasons = [triage.reason(f) for f in features]
+    positive = np.asarray(labels, dtype=bool)
+    skipped = sum(map(bool, reasons))
+    wrong = int(sum(bool(r) and p for r, p in zip(reasons, positive)))
+    with_detections = int(positive.sum())
+    return {
+        "images": len(features),
+        "with_detections": with_detections,
+        "skip_rate": skipped / len(features) if features else 0.0,
+        "false_skip_rate": wrong / skipped if skipped else 0.0,
+        "missed_rate": wrong / with_detections if with_detections else 0.0,
+        "skipped": {reason: reasons.count(reason) for reason in REASONS if reasons.count(reason)},
+    }
+
+
+def calibrate(features, labels, max_missed=0.01, holdout=0.3, classifier=False, seed=0,
+              edge_threshold=16, thumb_size=64):
+    """
+    특징과 정답(감지 여부)으로 임계값을 정하고 떼어둔 이미지로 평가
+    규칙마다 객체가 있는 이미지 중 max_missed / 규칙 수 이하만 걸리도록 임계값을 정해
+    (분류기를 쓰면 분류기 포함) 전체적으로 놓치는 비율이 max_missed를 넘지 않게 함
+    features (list): Features 목록
+    labels (list): 이미지별 감지 여부 (bool)
+    max_missed (float): 객체가 있는 이미지 중 건너뛰어도 되는 최대 비율
+    holdout (float): 평가용으로 떼어둘 비율
+    classifier (bool): 로지스틱 분류기도 학습할지 여부
+    returns: (Triage, dict): 보정된 Triage와 평가 결과 (학습/평가 각각)
+    """
+    labels = np.asarray(labels, dtype=bool)
+    order = np.random.default_rng(seed).permutation(len(features))
+    cut = int(len(order) * (1 - holdout)) if 0 < holdout < 1 else len(order)
+    train, test = order[:cut], order[cut:]
+    positives = [features[i] for i in train if labels[i]]
+    if not positives:
+        raise ValueError("calibration set has no images with detections")
+
+    budget = max_missed / (4 if classifier else 3)
+
+    def lower_bound(values):
+        """ 객체가 있는 이미지 중 budget 비율만 이 값보다 작도록 하는 임계값 """
+        values = np.sort(np.asarray(values, dtype=np.float64))
+        index = int(np.floor(budget * len(values)))
+        return float(values[index]) if index < len(values) else float(values[-1])
+
+    triage = Triage(int(lower_bound([f.min_side for f in positives])),
+                    lower_bound([f.std for f in positives]),
+                    lower_bound([f.edge_density for f in positives]),
+                    edge_threshold, thumb_size)
+    if classifier:
+        model = TinyClassifier.fit([features[i].vector() for i in train], labels[train].astype(np.float64))
+        model.threshold = lower_bound(model.probability([f.vector() for f in positives]))
+        triage.classifier = model
+
+    report = {"train": evaluate(triage, [features[i] for i in train], labels[train])}
+    if len(test):
+        report["holdout"] = evaluate(triage, [features[i] for i in test], labels[test])
+    return triage, report
+
+
+def _label(config, directory, recursive, batch_size):
+    """ 디렉터리의 이미지마다 특징을 계산하고 실제 모델로 감지 여부 확인 """
+    from pathlib import Path
+
+    from core.tagger import ImageTagger
+    from interface.directory_watcher import IMAGE_SUFFIXES
+    from models.model_loader import ModelLoader
+    from utils.perceptual_hash import decode_gray
+
+    loader = ModelLoader(config.model_path, config.model_backend, config.model_imgsz,
+                         config.ort_intra_op_threads, config.ort_inter_op_threads)
+    tagger = ImageTagger(loader, config.tag_mapping, config.color_ranges, None, config.color_threshold,
+                         config.color_max_pixels, config.color_integral_ratio,
+                         config.model_imgsz if config.reduced_decode else None)
+
+    paths = Path(directory).rglob("*") if recursive else Path(directory).glob("*")
+    features, labels, batch = [], [], []
+
+    def flush():
+        results = tagger.detect([img for _, _, img in batch])
+        for (path, feature, img), result in zip(batch, results):
+            primary_tag, _ = tagger.tag_result(path, img, result)
+            features.append(feature)
+            labels.append(primary_tag is not None)
+        batch.clear()
+
+    for path in sorted(paths):
+        if path.suffix.lower() not in IMAGE_SUFFIXES or not path.is_file():
+            continue
+        data = path.read_bytes()
+        gray, size = decode_gray(data)
+        img = tagger.decode(data, tagger.decode_size)
+        if gray is None or img is None:
+            continue
+        batch.append((str(path), measure(gray, size), img))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return features, labels
+
+
+def main():
+    import argparse
+
+    from config import Config
+
+    parser = argparse.ArgumentParser(description="Pre-inference triage calibration")
+    commands = parser.add_subparsers(dest="command", required=True)
+    cal = commands.add_parser("calibrate", help="따로 떼어둔 이미지로 임계값 보정 후 저장")
+    cal.add_argument("directory")
+    cal.add_argument("--max-missed", type=float, default=0.01, help="객체가 있는 이미지 중 건너뛰어도 되는 최대 비율")
+    cal.add_argument("--holdout", type=float, default=0.3, help="평가용으로 떼어둘 비율")
+    cal.add_argument("--classifier", action="store_true", help="로지스틱 분류기도 학습")
+    cal.add_argument("--output", help="저장할 JSON 경로 (기본값: Config.triage_path)")
+    ev = commands.add_parser("evaluate", help="저장된 임계값의 건너뜀/오판 비율 측정")
+    ev.add_argument("directory")
+    for sub in (cal, ev):
+        sub.add_argument("--recursive", action="store_true", help="하위 디렉터리 포함")
+        sub.add_argument("--batch-size", type=int, default=8, help="추론 배치 크기")
+    args = parser.parse_args()
+
+    config = Config()
+    features, labels = _label(config, args.directory, args.recursive, args.batch_size)
+    print(f"Labeled {len(features)} images ({sum(labels)} with detections)")
+    if args.command == "calibrate":
+        triage, report = calibrate(features, labels, args.max_missed, args.holdout, args.classifier)
+        output = args.output or config.triage_path
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(dict(triage.to_dict(), report=report), f, indent=1)
+        print(f"Saved {output}: {json.dumps(triage.to_dict())}")
+    else:
+        report = evaluate(Triage.load(config.triage_path), features, labels)
+    print(json.dumps(report, indent=1))
+
+
+if __name__ == "__main__":
+    main()
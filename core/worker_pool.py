@@ -0,0 +1,178 @@
+"""
+멀티 프로세스 추론 워커 풀 모듈
+워커 프로세스마다 모델을 한 번씩 로드해 두고, 이미지 배치를 나눠서 디코딩/추론/태깅
+(GIL과 단일 모델의 스레드 한계를 넘어 여러 CPU 코어를 사용)
+"""
+import multiprocessing
+import multiprocessing.util
+
+from core.frame_ring import FrameRing, cleanup_stale
+from utils.log_util import get_logger, setup_logging
+
+logger = get_logger(__name__)
+
+# 워커 프로세스 전역 상태 (프로세스마다 하나)
+_worker_tagger = None
+_worker_ring = None
+
+
+def _init_worker(config, threads, ring_name=None, ring_slots=0):
+    """
+    워커 프로세스 초기화: 스레드 수 고정 후 모델 로드
+    config (Config): 모델/태그/색상 설정
+    threads (int): 워커 하나가 사용할 연산 스레드 수
+    ring_name (str): 메인 프로세스가 만든 프레임 링 이름 (없으면 파일 바이트로만 전달받음)
+    ring_slots (int): 프레임 링 슬롯 수
+    """
+    global _worker_tagger, _worker_ring
+    import cv2
+    from core.result_cache import ResultCache, model_fingerprint
+    from core.tag_config import TagConfigWatcher
+    from core.tagger import ImageTagger
+    from models.model_loader import ModelLoader
+
+    # 워커 프로세스도 메인과 같은 로그 레벨/출력 수 제한 사용
+    setup_logging(config.log_level, config.log_rate_burst, config.log_rate_interval)
+    # 워커끼리 코어를 과하게 나눠 쓰지 않도록 라이브러리별 스레드 수 고정
+    cv2.setNumThreads(threads)
+    if config.model_backend == "torch":
+        import torch
+        torch.set_num_threads(threads)
+
+    loader = ModelLoader(config.model_path, config.model_backend, config.model_imgsz, threads, 1)
+    decode_size = config.model_imgsz if config.reduced_decode else None
+    # 결과 캐시 DB는 모든 워커가 함께 사용 (SQLite WAL)
+    result_cache = None
+    if config.result_cache_path:
+        # 프레임 링을 쓰면 메인 프로세스가 입력 크기로 축소 디코딩 + letterbox한 프레임을 받으므로 다른 fingerprint
+        fingerprint = (model_fingerprint(loader, config.model_imgsz, letterbox=True) if ring_name
+                       else model_fingerprint(loader, decode_size))
+        result_cache = ResultCache(config.result_cache_path, fingerprint, config.result_cache_max_entries)
+        # 워커가 정상 종료할 때 모아 둔 최근 사용 시각 기록
+        multiprocessing.util.Finalize(result_cache, result_cache.close, exitpriority=10)
+    _worker_tagger = ImageTagger(loader, config.tag_mapping, config.color_ranges, None,
+                                 config.color_threshold, config.color_max_pixels, config.color_integral_ratio,
+                                 decode_size, result_cache)
+    if config.model_warmup:
+        # 첫 배치가 지연 초기화 비용을 치르지 않도록 준비 완료 전에 한 번 추론
+        loader.warm_up()
+    if config.tag_reload_interval > 0:
+        # 워커마다 설정 파일을 확인해 바뀌면 다시 컴파일 (모델은 그대로)
+        TagConfigWatcher(config.tag_mapping_file, config.colors_file, _worker_tagger.apply_config,
+                         config.tag_reload_interval).start()
+    if ring_name:
+        _worker_ring = FrameRing.attach(ring_name, ring_slots, config.model_imgsz)
+    print(f"Inference worker ready (pid {multiprocessing.current_process().pid}, threads {threads})")
+
+
+def _analyze_batch(items):
+    """
+    워커 프로세스에서 이미지 배치 분석
+    items (list): (이미지 경로, 파일 바이트, 내용 해시) 목록 (해시는 결과 캐시 키, None이면 캐시 사용 안 함)
+    returns: list: 입력 순서대로 (대분류 태그, 나머지 태그)
+    """
+    outcomes = [(None, [])] * len(items)
+    decoded = []
+    for index, (image_path, data, img_hash) in enumerate(items):
+        img = _worker_tagger.decode(data, _worker_tagger.decode_size)
+        if img is None:
+            logger.warning("Could not load image %s", image_path)
+            continue
+        decoded.append((index, image_path, img_hash, img))
+    if not decoded:
+        return outcomes
+
+    results = _worker_tagger.detect_cached([img for _, _, _, img in decoded], [h for _, _, h, _ in decoded])
+    for (index, image_path, _, img), result in zip(decoded, results):
+        outcomes[index] = _worker_tagger.tag_result(image_path, img, result)
+    return outcomes
+
+
+def _analyze_frames(items):
+    """
+    워커 프로세스에서 프레임 링 슬롯에 있는 letterbox 이미지 배치 분석
+    감지와 색상 분석 모두 슬롯 뷰에서 수행 (좌표는 letterbox 프레임 기준)
+    items (list): (이미지 경로, 슬롯 번호, 내용 해시, LetterboxMeta) 목록
+    returns: list: 입력 순서대로 (대분류 태그, 나머지 태그)
+    """
+    frames = [_worker_ring.view(slot) for _, slot, _, _ in items]
+    results = _worker_tagger.detect_cached(frames, [h for _, _, h, _ in items], [meta for _, _, _, meta in items])
+    return [_worker_tagger.tag_result(image_path, frame, result)
+            for (image_path, _, _, _), frame, result in zip(items, frames, results)]
+
+
+def _ping(_):
+    """ 워커 준비 확인용 """
+    return multiprocessing.current_process().pid
+
+
+class InferenceWorkerPool:
+    """
+    모델을 로드한 워커 프로세스 풀
+    결과는 메인 프로세스로 돌아와 해시 저장, 파일 이동, Kafka 발행에 사용
+    """
+    def __init__(self, config, workers, threads_per_worker=1, task_timeout=120, frame_slots=0):
+        """
+        config (Config): 워커에 전달할 설정
+        workers (int): 워커 프로세스 수
+        threads_per_worker (int): 워커 하나가 사용할 연산 스레드 수
+        task_timeout (float): 배치 하나의 최대 처리 시간(초), 워커가 죽은 경우 무한 대기 방지
+        frame_slots (int): 프레임 링 슬롯 수 (0이면 프레임 링 없이 파일 바이트 전달)
+        """
+        self.workers = max(1, workers)
+        self.threads_per_worker = max(1, threads_per_worker)
+        self.task_timeout = task_timeout
+
+        # 워커가 읽을 공유 메모리 프레임 링 (이전 실행이 강제 종료되며 남긴 링은 먼저 삭제)
+        self.ring = None
+        if frame_slots > 0:
+            cleanup_stale()
+            self.ring = FrameRing(frame_slots, config.model_imgsz)
+        ring_args = (self.ring.name, self.ring.slots) if self.ring else (None, 0)
+
+        # fork는 부모의 스레드/모델 상태를 복제하므로 spawn 사용
+        context = multiprocessing.get_context("spawn")
+        # Pool은 생성 시점에 워커를 모두 띄우고 initializer에서 모델을 로드
+        self.pool = context.Pool(self.workers, initializer=_init_worker,
+                                 initargs=(config, self.threads_per_worker) + ring_args)
+        # 모든 워커의 모델 로드가 끝날 때까지 대기
+        self.pool.map(_ping, range(self.workers), chunksize=1)
+        print(f"Inference worker pool started ({self.workers} workers x {self.threads_per_worker} threads)")
+
+    def analyze_async(self, items):
+        """ 배치 분석 요청 (AsyncResult 반환) """
+        return self.pool.apply_async(_analyze_batch, (items,))
+
+    def analyze(self, items):
+        """
+        배치 분석 후 결과 반환 (호출 스레드는 결과가 올 때까지 대기)
+        items (list): (이미지 경로, 파일 바이트, 내용 해시) 목록
+        """
+        return self.analyze_async(items).get(timeout=self.task_timeout)
+
+    def analyze_frames(self, items):
+        """
+        프레임 링 슬롯에 기록된 배치 분석 후 결과 반환
+        슬롯은 워커가 배치를 끝낸 뒤(성공/오류) 반환하므로, 제한 시간을 넘겨 호출한 쪽이 먼저 포기해도
+        워커가 아직 읽고 있는 슬롯에 다른 프레임이 기록되지 않음
+        items (list): (이미지 경로, 슬롯 번호, 내용 해시, LetterboxMeta) 목록
+        """
+        slots = [slot for _, slot, _, _ in items]
+
+        def release(_):
+            for slot in slots:
+                self.ring.release(slot)
+
+        try:
+            result = self.pool.apply_async(_analyze_frames, (items,), callback=release, error_callback=release)
+        except Exception:
+            release(None)   # 작업이 등록되지 않았으므로 바로 반환
+            raise
+        return result.get(timeout=self.task_timeout)
+
+    def close(self):
+        """ 진행 중인 작업을 마친 뒤 워커 종료, 프레임 링 삭제 """
+        self.pool.close()
+        self.pool.join()
+        if self.ring:
+            self.ring.close()
@@ -0,0 +1,229 @@
+"""
+기존 파일 백필 모듈
+시작 시 디렉터리에 이미 있던 이미지를 os.scandir로 스트리밍하면서 처리 경로로 넘김
+(전체 목록을 메모리에 올리지 않고, 감시는 바로 시작되어 새 파일과 함께 처리)
+처리가 끝난 파일은 체크포인트에 기록해 중단된 백필을 이어서 진행
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from interface.directory_watcher import IMAGE_SUFFIXES
+from utils.log_util import get_logger
+
+logger = get_logger(__name__)
+
+
+class BackfillCheckpoint:
+    """
+    백필 중 처리가 끝난 파일을 (경로, 크기, 수정시각)으로 기록하는 SQLite 체크포인트
+    백필이 끝까지 완료되면 비워서 다음 시작 때는 다시 전체를 확인
+    """
+    def __init__(self, db_path, commit_every=500, commit_interval=2.0):
+        """
+        db_path (str): 체크포인트 DB 파일 경로
+        commit_every (int): 이만큼 기록이 쌓이면 커밋
+        commit_interval (float): 기록이 있으면 최소 이 간격(초)마다 커밋
+        """
+        self.db_path = str(db_path)
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        # 완료 콜백은 파이프라인 스레드에서 호출되므로 연결은 하나만 두고 락으로 보호
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS backfill_done ("
+            " path TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+        self._uncommitted = 0
+        self._last_commit = time.monotonic()
+
+    def count(self):
+        """ 기록된 파일 수 """
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM backfill_done").fetchone()[0]
+
+    def is_done(self, path, stat_result):
+        """ 같은 크기/수정시각으로 이미 처리된 파일인지 확인 """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns FROM backfill_done WHERE path = ?", (path,)
+            ).fetchone()
+        return row is not None and row == (stat_result.st_size, stat_result.st_mtime_ns)
+
+    def mark_done(self, path, stat_result):
+        """ 처리 완료 기록 (일정 개수/시간마다 커밋) """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO backfill_done (path, size, mtime_ns) VALUES (?, ?, ?)",
+                (path, stat_result.st_size, stat_result.st_mtime_ns),
+            )
+            self._uncommitted += 1
+            if (self._uncommitted >= self.commit_every or
+                    time.monotonic() - self._last_commit >= self.commit_interval):
+                self._commit()
+
+    def _commit(self):
+        """ 쌓인 기록 커밋 (락을 잡은 상태에서 호출) """
+        self._conn.commit()
+        self._uncommitted = 0
+        self._last_commit = time.monotonic()
+
+    def clear(self):
+        """ 백필 완료 후 기록 삭제 """
+        with self._lock:
+            self._conn.execute("DELETE FROM backfill_done")
+            self._commit()
+
+    def close(self):
+        """ 남은 기록 커밋 후 DB 연결 종료 """
+        with self._lock:
+            self._commit()
+            self._conn.close()
+
+
+class Backfill:
+    """
+    디렉터리를 스트리밍으로 훑어 기존 이미지를 처리 함수로 넘기는 백그라운드 스캐너
+    처리 함수가 대기(backpressure)하면 스캔도 함께 멈추므로 메모리 사용은 일정
+    """
+    def __init__(self, directory_path, submit, recursive=False, checkpoint_path=None,
+                 tracker=None, settle_time=1.0, log_every=1000):
+        """
+        directory_path (str): 백필할 디렉터리
+        submit (function): (경로, 완료 콜백)을 받아 처리 경로에 등록하는 함수, 완료 콜백은 처리가 끝나면 호출
+        recursive (bool): 하위 디렉터리까지 훑을지 여부
+        checkpoint_path (str): 체크포인트 DB 경로 (없으면 체크포인트 사용 안 함)
+        tracker (ReadinessTracker): 아직 쓰는 중일 수 있는 최근 파일을 넘길 tracker (없으면 바로 처리)
+        settle_time (float): 시작 시각 기준 이 시간(초) 안에 수정된 파일은 tracker로 넘김
+        log_every (int): 이만큼 확인할 때마다 진행 상황 출력
+        """
+        self.directory_path = str(directory_path)
+        self.submit = submit
+        self.recursive = recursive
+        self.checkpoint = BackfillCheckpoint(checkpoint_path) if checkpoint_path else None
+        self.tracker = tracker
+        self.settle_time = settle_time
+        self.log_every = log_every
+        self.started_at = None
+
+        self._stopping = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._scan_finished = False
+        # 진행 상황
+        self.scanned = 0        # 확인한 이미지 수
+        self.skipped = 0        # 체크포인트로 건너뛴 수
+        self.submitted = 0      # 처리 경로로 넘긴 수
+        self.completed = 0      # 처리가 끝난 수
+
+    def start(self):
+        """ 스캔 스레드 시작 (감시를 시작한 뒤 호출) """
+        # 시작 시각 이후 생긴 파일은 감시 이벤트로 처리되므로 백필에서는 제외
+        self.started_at = time.time_ns()
+        self._thread = threading.Thread(target=self._run, name="backfill", daemon=True)
+        self._thread.start()
+
+    def _entries(self):
+        """ 이미지 파일 DirEntry를 하나씩 생성 (recursive면 하위 디렉터리도 깊이 우선으로) """
+        stack = [self.directory_path]
+        while stack and not self._stopping.is_set():
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if self._stopping.is_set():
+                            return
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if self.recursive:
+                                    stack.append(entry.path)
+                            elif (entry.is_file() and
+                                  os.path.splitext(entry.name)[1].lower() in IMAGE_SUFFIXES):
+                                yield entry
+                        except OSError:
+                            continue
+            except OSError as e:
+                logger.error("백필 디렉터리 읽기 오류: %s (%s)", directory, e)
+
+    def _run(self):
+        """ 디렉터리를 훑으며 기존 파일을 처리 경로로 넘김 """
+        logger.info("기존 파일 백필 시작: %s (recursive=%s, checkpoint=%d done)",
+                    self.directory_path, self.recursive, self.checkpoint.count() if self.checkpoint else 0)
+        recent = self.started_at - int(self.settle_time * 1e9)
+        for entry in self._entries():
+            try:
+                stat_result = entry.stat()
+            except OSError:
+                continue
+            if stat_result.st_mtime_ns >= self.started_at:
+                continue    # 감시가 시작된 뒤 생긴 파일
+            with self._lock:
+                self.scanned += 1
+            if self.checkpoint and self.checkpoint.is_done(entry.path, stat_result):
+                with self._lock:
+                    self.skipped += 1
+                continue
+
+            if self.tracker and stat_result.st_mtime_ns >= recent:
+                # 아직 쓰는 중일 수 있으므로 감시 이벤트와 같이 쓰기 완료를 기다림
+                self.tracker.touch(entry.path)
+            else:
+                try:
+                    self.submit(entry.path, self._on_done(entry.path, stat_result))
+                except Exception as e:
+                    logger.error("기존 파일 처리 오류: %s", e)
+                    continue
+                with self._lock:
+                    self.submitted += 1
+            if self.scanned % self.log_every == 0:
+                self.log_progress()
+
+        with self._lock:
+            self._scan_finished = not self._stopping.is_set()
+        self.log_progress()
+        self._check_finished()
+
+    def _on_done(self, path, stat_result):
+        """ 파일 하나의 처리 완료 콜백 생성 """
+        def done(_item=None):
+            if self.checkpoint:
+                self.checkpoint.mark_done(path, stat_result)
+            with self._lock:
+                self.completed += 1
+            self._check_finished()
+        return done
+
+    def _check_finished(self):
+        """ 스캔이 끝나고 넘긴 파일이 모두 처리되면 체크포인트 정리 """
+        with self._lock:
+            finished = self._scan_finished and self.completed == self.submitted
+            if finished:
+                self._scan_finished = False     # 한 번만 정리
+        if finished:
+            logger.info("기존 파일 백필 완료: %d processed, %d skipped by checkpoint", self.completed, self.skipped)
+            if self.checkpoint:
+                self.checkpoint.clear()
+
+    def log_progress(self):
+        """ 진행 상황 출력 """
+        with self._lock:
+            logger.info("Backfill: scanned %d, skipped %d, submitted %d, completed %d",
+                        self.scanned, self.skipped, self.submitted, self.completed)
+
+    def stop(self):
+        """ 스캔 중지 (이미 넘긴 파일은 처리 경로에서 마무리) """
+        self._stopping.set()
+        if self._thread:
+            self._thread.join()
+
+    def close(self):
+        """ 체크포인트 닫기 (넘긴 파일의 처리가 모두 끝난 뒤 호출) """
+        if self.checkpoint:
+            self.checkpoint.close()
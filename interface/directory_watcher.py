@@ -2,40 +2,78 @@
 디렉터리 감시 로직을 담당하는 모듈
 watchdog 라이브러리 사용해 특정 디렉터리의 파일 변경 이벤트를 감지
 """
-import time
 from pathlib import Path
 
 from watchdog.events import FileSystemEventHandler  # 디렉터리 변경 감시자
 from watchdog.observers import Observer     # 파일 시스템 이벤트 처리기
 
+from interface.readiness_tracker import ReadinessTracker
+from utils.log_util import get_logger
+
+logger = get_logger(__name__)
+
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png'}
+
+
 class ImageEventHandler(FileSystemEventHandler):
     """
     파일 시스템 이벤트를 처리하는 핸들러 클래스
-    특정 이벤트(파일 생성)가 발생하면 등록된 콜백 함수를 호출
+    이미지 파일 이벤트를 ReadinessTracker에 기록만 하고 바로 반환 (감시 스레드는 대기하지 않음)
     """
-    def __init__(self, callback):
+    def __init__(self, tracker, directory_path):
         """
-        생성자: 콜백 함수를 저장
-        callback(function): 새 파일 감지 시 호출할 함수
+        생성자: 이벤트를 전달할 tracker 저장
+        tracker (ReadinessTracker): 쓰기 완료를 판단해 파일을 넘겨줄 객체
+        directory_path (str): 감시 대상 디렉터리 (이 디렉터리 바로 아래 파일만 처리)
         """
         print("ImageEventHandler 초기화됨")
-        self.callback = callback
+        self.tracker = tracker
+        self.directory_path = Path(directory_path)
+
+    def _image_path(self, path):
+        """ 감시 디렉터리 바로 아래의 이미지 파일이면 경로 문자열, 아니면 None """
+        file_path = Path(path)
+        if file_path.suffix.lower() in IMAGE_SUFFIXES and file_path.parent == self.directory_path:
+            return str(file_path)
+        return None
 
     def on_created(self, event):
         """
         파일 생성 이벤트 처리 메서드
         event: watchdog 이벤트 객체 (생성된 파일 정보 포함)
         """
-        print(f"이벤트 발생: {event.src_path}")  # 모든 생성 이벤트 로깅
         # 디렉터리인 경우 무시
-        if  event.is_directory:
+        if event.is_directory:
+            return
+        file_path = self._image_path(event.src_path)
+        if file_path:
+            logger.debug("새 이미지 감지: %s", file_path)
+            self.tracker.touch(file_path)
+
+    def on_modified(self, event):
+        """ 파일 수정 이벤트 처리 (쓰기 진행 중) """
+        if event.is_directory:
             return
-        # 콜백 함수 호출하여 파일 처리 시작
-        file_path = Path(event.src_path)
-        if file_path.suffix.lower() in {'.jpg', '.jpeg', '.png'}:
-            print(f"새 이미지 감지: {file_path}")
-            time.sleep(1)  # 파일 쓰기 완료 대기
-            self.callback(str(file_path))
+        file_path = self._image_path(event.src_path)
+        if file_path:
+            self.tracker.touch(file_path)
+
+    def on_closed(self, event):
+        """ 쓰기 후 파일 닫힘 이벤트 처리 (쓰기 완료) """
+        if event.is_directory:
+            return
+        file_path = self._image_path(event.src_path)
+        if file_path:
+            self.tracker.mark_closed(file_path)
+
+    def on_moved(self, event):
+        """ 파일 이동 이벤트 처리 (임시 파일명에서 이미지 이름으로 바뀐 경우 등, 이동된 파일은 완성된 것으로 간주) """
+        if event.is_directory:
+            return
+        file_path = self._image_path(event.dest_path)
+        if file_path:
+            logger.debug("새 이미지 감지 (이동): %s", file_path)
+            self.tracker.mark_closed(file_path)
 
 
 class DirectoryWatcher:
@@ -43,42 +81,32 @@ class DirectoryWatcher:
     디렉터리 감시를 관리하는 클래스
     Observer를 실행하고 종료하는 메서드 제공
     """
-    def __init__(self, directory_path):
+    def __init__(self, directory_path, settle_time=1.0, poll_interval=0.25):
         """
         생성자: 감시할 디렉터리 경로 저장
         directory_path(str): 감시할 디렉터리 경로
+        settle_time(float): 파일 크기가 이 시간(초) 동안 변하지 않으면 쓰기 완료로 판단
+        poll_interval(float): 쓰기 중인 파일 상태 확인 주기(초)
         """
         self.directory_path = directory_path
+        self.settle_time = settle_time
+        self.poll_interval = poll_interval
         self.observer = None
+        self.tracker = None
         print(f"감시 대상 디렉터리: {self.directory_path}")
 
-    def process_existing_files(self, callback_function):
-        """
-        프로그램 시작 시 디렉터리 내 기존 파일을 처리
-        callback_function(function): 파일 처리 시 호출할 함수
-        """
-        dir_path = Path(self.directory_path)
-        print(f"기존 파일 확인 시작: {dir_path}")
-        for file_path in dir_path.glob("*"):  # 모든 파일 검색
-            if (file_path.is_file() and
-                    file_path.suffix.lower() in {'.jpg', '.jpeg', '.png'} and
-                    file_path.parent == dir_path):  # 최상위 디렉터리만
-                print(f"기존 파일 감지: {file_path}")
-                try:
-                    callback_function(str(file_path))
-                except Exception as e:
-                    print(f"기존 파일 처리 오류: {e}")
-
     def start(self, callback_function):
         """
         디렉터리 감시 시작
         callback_function(function): 파일 생성 시 호출할 함수
+        (기존 파일은 감시를 시작한 뒤 Backfill이 따로 처리)
         """
-        # 기존 파일 먼저 처리
-        self.process_existing_files(callback_function)
+        # 쓰기 완료된 파일만 콜백으로 넘겨주는 tracker 시작
+        self.tracker = ReadinessTracker(callback_function, self.settle_time, self.poll_interval)
+        self.tracker.start()
 
-        # 이벤트 핸들러 생성 (콜백 함수 전달)
-        event_handler = ImageEventHandler(callback_function)
+        # 이벤트 핸들러 생성 (tracker 전달)
+        event_handler = ImageEventHandler(self.tracker, self.directory_path)
         # Observer 객체 생성
         self.observer = Observer()
         # Observer에 감시할 디렉터리와 이벤트 핸들러 등록
@@ -94,4 +122,6 @@ class DirectoryWatcher:
             self.observer.stop()
             # Observer 스레드가 완전히 종료될 때까지 대기
             self.observer.join()
-            print("디렉터리 감시 중지")
\ No newline at end of file
+            print("디렉터리 감시 중지")
+        if self.tracker:
+            self.tracker.stop()
\ No newline at end of file
@@ -3,26 +3,127 @@ Kafka로 메시지 발행 기능 담당 모듈
 태깅된 이미지 정보를 Kafka 토픽으로 전송
 """
 
-from kafka import KafkaProducer # Kafka 프로튜서 클래스
 import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from utils.log_util import get_logger
+from utils.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+
+class MessageSpool:
+    """
+    전송 실패한 메시지를 보관하는 로컬 파일 (JSON Lines)
+    다음 시작 시 다시 전송하기 위해 사용
+    """
+    def __init__(self, spool_path):
+        """
+        생성자: 스풀 파일 경로 저장
+        spool_path (str): 실패 메시지를 저장할 파일 경로
+        """
+        self.spool_path = Path(spool_path)
+        self._lock = threading.Lock()
+
+    def append(self, message):
+        """ 메시지 한 건을 디스크에 기록 (fsync로 내구성 보장) """
+        with self._lock:
+            with open(self.spool_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(message, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def drain(self):
+        """
+        보관된 메시지를 모두 꺼내 반환
+        재전송 중 실패한 메시지는 새 스풀 파일에 다시 기록되므로 기존 파일은 비움
+        """
+        replay_path = self.spool_path.with_name(self.spool_path.name + ".replay")
+        with self._lock:
+            if self.spool_path.exists():
+                # 이전 재전송이 중단되어 남은 파일이 있으면 이어 붙임
+                if replay_path.exists():
+                    with open(replay_path, 'a', encoding='utf-8') as dst, \
+                            open(self.spool_path, 'r', encoding='utf-8') as src:
+                        dst.write(src.read())
+                    self.spool_path.unlink()
+                else:
+                    os.replace(self.spool_path, replay_path)
+        if not replay_path.exists():
+            return []
+
+        messages = []
+        with open(replay_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    messages.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning("Skipping corrupt spooled message: %s", line[:80])
+        return messages
+
+    def commit_drain(self):
+        """ 꺼낸 메시지가 모두 전송 확인(또는 실패해 스풀에 다시 기록)된 뒤 재전송 파일 삭제 """
+        replay_path = self.spool_path.with_name(self.spool_path.name + ".replay")
+        replay_path.unlink(missing_ok=True)
+
 
 class TagProducer:
     """
     Kafka로 태그 데이터 발행하는 클래스
+    전송은 비동기로 처리하고, 결과는 delivery 콜백으로 확인
     """
-    def __init__(self, bootstrap_servers, topic_name):
+    def __init__(self, bootstrap_servers, topic_name, linger_ms=5, batch_size=16384,
+                 compression_type=None, acks=1, max_in_flight=1000, spool_path=None,
+                 close_timeout=10, producer=None):
         """
         생성자: Kafka 프로듀서 초기화
         bootstrap_servers (list): Kafka 서버 주소 목록
         topic_name (str): 토픽 이름
+        linger_ms (int): 배치를 채우기 위해 기다리는 시간(ms)
+        batch_size (int): 파티션별 배치 최대 크기(바이트)
+        compression_type (str): 압축 방식 (None, 'gzip', 'snappy', 'lz4', 'zstd')
+        acks (int|str): 전송 확인 수준 (0, 1, 'all')
+        max_in_flight (int): 확인되지 않은 메시지의 최대 개수 (넘으면 send가 대기)
+        spool_path (str): 전송 실패 메시지를 저장할 파일 경로 (없으면 저장 안 함)
+        close_timeout (float): 종료 시 남은 메시지 전송을 기다리는 최대 시간(초)
+        producer: 이미 생성된 프로듀서 (테스트/벤치마크용 가짜 프로듀서 주입)
         """
-        # Kafka 프로듀서 객체 생성
-        # value_serializer: Python 객체를 바이트로 직렬화하는 함수 지정 (JSON 형식)
-        self.producer = KafkaProducer(
-            bootstrap_servers=bootstrap_servers,
-            value_serializer=lambda x: json.dumps(x).encode('utf-8') # Python 객체 -> JSON -> UTF-8
-        )
+        if producer is None:
+            from kafka import KafkaProducer  # Kafka 프로튜서 클래스
+            # Kafka 프로듀서 객체 생성
+            # value_serializer: Python 객체를 바이트로 직렬화하는 함수 지정 (JSON 형식)
+            producer = KafkaProducer(
+                bootstrap_servers=bootstrap_servers,
+                value_serializer=lambda x: json.dumps(x).encode('utf-8'), # Python 객체 -> JSON -> UTF-8
+                linger_ms=linger_ms,
+                batch_size=batch_size,
+                compression_type=compression_type,
+                acks=acks,
+            )
+        self.producer = producer
         self.topic_name = topic_name
+        self.close_timeout = close_timeout
+
+        # 확인되지 않은 메시지 수 제한 (전송 창)
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        self._stats_lock = threading.Lock()
+        self.sent_count = 0      # 전송 확인된 메시지 수
+        self.failed_count = 0    # 전송 실패한 메시지 수
+        self._pending = 0        # 전송 확인을 기다리는 메시지 수
+        self.latency = REGISTRY.histogram("imgtag_kafka_delivery_seconds", "Time from send to broker ack")
+        self.sent_metric = REGISTRY.counter("imgtag_kafka_messages_total", "Kafka messages by result", result="sent")
+        self.failed_metric = REGISTRY.counter("imgtag_kafka_messages_total", "Kafka messages by result", result="failed")
+        REGISTRY.gauge("imgtag_kafka_in_flight", "Kafka messages awaiting ack").set_function(lambda: self._pending)
+
+        # 이전 실행에서 실패한 메시지 재전송
+        self.spool = MessageSpool(spool_path) if spool_path else None
+        self._replay_spool()
 
 
     def _get_timestamp(self):
@@ -30,30 +131,123 @@ class TagProducer:
         from datetime import datetime
         return datetime.now().isoformat() # ex: 2025-03-10T15:30:45.123456
 
+    def _replay_spool(self):
+        """
+        스풀 파일에 남은 메시지를 다시 전송
+        모든 메시지의 결과가 나오면 실패한 메시지만 스풀에 다시 기록한 뒤 재전송 파일을 삭제
+        제한 시간 안에 결과가 나오지 않으면 재전송 파일을 남겨 다음 시작 때 다시 전송 (전송 확인된 메시지는 중복 전송 가능)
+        재전송 중 실패한 메시지는 바로 스풀에 기록하지 않음 (재전송 파일에도 남아 있어 두 번 보내게 되므로)
+        """
+        if not self.spool:
+            return
+        messages = self.spool.drain()
+        if not messages:
+            return
+        logger.info("Replaying %d spooled messages to Kafka", len(messages))
+        lock = threading.Lock()
+        remaining = [len(messages)]
+        failed = []
+        finished = threading.Event()
+
+        def settled(*_):
+            # 발행 시 등록한 결과 콜백 다음에 호출됨
+            with lock:
+                remaining[0] -= 1
+                if remaining[0] == 0:
+                    finished.set()
+
+        def replay_failed(message, *_):
+            with lock:
+                failed.append(message)
+            settled()
+
+        for message in messages:
+            future = self._publish(message, spool=False)
+            if future is None:
+                replay_failed(message)  # 보내기 전에 실패
+                continue
+            future.add_callback(settled)
+            future.add_errback(replay_failed, message)
+
+        try:
+            self.producer.flush(timeout=self.close_timeout)
+        except Exception as e:
+            logger.warning("Kafka flush during spool replay did not complete: %s", e)
+        if not finished.wait(self.close_timeout):
+            logger.warning("Spool replay not confirmed within %ss (%d pending), keeping replay file for next start",
+                           self.close_timeout, remaining[0])
+            return
+        for message in failed:
+            self.spool.append(message)
+        self.spool.commit_drain()
+
+    def _publish(self, message, spool=True):
+        """
+        메시지를 비동기로 발행하고 결과는 콜백에서 처리
+        spool (bool): 전송 실패 시 스풀 파일에 보관 (재전송 중이면 False)
+        returns: 전송 결과 future, 보내기 전에 실패했으면 None
+        """
+        on_error = self._on_error if spool else self._on_failed
+        self._in_flight.acquire()   # 전송 창이 가득 차면 여기서 대기 (backpressure)
+        with self._stats_lock:
+            self._pending += 1
+        try:
+            future = self.producer.send(self.topic_name, value=message)
+        except Exception as e:
+            on_error(message, e)
+            return None
+        future.add_callback(self._on_delivered, time.perf_counter())
+        future.add_errback(on_error, message)
+        return future
+
+    def _on_delivered(self, sent_at, record_metadata):
+        """ 전송 성공 콜백 """
+        self._in_flight.release()
+        with self._stats_lock:
+            self.sent_count += 1
+            self._pending -= 1
+        self.sent_metric.inc()
+        self.latency.observe(time.perf_counter() - sent_at)
+
+    def _on_failed(self, message, exc):
+        """ 전송 실패 콜백 (통계만 기록) """
+        self._in_flight.release()
+        with self._stats_lock:
+            self.failed_count += 1
+            self._pending -= 1
+        self.failed_metric.inc()
+        logger.error("Error sending to Kafka: %s", exc)
+
+    def _on_error(self, message, exc):
+        """ 전송 실패 콜백: 메시지를 스풀 파일에 보관 """
+        self._on_failed(message, exc)
+        if self.spool:
+            self.spool.append(message)
+
     def send_tag_data(self, file_path, tags, primary_tag):
         """
-        태그 데이터를 kafka 토픽으로 전송
+        태그 데이터를 kafka 토픽으로 전송 (비동기)
         file_path (str): 이동된 파일 경로
         tags (list): 나머지 태그 목록
         primary_tag (str): 대분류 태그
         """
-        try:
-            # 전송할 메시지 구조
-            message = {
-                "file_path": file_path,
-                "primary_tag": primary_tag,
-                "tags" : tags,
-                "timestamp": self._get_timestamp(),
-            }
-            # Kafka 토픽으로 메시지 발행
-            self.producer.send(self.topic_name, value=message)
-            self.producer.flush()   # 즉시 전송 보장 (비동기 처리 시 제거 가능)
-            print(f"Sent to Kafka topic: '{self.topic_name}' : {message}")
-        except Exception as e:
-            print(f"Error sending to Kafka: {e}")
+        # 전송할 메시지 구조
+        message = {
+            "file_path": file_path,
+            "primary_tag": primary_tag,
+            "tags" : tags,
+            "timestamp": self._get_timestamp(),
+        }
+        # Kafka 토픽으로 메시지 발행 (전송 확인은 콜백에서 처리)
+        self._publish(message)
+        logger.debug("Queued to Kafka topic: '%s' : %s", self.topic_name, message)
 
 
     def close(self):
-        """ Kafka Producer 종료 """
-        self.producer.close()
-        print("Kafka Producer closed")
\ No newline at end of file
+        """ 남은 메시지를 제한 시간 내에 전송한 뒤 Kafka Producer 종료 """
+        try:
+            self.producer.flush(timeout=self.close_timeout)
+        except Exception as e:
+            logger.warning("Kafka flush did not complete: %s", e)
+        self.producer.close(timeout=self.close_timeout)
+        logger.info("Kafka Producer closed (sent: %d, failed: %d)", self.sent_count, self.failed_count)
@@ -0,0 +1,137 @@
+"""
+파일 쓰기 완료 감지 모듈
+파일 이벤트를 경로별로 모아 두었다가 크기가 안정되거나 close 이벤트가 오면
+처리 대상으로 넘김 (감시 스레드는 대기하지 않음)
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from utils.log_util import get_logger
+
+logger = get_logger(__name__)
+
+
+class _PendingFile:
+    """ 쓰기 완료를 기다리는 파일 상태 """
+    __slots__ = ("signature", "stable_since", "closed")
+
+    def __init__(self):
+        self.signature = None       # 마지막으로 확인한 (크기, 수정시각)
+        self.stable_since = None    # signature가 마지막으로 바뀐 시각
+        self.closed = False         # 쓰기 후 close 이벤트 수신 여부
+
+
+class ReadinessTracker:
+    """
+    경로별 이벤트를 하나로 합치고, 쓰기가 끝난 파일만 release 함수로 전달하는 클래스
+    release 호출은 별도 스레드에서 이루어지므로 release가 대기해도 감시 스레드는 막히지 않음
+    """
+    def __init__(self, release, settle_time=1.0, poll_interval=0.25, remember=10000):
+        """
+        release (function): 쓰기가 끝난 파일 경로를 받아 처리할 함수
+        settle_time (float): 크기/수정시각이 이 시간(초) 동안 변하지 않으면 쓰기 완료로 판단
+        poll_interval (float): 대기 중인 파일 상태 확인 주기(초)
+        remember (int): 이미 넘긴 파일을 기억할 최대 개수 (중복 이벤트 무시용)
+        """
+        self.release = release
+        self.settle_time = settle_time
+        self.poll_interval = poll_interval
+        self.remember = remember
+        self._pending = {}                  # 경로 -> _PendingFile
+        self._released = OrderedDict()      # 경로 -> 넘길 당시 signature
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """ 상태 확인 스레드 시작 """
+        self._thread = threading.Thread(target=self._run, name="readiness-tracker", daemon=True)
+        self._thread.start()
+
+    def touch(self, path):
+        """ 파일 생성/수정 이벤트 기록 (같은 경로의 이벤트는 하나로 합쳐짐) """
+        with self._lock:
+            self._pending.setdefault(path, _PendingFile())
+        self._wakeup.set()
+
+    def mark_closed(self, path):
+        """ 쓰기 후 close(또는 완성된 파일의 이동) 이벤트 기록 """
+        with self._lock:
+            self._pending.setdefault(path, _PendingFile()).closed = True
+        self._wakeup.set()
+
+    def forget(self, path):
+        """ 이미 넘긴 파일 기록 삭제 (처리되지 않고 버려진 파일의 다음 이벤트를 중복으로 무시하지 않도록) """
+        with self._lock:
+            self._released.pop(path, None)
+
+    @staticmethod
+    def _signature(path):
+        """ 파일의 (크기, 수정시각), 파일이 없으면 None """
+        try:
+            stat_result = os.stat(path)
+        except OSError:
+            return None
+        return stat_result.st_size, stat_result.st_mtime_ns
+
+    def _check(self):
+        """ 대기 중인 파일을 확인해 쓰기가 끝난 경로 목록 반환 """
+        # 파일 상태 확인(stat)은 락 밖에서 수행해 감시 스레드의 touch/mark_closed가 기다리지 않도록 함
+        # close 여부는 stat 전에 읽어 둠 (stat 이후에 온 close 이벤트는 다음 확인에서 반영)
+        with self._lock:
+            snapshot = [(path, state, state.closed) for path, state in self._pending.items()]
+        signatures = [self._signature(path) for path, _, _ in snapshot]
+
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            for (path, state, closed), signature in zip(snapshot, signatures):
+                if signature is None:
+                    # 처리 전에 삭제/이동된 파일
+                    del self._pending[path]
+                    self._released.pop(path, None)
+                    continue
+                if signature != state.signature:
+                    state.signature = signature
+                    state.stable_since = now
+                if closed or now - state.stable_since >= self.settle_time:
+                    del self._pending[path]
+                    # 이미 같은 상태로 넘긴 파일이면 중복 이벤트로 보고 무시
+                    if self._released.get(path) == signature:
+                        continue
+                    self._released[path] = signature
+                    self._released.move_to_end(path)
+                    while len(self._released) > self.remember:
+                        self._released.popitem(last=False)
+                    ready.append(path)
+        return ready
+
+    def _run(self):
+        """ 대기 중인 파일이 있는 동안 주기적으로 상태 확인 """
+        while not self._stopping.is_set():
+            if not self._pending:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            for path in self._check():
+                try:
+                    self.release(path)
+                except Exception as e:
+                    logger.error("파일 처리 등록 오류: %s", e)
+            if self._pending:
+                self._stopping.wait(self.poll_interval)
+
+    def pending_count(self):
+        """ 쓰기 완료를 기다리는 파일 수 """
+        return len(self._pending)
+
+    def stop(self):
+        """ 상태 확인 스레드 종료 (대기 중인 파일은 버림) """
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,338 @@
+"""
+여러 노드가 같은 입력 디렉터리를 나눠 처리하기 위한 작업 선점(claim) 모듈
+공유 볼륨의 입력 디렉터리 아래 제어 디렉터리(.claims)를 두고 파일 시스템만으로 조정
+
+.claims/
+  nodes/<노드>.json   노드별 heartbeat (수정 시각이 lease_timeout보다 오래되면 죽은 노드)
+  work/<노드>/         노드가 선점한 파일 (입력 파일을 이 디렉터리로 rename하면 선점, rename은 원자적이라 한 노드만 성공)
+  done/               태그 없이 끝난 파일 (감지 없음/중복/분류 단계에서 걸러짐)
+  failed/             처리 중 오류가 난 파일
+
+- 파일 이름을 살아 있는 노드 목록에 rendezvous hashing하여 담당 노드만 선점 시도 (노드가 들어오거나 나가면 자동 재분배)
+- 감시 이벤트는 다른 호스트의 쓰기를 받지 못할 수 있으므로 scan_interval마다 입력 디렉터리를 다시 훑음
+- 죽은 노드가 선점해 둔 파일은 살아 있는 노드가 같은 방식으로 나눠 다시 선점 (처리 도중 죽으면 최소 한 번 처리)
+- 같은 노드 이름으로 다시 시작하면 자신이 선점해 둔 파일부터 처리
+"""
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+
+from interface.directory_watcher import IMAGE_SUFFIXES
+from utils.log_util import get_logger
+from utils.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+
+def rendezvous_owner(name, nodes):
+    """ 파일 이름을 가장 높은 점수의 노드에 배정 (노드 하나가 빠지면 그 노드의 파일만 다른 노드로 이동) """
+    best, best_score = None, -1
+    for node in nodes:
+        score = int.from_bytes(hashlib.blake2b(f"{node}/{name}".encode(), digest_size=8).digest(), "big")
+        if score > best_score:
+            best, best_score = node, score
+    return best
+
+
+def _unique_path(directory, name, counter=0):
+    """ directory 안에서 쓰이지 않은 경로 (같은 이름이 있으면 '이름~N.확장자', N은 counter부터) """
+    stem, suffix = os.path.splitext(name)
+    path = os.path.join(directory, name if counter == 0 else f"{stem}~{counter}{suffix}")
+    while os.path.exists(path):
+        counter += 1
+        path = os.path.join(directory, f"{stem}~{counter}{suffix}")
+    return path
+
+
+def _move_unique(src, directory):
+    """
+    여러 노드가 함께 쓰는 디렉터리로 파일 이동 (같은 이름이 있으면 '이름~N.확장자')
+    rename은 대상이 있으면 덮어쓰므로, 대상이 있으면 실패하는 hard link로 자리를 잡은 뒤 원본 삭제
+    returns: str: 이동한 경로
+    """
+    name = os.path.basename(src)
+    counter = 0
+    while True:
+        dest = _unique_path(directory, name, counter)
+        try:
+            os.link(src, dest)
+        except FileExistsError:
+            counter += 1    # 확인과 link 사이에 다른 노드가 같은 이름을 씀
+            continue
+        except PermissionError:
+            # hard link를 지원하지 않는 파일시스템 (덮어쓰기 경합은 남음)
+            os.rename(src, dest)
+            return dest
+        os.unlink(src)
+        return dest
+
+
+class WorkClaimer:
+    """
+    파일 시스템 rename 기반 작업 선점
+    start(submit)로 시작하면 자신이 담당하는 입력 파일을 선점해 submit(선점 경로, 완료 콜백, backlog)로 넘김
+    (다른 선점 방식, 예를 들어 Kafka consumer group을 쓰려면 start/offer/stop을 같은 의미로 구현)
+    """
+    def __init__(self, input_dir, node_id=None, claim_dir=None, heartbeat_interval=2.0, lease_timeout=10.0,
+                 scan_interval=5.0, settle_time=1.0):
+        """
+        input_dir (str): 여러 노드가 공유하는 입력 디렉터리
+        node_id (str): 노드 이름 (재시작해도 같아야 자신이 선점한 파일을 이어서 처리, 없으면 호스트 이름)
+        claim_dir (str): 제어 디렉터리 (입력 디렉터리와 같은 파일시스템이어야 함, 없으면 input_dir/.claims)
+        heartbeat_interval (float): heartbeat 갱신 주기(초)
+        lease_timeout (float): heartbeat가 이 시간(초)보다 오래되면 죽은 노드로 보고 선점 파일을 회수
+        scan_interval (float): 입력 디렉터리와 죽은 노드의 선점 디렉터리를 다시 훑는 주기(초)
+        settle_time (float): 훑을 때 이 시간(초) 안에 수정된 파일은 쓰는 중일 수 있으므로 다음 번으로 미룸
+        """
+        self.input_dir = str(input_dir)
+        self.node_id = node_id or socket.gethostname()
+        self.claim_dir = str(claim_dir or os.path.join(self.input_dir, ".claims"))
+        self.heartbeat_interval = heartbeat_interval
+        self.lease_timeout = lease_timeout
+        self.scan_interval = scan_interval
+        self.settle_time = settle_time
+
+        self.nodes_dir = os.path.join(self.claim_dir, "nodes")
+        self.work_dir = os.path.join(self.claim_dir, "work")
+        self.own_dir = os.path.join(self.work_dir, self.node_id)
+        self.done_dir = os.path.join(self.claim_dir, "done")
+        self.failed_dir = os.path.join(self.claim_dir, "failed")
+        self.heartbeat_path = os.path.join(self.nodes_dir, self.node_id + ".json")
+
+        self.submit = None
+        self._lock = threading.Lock()       # 선점 디렉터리 안 이름 충돌 방지
+        self._nodes = [self.node_id]        # 살아 있는 노드 목록 (정렬)
+        self._stopping = threading.Event()     # 훑기 중지
+        self._closing = threading.Event()      # heartbeat 중지
+        self._scan_thread = None
+        self._heartbeat_thread = None
+        self.started_at = time.time()
+
+        # 통계
+        self.claimed = 0        # 선점한 파일 수
+        self.lost = 0           # 다른 노드가 먼저 가져가 선점에 실패한 수
+        self.recovered = 0      # 죽은 노드에게서 회수한 수
+        self.finished = 0
+        REGISTRY.gauge("imgtag_claim_nodes", "Live nodes sharing the input directory"
+                       ).set_function(lambda: len(self._nodes))
+
+    # 노드 목록
+    def _heartbeat(self):
+        """ 자신의 heartbeat를 갱신하고 살아 있는 노드 목록을 다시 읽음 """
+        tmp_path = self.heartbeat_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"node": self.node_id, "host": socket.gethostname(), "pid": os.getpid(),
+                       "started_at": self.started_at}, f)
+        os.replace(tmp_path, self.heartbeat_path)
+        # 노드 사이 시계 차이를 피하려고 파일 서버가 기록한 자신의 수정 시각을 현재 시각으로 사용
+        now = os.stat(self.heartbeat_path).st_mtime
+        nodes = []
+        with os.scandir(self.nodes_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    if now - entry.stat().st_mtime <= self.lease_timeout:
+                        nodes.append(entry.name[:-len(".json")])
+                except OSError:
+                    continue
+        if self.node_id not in nodes:
+            nodes.append(self.node_id)
+        nodes.sort()
+        if nodes != self._nodes:
+            logger.info("Claim nodes changed: %s -> %s", self._nodes, nodes)
+            self._nodes = nodes
+        return now
+
+    def owner(self, name):
+        """ 파일 이름을 담당하는 노드 """
+        return rendezvous_owner(name, self._nodes)
+
+    # 선점
+    def _claim(self, path):
+        """ 파일을 자신의 선점 디렉터리로 rename, 성공하면 새 경로 (다른 노드가 먼저 가져갔으면 None) """
+        with self._lock:
+            dest = _unique_path(self.own_dir, os.path.basename(path))
+            for _ in range(2):
+                try:
+                    os.rename(path, dest)
+                    break
+                except FileNotFoundError:
+                    if not os.path.exists(path) or os.path.isdir(self.own_dir):
+                        self.lost += 1
+                        return None
+                    # 시작 직후 다른 노드가 빈 선점 디렉터리를 죽은 노드의 것으로 보고 지운 경우
+                    os.makedirs(self.own_dir, exist_ok=True)
+            else:
+                self.lost += 1
+                return None
+            self.claimed += 1
+        REGISTRY.counter("imgtag_claims_total", "Files claimed by this node").inc()
+        return dest
+
+    def offer(self, path, backlog=False):
+        """
+        입력 파일 처리 요청 (감시 이벤트/훑기에서 호출)
+        자신이 담당하는 파일이면 선점 후 submit으로 넘기고 True, 아니면 False
+        """
+        if self.owner(os.path.basename(path)) != self.node_id:
+            return False
+        claimed = self._claim(path)
+        if claimed is None:
+            return False
+        self.submit(claimed, self._on_done(claimed), backlog)
+        return True
+
+    def _on_done(self, claimed):
+        """ 선점한 파일 하나의 처리 완료 콜백 (태그가 붙은 파일은 FileManager가 이미 옮김) """
+        def done(item=None):
+            with self._lock:
+                self.finished += 1
+            if item is not None and item.primary_tag:
+                return
+            target = self.failed_dir if item is not None and item.error else self.done_dir
+            try:
+                _move_unique(claimed, target)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.error("Could not park claimed file %s: %s", claimed, e)
+        return done
+
+    def _scan(self, now):
+        """ 입력 디렉터리에서 쓰기가 끝난 담당 파일 선점 """
+        offered = 0
+        with os.scandir(self.input_dir) as entries:
+            for entry in entries:
+                if self._stopping.is_set():
+                    break
+                if os.path.splitext(entry.name)[1].lower() not in IMAGE_SUFFIXES:
+                    continue
+                try:
+                    if not entry.is_file() or now - entry.stat().st_mtime < self.settle_time:
+                        continue
+                except OSError:
+                    continue
+                offered += self.offer(entry.path, backlog=True)
+        return offered
+
+    def _is_stale(self, node, now):
+        """ 노드의 heartbeat가 없거나 lease_timeout보다 오래되었는지 (캐시된 노드 목록이 아니라 지금 파일로 확인) """
+        try:
+            return now - os.stat(os.path.join(self.nodes_dir, node + ".json")).st_mtime > self.lease_timeout
+        except FileNotFoundError:
+            return True
+
+    def _recover_stale(self, now):
+        """ 죽은 노드의 선점 디렉터리에 남은 파일을 담당 노드 기준으로 다시 선점 """
+        live = set(self._nodes)
+        with os.scandir(self.work_dir) as nodes:
+            # 방금 합류해 아직 노드 목록에 없는 노드의 파일을 가져가지 않도록 heartbeat를 다시 확인
+            stale_dirs = [entry.path for entry in nodes
+                          if entry.is_dir() and entry.name not in live and self._is_stale(entry.name, now)]
+        for stale_dir in stale_dirs:
+            try:
+                names = os.listdir(stale_dir)
+            except FileNotFoundError:
+                continue
+            for name in names:
+                if self._stopping.is_set():
+                    return
+                if self.owner(name) != self.node_id:
+                    continue
+                claimed = self._claim(os.path.join(stale_dir, name))
+                if claimed:
+                    self.recovered += 1
+                    logger.info("Recovered %s from stale node %s", name, os.path.basename(stale_dir))
+                    self.submit(claimed, self._on_done(claimed), True)
+            self._remove_stale(stale_dir, now)
+
+    def _remove_stale(self, stale_dir, now):
+        """ 비어 있는 죽은 노드의 선점 디렉터리와 heartbeat 정리 (그사이 heartbeat가 갱신되었으면 그대로 둠) """
+        node = os.path.basename(stale_dir)
+        if not self._is_stale(node, now):
+            return
+        try:
+            os.rmdir(stale_dir)     # 비었을 때만 성공 (다른 노드가 아직 회수 중이면 실패해도 무시)
+            os.unlink(os.path.join(self.nodes_dir, node + ".json"))
+        except OSError:
+            pass
+
+    def _resume_own(self):
+        """ 같은 이름으로 재시작한 경우 이전에 선점해 두고 끝내지 못한 파일 처리 """
+        resumed = 0
+        for name in sorted(os.listdir(self.own_dir)):
+            if os.path.splitext(name)[1].lower() in IMAGE_SUFFIXES:
+                path = os.path.join(self.own_dir, name)
+                self.submit(path, self._on_done(path), True)
+                resumed += 1
+        if resumed:
+            logger.info("Resumed %d files claimed before restart", resumed)
+
+    def start(self, submit):
+        """
+        선점 시작 (heartbeat 등록, 이전 선점 파일 처리, 주기적인 훑기/회수 스레드 시작)
+        submit (function): (선점 경로, 완료 콜백, backlog)를 받아 처리 경로에 등록하는 함수
+        """
+        self.submit = submit
+        for directory in (self.nodes_dir, self.done_dir, self.failed_dir):
+            os.makedirs(directory, exist_ok=True)
+        # heartbeat를 먼저 기록해야 다른 노드가 새 선점 디렉터리를 죽은 노드의 것으로 보지 않음
+        self._heartbeat()
+        os.makedirs(self.own_dir, exist_ok=True)
+        logger.info("Work claiming as node '%s' (%d live nodes) in %s", self.node_id, len(self._nodes), self.claim_dir)
+        # 훑기는 파이프라인 backpressure로 오래 대기할 수 있으므로 heartbeat와 다른 스레드에서 실행
+        self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, name="claim-heartbeat", daemon=True)
+        self._heartbeat_thread.start()
+        self._scan_thread = threading.Thread(target=self._scan_loop, name="claim-scan", daemon=True)
+        self._scan_thread.start()
+
+    def _heartbeat_loop(self):
+        while not self._closing.wait(self.heartbeat_interval):
+            try:
+                self._heartbeat()
+            except OSError as e:
+                logger.error("Work claim heartbeat error: %s", e)
+
+    def _scan_loop(self):
+        self._resume_own()
+        while not self._stopping.is_set():
+            try:
+                # 자신의 heartbeat 수정 시각을 현재 시각으로 사용 (heartbeat 주기만큼 늦으므로 만료 판단은 보수적)
+                now = os.stat(self.heartbeat_path).st_mtime
+                self._recover_stale(now)
+                self._scan(now)
+            except OSError as e:
+                logger.error("Work claim scan error: %s", e)
+            self._stopping.wait(self.scan_interval)
+
+    def stats(self):
+        return {"node": self.node_id, "nodes": list(self._nodes), "claimed": self.claimed, "lost": self.lost,
+                "recovered": self.recovered, "finished": self.finished}
+
+    def log_stats(self):
+        s = self.stats()
+        logger.info("Work claim [%s]: %d nodes, claimed %d, recovered %d, lost races %d, finished %d",
+                    s['node'], len(s['nodes']), s['claimed'], s['recovered'], s['lost'], s['finished'])
+
+    def stop(self):
+        """ 훑기 중지 (이미 넘긴 파일은 처리 경로에서 마무리, 그동안 heartbeat는 계속 갱신) """
+        self._stopping.set()
+        if self._scan_thread:
+            self._scan_thread.join()
+
+    def close(self):
+        """
+        heartbeat 중지 후 노드 목록에서 빠짐 (남은 노드가 바로 재분배)
+        넘긴 파일의 처리가 모두 끝난 뒤 호출 (끝나지 않은 선점 파일은 재시작하거나 lease가 만료되면 다시 처리)
+        """
+        self._closing.set()
+        if self._heartbeat_thread:
+            self._heartbeat_thread.join()
+        try:
+            os.unlink(self.heartbeat_path)
+        except OSError:
+            pass
@@ -1,52 +1,237 @@
 """
 어플리케이션 시작점
 각 컴포넌트를 초기화하고 실행 흐름 제어
+(무거운 모듈은 디렉터리 감시를 시작한 뒤 build_components에서 가져옴)
 """
 import time
+from interface.backfill import Backfill
 from interface.directory_watcher import DirectoryWatcher
-from interface.kafka_producer import TagProducer
-from models.model_loader import ModelLoader
-from core.tagger import ImageTagger
-from core.file_manager import FileManager
+from interface.work_claim import WorkClaimer
+from core.startup import ReadinessGate, StartupTimer, run_phases
 from config import Config
-from utils.hash_util import HashUtil
+from utils.log_util import get_logger, setup_logging
+from utils.metrics import MetricsServer, SnapshotWriter
+
+logger = get_logger("main")
 
 # 전역 변수 선언
 tagger = None
 file_manager = None
 kafka_producer = None
+pipeline = None
+scheduler = None
+tag_index = None
 
 def process_image(image_path):
     """
-    새 이미지 파일 처리
+    새 이미지 파일을 스케줄러에 등록
     이 함수는 DirectoryWatcher에 의해 호출됨
+    (대기하지 않음, 대기 중인 새 파일이 한도를 넘으면 스케줄러의 overflow 정책 적용)
 
     image_path (str): 처리할 이미지 파일 경로
     """
-    print(f"Processing: {image_path}")
-    try:
-        # 1. 이미지 분석
-        primary_tag, tags = tagger.analyze_image(image_path)
+    logger.debug("Queued: %s", image_path)
+    scheduler.submit(image_path)
+
+
+def backfill_image(image_path, on_done):
+    """
+    시작 시 이미 있던 이미지를 가장 낮은 우선순위로 스케줄러에 등록
+    이 함수는 Backfill에 의해 호출됨 (스케줄러의 백필 큐가 가득 차면 대기)
+
+    image_path (str): 처리할 이미지 파일 경로
+    on_done (function): 처리가 끝나면 호출할 함수 (백필 체크포인트 기록)
+    """
+    scheduler.submit(image_path, on_done, backlog=True)
+
+
+def claimed_image(image_path, on_done, backlog):
+    """
+    이 노드가 선점한 이미지를 스케줄러에 등록
+    이 함수는 WorkClaimer에 의해 호출됨 (훑기/회수로 찾은 파일은 백필과 같은 낮은 우선순위)
 
+    image_path (str): 선점 디렉터리로 옮긴 이미지 파일 경로
+    on_done (function): 처리가 끝나면 호출할 함수 (태그 없는 파일 정리)
+    backlog (bool): 감시 이벤트가 아닌 훑기/회수/재시작으로 찾은 파일이면 True
+    """
+    scheduler.submit(image_path, on_done, backlog)
+
+
+def handle_result(image_path, primary_tag, tags, img_hash=None):
+    """
+    분석 결과에 따라 파일 이동 및 Kafka 전송
+    이 함수는 Pipeline의 sink 단계에서 호출됨
+    (다른 파일시스템으로 복사하는 경우 Kafka 전송은 복사가 끝난 뒤 I/O 스레드에서 수행)
+
+    image_path (str): 분석한 이미지 파일 경로
+    primary_tag (str): 대분류 태그 (없으면 None)
+    tags (list): 나머지 태그 목록
+    img_hash (str): 이미지 내용 해시 (이름 충돌 시 사용)
+    """
+    try:
         # 태그가 없으면 처리 중단
         if not primary_tag:
-            print(f"No recognized objects in {image_path}, skipping...")
+            logger.debug("No recognized objects in %s, skipping...", image_path)
             return
 
-        print(f"Image {image_path} classified - Primary tag: {primary_tag}, Tags: {tags}")
-
+        logger.debug("Image %s classified - Primary tag: %s, Tags: %s", image_path, primary_tag, tags)
 
-        # 2. 파일 이동
-        new_path = file_manager.move_file(image_path, primary_tag)
-        print(f"Moved to: {new_path}")
 
-        # 3. Kafka로 태그 정보 전송
-        kafka_producer.send_tag_data(new_path, tags, primary_tag)
+        # 2. 파일 이동 (이동이 끝나면 publish_moved에서 Kafka로 전송)
+        file_manager.move_file(image_path, primary_tag, img_hash, publish_moved,
+                               {"primary_tag": primary_tag, "tags": tags})
 
     except Exception as e:
-        print(f"이미지 처리 오류: {e}")
+        logger.error("이미지 처리 오류: %s", e)
 
 
+def publish_moved(new_path, context):
+    """
+    이동이 끝난 파일의 태그 정보를 Kafka로 전송
+    이 함수는 FileManager에 의해 호출됨 (중단 후 복구된 이동 포함)
+
+    new_path (str): 이동된 파일 경로
+    context (dict): 대분류 태그 및 나머지 태그 목록
+    """
+    logger.debug("Moved to: %s", new_path)
+    # 3. Kafka로 태그 정보 전송
+    kafka_producer.send_tag_data(new_path, context["tags"], context["primary_tag"])
+    # 4. 로컬 태그 색인에 추가 (백그라운드에서 기록)
+    if tag_index:
+        tag_index.add(new_path, context["primary_tag"], context["tags"])
+
+
+
+
+class Components:
+    """ build_components가 만든 처리 컴포넌트 묶음 (종료 순서 관리) """
+    def __init__(self, hash_util, worker_pool, tagger, file_manager, kafka_producer, pipeline, tag_index=None,
+                 scheduler=None):
+        self.hash_util = hash_util
+        self.worker_pool = worker_pool
+        self.tagger = tagger
+        self.file_manager = file_manager
+        self.kafka_producer = kafka_producer
+        self.pipeline = pipeline
+        self.tag_index = tag_index
+        self.scheduler = scheduler
+
+    def close(self):
+        """ 처리 중인 이미지를 마무리하고 컴포넌트를 순서대로 종료 """
+        if self.scheduler:
+            self.scheduler.stop()       # 새로 넘기기 중지 (대기 중인 파일은 다음 시작 시 처리)
+        self.pipeline.stop()            # 처리 중인 이미지 마무리 후 종료
+        self.file_manager.close()       # 진행 중인 파일 복사 및 전송 마무리
+        if self.tag_index:
+            self.tag_index.close()      # 남은 색인 기록 및 압축
+        if self.tagger and self.tagger.result_cache:
+            self.tagger.result_cache.close()    # 감지 결과 캐시 종료
+        self.kafka_producer.close()     # kafka Producer 종료
+        self.hash_util.close()          # 대기 중인 해시 저장 및 해시 캐시 종료
+
+
+def build_components(config, es_session=None, producer=None, timer=None):
+    """
+    설정에 따라 해시/추론/이동/발행 컴포넌트와 파이프라인을 만들고 파이프라인 시작
+    (main과 벤치마크가 같은 구성을 사용)
+    모델 로드(+워밍업), ES 해시 로드, Kafka 연결, 태그 색인 로드는 서로 독립적이므로 동시에 실행
+
+    config (Config): 어플리케이션 설정
+    es_session: Elasticsearch HTTP 세션 (없으면 requests.Session, 벤치마크는 가짜 세션 주입)
+    producer: Kafka 프로듀서 (없으면 KafkaProducer 생성, 벤치마크는 가짜 프로듀서 주입)
+    timer (StartupTimer): 단계별 시작 시간을 기록할 타이머 (없으면 새로 만듦)
+    returns: Components
+    """
+    global  tagger, file_manager, kafka_producer, pipeline, scheduler, tag_index                         # 전역 변수로 선언한 컴포넌트들 초기화
+    timer = timer or StartupTimer()
+    with timer.phase("imports"):
+        # cv2/numpy 등을 가져오는 모듈 (torch/ultralytics는 모델을 로드할 때 가져옴)
+        from core.file_manager import FileManager
+        from core.pipeline import Pipeline
+        from core.result_cache import ResultCache, model_fingerprint
+        from core.scheduler import BatchTuner, Scheduler
+        from core.tag_config import TagConfigWatcher
+        from core.tag_index import TagIndex
+        from core.tagger import ImageTagger
+        from core.triage import Triage
+        from core.worker_pool import InferenceWorkerPool
+        from interface.kafka_producer import TagProducer
+        from models.model_loader import ModelLoader
+        from utils.hash_util import HashUtil
+
+    hash_util = HashUtil(config.es_url, config.hash_cache_path, session=es_session,             # 해시 유틸 초기화 (해시 캐시 경로 전달)
+                         page_size=config.es_load_page_size, load_slices=config.es_load_slices,
+                         bulk_size=config.es_bulk_size, bulk_interval=config.es_bulk_interval,
+                         bulk_max_retries=config.es_bulk_max_retries,
+                         perceptual_dedup=config.perceptual_dedup, phash_radius=config.phash_radius)
+
+    def load_model():
+        """ 추론 워커 풀 또는 현재 프로세스의 태거 준비, (worker_pool, tagger) 반환 """
+        if config.inference_workers > 0:
+            # 워커 프로세스마다 모델을 로드하므로 메인 프로세스에서는 모델을 로드하지 않음 (워밍업도 워커에서)
+            return InferenceWorkerPool(config, config.inference_workers,                        # 추론 워커 풀 초기화 (워커 수 및 워커별 스레드 수 전달)
+                                       config.worker_threads, config.worker_task_timeout,
+                                       config.frame_ring_slots), None
+        model_loader = ModelLoader(config.model_path, config.model_backend, config.model_imgsz, # 모델 로더 초기화 (백엔드 및 스레드 수 전달)
+                                   config.ort_intra_op_threads, config.ort_inter_op_threads)
+        decode_size = config.model_imgsz if config.reduced_decode else None
+        result_cache = None
+        if config.result_cache_path:
+            result_cache = ResultCache(config.result_cache_path,                               # 감지 결과 캐시 초기화 (모델/추론 설정 fingerprint 전달)
+                                       model_fingerprint(model_loader, decode_size),
+                                       config.result_cache_max_entries)
+        image_tagger = ImageTagger(model_loader, config.tag_mapping, config.color_ranges, hash_util,  # 태거 초기화 (모델 로더 및 태그 매핑 전달)
+                                   config.color_threshold, config.color_max_pixels, config.color_integral_ratio,
+                                   decode_size, result_cache)
+        if config.model_warmup:
+            # 첫 이미지가 지연 초기화 비용을 치르지 않도록 빈 이미지로 한 번 추론
+            timer.record("warmup", model_loader.warm_up())
+        if config.tag_reload_interval > 0:
+            # tags.json/colors.json이 바뀌면 다시 컴파일해 교체 (모델은 그대로)
+            TagConfigWatcher(config.tag_mapping_file, config.colors_file, image_tagger.apply_config,
+                             config.tag_reload_interval).start()
+        return None, image_tagger
+
+    def connect_kafka():
+        return TagProducer(config.kafka_bootstrap_servers, config.kafka_topic_name,             # Kafka 프로듀서 초기화 (서버 주소 및 토픽 이름 전달)
+                           linger_ms=config.kafka_linger_ms, batch_size=config.kafka_batch_size,
+                           compression_type=config.kafka_compression_type, acks=config.kafka_acks,
+                           max_in_flight=config.kafka_max_in_flight, spool_path=config.kafka_spool_path,
+                           close_timeout=config.kafka_close_timeout, producer=producer)
+
+    def open_tag_index():
+        if not config.tag_index_path:
+            return None
+        index = TagIndex(config.tag_index_path, config.tag_index_compact_docs)    # 태그 색인 열기 (압축 이후 추가분 반영)
+        index.start()
+        return index
+
+    ready = run_phases({"model": load_model, "hashes": hash_util.load_hashes_from_es, "kafka": connect_kafka,
+                        "tag_index": open_tag_index}, timer, config.concurrent_startup)
+    worker_pool, tagger = ready["model"]
+    kafka_producer = ready["kafka"]
+    tag_index = ready["tag_index"]
+
+    with timer.phase("pipeline"):
+        triage = Triage.load(config.triage_path, config.triage_audit_rate) if config.triage else None
+        batch_tuner = None
+        if config.batch_target_latency:
+            batch_tuner = BatchTuner(config.batch_target_latency, config.batch_size_min, config.batch_size_max)
+        file_manager = FileManager(config.output_dir, config.file_io_workers,                   # 파일 관리자 초기화 (출력 디렉터리, 복사 스레드 수, 저널 경로 전달)
+                                   config.file_move_journal_path)
+        file_manager.recover(publish_moved)     # 이전 실행에서 중단된 파일 이동 마무리 후 전송
+        pipeline = Pipeline(tagger, handle_result, hash_util,                                   # 처리 파이프라인 초기화 (단계별 워커 수, 큐 크기, 배치 조건 전달)
+                            decode_workers=config.decode_workers, color_workers=config.color_workers,
+                            sink_workers=config.sink_workers, queue_size=config.stage_queue_size,
+                            batch_size=config.batch_size, batch_max_wait=config.batch_max_wait,
+                            worker_pool=worker_pool,
+                            trace_sample_rate=config.trace_sample_rate, triage=triage, batch_tuner=batch_tuner)
+        pipeline.start()
+        scheduler = Scheduler(pipeline.submit, config.sched_max_in_flight, config.sched_large_file_bytes,  # 스케줄러 초기화 (클래스별 마감 시간/한도, overflow 정책 전달)
+                              config.sched_deadlines, config.sched_limits, config.sched_lifo_depth,
+                              config.sched_overflow)
+        scheduler.start()
+    return Components(hash_util, worker_pool, tagger, file_manager, kafka_producer, pipeline, tag_index, scheduler)
 
 
 def main():
@@ -55,35 +240,86 @@ def main():
     컴포넌트 초기화 및 디렉터리 감시 시작
     """
     # 설정 로드
+    timer = StartupTimer()
     config = Config()
+    setup_logging(config.log_level, config.log_rate_burst, config.log_rate_interval)
+    metrics_server = snapshot_writer = None
+    backfill = claimer = None
+    # 준비되기 전에 감지된 파일은 모아 두었다가 준비되면 순서대로 등록
+    gate = ReadinessGate()
     try:
-        model_loader = ModelLoader(config.model_path)                                           # 모델 로더 초기화
-        hash_util = HashUtil(config.es_url)                                                     # 해시 유틸 초기화
-        hash_util.load_hashes_from_es()
-
-        global  tagger, file_manager, kafka_producer                                            # 전역 변수로 선언한 컴포넌트들 초기화
-        tagger = ImageTagger(model_loader, config.tag_mapping, config.color_ranges, hash_util)  # 태거 초기화 (모델 로더 및 태그 매핑 전달)
-        file_manager = FileManager(config.output_dir)                                           # 파일 관리자 초기화 (출력 디렉터리 전달)
-        kafka_producer = TagProducer(config.kafka_bootstrap_servers, config.kafka_topic_name)   # Kafka 프로듀서 초기화 (서버 주소 및 토픽 이름 전달)
-
-        # 디렉터리 감시 시작
-        watcher = DirectoryWatcher(config.input_dir)
-        # process_image 함수를 이벤트 콜백으로 등록
-        watcher.start(process_image)
+        # 메트릭 노출 (Prometheus 텍스트 HTTP 엔드포인트 및 주기적인 JSON 스냅샷)
+        if config.metrics_port:
+            metrics_server = MetricsServer(port=config.metrics_port, host=config.metrics_host)
+            metrics_server.start()
+        if config.metrics_snapshot_path:
+            snapshot_writer = SnapshotWriter(config.metrics_snapshot_path, config.metrics_snapshot_interval)
+            snapshot_writer.start()
+
+        # 디렉터리 감시는 컴포넌트 초기화 전에 바로 시작 (이벤트는 gate에 모아 둠)
+        watcher = DirectoryWatcher(config.input_dir, config.file_settle_time, config.file_poll_interval)
+        watcher.start(gate.submit)
+        timer.record("watcher", timer.elapsed())
         print("디렉터리 감시 시작")
+
+        components = build_components(config, timer=timer)
+        # 과부하로 버린 파일은 감시 쪽 중복 이벤트 기록에서 지워 다음 이벤트(수정/이동)로 다시 처리되게 함
+        components.scheduler.on_shed = watcher.tracker.forget
+        if config.work_claim:
+            # 여러 노드가 입력 디렉터리를 공유: 담당 파일을 선점한 뒤 처리 (기존 파일은 주기적인 훑기로 처리)
+            claimer = WorkClaimer(config.input_dir, config.node_id, config.claim_dir,
+                                  config.claim_heartbeat_interval, config.claim_lease_timeout,
+                                  config.claim_scan_interval, config.file_settle_time)
+            claimer.start(claimed_image)
+            queued = gate.open(claimer.offer)
+        else:
+            # process_image 함수를 이벤트 콜백으로 등록하고 그동안 모인 파일 등록
+            queued = gate.open(process_image)
+        if queued:
+            print(f"Submitted {queued} files detected during startup")
+
+        # 기존 파일은 감시를 시작한 뒤 백그라운드에서 스트리밍으로 처리 (새 파일이 우선)
+        if not claimer:
+            backfill = Backfill(config.input_dir, backfill_image, config.backfill_recursive,
+                                config.backfill_checkpoint_path, watcher.tracker, config.file_settle_time)
+            backfill.start()
+        timer.report()
     except Exception as e:
         print(f"초기화 오류: {e}")
         return
 
     try:
-        # 메인 스레드 계속 실행 유지
+        # 메인 스레드 계속 실행 유지 (주기적으로 파이프라인 통계 출력)
+        last_stats = time.monotonic()
         while True:
             time.sleep(1)
+            if time.monotonic() - last_stats >= config.pipeline_stats_interval:
+                scheduler.log_stats()
+                pipeline.log_stats()
+                if tagger and tagger.result_cache:
+                    tagger.result_cache.log_stats()
+                if tag_index:
+                    tag_index.log_stats()
+                if claimer:
+                    claimer.log_stats()
+                last_stats = time.monotonic()
     except KeyboardInterrupt:
         # Ctrl+C로 프로그램 종료 시 디렉터리 감시도 중지
         print("프로그램 종료 중...")
         watcher.stop()
-        kafka_producer.close()  # kafka Producer 종료
+        if backfill:
+            backfill.stop()     # 백필 스캔 중지
+        if claimer:
+            claimer.stop()      # 선점 훑기 중지
+        components.close()      # 처리 중인 이미지 마무리 후 컴포넌트 종료
+        if backfill:
+            backfill.close()    # 마무리된 이미지까지 체크포인트에 기록 후 종료
+        if claimer:
+            claimer.close()     # 처리가 끝난 뒤 노드 목록에서 빠짐 (남은 노드가 재분배)
+        if snapshot_writer:
+            snapshot_writer.stop()  # 마지막 메트릭 스냅샷 기록
+        if metrics_server:
+            metrics_server.stop()
         print("디렉터리 감시 중지됨.")
 
 
@@ -1,27 +1,105 @@
 """
 YOLO 모델 로드하고 관리하는 모듈
-적절한 디바이스(CPU, GPU, MPS)에 모델을 로드
+적절한 디바이스(CPU, GPU, MPS)에 모델을 로드하거나
+ONNX로 한 번 내보낸 뒤 ONNX Runtime으로 로드
+torch/ultralytics는 가져오는 데 수 초가 걸리므로 실제로 필요할 때 가져옴 (ONNX 백엔드는 내보낸 뒤에는 사용 안 함)
 """
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKENDS = ("torch", "onnx", "onnx-int8", "openvino")
 
-import torch #PyTorch 임포트 (텐서 연산 및 GPU사용)
-from ultralytics import YOLO # YOLO 모델 클래스
 
 class ModelLoader:
     """ YOLO 모델을 로드하고 관리하는 클래스 """
-    def __init__(self, model_path='./yolo8n.pt'): # 기본값
+    def __init__(self, model_path='./yolo8n.pt', backend="torch", imgsz=640,
+                 intra_op_threads=0, inter_op_threads=0): # 기본값
+        """
+        model_path (str): PyTorch 모델(.pt) 경로, ONNX 파일은 같은 위치에 캐시
+        backend (str): 추론 백엔드 ('torch', 'onnx', 'onnx-int8', 'openvino')
+        imgsz (int): 모델 입력 크기
+        intra_op_threads (int): ONNX Runtime 연산자 내부 스레드 수 (0이면 기본값)
+        inter_op_threads (int): ONNX Runtime 연산자 간 스레드 수 (0이면 기본값)
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown model backend: {backend} (choose from {BACKENDS})")
         self.model_path = model_path    # 모델 파일 경로
-        self.device = self._get_device()    # 사용할 디바이스 결정
+        self.backend = backend
+        self.imgsz = imgsz
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.device = None  # 사용할 디바이스 (torch 백엔드로 로드할 때 결정)
         self.model = None   # 모델 객체 (아직 로드되지 않음)
 
     def _get_device(self):
         """ 적절한 연산 디바이스 결정, 'mps' (Apple Silicon), 'cuda' (NVIDIA GPU) 또는 'cpu'"""
+        import torch #PyTorch 임포트 (텐서 연산 및 GPU사용)
         return 'mps' if torch.backends.mps.is_available() else 'cpu'
 
     def load_model(self):
-        """ YOLO 모델 로드 및 지정된 디바이스 이동"""
+        """ 설정된 백엔드로 모델 로드 """
+        if self.backend != "torch":
+            return self._load_onnx()
+
+        from ultralytics import YOLO # YOLO 모델 클래스
+        self.device = self._get_device()    # 사용할 디바이스 결정
         print(f"Loading model on device: {self.device}")
         # YOLO 모델 로드
         self.model = YOLO(self.model_path)
         # 모델을 지정된 디바이스로 이동
         self.model.to(self.device)
-        return self.model
\ No newline at end of file
+        return self.model
+
+    def warm_up(self):
+        """
+        모델 입력 크기의 빈 이미지로 한 번 추론 (첫 추론의 지연 초기화 비용을 시작 시 미리 지불)
+        load_model 이후 호출, 걸린 시간(초) 반환
+        """
+        start = time.perf_counter()
+        dummy = np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8)
+        self.model([dummy], conf=0.25, verbose=False)
+        return time.perf_counter() - start
+
+    def export_onnx(self):
+        """
+        PyTorch 모델을 ONNX로 내보내고 경로 반환 (이미 있으면 재사용)
+        onnx-int8 백엔드는 가중치를 INT8로 동적 양자화한 파일을 추가로 만듦
+        """
+        model_path = Path(self.model_path)
+        onnx_path = model_path.with_name(f"{model_path.stem}-{self.imgsz}.onnx")
+        if not onnx_path.exists():
+            from ultralytics import YOLO # YOLO 모델 클래스
+            print(f"Exporting {model_path} to ONNX (imgsz={self.imgsz})")
+            # dynamic=True: 배치 크기를 실행 시에 정할 수 있도록 내보냄
+            exported = YOLO(self.model_path).export(format="onnx", imgsz=self.imgsz, dynamic=True)
+            Path(exported).replace(onnx_path)
+
+        if self.backend != "onnx-int8":
+            return onnx_path
+
+        int8_path = onnx_path.with_name(f"{onnx_path.stem}.int8.onnx")
+        if not int8_path.exists():
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            print(f"Quantizing {onnx_path} to INT8")
+            quantize_dynamic(str(onnx_path), str(int8_path), weight_type=QuantType.QUInt8)
+        return int8_path
+
+    def _providers(self):
+        """ 백엔드에 맞는 ONNX Runtime 실행 provider 목록 """
+        import onnxruntime as ort
+        if self.backend == "openvino":
+            if "OpenVINOExecutionProvider" in ort.get_available_providers():
+                return ["OpenVINOExecutionProvider", "CPUExecutionProvider"]
+            print("OpenVINOExecutionProvider not available (install onnxruntime-openvino), using CPU")
+        return ["CPUExecutionProvider"]
+
+    def _load_onnx(self):
+        """ ONNX 모델을 ONNX Runtime으로 로드 """
+        from models.onnx_backend import OnnxYolo
+        onnx_path = self.export_onnx()
+        providers = self._providers()
+        print(f"Loading model with ONNX Runtime ({self.backend}, {providers[0]}): {onnx_path}")
+        self.model = OnnxYolo(onnx_path, self.intra_op_threads, self.inter_op_threads, providers)
+        return self.model
@@ -0,0 +1,141 @@
+"""
+ONNX Runtime 추론 백엔드 모듈
+ultralytics YOLO 객체와 같은 방식(model(images, conf=...) -> results[i].boxes)으로 호출할 수 있는
+ONNX 모델 래퍼와 NumPy 후처리(NMS)
+"""
+import ast
+
+import cv2
+import numpy as np
+
+from core.preprocess import letterbox
+
+
+class OnnxBox:
+    """ ultralytics Boxes의 원소 하나와 같은 속성(cls, conf, xyxy)을 가진 감지 결과 """
+    __slots__ = ("cls", "conf", "xyxy")
+
+    def __init__(self, cls, conf, xyxy):
+        self.cls = cls                                          # 클래스 ID
+        self.conf = conf                                        # 신뢰도
+        self.xyxy = np.asarray(xyxy, dtype=np.float32).reshape(1, 4)  # [[x1, y1, x2, y2]]
+
+
+class OnnxResult:
+    """ ultralytics Results 중 boxes 속성만 가진 결과 """
+    __slots__ = ("boxes",)
+
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+def nms(boxes, scores, iou_threshold):
+    """
+    NumPy Non-Maximum Suppression
+    boxes (ndarray): (N, 4) xyxy
+    scores (ndarray): (N,)
+    returns: ndarray: 남길 박스 인덱스 (점수 내림차순)
+    """
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1).clip(0) * (y2 - y1).clip(0)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        inter_w = (np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest])).clip(0)
+        inter_h = (np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest])).clip(0)
+        inter = inter_w * inter_h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+class OnnxYolo:
+    """ ONNX로 내보낸 YOLOv8 모델을 ONNX Runtime으로 실행하는 클래스 """
+    def __init__(self, onnx_path, intra_op_threads=0, inter_op_threads=0, providers=None,
+                 iou=0.7, max_det=300):
+        """
+        onnx_path (str): ONNX 모델 경로
+        intra_op_threads (int): 연산자 내부 스레드 수 (0이면 ONNX Runtime 기본값)
+        inter_op_threads (int): 연산자 간 스레드 수 (0이면 ONNX Runtime 기본값)
+        providers (list): 실행 provider 목록 (없으면 CPU)
+        iou (float): 호출 시 지정하지 않았을 때의 NMS IoU 임계값 (ultralytics 기본값과 같음)
+        max_det (int): 이미지당 최대 감지 수
+        """
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(str(onnx_path), sess_options=options,
+                                            providers=providers or ["CPUExecutionProvider"])
+        self.iou = iou
+        self.max_det = max_det
+
+        # 클래스 이름은 ultralytics가 내보낼 때 메타데이터에 저장한 값 사용
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(metadata["names"]) if "names" in metadata else {}
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        batch, _, height, _ = model_input.shape
+        self.imgsz = height if isinstance(height, int) else 640
+        self.dynamic_batch = not isinstance(batch, int)
+
+    def _preprocess(self, images):
+        """ 이미지 목록 -> (N, 3, S, S) float32 입력 텐서와 letterbox 정보 """
+        blob = np.empty((len(images), 3, self.imgsz, self.imgsz), dtype=np.float32)
+        metas = []
+        for i, img in enumerate(images):
+            boxed, meta = letterbox(img, self.imgsz)
+            rgb = cv2.cvtColor(boxed, cv2.COLOR_BGR2RGB)
+            blob[i] = rgb.transpose(2, 0, 1)
+            metas.append(meta)
+        blob *= 1.0 / 255
+        return blob, metas
+
+    def _postprocess(self, output, meta, conf, iou):
+        """ 모델 출력 (4 + 클래스 수, 후보 수) -> 원본 좌표의 OnnxBox 목록 """
+        predictions = output.T                                  # (후보 수, 4 + 클래스 수)
+        class_scores = predictions[:, 4:]
+        class_ids = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(class_ids)), class_ids]
+        mask = scores >= conf
+        if not mask.any():
+            return []
+        predictions, class_ids, scores = predictions[mask], class_ids[mask], scores[mask]
+
+        # cx, cy, w, h -> x1, y1, x2, y2
+        boxes = np.empty((len(predictions), 4), dtype=np.float32)
+        boxes[:, 0] = predictions[:, 0] - predictions[:, 2] / 2
+        boxes[:, 1] = predictions[:, 1] - predictions[:, 3] / 2
+        boxes[:, 2] = predictions[:, 0] + predictions[:, 2] / 2
+        boxes[:, 3] = predictions[:, 1] + predictions[:, 3] / 2
+
+        # 클래스별 NMS: 클래스마다 좌표를 멀리 떨어뜨려 한 번에 처리
+        offsets = class_ids[:, None].astype(np.float32) * (self.imgsz * 2)
+        keep = nms(boxes + offsets, scores, iou)[:self.max_det]
+        original = meta.to_original(boxes[keep])
+        return [OnnxBox(int(class_ids[i]), float(scores[i]), box) for i, box in zip(keep, original)]
+
+    def __call__(self, images, conf=0.25, iou=None, verbose=False):
+        """
+        객체 감지 수행 (ultralytics YOLO 호출 방식과 동일)
+        images (ndarray | list): BGR 이미지 또는 이미지 목록
+        conf (float): 신뢰도 임계값
+        iou (float): NMS IoU 임계값 (없으면 생성 시 지정한 값)
+        returns: list: 이미지별 OnnxResult
+        """
+        iou = self.iou if iou is None else iou
+        if isinstance(images, np.ndarray):
+            images = [images]
+        blob, metas = self._preprocess(images)
+        if self.dynamic_batch:
+            outputs = self.session.run(None, {self.input_name: blob})[0]
+        else:
+            outputs = np.concatenate([self.session.run(None, {self.input_name: blob[i:i + 1]})[0]
+                                      for i in range(len(blob))])
+        return [OnnxResult(self._postprocess(output, meta, conf, iou)) for output, meta in zip(outputs, metas)]
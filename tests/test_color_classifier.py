@@ -0,0 +1,109 @@
+"""
+core.color_classifier 테스트
+룩업 테이블 결과를 colors.json 범위별 cv2.inRange 결과와 비교
+실행: python -m pytest -q tests
+"""
+import json
+import math
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+from core.color_classifier import ColorClassifier
+
+COLORS = json.loads((Path(__file__).resolve().parent.parent / "colors.json").read_text())
+THRESHOLD = 0.1
+
+
+def reference_counts(hsv):
+    """ 색상마다 cv2.inRange로 센 픽셀 수 """
+    return np.array([cv2.countNonZero(cv2.inRange(hsv, np.array(r["lower"]), np.array(r["upper"])))
+                     for r in COLORS.values()])
+
+
+def reference_colors(roi):
+    hsv = cv2.cvtColor(np.ascontiguousarray(roi), cv2.COLOR_BGR2HSV)
+    pixels = hsv.shape[0] * hsv.shape[1]
+    return [name for name, count in zip(COLORS, reference_counts(hsv)) if count > pixels * THRESHOLD]
+
+
+def boundary_hsv(shape, seed):
+    """ colors.json 경계값과 그 양옆 값이 많이 섞인 HSV 이미지 """
+    rng = np.random.default_rng(seed)
+    channels = []
+    for axis, top in enumerate((180, 255, 255)):
+        edges = {0, top}
+        for r in COLORS.values():
+            edges.update((r["lower"][axis], r["upper"][axis]))
+        values = sorted({min(top, max(0, v + d)) for v in edges for d in (-1, 0, 1)})
+        channel = np.where(rng.random(shape) < 0.7, rng.choice(values, shape), rng.integers(0, top + 1, shape))
+        channels.append(channel.astype(np.uint8))
+    return np.dstack(channels)
+
+
+def test_counts_match_in_range():
+    classifier = ColorClassifier(COLORS)
+    hsv = boundary_hsv((120, 160), seed=1)
+    np.testing.assert_array_equal(classifier.count(hsv), reference_counts(hsv))
+
+
+def test_counts_match_in_range_for_every_hue():
+    classifier = ColorClassifier(COLORS)
+    # 모든 H 값 x 경계 주변 S/V 값 조합
+    values = np.arange(0, 256, dtype=np.uint8)
+    h, s, v = np.meshgrid(np.arange(0, 181, dtype=np.uint8), values, values[::5], indexing="ij")
+    hsv = np.dstack([h.reshape(181, -1), s.reshape(181, -1), v.reshape(181, -1)])
+    np.testing.assert_array_equal(classifier.count(hsv), reference_counts(hsv))
+
+
+def test_classify_matches_reference():
+    classifier = ColorClassifier(COLORS, THRESHOLD)
+    img = cv2.cvtColor(boundary_hsv((90, 70), seed=2), cv2.COLOR_HSV2BGR)
+    assert classifier.classify(img) == reference_colors(img)
+
+
+BOXES = [
+    (0, 0, 200, 150),       # 이미지 전체
+    (10, 5, 120, 100),
+    (50, 40, 180, 140),     # 앞 박스와 겹침
+    (60, 45, 61, 46),       # 한 픽셀
+    (-20, -10, 30, 25),     # 이미지 밖으로 나감
+    (33, 17, 97, 143),
+    (190, 140, 260, 200),
+]
+
+
+@pytest.mark.parametrize("max_pixels", [None, 3000])
+@pytest.mark.parametrize("integral_ratio", [0.5, 1e9])
+def test_classify_boxes_matches_reference(monkeypatch, max_pixels, integral_ratio):
+    classifier = ColorClassifier(COLORS, THRESHOLD, max_pixels=max_pixels, integral_ratio=integral_ratio)
+    used_integral = []
+    integral = classifier._integral
+    monkeypatch.setattr(classifier, "_integral", lambda labels: used_integral.append(True) or integral(labels))
+
+    # 영역마다 다른 색이 모이도록 블록 단위로 색을 정한 뒤 경계값 잡음을 섞음
+    hsv = cv2.resize(boundary_hsv((6, 8), seed=3), (200, 150), interpolation=cv2.INTER_NEAREST)
+    noise = boundary_hsv((150, 200), seed=4)
+    mask = np.random.default_rng(5).random((150, 200)) < 0.3
+    hsv[mask] = noise[mask]
+    img = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
+
+    colors = classifier.classify_boxes(img, BOXES)
+
+    step = classifier.sample_step(img)
+    assert (step > 1) == (max_pixels is not None)
+    assert bool(used_integral) == (integral_ratio < 1)
+    for box, result in zip(BOXES, colors):
+        x1, y1, x2, y2 = max(0, box[0]), max(0, box[1]), min(200, box[2]), min(150, box[3])
+        # 샘플링하면 원본 [x1, x2) 안에서 step의 배수 위치에 있는 픽셀만 사용
+        roi = img[math.ceil(y1 / step) * step:y2:step, math.ceil(x1 / step) * step:x2:step]
+        expected = reference_colors(roi) if roi.size else []
+        assert result == expected, box
+
+
+def test_invalid_box_has_no_colors():
+    classifier = ColorClassifier(COLORS, THRESHOLD)
+    img = np.zeros((20, 20, 3), dtype=np.uint8)
+    assert classifier.classify_boxes(img, [(5, 5, 5, 10), (0, 0, 20, 20)]) == [[], ["black"]]
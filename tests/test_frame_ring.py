@@ -0,0 +1,163 @@
+"""
+core.frame_ring 테스트
+실행: python -m pytest -q tests
+"""
+import multiprocessing
+import multiprocessing.pool
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import core.worker_pool
+from core.frame_ring import NAME_PREFIX, FrameRing, cleanup_stale
+from core.worker_pool import InferenceWorkerPool
+
+
+@pytest.fixture
+def ring():
+    ring = FrameRing(2, size=8)
+    yield ring
+    ring.close()
+
+
+def dead_pid():
+    """ 종료가 끝난 프로세스의 pid """
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+def test_acquire_release_reuses_slots(ring):
+    first = ring.acquire()
+    second = ring.acquire()
+    assert {first, second} == {0, 1}
+    assert ring.available() == 0
+
+    ring.release(first)
+    assert ring.available() == 1
+    assert ring.acquire() == first
+
+
+def test_view_shares_memory_with_attached_ring(ring):
+    index = ring.acquire()
+    ring.view(index)[:] = 7
+    other = FrameRing.attach(ring.name, ring.slots, ring.size)
+    try:
+        assert other.view(index).shape == (8, 8, 3)
+        assert np.all(other.view(index) == 7)
+        with pytest.raises(RuntimeError):
+            other.acquire()
+    finally:
+        other.close()
+
+
+def test_release_is_idempotent(ring):
+    index = ring.acquire()
+    ring.release(index)
+    ring.release(index)
+    assert ring.available() == 2
+    # 두 번 반환한 슬롯이 두 곳에 나눠지지 않음
+    first = ring.acquire()
+    second = ring.acquire()
+    assert first != second
+    with pytest.raises(TimeoutError):
+        ring.acquire(timeout=0.05)
+
+
+def test_release_ignores_slot_never_acquired(ring):
+    ring.release(0)
+    assert ring.available() == 2
+
+
+def test_acquire_times_out_when_all_slots_held(ring):
+    ring.acquire()
+    ring.acquire()
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        ring.acquire(timeout=0.1)
+    assert time.monotonic() - start >= 0.1
+
+
+def test_acquire_blocks_until_release(ring):
+    held = [ring.acquire(), ring.acquire()]
+    acquired = []
+    waiter = threading.Thread(target=lambda: acquired.append(ring.acquire(timeout=5)))
+    waiter.start()
+    time.sleep(0.1)
+    assert not acquired     # 빈 슬롯이 없어 대기 중
+
+    ring.release(held[1])
+    waiter.join(timeout=5)
+    assert acquired == [held[1]]
+
+
+def thread_pool(ring, task_timeout):
+    """ 모델 워커 대신 스레드 풀을 쓰는 InferenceWorkerPool (프레임 링 슬롯 처리만 확인) """
+    pool = InferenceWorkerPool.__new__(InferenceWorkerPool)
+    pool.ring = ring
+    pool.task_timeout = task_timeout
+    pool.pool = multiprocessing.pool.ThreadPool(1)
+    return pool
+
+
+def test_slot_held_until_timed_out_worker_finishes(ring, monkeypatch):
+    finish = threading.Event()
+    reading = threading.Event()
+
+    def slow_analyze(items):
+        reading.set()
+        finish.wait(5)      # 워커가 아직 슬롯을 읽는 중
+        return [(None, []) for _ in items]
+
+    monkeypatch.setattr(core.worker_pool, "_analyze_frames", slow_analyze)
+    pool = thread_pool(ring, task_timeout=0.1)
+    try:
+        slots = [ring.acquire(), ring.acquire()]
+        with pytest.raises(multiprocessing.TimeoutError):
+            pool.analyze_frames([("a.jpg", slots[0], None, None), ("b.jpg", slots[1], None, None)])
+        assert reading.is_set()
+        # 호출한 쪽은 포기했지만 워커가 끝나기 전에는 슬롯이 다시 나가지 않음
+        with pytest.raises(TimeoutError):
+            ring.acquire(timeout=0.2)
+
+        finish.set()
+        assert {ring.acquire(timeout=5), ring.acquire(timeout=5)} == set(slots)
+    finally:
+        finish.set()
+        pool.pool.terminate()
+
+
+def test_slot_released_when_worker_fails(ring, monkeypatch):
+    def failing_analyze(items):
+        raise RuntimeError("worker error")
+
+    monkeypatch.setattr(core.worker_pool, "_analyze_frames", failing_analyze)
+    pool = thread_pool(ring, task_timeout=5)
+    try:
+        slot = ring.acquire()
+        with pytest.raises(RuntimeError):
+            pool.analyze_frames([("a.jpg", slot, None, None)])
+        assert ring.available() == 2
+    finally:
+        pool.pool.terminate()
+
+
+def test_cleanup_stale_removes_dead_owner_segments(tmp_path):
+    dead = f"{NAME_PREFIX}-{dead_pid()}-abcd1234"
+    alive = f"{NAME_PREFIX}-{os.getpid()}-abcd1234"
+    unrelated = "other-segment"
+    malformed = f"{NAME_PREFIX}-notapid-abcd1234"
+    for name in (dead, alive, unrelated, malformed):
+        (tmp_path / name).write_bytes(b"\0")
+
+    assert cleanup_stale(str(tmp_path)) == [dead]
+    assert sorted(os.listdir(tmp_path)) == sorted([alive, unrelated, malformed])
+
+
+def test_cleanup_stale_without_shm_dir(tmp_path):
+    assert cleanup_stale(str(tmp_path / "missing")) == []
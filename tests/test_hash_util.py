@@ -0,0 +1,188 @@
+"""
+utils.hash_util 테스트 (가짜 ES 세션 사용)
+실행: python -m pytest -q tests
+"""
+import hashlib
+import threading
+
+import pytest
+
+from benchmarks.fakes import FakeEsSession, FakeResponse
+from core.pipeline import Pipeline
+from utils.hash_util import HashUtil
+
+
+def make_hashes(count):
+    return [hashlib.sha256(str(i).encode()).hexdigest() for i in range(count)]
+
+
+class RecordingSession(FakeEsSession):
+    """
+    요청 본문을 기록하는 가짜 세션
+    pit_status로 _pit 응답 상태를 바꾸고, fail_search번째 검색 요청(1부터)을 500으로 실패시킬 수 있음
+    """
+    def __init__(self, hashes=(), pit_status=None, fail_search=None, **kwargs):
+        super().__init__(hashes, **kwargs)
+        self.pit_status = pit_status
+        self.fail_search = fail_search
+        self.bodies = []
+        self.searches = 0
+
+    def request(self, method, url, json=None, data=None, **kwargs):
+        path = url.split("?")[0].replace("http://fake-es:9200", "")
+        if path == "/image_hashes/_pit" and self.pit_status:
+            self.requests.append((method, path))
+            return FakeResponse(self.pit_status, {"error": "no handler found"})
+        if path in ("/_search", "/image_hashes/_search", "/_search/scroll") and method == "POST":
+            with self._lock:
+                self.searches += 1
+                failed = self.searches == self.fail_search
+                self.bodies.append((path, dict(json or {}, pit=dict((json or {}).get("pit", {})))))
+            if failed:
+                return FakeResponse(500, {"error": "search_phase_execution_exception"})
+        return super().request(method, url, json=json, data=data, **kwargs)
+
+
+def load(session, **kwargs):
+    hash_util = HashUtil("http://fake-es:9200", session=session, **kwargs)
+    hash_util.load_hashes_from_es()
+    hash_util.close()
+    return hash_util.processed_hashes
+
+
+def test_load_with_sliced_pit():
+    hashes = make_hashes(2500)
+    session = RecordingSession(hashes)
+
+    loaded = load(session, page_size=100, load_slices=4)
+    assert len(loaded) == len(hashes)
+    assert all(img_hash in loaded for img_hash in hashes)
+    bodies = [body for path, body in session.bodies if path == "/_search"]
+    assert {body["slice"]["id"] for body in bodies} == {0, 1, 2, 3}
+    assert all(body["slice"]["max"] == 4 for body in bodies)
+    # 슬라이스마다 첫 페이지 이후에는 마지막 문서의 sort 값부터 이어서 조회
+    assert sum("search_after" not in body for body in bodies) == 4
+    assert ("DELETE", "/_pit") in session.requests
+    assert not any(path.startswith("/image_hashes/_search") for _, path in session.requests)
+
+
+def test_pit_404_without_missing_index_falls_back_to_scroll():
+    hashes = make_hashes(250)
+    session = RecordingSession(hashes, pit_status=404)
+
+    loaded = load(session, page_size=100)
+    assert len(loaded) == len(hashes)
+    assert all(img_hash in loaded for img_hash in hashes)
+    assert ("POST", "/image_hashes/_search") in session.requests
+    assert ("DELETE", "/_search/scroll") in session.requests
+    assert ("PUT", "/image_hashes") not in session.requests
+
+
+def test_missing_index_is_created():
+    session = RecordingSession(index_exists=False)
+
+    loaded = load(session)
+    assert len(loaded) == 0
+    assert ("PUT", "/image_hashes") in session.requests
+    assert session.index_exists
+
+
+@pytest.mark.parametrize("pit_status", [None, 400])
+def test_failed_load_keeps_pages_read_so_far(pit_status):
+    hashes = make_hashes(500)
+    # 두 페이지를 읽은 뒤 세 번째 검색 요청에서 실패 (400이면 scroll로 대체해 로드)
+    session = RecordingSession(hashes, pit_status=pit_status, fail_search=3)
+
+    loaded = load(session, page_size=100, load_slices=1)
+    assert len(loaded) == 200
+    # 실패 전에 읽은 페이지는 finish_load로 정렬되어 바로 조회 가능
+    assert all(img_hash in loaded for img_hash in hashes[:200])
+    assert not any(img_hash in loaded for img_hash in hashes[200:])
+    cleanup = ("DELETE", "/_pit") if pit_status is None else ("DELETE", "/_search/scroll")
+    assert cleanup in session.requests
+
+
+@pytest.fixture
+def hash_util():
+    hash_util = HashUtil("http://fake-es:9200", session=FakeEsSession(), bulk_interval=0.01)
+    yield hash_util
+    hash_util.close()
+
+
+def write_images(tmp_path, count, content=b"same image"):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f"img{i}.jpg"
+        path.write_bytes(content)
+        paths.append(str(path))
+    return paths
+
+
+def test_in_flight_duplicate_is_dropped_until_released(hash_util, tmp_path):
+    first, second = write_images(tmp_path, 2)
+
+    img_hash, data = hash_util.read_if_new(first)
+    assert data == b"same image"
+    assert hash_util.read_if_new(second) is None
+
+    hash_util.release_hash(img_hash)    # 태그 없이 끝남
+    assert hash_util.read_if_new(second)[0] == img_hash
+
+
+def test_saved_hash_stays_duplicate(hash_util, tmp_path):
+    first, second = write_images(tmp_path, 2)
+
+    img_hash, _ = hash_util.read_if_new(first)
+    hash_util.save_hash_to_es(img_hash)
+    assert not hash_util.pending_hashes
+    hash_util.release_hash(img_hash)
+    assert hash_util.read_if_new(second) is None
+
+
+class StubTagger:
+    """ 디코딩은 바이트를 그대로 쓰고, 감지는 release가 설정될 때까지 대기하는 태거 """
+    decode_size = None
+
+    def __init__(self, tag="cat"):
+        self.tag = tag
+        self.release = threading.Event()
+
+    def decode(self, data, size=None):
+        return bytes(data)
+
+    def detect_cached(self, images, hashes):
+        self.release.wait(5.0)
+        return [None] * len(images)
+
+    def tag_result(self, image_path, img, result):
+        return (self.tag, []) if self.tag else (None, [])
+
+
+def run_pipeline(tagger, hash_util, paths):
+    sunk = []
+    pipeline = Pipeline(tagger, lambda path, primary_tag, tags, img_hash: sunk.append(path), hash_util,
+                        decode_workers=2, batch_size=1)
+    pipeline.start()
+    for path in paths:
+        pipeline.submit(path)
+    tagger.release.set()
+    pipeline.stop()
+    return sunk
+
+
+def test_pipeline_processes_identical_files_in_flight_once(hash_util, tmp_path):
+    paths = write_images(tmp_path, 3)
+
+    sunk = run_pipeline(StubTagger(), hash_util, paths)
+    assert len(sunk) == 1
+    assert not hash_util.pending_hashes
+
+
+def test_pipeline_releases_hash_without_detection(hash_util, tmp_path):
+    first, second = write_images(tmp_path, 2)
+    tagger = StubTagger(tag=None)
+
+    run_pipeline(tagger, hash_util, [first])
+    assert not hash_util.pending_hashes
+    # 태그가 없어 저장하지 않은 해시는 다음에 같은 내용이 들어오면 다시 처리
+    assert hash_util.read_if_new(second) is not None
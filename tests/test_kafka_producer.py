@@ -0,0 +1,151 @@
+"""
+interface.kafka_producer 테스트 (가짜 프로듀서 사용)
+실행: python -m pytest -q tests
+"""
+import json
+
+import pytest
+
+from benchmarks.fakes import FakeFuture, FakeKafkaProducer
+from interface.kafka_producer import MessageSpool, TagProducer
+
+
+class ManualProducer:
+    """ 전송 결과를 테스트에서 직접 정하는 프로듀서 (fail_on에 해당하는 메시지는 바로 실패) """
+    def __init__(self, fail_on=(), hang=False):
+        self.fail_on = set(fail_on)
+        self.hang = hang
+        self.messages = []
+        self.futures = []
+
+    def send(self, topic, value=None, **kwargs):
+        future = FakeFuture()
+        self.futures.append((value, future))
+        if self.hang:
+            return future
+        if value["file_path"] in self.fail_on:
+            future.resolve(error=RuntimeError("fake delivery failure"))
+        else:
+            self.messages.append(value)
+            future.resolve(result={"topic": topic})
+        return future
+
+    def flush(self, timeout=None):
+        pass
+
+    def close(self, timeout=None):
+        pass
+
+
+def message(name):
+    return {"file_path": name, "primary_tag": "cat", "tags": [], "timestamp": "2025-01-01T00:00:00"}
+
+
+def read_lines(path):
+    return [json.loads(line) for line in path.read_text().splitlines()] if path.exists() else []
+
+
+@pytest.fixture
+def spool_path(tmp_path):
+    return tmp_path / "kafka_spool.jsonl"
+
+
+def replay_path(spool_path):
+    return spool_path.with_name(spool_path.name + ".replay")
+
+
+def test_spool_drain_and_commit(spool_path):
+    spool = MessageSpool(spool_path)
+    spool.append(message("a"))
+    spool.append(message("b"))
+
+    assert [m["file_path"] for m in spool.drain()] == ["a", "b"]
+    assert not spool_path.exists() and replay_path(spool_path).exists()
+
+    # 확인 전에 다시 꺼내면 남은 재전송 파일 뒤에 새 스풀을 이어 붙임
+    spool.append(message("c"))
+    assert [m["file_path"] for m in spool.drain()] == ["a", "b", "c"]
+
+    spool.commit_drain()
+    assert not replay_path(spool_path).exists()
+    assert spool.drain() == []
+
+
+def test_spool_skips_corrupt_lines(spool_path):
+    spool_path.write_text(json.dumps(message("a")) + "\n{broken\n\n" + json.dumps(message("b")) + "\n")
+    assert [m["file_path"] for m in MessageSpool(spool_path).drain()] == ["a", "b"]
+
+
+def test_failed_send_is_spooled(spool_path):
+    producer = TagProducer(None, "tags", spool_path=str(spool_path), producer=ManualProducer(fail_on={"bad"}))
+    producer.send_tag_data("good", [], "cat")
+    producer.send_tag_data("bad", [], "cat")
+
+    assert [m["file_path"] for m in read_lines(spool_path)] == ["bad"]
+    assert (producer.sent_count, producer.failed_count) == (1, 1)
+
+
+def test_replay_sends_spooled_messages_and_commits(spool_path):
+    spool = MessageSpool(spool_path)
+    for name in ("a", "b", "c"):
+        spool.append(message(name))
+
+    fake = FakeKafkaProducer(latency=0.0)
+    producer = TagProducer(None, "tags", spool_path=str(spool_path), close_timeout=5, producer=fake)
+
+    assert sorted(value["file_path"] for _, value in fake.messages) == ["a", "b", "c"]
+    assert producer.sent_count == 3
+    assert not spool_path.exists() and not replay_path(spool_path).exists()
+
+
+def test_replay_failures_are_spooled_once(spool_path):
+    spool = MessageSpool(spool_path)
+    for name in ("a", "bad", "c"):
+        spool.append(message(name))
+
+    TagProducer(None, "tags", spool_path=str(spool_path), producer=ManualProducer(fail_on={"bad"}))
+
+    assert [m["file_path"] for m in read_lines(spool_path)] == ["bad"]
+    assert not replay_path(spool_path).exists()
+
+
+def test_replay_timeout_keeps_replay_file_without_duplicates(spool_path):
+    spool = MessageSpool(spool_path)
+    for name in ("a", "b", "c"):
+        spool.append(message(name))
+
+    fake = ManualProducer(hang=True)
+    producer = TagProducer(None, "tags", spool_path=str(spool_path), close_timeout=0.1, producer=fake)
+    assert replay_path(spool_path).exists()
+
+    # 제한 시간이 지난 뒤 결과가 나와도 재전송 파일에 남은 메시지를 스풀에 다시 기록하지 않음
+    for value, future in fake.futures:
+        if value["file_path"] == "b":
+            future.resolve(error=RuntimeError("fake delivery failure"))
+        else:
+            future.resolve(result={"topic": "tags"})
+    assert not spool_path.exists()
+    assert producer.failed_count == 1
+
+    # 다음 시작에서는 각 메시지를 한 번씩만 다시 보냄
+    fake = ManualProducer()
+    TagProducer(None, "tags", spool_path=str(spool_path), producer=fake)
+    assert [m["file_path"] for m in fake.messages] == ["a", "b", "c"]
+    assert not spool_path.exists() and not replay_path(spool_path).exists()
+
+
+def test_replay_timeout_with_new_failures_sends_each_once(spool_path):
+    spool = MessageSpool(spool_path)
+    spool.append(message("old"))
+
+    fake = ManualProducer(hang=True)
+    producer = TagProducer(None, "tags", spool_path=str(spool_path), close_timeout=0.1, producer=fake)
+    # 재전송이 확인되지 않은 상태에서 새 메시지가 실패하면 스풀에 기록
+    fake.hang = False
+    fake.fail_on = {"new"}
+    producer.send_tag_data("new", [], "cat")
+    fake.futures[0][1].resolve(error=RuntimeError("fake delivery failure"))
+
+    fake = ManualProducer()
+    TagProducer(None, "tags", spool_path=str(spool_path), producer=fake)
+    assert [m["file_path"] for m in fake.messages] == ["old", "new"]
@@ -0,0 +1,87 @@
+"""
+core.result_cache 테스트
+실행: python -m pytest -q tests
+"""
+import sqlite3
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from core.result_cache import ResultCache, model_fingerprint
+
+RECORD = np.array([[0, 0.9, 0.1, 0.2, 0.3, 0.4]], dtype=np.float32)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / "result_cache.sqlite3"
+
+
+def last_used(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return dict(conn.execute("SELECT hash, last_used FROM detections"))
+
+
+def test_hits_update_last_used_in_batches(db_path):
+    cache = ResultCache(db_path, "fp", touch_batch=3, touch_interval=3600)
+    for name in ("a", "b", "c", "d"):
+        cache.put(name, RECORD)
+    stored = last_used(db_path)
+    time.sleep(0.01)
+
+    np.testing.assert_array_equal(cache.get("a"), RECORD)
+    cache.get("b")
+    cache.get("a")
+    assert last_used(db_path) == stored     # 아직 기록 안 함 (적중한 항목 2개)
+    cache.get("c")
+    updated = last_used(db_path)            # 세 번째 항목에서 한 번에 기록
+    assert all(updated[name] > stored[name] for name in "abc") and updated["d"] == stored["d"]
+    assert cache.stats()["hits"] == 4
+    cache.close()
+
+
+def test_hits_flushed_after_interval(db_path):
+    cache = ResultCache(db_path, "fp", touch_batch=1000, touch_interval=0.0)
+    cache.put("a", RECORD)
+    stored = last_used(db_path)["a"]
+    time.sleep(0.01)
+    cache.get("a")
+    assert last_used(db_path)["a"] > stored
+    cache.close()
+
+
+def test_eviction_sees_pending_hits(db_path):
+    cache = ResultCache(db_path, "fp", max_entries=3, touch_batch=1000, touch_interval=3600)
+    for name in ("a", "b", "c"):
+        cache.put(name, RECORD)
+    time.sleep(0.01)
+    cache.get("a")      # 가장 먼저 넣었지만 최근에 사용
+    cache.put("d", RECORD)
+
+    # 최대 개수의 90%(2개)까지 오래 쓰지 않은 항목부터 삭제
+    assert set(last_used(db_path)) == {"a", "d"}
+    cache.close()
+
+
+def test_close_writes_pending_hits(db_path):
+    cache = ResultCache(db_path, "fp", touch_batch=1000, touch_interval=3600)
+    cache.put("a", RECORD)
+    stored = last_used(db_path)["a"]
+    time.sleep(0.01)
+    cache.get("a")
+    cache.close()
+    assert last_used(db_path)["a"] > stored
+
+
+def test_fingerprint_depends_on_decode_mode(tmp_path):
+    weights = tmp_path / "model.onnx"
+    weights.write_bytes(b"weights")
+    loader = SimpleNamespace(model_path=str(weights), backend="onnx", imgsz=640)
+
+    plain = model_fingerprint(loader)
+    reduced = model_fingerprint(loader, 640)
+    framed = model_fingerprint(loader, 640, letterbox=True)
+    assert len({plain, reduced, framed}) == 3
+    assert model_fingerprint(loader, 640, letterbox=False) == reduced
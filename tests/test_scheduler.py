@@ -0,0 +1,182 @@
+"""
+core.scheduler 테스트
+실행: python -m pytest -q tests
+"""
+import threading
+import time
+
+import pytest
+
+from core.scheduler import Scheduler
+
+
+class Recorder:
+    """ 넘겨받은 순서를 기록하고 바로 완료 처리하는 submit 함수 """
+    def __init__(self):
+        self.paths = []
+        self.cond = threading.Condition()
+
+    def __call__(self, path, on_done):
+        with self.cond:
+            self.paths.append(path)
+            self.cond.notify_all()
+        on_done(None)
+
+    def wait(self, count, timeout=5.0):
+        with self.cond:
+            return self.cond.wait_for(lambda: len(self.paths) >= count, timeout)
+
+
+@pytest.fixture
+def recorder():
+    return Recorder()
+
+
+def run(scheduler, recorder, count):
+    scheduler.start()
+    try:
+        assert recorder.wait(count)
+    finally:
+        scheduler.stop()
+    return recorder.paths
+
+
+def test_live_dispatched_before_backfill(recorder):
+    scheduler = Scheduler(recorder, max_in_flight=1, large_file_bytes=None, lifo_depth=None)
+    for i in range(3):
+        scheduler.submit(f"old{i}.jpg", backlog=True)
+    for i in range(3):
+        scheduler.submit(f"new{i}.jpg")
+
+    assert run(scheduler, recorder, 6) == ["new0.jpg", "new1.jpg", "new2.jpg", "old0.jpg", "old1.jpg", "old2.jpg"]
+    assert scheduler.stats()["classes"]["live"]["dispatched"] == 3
+
+
+def test_live_large_after_live(recorder):
+    scheduler = Scheduler(recorder, max_in_flight=1, large_file_bytes=100, lifo_depth=None)
+    scheduler.submit("big.jpg", size=1000)
+    scheduler.submit("small.jpg", size=10)
+
+    assert run(scheduler, recorder, 2) == ["small.jpg", "big.jpg"]
+
+
+def test_expired_deadline_moves_to_deferred(recorder):
+    scheduler = Scheduler(recorder, max_in_flight=1, large_file_bytes=None, lifo_depth=None)
+    scheduler.submit("old.jpg", backlog=True)
+    scheduler.submit("late.jpg", deadline=-1.0)
+    scheduler.submit("fresh.jpg", deadline=60.0)
+
+    # deferred는 live 뒤, backfill 앞
+    assert run(scheduler, recorder, 3) == ["fresh.jpg", "late.jpg", "old.jpg"]
+    stats = scheduler.stats()
+    assert stats["deferred"] == {"deadline": 1}
+    assert stats["classes"]["deferred"]["dispatched"] == 1
+    assert stats["classes"]["deferred"]["missed"] == 1
+
+
+def test_shed_overflow_respects_limits():
+    shed = []
+    scheduler = Scheduler(None, large_file_bytes=None, limits={"live": 2, "deferred": 3}, overflow="defer")
+    scheduler.on_shed = shed.append
+    for i in range(8):
+        scheduler.submit(f"{i}.jpg")
+
+    # live에는 최근 2개, deferred에는 그 앞의 3개, 나머지 가장 오래된 3개는 버림
+    assert [e.path for e in scheduler.queues["live"]] == ["6.jpg", "7.jpg"]
+    assert [e.path for e in scheduler.queues["deferred"]] == ["3.jpg", "4.jpg", "5.jpg"]
+    assert shed == ["0.jpg", "1.jpg", "2.jpg"]
+    assert scheduler.stats()["shed"] == 3
+
+
+def test_shed_policy_drops_without_deferring():
+    shed = []
+    scheduler = Scheduler(None, large_file_bytes=None, limits={"live": 2}, overflow="shed")
+    scheduler.on_shed = shed.append
+    for i in range(4):
+        scheduler.submit(f"{i}.jpg")
+
+    assert [e.path for e in scheduler.queues["live"]] == ["2.jpg", "3.jpg"]
+    assert not scheduler.queues["deferred"]
+    assert shed == ["0.jpg", "1.jpg"]
+
+
+def test_entries_with_callback_are_never_shed():
+    shed = []
+    scheduler = Scheduler(None, large_file_bytes=None, limits={"live": 1, "deferred": 2}, overflow="shed")
+    scheduler.on_shed = shed.append
+    callback = lambda item: None
+    scheduler.submit("plain0.jpg")
+    scheduler.submit("claimed0.jpg", callback)   # plain0 버림
+    scheduler.submit("plain1.jpg")               # claimed0은 콜백이 있으므로 deferred로
+    scheduler.submit("plain2.jpg")               # plain1 버림
+    scheduler.submit("claimed1.jpg", callback)   # plain2 버림
+    scheduler.submit("plain3.jpg")               # claimed1 deferred로 (deferred 한도 도달)
+
+    assert [e.path for e in scheduler.queues["deferred"]] == ["claimed0.jpg", "claimed1.jpg"]
+    assert shed == ["plain0.jpg", "plain1.jpg", "plain2.jpg"]
+
+
+def test_deferred_evicts_oldest_entry_without_callback():
+    shed = []
+    scheduler = Scheduler(None, large_file_bytes=None, limits={"live": 1, "deferred": 2}, overflow="defer")
+    scheduler.on_shed = shed.append
+    callback = lambda item: None
+    scheduler.submit("claimed0.jpg", callback)
+    scheduler.submit("plain0.jpg")      # claimed0 -> deferred
+    scheduler.submit("plain1.jpg")      # plain0 -> deferred (한도 도달)
+    scheduler.submit("plain2.jpg")      # plain1 -> deferred, 한도 초과라 콜백 없는 가장 오래된 plain0 버림
+
+    assert [e.path for e in scheduler.queues["deferred"]] == ["claimed0.jpg", "plain1.jpg"]
+    assert shed == ["plain0.jpg"]
+
+
+def test_callback_submit_waits_while_deferred_full(recorder):
+    callback = lambda item: None
+    scheduler = Scheduler(recorder, max_in_flight=1, large_file_bytes=None, limits={"live": 1, "deferred": 2},
+                          lifo_depth=None)
+    for i in range(3):
+        scheduler.submit(f"claimed{i}.jpg", callback)
+    assert len(scheduler.queues["deferred"]) == 2
+
+    submitted = threading.Event()
+
+    def submit_more():
+        scheduler.submit("waiting.jpg", callback, backlog=True)
+        submitted.set()
+
+    threading.Thread(target=submit_more, daemon=True).start()
+    time.sleep(0.2)
+    assert not submitted.is_set()
+    assert len(scheduler.queues["deferred"]) == 2
+
+    scheduler.start()
+    try:
+        assert submitted.wait(5.0)
+        assert recorder.wait(4)
+    finally:
+        scheduler.stop()
+    assert sorted(recorder.paths) == ["claimed0.jpg", "claimed1.jpg", "claimed2.jpg", "waiting.jpg"]
+
+
+def test_backfill_submit_waits_at_limit(recorder):
+    scheduler = Scheduler(recorder, max_in_flight=1, limits={"backfill": 2})
+    scheduler.submit("old0.jpg", backlog=True)
+    scheduler.submit("old1.jpg", backlog=True)
+
+    submitted = threading.Event()
+
+    def submit_more():
+        scheduler.submit("old2.jpg", backlog=True)
+        submitted.set()
+
+    threading.Thread(target=submit_more, daemon=True).start()
+    time.sleep(0.2)
+    assert not submitted.is_set()
+
+    scheduler.start()
+    try:
+        assert submitted.wait(5.0)
+        assert recorder.wait(3)
+    finally:
+        scheduler.stop()
+    assert recorder.paths == ["old0.jpg", "old1.jpg", "old2.jpg"]
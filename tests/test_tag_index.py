@@ -0,0 +1,169 @@
+"""
+utils.bitmap / core.tag_index 테스트
+실행: python -m pytest -q tests
+"""
+import sqlite3
+
+import numpy as np
+import pytest
+
+from core.tag_index import TagIndex, parse
+from utils.bitmap import ARRAY_MAX, Bitmap, _is_bitset
+
+# 컨테이너 하나에 넣을 원소 수 (배열 <-> 비트셋 경계 주변)
+SIZES = (0, 1, ARRAY_MAX - 1, ARRAY_MAX, ARRAY_MAX + 1, 20000, 65536)
+
+
+def random_set(rng, sizes):
+    """ 컨테이너(상위 16비트)별로 지정한 수만큼 원소를 가진 집합 """
+    values = set()
+    for key, size in enumerate(sizes):
+        lows = rng.choice(65536, size, replace=False) if size < 65536 else np.arange(65536)
+        values.update(((key << 16) | lows).tolist())
+    return values
+
+
+def check(bitmap, expected):
+    assert len(bitmap) == len(expected)
+    assert bitmap.to_array().tolist() == sorted(expected)
+    for key, container in bitmap.containers.items():
+        # 원소 수에 맞는 컨테이너 종류로 정규화되어 있어야 함
+        count = len(container) if not _is_bitset(container) else len(Bitmap({key: container}))
+        assert count > 0
+        assert _is_bitset(container) == (count > ARRAY_MAX)
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_bitmap_ops_match_python_sets(seed):
+    rng = np.random.default_rng(seed)
+    a = random_set(rng, rng.choice(SIZES, 3))
+    b = random_set(rng, rng.choice(SIZES, 3))
+    # 일부 원소를 공유해 교집합이 비지 않도록
+    shared = rng.choice(sorted(a), min(len(a), 3000), replace=False).tolist() if a else []
+    b.update(shared)
+    bitmap_a, bitmap_b = Bitmap.from_ids(sorted(a)), Bitmap.from_ids(sorted(b))
+
+    check(bitmap_a, a)
+    check(bitmap_a & bitmap_b, a & b)
+    check(bitmap_a | bitmap_b, a | b)
+    check(bitmap_a - bitmap_b, a - b)
+    check(bitmap_b - bitmap_a, b - a)
+    for value in list(a)[:50] + [1 << 20, 3 << 16]:
+        assert (value in bitmap_a) == (value in a)
+
+
+@pytest.mark.parametrize("sizes", [(), (1,), (ARRAY_MAX,), (ARRAY_MAX + 1,), (65536, 0, 7), (ARRAY_MAX, ARRAY_MAX + 1)])
+def test_bitmap_serialize_round_trip(sizes):
+    values = random_set(np.random.default_rng(len(sizes)), sizes)
+    bitmap = Bitmap.from_ids(sorted(values))
+    restored = Bitmap.deserialize(bitmap.serialize())
+    check(restored, values)
+    assert {k: _is_bitset(c) for k, c in restored.containers.items()} == \
+           {k: _is_bitset(c) for k, c in bitmap.containers.items()}
+
+
+def test_bitmap_shrinks_bitset_to_array():
+    values = set(range(ARRAY_MAX + 10))
+    bitmap = Bitmap.from_ids(sorted(values)) - Bitmap.from_ids(list(range(20)))
+    check(bitmap, values - set(range(20)))
+    assert not _is_bitset(bitmap.containers[0])
+
+
+def term(name):
+    return ("term", name)
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("a", term("a")),
+    ("a b", ("and", term("a"), term("b"))),
+    ("a OR b c", ("or", term("a"), ("and", term("b"), term("c")))),
+    ("NOT a b", ("and", ("not", term("a")), term("b"))),
+    ("a or not b and c", ("or", term("a"), ("and", ("not", term("b")), term("c")))),
+    ("(a OR b) NOT primary:c", ("and", ("or", term("a"), term("b")), ("not", term("primary:c")))),
+    ("NOT NOT *", ("not", ("not", term("*")))),
+])
+def test_parse_precedence(expression, expected):
+    assert parse(expression) == expected
+
+
+@pytest.mark.parametrize("expression", ["", "a AND", "(a", "a)", "AND a", "NOT", "()", "a OR OR b"])
+def test_parse_errors(expression):
+    with pytest.raises(ValueError):
+        parse(expression)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / "tag_index.sqlite3"
+
+
+def open_index(db_path):
+    index = TagIndex(db_path, compact_docs=10 ** 9, flush_interval=0.01)
+    index.start()
+    return index
+
+
+def doc_ids(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return [doc_id for (doc_id,) in conn.execute("SELECT id FROM docs ORDER BY id")]
+
+
+def test_reindex_same_path_replaces_tags(db_path):
+    index = open_index(db_path)
+    index.add("/out/a.jpg", "vehicle", ["car", "red"])
+    index.add("/out/b.jpg", "vehicle", ["bus", "red"])
+    index.flush()
+    index.add("/out/a.jpg", "human", ["person", "blue"])
+    index.flush()
+
+    assert index.count("*") == 2
+    assert index.count("red") == 1
+    assert index.count("primary:vehicle") == 1
+    assert [row["path"] for row in index.query("blue OR car")] == ["/out/a.jpg"]
+    assert index.query("person")[0]["tags"] == ["person", "blue"]
+    assert index.stats()["deleted"] == 1
+    index.close(compact=False)
+
+
+def test_compact_drops_replaced_docs(db_path):
+    index = open_index(db_path)
+    index.add("/out/a.jpg", "vehicle", ["car"])
+    index.flush()
+    index.add("/out/a.jpg", "animal", ["dog"])
+    index.flush()
+    assert len(doc_ids(db_path)) == 2
+
+    index.compact()
+    assert len(doc_ids(db_path)) == 1
+    assert index.stats()["deleted"] == 0
+    assert "car" not in index.tag_counts()
+    assert index.count("dog") == 1 and index.count("*") == 1
+    index.close()
+
+
+def test_reopen_replays_docs_after_compaction(db_path):
+    index = open_index(db_path)
+    for i in range(5):
+        index.add(f"/out/{i}.jpg", "vehicle", ["car"] if i % 2 else ["bus"])
+    index.flush()
+    index.compact()
+    # 압축 이후: 새 문서 추가와 압축된 문서의 재색인
+    index.add("/out/5.jpg", "animal", ["dog"])
+    index.add("/out/0.jpg", "animal", ["cat"])
+    index.flush()
+    expected = {expression: index.count(expression)
+                for expression in ("*", "car", "bus", "dog", "cat", "primary:animal", "vehicle NOT car")}
+    index.close(compact=False)
+
+    reopened = TagIndex(db_path)
+    assert {expression: reopened.count(expression) for expression in expected} == expected
+    assert expected["*"] == 6 and expected["bus"] == 2
+    assert reopened.stats()["since_compact"] == 2     # 압축 이후 문서만 다시 읽음
+    assert [row["path"] for row in reopened.query("cat")] == ["/out/0.jpg"]
+    reopened.close()
+
+    # 닫을 때 압축했으면 다시 열 때 읽을 문서가 없음
+    reopened = TagIndex(db_path)
+    assert reopened.stats()["since_compact"] == 0
+    assert reopened.count("*") == 6 and reopened.count("bus") == 2
+    reopened.close()
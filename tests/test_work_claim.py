@@ -0,0 +1,181 @@
+"""
+interface.work_claim 테스트
+같은 tmp 디렉터리를 여러 로컬 프로세스(노드)가 나눠 처리
+실행: python -m pytest -q tests
+"""
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from interface.work_claim import WorkClaimer, _move_unique
+
+HEARTBEAT = 0.1
+LEASE = 0.6
+
+
+def run_node(workdir, node, process_ms):
+    """ 자식 프로세스: 노드 하나로 선점/처리하다가 정지 파일이 생기면 종료 """
+    claimer = WorkClaimer(os.path.join(workdir, "in"), node, heartbeat_interval=HEARTBEAT,
+                          lease_timeout=LEASE, scan_interval=0.1, settle_time=0.0)
+    tasks = queue.Queue()
+    log_fd = os.open(os.path.join(workdir, "processed.log"), os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+
+    def work():
+        while True:
+            path, on_done = tasks.get()
+            time.sleep(process_ms / 1000)
+            # 한 줄을 한 번의 write로 기록 (O_APPEND라 프로세스 사이에서 섞이지 않음)
+            os.write(log_fd, f"{node}\t{os.path.basename(path)}\n".encode())
+            on_done(None)   # 태그 없이 끝난 파일로 done/에 보관
+            tasks.task_done()
+
+    threading.Thread(target=work, daemon=True).start()
+    claimer.start(lambda path, on_done, backlog: tasks.put((path, on_done)))
+    stop_path = os.path.join(workdir, "stop")
+    while not os.path.exists(stop_path):
+        time.sleep(0.02)
+    claimer.stop()
+    tasks.join()
+    claimer.close()
+
+
+def park_files(src_dir, done_dir, names, go):
+    """ 자식 프로세스: 같은 이름의 파일들을 공유 done/ 디렉터리로 이동 (모든 프로세스가 동시에 시작) """
+    go.wait()
+    for name in names:
+        _move_unique(os.path.join(src_dir, name), done_dir)
+
+
+CONTEXT = multiprocessing.get_context("spawn")
+
+
+def spawn(target, *args):
+    process = CONTEXT.Process(target=target, args=args, daemon=True)
+    process.start()
+    return process
+
+
+def write_files(input_dir, names):
+    """ 다른 이름으로 쓴 뒤 rename해서 들어오게 함 """
+    for name in names:
+        tmp_path = input_dir / (name + ".part")
+        tmp_path.write_bytes(name.encode())
+        os.replace(tmp_path, input_dir / name)
+
+
+def read_log(workdir):
+    path = workdir / "processed.log"
+    if not path.exists():
+        return []
+    return [tuple(line.split("\t")) for line in path.read_text().splitlines() if line]
+
+
+def wait_for(condition, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_nodes_share_recover_and_process_each_file_once(tmp_path):
+    input_dir = tmp_path / "in"
+    input_dir.mkdir()
+    claims = input_dir / ".claims"
+    first = [f"a_{i:03d}.jpg" for i in range(90)]
+    later = [f"b_{i:03d}.jpg" for i in range(90)]
+
+    nodes = {f"node{i}": spawn(run_node, str(tmp_path), f"node{i}", 20) for i in range(3)}
+    try:
+        # 모든 노드가 서로를 노드 목록에 반영한 뒤 파일 투입 (먼저 뜬 노드가 혼자 전부 선점하지 않도록)
+        assert wait_for(lambda: all((claims / "nodes" / f"{node}.json").exists() for node in nodes))
+        time.sleep(3 * HEARTBEAT)
+        write_files(input_dir, first)
+
+        # 죽일 노드가 자기 몫을 선점해 두고 일부 처리한 시점에 SIGKILL
+        assert wait_for(lambda: sum(node == "node0" for node, _ in read_log(tmp_path)) >= 3)
+        nodes["node0"].kill()
+        nodes["node0"].join()
+        killed_dir = claims / "work" / "node0"
+        left = set(os.listdir(killed_dir))
+        assert left, "killed node should still hold claimed files"
+
+        # lease 만료 후 남은 노드가 회수하고 빈 선점 디렉터리 정리
+        killed_at = time.monotonic()
+        assert wait_for(lambda: not killed_dir.exists())
+        assert time.monotonic() - killed_at >= LEASE - HEARTBEAT
+
+        # 늦게 합류한 노드도 이후 들어온 파일을 나눠 받음
+        nodes["node3"] = spawn(run_node, str(tmp_path), "node3", 20)
+        assert wait_for(lambda: (claims / "nodes" / "node3.json").exists())
+        time.sleep(3 * HEARTBEAT)   # 다른 노드가 새 노드를 노드 목록에 반영
+        write_files(input_dir, later)
+
+        names = first + later
+        assert wait_for(lambda: len(os.listdir(claims / "done")) == len(names))
+    finally:
+        (tmp_path / "stop").touch()
+        for process in nodes.values():
+            process.join(10)
+            if process.is_alive():
+                process.kill()
+
+    per_name = defaultdict(list)
+    for node, name in read_log(tmp_path):
+        per_name[name].append(node)
+    assert sorted(per_name) == sorted(names)
+    for name, processed_by in per_name.items():
+        if len(processed_by) > 1:
+            # 죽은 노드가 처리 기록만 남기고 보관하기 전에 죽은 파일만 다시 처리될 수 있음
+            assert name in left and processed_by.count("node0") == 1 and len(processed_by) == 2, (name, processed_by)
+    # 죽은 노드가 선점해 두었던 파일은 모두 다른 노드가 처리
+    for name in left:
+        assert any(node != "node0" for node in per_name[name])
+    assert any(node == "node3" for processed_by in per_name.values() for node in processed_by)
+    assert sorted(os.listdir(claims / "done")) == sorted(names)
+    assert not list(input_dir.glob("*.jpg"))
+
+
+def test_move_unique_does_not_clobber_across_processes(tmp_path):
+    done_dir = tmp_path / "done"
+    done_dir.mkdir()
+    names = [f"img_{i:03d}.jpg" for i in range(300)]
+    sources = []
+    for worker in range(4):
+        src_dir = tmp_path / f"src{worker}"
+        src_dir.mkdir()
+        for name in names:
+            (src_dir / name).write_text(f"{worker}/{name}")
+        sources.append(src_dir)
+
+    go = CONTEXT.Event()
+    processes = [spawn(park_files, str(src_dir), str(done_dir), names, go) for src_dir in sources]
+    time.sleep(1.0)     # 모든 프로세스가 시작될 때까지 대기
+    go.set()
+    for process in processes:
+        process.join(30)
+        assert process.exitcode == 0
+
+    contents = sorted(path.read_text() for path in done_dir.iterdir())
+    assert contents == sorted(f"{worker}/{name}" for worker in range(4) for name in names)
+    assert all(not os.listdir(src_dir) for src_dir in sources)
+    assert (done_dir / "img_000~3.jpg").exists()
+
+
+def test_move_unique_numbers_existing_names(tmp_path):
+    target = tmp_path / "failed"
+    target.mkdir()
+    (target / "x.jpg").write_text("old")
+    (target / "x~1.jpg").write_text("older")
+    src = tmp_path / "x.jpg"
+    src.write_text("new")
+
+    dest = _move_unique(str(src), str(target))
+    assert dest == str(target / "x~2.jpg")
+    assert (target / "x.jpg").read_text() == "old"
+    assert (target / "x~2.jpg").read_text() == "new"
+    assert not src.exists()
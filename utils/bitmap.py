@@ -0,0 +1,199 @@
+"""
+압축 비트맵 모듈 (roaring 방식)
+32비트 정수 집합을 상위 16비트별 컨테이너로 나누어 저장
+- 원소가 ARRAY_MAX개 이하인 컨테이너: 정렬된 uint16 배열
+- 그보다 많은 컨테이너: 65536비트 비트셋 (uint64 1024개, 8KB)
+교집합/합집합/차집합은 컨테이너 종류 조합별로 numpy 연산으로 처리
+"""
+import numpy as np
+
+ARRAY_MAX = 4096        # 이보다 많으면 비트셋이 배열보다 작음
+BITSET_WORDS = 1024     # 65536비트 / 64
+
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(words):
+        return int(np.bitwise_count(words).sum())
+else:
+    def _popcount(words):
+        return int(np.unpackbits(words.view(np.uint8)).sum())
+
+
+def _is_bitset(container):
+    return container.dtype == np.uint64
+
+
+def _to_bitset(values):
+    """ 정렬 배열 -> 비트셋 """
+    flags = np.zeros(BITSET_WORDS * 64, dtype=bool)
+    flags[values] = True
+    return np.packbits(flags, bitorder="little").view(np.uint64)
+
+
+def _to_array(bits):
+    """ 비트셋 -> 정렬 배열 """
+    return np.flatnonzero(np.unpackbits(bits.view(np.uint8), bitorder="little").view(bool)).astype(np.uint16)
+
+
+def _contains(bits, values):
+    """ 배열의 각 값이 비트셋에 있는지 (bool 배열) """
+    return ((bits[values >> 6] >> (values & 63).astype(np.uint64)) & np.uint64(1)).astype(bool)
+
+
+def _normalize(container):
+    """ 원소 수에 맞는 컨테이너 종류로 변환, 비었으면 None """
+    if _is_bitset(container):
+        count = _popcount(container)
+        if count == 0:
+            return None
+        return _to_array(container) if count <= ARRAY_MAX else container
+    if len(container) == 0:
+        return None
+    return _to_bitset(container) if len(container) > ARRAY_MAX else container
+
+
+def _and(a, b):
+    if _is_bitset(a) and _is_bitset(b):
+        return _normalize(a & b)
+    if _is_bitset(a):
+        a, b = b, a
+    if _is_bitset(b):
+        return _normalize(a[_contains(b, a)])
+    return _normalize(np.intersect1d(a, b, assume_unique=True))
+
+
+def _or(a, b):
+    if not _is_bitset(a) and not _is_bitset(b):
+        if len(a) + len(b) > ARRAY_MAX:
+            return _normalize(_to_bitset(a) | _to_bitset(b))
+        merged = np.concatenate((a, b))
+        merged.sort()
+        return merged[np.concatenate(([True], merged[1:] != merged[:-1]))]
+    bits_a = a if _is_bitset(a) else _to_bitset(a)
+    bits_b = b if _is_bitset(b) else _to_bitset(b)
+    return bits_a | bits_b
+
+
+def _andnot(a, b):
+    if not _is_bitset(a):
+        keep = ~_contains(b, a) if _is_bitset(b) else ~np.isin(a, b, assume_unique=True)
+        return _normalize(a[keep])
+    bits_b = b if _is_bitset(b) else _to_bitset(b)
+    return _normalize(a & ~bits_b)
+
+
+class Bitmap:
+    """
+    변경하지 않는(immutable) 압축 비트맵
+    연산은 항상 새 Bitmap을 만들고 컨테이너는 공유하므로, 읽는 쪽은 락 없이 이전 참조를 계속 사용 가능
+    """
+    __slots__ = ("containers",)
+
+    def __init__(self, containers=None):
+        """ containers (dict): 상위 16비트 -> 컨테이너 (uint16 정렬 배열 또는 uint64 비트셋) """
+        self.containers = containers or {}
+
+    @classmethod
+    def from_ids(cls, ids):
+        """ 정수 목록으로 생성 (정렬/중복 제거는 여기서 처리) """
+        ids = np.unique(np.asarray(ids, dtype=np.uint32))
+        if len(ids) == 0:
+            return cls()
+        highs = (ids >> 16).astype(np.uint16)
+        lows = (ids & 0xFFFF).astype(np.uint16)
+        bounds = np.flatnonzero(np.diff(highs)) + 1
+        containers = {}
+        for high, low in zip(np.split(highs, bounds), np.split(lows, bounds)):
+            containers[int(high[0])] = _normalize(low)
+        return cls(containers)
+
+    def _merge(self, other, op, keep_left, keep_right):
+        containers = {}
+        for key, container in self.containers.items():
+            other_container = other.containers.get(key)
+            if other_container is None:
+                if keep_left:
+                    containers[key] = container
+                continue
+            merged = op(container, other_container)
+            if merged is not None:
+                containers[key] = merged
+        if keep_right:
+            for key, container in other.containers.items():
+                if key not in self.containers:
+                    containers[key] = container
+        return Bitmap(containers)
+
+    def __and__(self, other):
+        return self._merge(other, _and, False, False)
+
+    def __or__(self, other):
+        return self._merge(other, _or, True, True)
+
+    def __sub__(self, other):
+        return self._merge(other, _andnot, True, False)
+
+    def __len__(self):
+        return sum(_popcount(c) if _is_bitset(c) else len(c) for c in self.containers.values())
+
+    def __bool__(self):
+        return bool(self.containers)
+
+    def __contains__(self, value):
+        container = self.containers.get(value >> 16)
+        if container is None:
+            return False
+        low = np.uint16(value & 0xFFFF)
+        if _is_bitset(container):
+            return bool(_contains(container, np.array([low]))[0])
+        index = np.searchsorted(container, low)
+        return index < len(container) and container[index] == low
+
+    def to_array(self, limit=None):
+        """ 정렬된 uint32 배열 (limit이 있으면 앞에서부터 limit개) """
+        parts = []
+        remaining = limit
+        for key in sorted(self.containers):
+            container = self.containers[key]
+            lows = _to_array(container) if _is_bitset(container) else container
+            if remaining is not None:
+                lows = lows[:remaining]
+                remaining -= len(lows)
+            parts.append((np.uint32(key) << 16) | lows.astype(np.uint32))
+            if remaining == 0:
+                break
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.uint32)
+
+    def nbytes(self):
+        """ 컨테이너가 차지하는 메모리 (바이트) """
+        return sum(c.nbytes for c in self.containers.values())
+
+    def serialize(self):
+        """
+        바이트로 직렬화
+        [컨테이너 수 uint32][키 uint16 * n][종류별 원소 수 uint32 * n (비트셋은 0)][컨테이너 데이터...]
+        """
+        keys = sorted(self.containers)
+        counts = [0 if _is_bitset(self.containers[k]) else len(self.containers[k]) for k in keys]
+        parts = [np.uint32(len(keys)).tobytes(), np.array(keys, dtype=np.uint16).tobytes(),
+                 np.array(counts, dtype=np.uint32).tobytes()]
+        parts.extend(self.containers[k].tobytes() for k in keys)
+        return b"".join(parts)
+
+    @classmethod
+    def deserialize(cls, data):
+        count = int(np.frombuffer(data, dtype=np.uint32, count=1)[0])
+        pos = 4
+        keys = np.frombuffer(data, dtype=np.uint16, count=count, offset=pos)
+        pos += 2 * count
+        sizes = np.frombuffer(data, dtype=np.uint32, count=count, offset=pos)
+        pos += 4 * count
+        containers = {}
+        for key, size in zip(keys.tolist(), sizes.tolist()):
+            if size == 0:
+                containers[key] = np.frombuffer(data, dtype=np.uint64, count=BITSET_WORDS, offset=pos).copy()
+                pos += 8 * BITSET_WORDS
+            else:
+                containers[key] = np.frombuffer(data, dtype=np.uint16, count=size, offset=pos).copy()
+                pos += 2 * size
+        return cls(containers)
@@ -0,0 +1,118 @@
+"""
+ES 비동기 일괄 저장 모듈
+새 해시를 큐에 모아 _bulk API로 한 번에 저장하는 백그라운드 스레드
+"""
+import json
+import queue
+import threading
+import time
+
+from utils.log_util import get_logger
+from utils.metrics import REGISTRY
+
+logger = get_logger(__name__)
+
+_FLUSH = object()    # 즉시 저장 요청 신호
+_STOP = object()     # 종료 신호
+
+
+class EsBulkWriter:
+    """
+    문서를 큐에 모아 개수/시간 기준으로 _bulk 요청을 보내는 클래스
+    문서 _id를 지정하므로 같은 문서를 여러 번 보내도 결과는 같음 (재시도 안전)
+    """
+    def __init__(self, session, es_url, index, batch_size=500, flush_interval=1.0,
+                 max_retries=5, backoff=0.5):
+        """
+        session: HTTP 세션 (커넥션 재사용)
+        es_url (str): Elasticsearch 주소
+        index (str): 저장할 인덱스 이름
+        batch_size (int): 한 번에 보낼 최대 문서 수
+        flush_interval (float): 문서가 있으면 최소 이 간격(초)마다 저장
+        max_retries (int): 실패한 배치의 최대 재시도 횟수
+        backoff (float): 재시도 대기 시간의 시작값(초), 시도마다 2배씩 증가
+        """
+        self.session = session
+        self.es_url = es_url
+        self.index = index
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.queue = queue.Queue()
+        self.latency = REGISTRY.histogram("imgtag_es_bulk_seconds", "ES _bulk request time including retries")
+        self.saved = REGISTRY.counter("imgtag_es_docs_total", "Documents sent to ES", result="saved")
+        self.dropped = REGISTRY.counter("imgtag_es_docs_total", "Documents sent to ES", result="dropped")
+        REGISTRY.gauge("imgtag_es_pending", "Documents waiting to be sent to ES").set_function(self.queue.qsize)
+        self._thread = threading.Thread(target=self._run, name="es-bulk-writer", daemon=True)
+        self._thread.start()
+
+    def enqueue(self, doc_id, doc):
+        """ 저장할 문서 등록 (블로킹 없음) """
+        self.queue.put((doc_id, doc))
+
+    def _run(self):
+        """ 큐에서 문서를 모아 개수/시간 조건이 되면 저장 """
+        pending = []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = _FLUSH
+
+            if item is _STOP:
+                self._flush(pending)
+                return
+            if item is not _FLUSH:
+                pending.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(pending) < self.batch_size:
+                    continue
+
+            self._flush(pending)
+            pending = []
+            deadline = None
+
+    def _flush(self, docs):
+        """ 문서 배치를 _bulk로 저장, 실패 시 지수 백오프로 재시도 """
+        if not docs:
+            return
+        lines = []
+        for doc_id, doc in docs:
+            lines.append(json.dumps({"index": {"_index": self.index, "_id": doc_id}}))
+            lines.append(json.dumps(doc))
+        payload = "\n".join(lines) + "\n"
+
+        with self.latency.time():
+            self._send(docs, payload)
+
+    def _send(self, docs, payload):
+        """ _bulk 요청 전송 (재시도 포함) """
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(
+                    f"{self.es_url}/_bulk", data=payload.encode("utf-8"),
+                    headers={"Content-Type": "application/x-ndjson"},
+                )
+                if response.status_code == 200 and not response.json().get("errors"):
+                    self.saved.inc(len(docs))
+                    logger.debug("Saved %d hashes to ES", len(docs))
+                    return
+                error = response.text
+            except Exception as e:
+                error = e
+            if attempt < self.max_retries:
+                wait = self.backoff * (2 ** attempt)
+                logger.warning("Failed to save %d hashes to ES (%s), retrying in %.1fs", len(docs), error, wait)
+                time.sleep(wait)
+        self.dropped.inc(len(docs))
+        logger.error("Giving up saving %d hashes to ES after %d retries", len(docs), self.max_retries)
+
+    def close(self):
+        """ 남은 문서를 모두 저장한 뒤 스레드 종료 """
+        if self._thread.is_alive():
+            self.queue.put(_STOP)
+            self._thread.join()
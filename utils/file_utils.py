@@ -1 +1,63 @@
-"""파일 관련 유틸"""
\ No newline at end of file
+"""파일 관련 유틸"""
+import errno
+import os
+import shutil
+
+COPY_CHUNK_SIZE = 8 * 1024 * 1024   # 커널 복사 한 번에 넘기는 최대 크기 (8MB)
+
+# 커널 내 복사를 지원하지 않을 때 나는 오류 (다음 방법으로 대체)
+_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF}
+
+
+def _copy_file_range(src_fd, dst_fd, size):
+    """ copy_file_range로 복사 (같은 파일시스템이면 reflink/서버 측 복사 가능) """
+    copied = 0
+    while copied < size:
+        n = os.copy_file_range(src_fd, dst_fd, min(COPY_CHUNK_SIZE, size - copied))
+        if n == 0:
+            break
+        copied += n
+    return copied
+
+
+def _sendfile(src_fd, dst_fd, size):
+    """ sendfile로 복사 (사용자 공간 버퍼 없이 커널에서 복사) """
+    copied = 0
+    while copied < size:
+        n = os.sendfile(dst_fd, src_fd, copied, min(COPY_CHUNK_SIZE, size - copied))
+        if n == 0:
+            break
+        copied += n
+    return copied
+
+
+def copy_file(src, dst):
+    """
+    파일 내용과 메타데이터를 복사하고 디스크에 기록될 때까지 기다림
+    copy_file_range -> sendfile -> 일반 읽기/쓰기 순으로 사용할 수 있는 방법을 사용
+    src (str): 원본 파일 경로
+    dst (str): 새로 만들 파일 경로 (이미 있으면 덮어씀)
+    """
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        copied = 0
+        for method in (getattr(os, "copy_file_range", None) and _copy_file_range,
+                       getattr(os, "sendfile", None) and _sendfile):
+            if not method or copied:
+                continue
+            try:
+                copied = method(fsrc.fileno(), fdst.fileno(), size)
+            except OSError as e:
+                if e.errno not in _UNSUPPORTED:
+                    raise
+                # 일부만 복사된 뒤 실패했을 수 있으므로 처음부터 다시 복사
+                copied = 0
+                fdst.seek(0)
+                fdst.truncate()
+        if copied < size:
+            fsrc.seek(copied)
+            fdst.seek(copied)
+            shutil.copyfileobj(fsrc, fdst, COPY_CHUNK_SIZE)
+        fdst.flush()
+        os.fsync(fdst.fileno())
+    shutil.copystat(src, dst)
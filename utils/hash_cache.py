@@ -0,0 +1,70 @@
+"""
+파일 해시 캐시 모듈
+(장치, inode, 크기, 수정시각) 기준으로 SHA256 해시를 SQLite에 저장해
+재시작이나 재스캔 시 이미 본 파일의 해시 계산을 생략
+"""
+import os
+import sqlite3
+import threading
+
+
+class HashCache:
+    """ 파일 메타데이터를 키로 해시를 저장하는 디스크 캐시 클래스 """
+    def __init__(self, db_path):
+        """
+        생성자: SQLite 파일 열기 및 테이블 생성
+        db_path (str): 캐시 DB 파일 경로
+        """
+        self.db_path = str(db_path)
+        # 여러 스레드에서 접근하므로 연결은 하나만 두고 락으로 보호
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS file_hashes ("
+            " dev INTEGER NOT NULL,"
+            " ino INTEGER NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " hash TEXT NOT NULL,"
+            " PRIMARY KEY (dev, ino))"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def file_key(stat_result):
+        """ os.stat 결과에서 캐시 키 (dev, ino, size, mtime_ns) 추출 """
+        return (stat_result.st_dev, stat_result.st_ino,
+                stat_result.st_size, stat_result.st_mtime_ns)
+
+    def get(self, key):
+        """ 캐시된 해시 반환, 없거나 파일이 변경되었으면 None """
+        dev, ino, size, mtime_ns = key
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, hash FROM file_hashes WHERE dev = ? AND ino = ?",
+                (dev, ino),
+            ).fetchone()
+        if row is None or row[0] != size or row[1] != mtime_ns:
+            return None
+        return row[2]
+
+    def put(self, key, img_hash):
+        """ 해시 저장 (같은 inode의 이전 값은 덮어씀) """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO file_hashes (dev, ino, size, mtime_ns, hash) VALUES (?, ?, ?, ?, ?)",
+                (*key, img_hash),
+            )
+            self._conn.commit()
+
+    def lookup(self, file_path):
+        """ 파일 경로로 캐시 조회, (키, 캐시된 해시 또는 None) 반환 """
+        key = self.file_key(os.stat(file_path))
+        return key, self.get(key)
+
+    def close(self):
+        """ DB 연결 종료 """
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,130 @@
+"""
+메모리 절약형 해시 집합 모듈
+SHA256 해시를 64자 hex 문자열 대신 32바이트 바이너리로 정렬 배열에 저장
+대량 로드는 페이지를 모아 두었다가 끝에 한 번만 정렬 (페이지마다 전체를 다시 정렬하면 로드 시간이 제곱으로 늘어남)
+"""
+import threading
+
+import numpy as np
+
+DIGEST_SIZE = 32                        # SHA256 다이제스트 크기 (바이트)
+DIGEST_DTYPE = np.dtype(f"S{DIGEST_SIZE}")
+
+
+def _dedupe_sorted(digests):
+    """ 정렬된 다이제스트 배열에서 연속된 중복 제거 (32바이트를 uint64 4개로 비교) """
+    if len(digests) < 2:
+        return digests
+    words = digests.view(np.uint64).reshape(-1, DIGEST_SIZE // 8)
+    keep = np.empty(len(digests), dtype=bool)
+    keep[0] = True
+    np.any(words[1:] != words[:-1], axis=1, out=keep[1:])
+    return digests if keep.all() else digests[keep]
+
+
+class CompactHashSet:
+    """
+    정렬된 32바이트 다이제스트 배열 + 최근 추가분 버퍼로 구성된 집합
+    조회는 이진 탐색, 추가분이 merge_threshold를 넘으면 정렬 배열의 제자리에 끼워 넣음 (전체 재정렬 없음)
+    add_many로 넣은 대량 로드분은 finish_load에서 한 번에 정렬/병합된 뒤 조회됨
+    """
+    def __init__(self, merge_threshold=65536):
+        """
+        생성자: 빈 집합 생성
+        merge_threshold (int): 정렬 배열로 병합하기 전 버퍼에 모을 최대 해시 수
+        """
+        self.merge_threshold = merge_threshold
+        self._sorted = np.empty(0, dtype=DIGEST_DTYPE)   # 정렬된 다이제스트 배열
+        self._pending = set()                            # 아직 병합되지 않은 다이제스트
+        self._chunks = []                                # finish_load 전까지 모아 둔 대량 로드 페이지
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def to_digest(img_hash):
+        """ hex 문자열 또는 바이트 해시를 32바이트 다이제스트로 변환 """
+        digest = bytes.fromhex(img_hash) if isinstance(img_hash, str) else bytes(img_hash)
+        if len(digest) != DIGEST_SIZE:
+            raise ValueError(f"Invalid digest length: {len(digest)}")
+        return digest
+
+    @staticmethod
+    def _row(sorted_digests, index):
+        """ 정렬 배열의 index 번째 다이제스트를 원본 32바이트로 반환 (S 타입은 끝의 NUL을 잘라내므로 uint8로 읽음) """
+        return sorted_digests[index:index + 1].view(np.uint8).tobytes()
+
+    def __contains__(self, img_hash):
+        try:
+            digest = self.to_digest(img_hash)
+        except (ValueError, TypeError):
+            return False
+        if digest in self._pending:
+            return True
+        sorted_digests = self._sorted
+        index = int(np.searchsorted(sorted_digests, np.array(digest, dtype=DIGEST_DTYPE)))
+        return index < len(sorted_digests) and self._row(sorted_digests, index) == digest
+
+    def __len__(self):
+        """ 저장된 해시 수 (finish_load 전에는 대량 로드분의 중복이 포함될 수 있음) """
+        return len(self._sorted) + len(self._pending) + sum(len(chunk) for chunk in self._chunks)
+
+    def __iter__(self):
+        """ 저장된 해시를 hex 문자열로 순회 """
+        sorted_digests = self._sorted
+        for index in range(len(sorted_digests)):
+            yield self._row(sorted_digests, index).hex()
+        for digest in list(self._pending):
+            yield digest.hex()
+
+    def add(self, img_hash):
+        """ 해시 하나 추가 """
+        digest = self.to_digest(img_hash)
+        if digest in self:
+            return
+        with self._lock:
+            self._pending.add(digest)
+            if len(self._pending) >= self.merge_threshold:
+                self._merge()
+
+    def add_many(self, digests):
+        """
+        연속된 32바이트 다이제스트 버퍼를 대량 로드분으로 추가 (조회에는 finish_load 이후 반영)
+        digests (bytes-like): 길이가 32의 배수인 바이너리 버퍼
+        """
+        if len(digests) % DIGEST_SIZE:
+            raise ValueError("Digest buffer length must be a multiple of 32")
+        if not digests:
+            return
+        chunk = np.frombuffer(bytes(digests), dtype=DIGEST_DTYPE)
+        with self._lock:
+            self._chunks.append(chunk)
+
+    def finish_load(self):
+        """ 모아 둔 대량 로드분과 버퍼를 정렬 배열과 합쳐 한 번만 정렬 (중복 제거) """
+        with self._lock:
+            if not self._chunks:
+                return
+            pending = np.array(list(self._pending), dtype=DIGEST_DTYPE)
+            merged = np.concatenate([self._sorted, *self._chunks, pending])
+            self._chunks = []
+            merged.sort()
+            # 조회 중인 스레드가 있으므로 배열은 제자리 수정하지 않고 교체
+            self._sorted = _dedupe_sorted(merged)
+            self._pending = set()
+
+    def _merge(self):
+        """
+        버퍼를 정렬 배열의 제자리에 끼워 넣음 (배열 크기에 비례하는 복사 한 번, 전체 재정렬 없음)
+        조회 중인 스레드가 있으므로 배열은 제자리 수정하지 않고 교체
+        """
+        new_digests = _dedupe_sorted(np.sort(np.array(list(self._pending), dtype=DIGEST_DTYPE)))
+        sorted_digests = self._sorted
+        positions = np.searchsorted(sorted_digests, new_digests)
+        # 확인과 추가 사이에 다른 스레드가 같은 해시를 넣었을 수 있으므로 이미 있는 것은 제외
+        found = positions < len(sorted_digests)
+        found[found] = sorted_digests[positions[found]] == new_digests[found]
+        self._sorted = np.insert(sorted_digests, positions[~found], new_digests[~found])
+        self._pending = set()
+
+    def nbytes(self):
+        """ 정렬 배열이 차지하는 메모리 크기 (바이트) """
+        return self._sorted.nbytes
@@ -1,38 +1,183 @@
 import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-import requests
+from utils.es_bulk_writer import EsBulkWriter
+from utils.hash_cache import HashCache
+from utils.hash_set import CompactHashSet, DIGEST_SIZE
+from utils.log_util import get_logger
+from utils.metrics import REGISTRY
+from utils.perceptual_hash import PerceptualIndex, from_hex, to_hex
+
+CHUNK_SIZE = 1024 * 1024    # 해시 계산 시 한 번에 읽는 크기 (1MB)
+KEEP_ALIVE = "1m"           # PIT/scroll 컨텍스트 유지 시간
+
+logger = get_logger(__name__)
+HASH_SECONDS = REGISTRY.histogram("imgtag_step_seconds", "Time per image spent in a step", step="hash")
+EXACT_DUPLICATES = REGISTRY.counter("imgtag_duplicates_total", "Images skipped as duplicates", kind="exact")
+NEAR_DUPLICATES = REGISTRY.counter("imgtag_duplicates_total", "Images skipped as duplicates", kind="near")
 
 
 class HashUtil:
     """ 이미지 해시 관리 유틸리티 클래스 """
-    def __init__(self, es_url):
+    def __init__(self, es_url, cache_path=None, session=None, page_size=10000, load_slices=4,
+                 bulk_size=500, bulk_interval=1.0, bulk_max_retries=5, perceptual_dedup=False, phash_radius=4):
+        """
+        es_url (str): Elasticsearch 주소
+        cache_path (str): 해시 캐시 DB 경로 (없으면 캐시 사용 안 함)
+        session: HTTP 세션 (기본 requests.Session, 테스트 시 가짜 세션 주입 가능)
+        page_size (int): 해시 로드 시 페이지당 문서 수
+        load_slices (int): 해시 로드 시 동시에 읽을 슬라이스 수
+        bulk_size (int): 해시 일괄 저장 시 한 번에 보낼 최대 개수
+        bulk_interval (float): 해시 일괄 저장 최대 대기 시간(초)
+        bulk_max_retries (int): 일괄 저장 실패 시 최대 재시도 횟수
+        perceptual_dedup (bool): 지각 해시(dHash)로 재인코딩/리사이즈된 사본도 중복으로 판단
+        phash_radius (int): 이 해밍 거리 이내의 지각 해시를 같은 이미지로 판단
+        """
         self.es_url = es_url
-        self.processed_hashes = set()
+        if session is None:
+            import requests     # 가져오는 시간이 있어 가짜 세션을 쓰는 경우에는 가져오지 않음
+            session = requests.Session()
+        self.session = session
+        self.page_size = page_size
+        self.load_slices = max(1, load_slices)
+        self.processed_hashes = CompactHashSet()
+        # read_if_new로 읽어 처리 중인 해시 (저장하거나 release_hash로 해제할 때까지 같은 내용의 파일은 중복으로 판단)
+        self.pending_hashes = set()
+        self._pending_lock = threading.Lock()
+        # 처리된 이미지의 지각 해시 인덱스 (사용하지 않으면 None)
+        self.perceptual_index = PerceptualIndex() if perceptual_dedup else None
+        self.phash_radius = phash_radius
+        # 파일 메타데이터 기반 해시 캐시 (경로가 없으면 캐시 사용 안 함)
+        self.cache = HashCache(cache_path) if cache_path else None
+        # 새 해시를 모아 _bulk로 저장하는 백그라운드 writer (해시를 _id로 사용)
+        self.bulk_writer = EsBulkWriter(self.session, es_url, "image_hashes", bulk_size,
+                                        bulk_interval, bulk_max_retries)
 
     def load_hashes_from_es(self):
-        """ es에서 기존 처리된 해시 로드 """
+        """ es에서 기존 처리된 해시 전체를 페이지 단위로 로드 """
+        start = time.perf_counter()
         try:
-            responses = requests.get(f"{self.es_url}/image_hashes/_search?pretty", json={
-                "query": {"match_all": {}},
-                "fields": ["hash"],
-                "_source": False,
-                "size": 1000,
-            })
-            if responses.status_code == 200:
-                hits = responses.json()["hits"]["hits"]
-                self.processed_hashes = {hit["fields"]["hash"][0] for hit in hits}
-                print(f"Loaded {len(self.processed_hashes)} hashes from {self.es_url}")
-                return self.processed_hashes
-            elif responses.status_code == 404:
+            response = self.session.post(f"{self.es_url}/image_hashes/_pit?keep_alive={KEEP_ALIVE}")
+            if response.status_code == 404 and self._index_missing(response):
                 self.create_hashes_index()
                 return self.processed_hashes
+            elif response.status_code == 200:
+                loaded = self._load_with_pit(response.json()["id"])
             else:
-                print(f"Error loading hashes from ES: {responses.text}")
-                return self.processed_hashes
+                # PIT를 지원하지 않는 ES 버전(또는 _pit 경로를 막은 프록시)이면 scroll로 대체
+                print(f"PIT not available ({response.status_code}), falling back to scroll")
+                loaded = self._load_with_scroll()
         except Exception as e:
-            print(f"Failed to connect to ES: {e}")
+            print(f"Failed to load hashes from ES: {e}")
             return self.processed_hashes
+        finally:
+            # 페이지별로 모아 둔 해시를 한 번에 정렬해 조회 가능하게 함 (실패해도 읽은 만큼은 반영)
+            self.processed_hashes.finish_load()
+            if self.perceptual_index is not None:
+                self.perceptual_index.finish_load()
+
+        elapsed = time.perf_counter() - start
+        rate = loaded / elapsed if elapsed > 0 else 0
+        print(f"Loaded {loaded} hashes from {self.es_url} in {elapsed:.2f}s ({rate:.0f} hashes/s, "
+              f"{self.processed_hashes.nbytes() / 1024 / 1024:.1f} MB)")
+        return self.processed_hashes
+
+    @staticmethod
+    def _index_missing(response):
+        """ 404 응답이 인덱스가 없어서인지 확인 (_pit API 자체가 없어서 난 404와 구분) """
+        try:
+            error = response.json().get("error")
+        except (ValueError, AttributeError):
+            return False
+        error_type = error.get("type") if isinstance(error, dict) else error
+        return error_type == "index_not_found_exception"
+
+    def _load_with_pit(self, pit_id):
+        """ PIT + search_after로 슬라이스별 동시 페이지 조회, 로드한 해시 수 반환 """
+        try:
+            with ThreadPoolExecutor(max_workers=self.load_slices) as executor:
+                futures = [executor.submit(self._load_slice, pit_id, slice_id)
+                           for slice_id in range(self.load_slices)]
+                return sum(future.result() for future in futures)
+        finally:
+            self.session.delete(f"{self.es_url}/_pit", json={"id": pit_id})
+
+    def _load_slice(self, pit_id, slice_id):
+        """ 슬라이스 하나를 끝까지 페이지 조회하며 해시 집합에 추가, 로드한 해시 수 반환 """
+        body = {
+            "size": self.page_size,
+            "_source": False,
+            "fields": ["hash", "phash"],
+            "pit": {"id": pit_id, "keep_alive": KEEP_ALIVE},
+            "sort": [{"_shard_doc": "asc"}],
+        }
+        if self.load_slices > 1:
+            body["slice"] = {"id": slice_id, "max": self.load_slices}
+
+        loaded = 0
+        while True:
+            response = self.session.post(f"{self.es_url}/_search", json=body)
+            if response.status_code != 200:
+                raise RuntimeError(f"Error loading hashes from ES: {response.text}")
+            result = response.json()
+            hits = result["hits"]["hits"]
+            if not hits:
+                return loaded
+            loaded += self._add_hits(hits)
+            # 다음 페이지는 마지막 문서의 sort 값 이후부터
+            body["pit"]["id"] = result.get("pit_id", body["pit"]["id"])
+            body["search_after"] = hits[-1]["sort"]
+
+    def _load_with_scroll(self):
+        """ scroll API로 전체 해시 조회, 로드한 해시 수 반환 """
+        response = self.session.post(f"{self.es_url}/image_hashes/_search?scroll={KEEP_ALIVE}", json={
+            "size": self.page_size,
+            "_source": False,
+            "fields": ["hash", "phash"],
+            "sort": ["_doc"],
+        })
+        if response.status_code != 200:
+            raise RuntimeError(f"Error loading hashes from ES: {response.text}")
+
+        loaded = 0
+        result = response.json()
+        scroll_id = result.get("_scroll_id")
+        try:
+            while result["hits"]["hits"]:
+                loaded += self._add_hits(result["hits"]["hits"])
+                response = self.session.post(f"{self.es_url}/_search/scroll",
+                                             json={"scroll": KEEP_ALIVE, "scroll_id": scroll_id})
+                if response.status_code != 200:
+                    raise RuntimeError(f"Error loading hashes from ES: {response.text}")
+                result = response.json()
+                scroll_id = result.get("_scroll_id", scroll_id)
+        finally:
+            if scroll_id:
+                self.session.delete(f"{self.es_url}/_search/scroll", json={"scroll_id": scroll_id})
+        return loaded
 
+    def _add_hits(self, hits):
+        """ 검색 결과 한 페이지의 해시를 바이너리 버퍼로 모아 집합에 추가 (지각 해시는 인덱스에 추가) """
+        digests = bytearray()
+        phashes = []
+        for hit in hits:
+            fields = hit.get("fields", {})
+            try:
+                digests += CompactHashSet.to_digest(fields["hash"][0])
+            except (KeyError, IndexError, ValueError):
+                continue
+            if self.perceptual_index is not None and "phash" in fields:
+                try:
+                    phashes.append(from_hex(fields["phash"][0]))
+                except (IndexError, ValueError):
+                    pass
+        self.processed_hashes.add_many(digests)
+        if phashes:
+            self.perceptual_index.add_many(phashes)
+        return len(digests) // DIGEST_SIZE
 
     def create_hashes_index(self):
         """ ES에 image_hashes 인덱스 생성 """
@@ -40,32 +185,152 @@ class HashUtil:
             "mappings": {
                 "properties": {
                     "hash" : {"type": "keyword"},
+                    "phash" : {"type": "keyword"},
                 }
             }
         }
-        responses = requests.put(f"{self.es_url}/image_hashes", json=mapping)
+        responses = self.session.put(f"{self.es_url}/image_hashes", json=mapping)
         if responses.status_code not in (200, 201):
             print(f"Failed to create image_hashes index: {responses.text}")
 
-    def save_hash_to_es(self, img_hash):
-        """ ES에 새 해시 저장 """
-        if img_hash not in self.processed_hashes:
-            doc = {"hash": img_hash}
-            response = requests.post(f"{self.es_url}/image_hashes/_doc", json=doc)
-            if response.status_code in (200, 201):
-                self.processed_hashes.add(img_hash)
-                print(f"Saved hash: {img_hash}")
-            else:
-                print(f"Failed to save hash to ES: {response.text}")
+    def save_hash_to_es(self, img_hash, phash=None):
+        """
+        새 해시를 처리 완료로 표시하고 ES 일괄 저장 큐에 등록
+        phash (int): 이미지의 64비트 지각 해시 (있으면 함께 저장)
+        """
+        with self._pending_lock:
+            self.pending_hashes.discard(img_hash)
+            if img_hash in self.processed_hashes:
+                return
+            # 로컬에는 즉시 반영, ES 저장은 백그라운드에서 일괄 처리
+            self.processed_hashes.add(img_hash)
+        doc = {"hash": img_hash}
+        if phash is not None:
+            doc["phash"] = to_hex(phash)
+            if self.perceptual_index is not None:
+                self.perceptual_index.add(phash)
+        self.bulk_writer.enqueue(img_hash, doc)
+
+    def release_hash(self, img_hash):
+        """ 처리 중 표시 해제 (태그 없음/오류로 해시를 저장하지 않고 끝난 경우, 저장한 해시면 아무 일 없음) """
+        with self._pending_lock:
+            self.pending_hashes.discard(img_hash)
+
+    def _reserve(self, img_hash):
+        """ 처리된 해시도 처리 중인 해시도 아니면 처리 중으로 표시하고 True """
+        with self._pending_lock:
+            if img_hash in self.processed_hashes or img_hash in self.pending_hashes:
+                return False
+            self.pending_hashes.add(img_hash)
+            return True
+
+    def get_cached_hash(self, image_path):
+        """ 캐시에 저장된 해시 반환 (파일을 읽지 않음), 없으면 None """
+        if self.cache is None:
+            return None
+        _, cached = self.cache.lookup(image_path)
+        return cached
 
     def get_image_hash(self, image_path):
-        """ 이미지의 SHA256 해시 계산 """
+        """ 이미지의 SHA256 해시 계산 (캐시 적중 시 계산 생략) """
+        key, cached = self.cache.lookup(image_path) if self.cache else (None, None)
+        if cached:
+            return cached
+
+        # 파일 전체를 메모리에 올리지 않고 청크 단위로 해시 계산
+        hasher = hashlib.sha256()
         with open(image_path, 'rb') as f:
-            img_bytes = f.read()
-            return hashlib.sha256(img_bytes).hexdigest()
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                hasher.update(chunk)
+        img_hash = hasher.hexdigest()
+        if key:
+            self.cache.put(key, img_hash)
+        return img_hash
+
+    def read_image(self, image_path):
+        """
+        파일을 한 번만 읽어 해시와 원본 바이트를 함께 반환
+        읽은 버퍼는 그대로 디코딩(cv2.imdecode)에 사용
+        returns: (str, bytearray): SHA256 해시, 파일 내용
+        """
+        stat_result = os.stat(image_path)
+        key = HashCache.file_key(stat_result)
+        cached = self.cache.get(key) if self.cache else None
+        hasher = None if cached else hashlib.sha256()
+
+        # 파일 크기만큼 버퍼를 미리 할당하고 청크 단위로 채우면서 해시 계산
+        size = stat_result.st_size
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        read_total = 0
+        with open(image_path, 'rb', buffering=0) as f:
+            while read_total < size:
+                read = f.readinto(view[read_total:read_total + CHUNK_SIZE])
+                if not read:
+                    break
+                if hasher:
+                    hasher.update(view[read_total:read_total + read])
+                read_total += read
+        view.release()
+        if read_total < size:
+            # 읽는 도중 파일이 줄어든 경우
+            del buffer[read_total:]
+
+        if cached:
+            return cached, buffer
+        img_hash = hasher.hexdigest()
+        if self.cache and read_total == size:
+            self.cache.put(key, img_hash)
+        return img_hash, buffer
+
+    def read_if_new(self, image_path):
+        """
+        중복이 아니면 파일을 한 번만 읽어 (해시, 바이트) 반환, 중복이면 None
+        캐시된 해시로 중복이 확인되면 파일을 읽지 않음
+        반환한 해시는 처리 중으로 표시되므로, 끝나면 save_hash_to_es 또는 release_hash를 호출해야 함
+        (같은 내용의 파일이 동시에 들어오면 먼저 읽은 쪽만 처리)
+        """
+        with HASH_SECONDS.time():
+            img_hash = self.get_cached_hash(image_path)
+            if img_hash and (self.is_processed(img_hash) or img_hash in self.pending_hashes):
+                EXACT_DUPLICATES.inc()
+                logger.info("Duplicate image detected: %s, skipping...", img_hash)
+                return None
+
+            img_hash, data = self.read_image(image_path)
+        if not self._reserve(img_hash):
+            EXACT_DUPLICATES.inc()
+            logger.info("Duplicate image detected: %s, skipping...", img_hash)
+            return None
+        return img_hash, data
+
+    def is_processed(self, img_hash):
+        """ 이미 처리된 해시인지 확인 """
+        return img_hash in self.processed_hashes
+
+    def is_near_duplicate(self, phash, image_path=None):
+        """
+        이미 처리된 이미지 중 지각 해시가 phash_radius 이내인 것이 있는지 확인
+        phash (int): 확인할 이미지의 64비트 지각 해시
+        """
+        if self.perceptual_index is None or phash is None:
+            return False
+        match = self.perceptual_index.nearest(phash, self.phash_radius)
+        if match is None:
+            return False
+        NEAR_DUPLICATES.inc()
+        logger.info("Near-duplicate image detected: %s (matches %s, distance %d), skipping...",
+                    image_path or to_hex(phash), to_hex(match[0]), match[1])
+        return True
 
     def is_duplicate(self, image_path):
         """ 중복 이미지 체크 """
         img_hash = self.get_image_hash(image_path)
-        return img_hash in self.processed_hashes
+        return self.is_processed(img_hash)
+
+    def close(self):
+        """ 대기 중인 해시를 ES에 모두 저장한 뒤 해시 캐시 종료 """
+        self.bulk_writer.close()
+        if self.cache:
+            self.cache.close()
 
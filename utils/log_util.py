@@ -1,7 +1,70 @@
 # """로깅 관련 유틸"""
+import logging
 import sys
+import threading
 import time
 
+
+class RateLimitFilter(logging.Filter):
+    """
+    호출 위치(파일, 줄)별로 interval초 동안 burst개까지만 기록하고 나머지는 생략
+    다음 구간의 첫 기록에 생략한 개수를 덧붙임
+    (이미지마다 찍히는 로그가 처리량을 떨어뜨리거나 다른 로그를 덮지 않도록)
+    extra={"rate_limited": False}로 기록한 로그는 제한하지 않음 (샘플링된 span 등)
+    """
+    def __init__(self, burst=10, interval=10.0):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._windows = {}      # (경로, 줄) -> [구간 시작, 기록 수, 생략 수]
+
+    def filter(self, record):
+        if self.burst <= 0 or not getattr(record, "rate_limited", True):
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+
+def setup_logging(level="INFO", burst=10, interval=10.0):
+    """
+    imgtag 로거 설정 (표준 출력, 레벨, 호출 위치별 기록 수 제한)
+    level (str): 기록할 최소 레벨 ('DEBUG', 'INFO', 'WARNING', 'ERROR')
+    burst (int): 호출 위치별로 interval초 동안 기록할 최대 수 (0이면 제한 없음)
+    interval (float): 기록 수 제한 구간(초)
+    """
+    logger = logging.getLogger("imgtag")
+    logger.setLevel(level)
+    logger.propagate = False
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    handler.addFilter(RateLimitFilter(burst, interval))
+    logger.addHandler(handler)
+    return logger
+
+
+def get_logger(name):
+    """ imgtag 아래의 로거 반환 (예: get_logger(__name__) -> imgtag.core.pipeline) """
+    if not name.startswith("imgtag"):
+        name = f"imgtag.{name}"
+    return logging.getLogger(name)
+
+
 class ProgressLogger:
     """ brew install과 같은 프로그레스 바 스타일 로깅 클래스  """
 
@@ -0,0 +1,322 @@
+"""
+메트릭 수집/노출 모듈
+단계별 지연 시간 히스토그램, 처리 결과 카운터, 큐 깊이 게이지를 모아
+로컬 HTTP 엔드포인트(Prometheus 텍스트 형식)와 주기적인 JSON 스냅샷으로 제공
+이미지 한 건의 단계별 시간(span)은 설정한 비율만큼 샘플링해 로그로 기록
+"""
+import bisect
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.log_util import get_logger
+
+# 지연 시간 히스토그램 기본 버킷(초): 0.5ms ~ 30s
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_text(labels):
+    """ 레이블 튜플 -> Prometheus 레이블 문자열 """
+    if not labels:
+        return ""
+    escaped = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        escaped.append(f'{key}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+class Counter:
+    """ 증가만 하는 값 """
+    kind = "counter"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def sample(self):
+        return self.value
+
+
+class Gauge:
+    """ 현재 값 (직접 설정하거나, 읽을 때 호출할 함수를 등록) """
+    kind = "gauge"
+
+    def __init__(self):
+        self.value = 0
+        self._fn = None
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, fn):
+        """ 수집할 때마다 fn()의 값을 사용 (큐 깊이 등) """
+        self._fn = fn
+
+    def sample(self):
+        if self._fn is not None:
+            try:
+                return self._fn()
+            except Exception:
+                return float("nan")
+        return self.value
+
+
+class Histogram:
+    """ 버킷별 개수와 합계로 분포를 기록 (관측 한 번은 이진 탐색 + 락 한 번) """
+    kind = "histogram"
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(self.buckets) + 1)     # 마지막은 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        """ with 블록의 실행 시간을 기록하는 컨텍스트 매니저 """
+        return _Timer(self)
+
+    def quantile(self, q, counts=None, total=None):
+        """ 버킷 경계로 근사한 분위수 (버킷 안에서는 선형 보간) """
+        if counts is None:
+            with self._lock:
+                counts, total = list(self.counts), self.count
+        if not total:
+            return 0.0
+        target = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            if seen + count >= target and count:
+                if index >= len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (target - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+    def sample(self):
+        with self._lock:
+            counts, total, value_sum = list(self.counts), self.count, self.sum
+        return {
+            "count": total,
+            "sum": value_sum,
+            "p50": self.quantile(0.5, counts, total),
+            "p90": self.quantile(0.9, counts, total),
+            "p99": self.quantile(0.99, counts, total),
+            "buckets": counts,
+        }
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class MetricsRegistry:
+    """ 이름과 레이블로 메트릭을 등록/조회하고 Prometheus 텍스트나 dict로 내보내는 클래스 """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._families = {}     # 이름 -> (종류, 설명, {레이블 튜플: 메트릭})
+
+    def _get(self, cls, name, help_text, labels, **kwargs):
+        key = tuple(sorted(labels.items())) if labels else ()
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = (cls.kind, help_text, {})
+            elif family[0] != cls.kind:
+                raise ValueError(f"metric {name} already registered as {family[0]}")
+            metric = family[2].get(key)
+            if metric is None:
+                metric = family[2][key] = cls(**kwargs)
+            return metric
+
+    def counter(self, name, help_text="", **labels):
+        """ 카운터 조회 (없으면 생성) """
+        return self._get(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text="", **labels):
+        """ 게이지 조회 (없으면 생성) """
+        return self._get(Gauge, name, help_text, labels)
+
+    def histogram(self, name, help_text="", buckets=LATENCY_BUCKETS, **labels):
+        """ 히스토그램 조회 (없으면 생성) """
+        return self._get(Histogram, name, help_text, labels, buckets=buckets)
+
+    def _items(self):
+        with self._lock:
+            return [(name, kind, help_text, list(metrics.items()))
+                    for name, (kind, help_text, metrics) in sorted(self._families.items())]
+
+    def render_prometheus(self):
+        """ Prometheus 텍스트 형식 (version 0.0.4) """
+        lines = []
+        for name, kind, help_text, metrics in self._items():
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, metric in metrics:
+                value = metric.sample()
+                if kind != "histogram":
+                    value = "NaN" if value != value else value
+                    lines.append(f"{name}{_label_text(labels)} {value}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + ("+Inf",), value["buckets"]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_label_text(labels + (('le', bound),))} {cumulative}")
+                lines.append(f"{name}_sum{_label_text(labels)} {value['sum']}")
+                lines.append(f"{name}_count{_label_text(labels)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """ 현재 값을 JSON으로 변환 가능한 dict로 반환 (히스토그램은 개수/합계/분위수) """
+        result = {"timestamp": time.time()}
+        for name, _, _, metrics in self._items():
+            for labels, metric in metrics:
+                value = metric.sample()
+                if isinstance(value, dict):
+                    value = {key: v for key, v in value.items() if key != "buckets"}
+                key = name + "".join(f"[{k}={v}]" for k, v in labels)
+                result[key] = value
+        return result
+
+
+# 프로세스 전체에서 공유하는 기본 레지스트리
+REGISTRY = MetricsRegistry()
+
+
+class MetricsServer:
+    """ /metrics (Prometheus 텍스트), /metrics.json (스냅샷)을 제공하는 로컬 HTTP 서버 """
+    def __init__(self, registry=REGISTRY, port=9464, host="127.0.0.1"):
+        registry_ref = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] == "/metrics":
+                    body = registry_ref.render_prometheus().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                elif self.path.split("?")[0] == "/metrics.json":
+                    body = json.dumps(registry_ref.snapshot()).encode("utf-8")
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass    # 요청마다 로그를 남기지 않음
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        host, port = self.server.server_address[:2]
+        print(f"Metrics endpoint: http://{host}:{port}/metrics")
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class SnapshotWriter:
+    """ 주기적으로 메트릭 스냅샷을 JSON 파일로 기록 (임시 파일에 쓴 뒤 교체) """
+    def __init__(self, path, interval=30.0, registry=REGISTRY):
+        self.path = str(path)
+        self.interval = interval
+        self.registry = registry
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def write(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.registry.snapshot(), f, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def _run(self):
+        while not self._stopping.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                print(f"Failed to write metrics snapshot: {e}")
+
+    def stop(self):
+        """ 마지막 스냅샷을 기록하고 종료 """
+        self._stopping.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        try:
+            self.write()
+        except OSError as e:
+            print(f"Failed to write metrics snapshot: {e}")
+
+
+class Span:
+    """ 샘플링된 이미지 한 건의 구간별 시간 기록 """
+    __slots__ = ("name", "start", "last", "marks")
+
+    def __init__(self, name):
+        self.name = name
+        self.start = self.last = time.perf_counter()
+        self.marks = []
+
+    def mark(self, step):
+        """ 직전 기록 이후 걸린 시간을 step 이름으로 기록 """
+        now = time.perf_counter()
+        self.marks.append((step, now - self.last))
+        self.last = now
+
+
+class SpanSampler:
+    """ 설정한 비율만큼 Span을 만들고, 끝난 Span은 로그(imgtag.trace)로 기록 """
+    def __init__(self, rate=0.0):
+        """ rate (float): 샘플링 비율 (0이면 만들지 않음, 1이면 모든 이미지) """
+        self.rate = rate
+        self.logger = get_logger("imgtag.trace")
+
+    def start(self, name):
+        """ 샘플링되면 Span, 아니면 None """
+        if self.rate <= 0 or (self.rate < 1 and random.random() >= self.rate):
+            return None
+        return Span(name)
+
+    def finish(self, span, outcome):
+        total_ms = (time.perf_counter() - span.start) * 1000
+        steps = " ".join(f"{step}={seconds * 1000:.1f}ms" for step, seconds in span.marks)
+        # 샘플링 비율로 이미 양을 조절하므로 출력 수 제한은 적용하지 않음
+        self.logger.info("span %s outcome=%s total=%.1fms %s", span.name, outcome, total_ms, steps,
+                         extra={"rate_limited": False})
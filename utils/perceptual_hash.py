@@ -0,0 +1,236 @@
+"""
+지각 해시(dHash) 및 해밍 거리 검색 인덱스 모듈
+재인코딩/리사이즈/재저장된 사본처럼 바이트는 다르지만 같은 사진인 이미지를 찾기 위해 사용
+"""
+import threading
+
+import cv2
+import numpy as np
+
+from core.preprocess import image_size, reduce_factor
+
+CODE_BITS = 64
+CHUNK_BITS = 16                         # multi-index hashing 청크 크기
+CHUNKS = CODE_BITS // CHUNK_BITS        # 청크 수 (4)
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+THUMB_MIN_SIZE = 256                    # 축소 디코딩해도 긴 변이 이 크기 이상 남도록 배율 선택
+FLAT_TOLERANCE = 2                      # 이웃 픽셀 밝기 차가 이 값 이하이면 변화 없음으로 봄 (압축 노이즈)
+MIN_GRADIENT_PAIRS = 8                  # 밝기 변화가 있는 이웃 쌍이 이보다 적은 썸네일은 해시를 만들지 않음
+
+# 축소 배율 -> OpenCV 흑백 축소 디코딩 플래그
+REDUCED_GRAY_FLAGS = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(values):
+        """ uint64 배열 원소별 1비트 수 """
+        return np.bitwise_count(values)
+else:
+    _BYTE_BITS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(values):
+        """ uint64 배열 원소별 1비트 수 (NumPy 2.0 미만: 바이트별 테이블 합) """
+        return _BYTE_BITS[values.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def dhash(img):
+    """
+    difference hash: 9x8 흑백 썸네일에서 가로로 이웃한 픽셀의 밝기 대소를 64비트로 기록
+    빈 이미지/단색 이미지는 모두 같은 해시(0)가 되어 서로 근사 중복으로 판단되므로 해시를 만들지 않음
+    img (ndarray): BGR 또는 흑백 이미지
+    returns: int: 64비트 해시, 밝기 변화가 거의 없는 이미지면 None
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    thumb = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA).astype(np.int16)
+    diff = thumb[:, 1:] - thumb[:, :-1]
+    if np.count_nonzero(np.abs(diff) > FLAT_TOLERANCE) < MIN_GRADIENT_PAIRS:
+        return None
+    return int.from_bytes(np.packbits((diff > 0).ravel()).tobytes(), "big")
+
+
+def decode_gray(data, min_size=THUMB_MIN_SIZE):
+    """
+    파일 바이트를 썸네일 계산용 흑백 이미지로 디코딩
+    큰 JPEG는 흑백으로 축소 디코딩해 전체 디코딩보다 훨씬 빠름
+    (너무 작게 줄이면 썸네일이 달라지므로 긴 변이 min_size 이상 남는 배율까지만 축소)
+    returns: (ndarray, (int, int)): 흑백 이미지와 원본 (너비, 높이), 디코딩 실패 시 (None, None)
+    """
+    info = image_size(data)
+    factor = reduce_factor(info[1], info[2], min_size) if info and info[0] == "jpeg" else 1
+    gray = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), REDUCED_GRAY_FLAGS[factor])
+    if gray is None:
+        return None, None
+    size = (info[1], info[2]) if info else (gray.shape[1], gray.shape[0])
+    return gray, size
+
+
+def dhash_bytes(data):
+    """
+    파일 바이트에서 바로 dHash 계산 (decode_gray로 축소 디코딩)
+    returns: int: 64비트 해시, 디코딩 실패 또는 밝기 변화가 거의 없는 이미지면 None
+    """
+    gray, _ = decode_gray(data)
+    if gray is None:
+        return None
+    return dhash(gray)
+
+
+def to_hex(code):
+    """ 64비트 해시 -> ES 저장용 16자리 hex 문자열 """
+    return f"{code:016x}"
+
+
+def from_hex(text):
+    """ 16자리 hex 문자열 -> 64비트 해시 """
+    return int(text, 16)
+
+
+def hamming(a, b):
+    """ 두 64비트 해시의 해밍 거리 """
+    return (a ^ b).bit_count()
+
+
+def _neighbors(key, radius):
+    """ 16비트 key와 해밍 거리 radius 이내인 모든 값 """
+    keys = [key]
+    for _ in range(radius):
+        keys = list({k ^ (1 << bit) for k in keys for bit in range(CHUNK_BITS)} | set(keys))
+    return keys
+
+
+class PerceptualIndex:
+    """
+    64비트 해시의 해밍 반경 검색 인덱스 (multi-index hashing)
+    해시를 16비트 청크 4개로 나누면 거리가 r 이내인 두 해시는 적어도 한 청크에서 r // 4 이내로 같음
+    청크마다 값별로 해시 번호를 모아 둔 CSR 배열(offsets, ids)로 후보를 찾고 전체 거리로 확인
+
+    - 대량 로드(add_many)는 페이지를 모아 두었다가 finish_load에서 인덱스를 한 번만 구성
+    - 실시간 추가(add)는 전수 비교하는 작은 버퍼에 넣고, 버퍼가 merge_threshold만큼 차면 고정한 뒤
+      백그라운드 스레드가 인덱스에 합쳐 다시 구성 (추가하는 쪽은 인덱스 구성을 기다리지 않음)
+    - 0(밝기 변화가 없는 이미지의 해시)은 저장하지도 찾지도 않음 (이전에 ES에 저장된 값 대비)
+    """
+    def __init__(self, merge_threshold=8192):
+        """
+        merge_threshold (int): 인덱스에 합치기 전 버퍼에 모을 최대 해시 수
+        """
+        self.merge_threshold = merge_threshold
+        # (인덱스에 포함된 해시, 청크 값별 시작 위치, 청크 값 순서로 정렬된 해시 번호)
+        # 조회 중에 섞이지 않도록 세 배열을 하나의 튜플로 교체
+        self._index = self._build(np.empty(0, dtype=np.uint64))
+        self._frozen = ()                   # 가득 차서 인덱스에 합치는 중인 버퍼들
+        self._delta = np.empty(merge_threshold, dtype=np.uint64)   # 실시간 추가 버퍼 (앞에서 _delta_len개 사용)
+        self._delta_len = 0
+        self._chunks = []                   # finish_load 전까지 모아 둔 대량 로드 페이지
+        self._lock = threading.Lock()
+        self._rebuilding = False
+        self.rebuilds = 0
+
+    def __len__(self):
+        return (len(self._index[0]) + sum(len(frozen) for frozen in self._frozen) + self._delta_len
+                + sum(len(chunk) for chunk in self._chunks))
+
+    def add(self, code):
+        """ 해시 하나 추가 (버퍼가 차면 백그라운드에서 인덱스에 합침) """
+        if not code:
+            return
+        with self._lock:
+            self._delta[self._delta_len] = code
+            self._delta_len += 1
+            if self._delta_len < self.merge_threshold:
+                return
+            # 읽는 쪽은 버퍼 -> 고정 버퍼 -> 인덱스 순서로 읽으므로, 고정 목록에 먼저 넣은 뒤 버퍼 교체
+            self._frozen = self._frozen + (self._delta,)
+            self._delta_len = 0
+            self._delta = np.empty(self.merge_threshold, dtype=np.uint64)
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild, name="phash-index-merge", daemon=True).start()
+
+    def add_many(self, codes):
+        """ 해시 여러 개를 대량 로드분으로 추가 (ES 로드 시 페이지 단위, 조회에는 finish_load 이후 반영) """
+        codes = np.asarray(codes, dtype=np.uint64)
+        codes = codes[codes != 0]
+        if not codes.size:
+            return
+        with self._lock:
+            self._chunks.append(codes)
+
+    def finish_load(self):
+        """ 모아 둔 대량 로드분을 포함해 인덱스를 한 번 구성 """
+        with self._lock:
+            if not self._chunks:
+                return
+            chunks, self._chunks = self._chunks, []
+            self._index = self._build(np.concatenate([self._index[0], *chunks]))
+
+    @staticmethod
+    def _build(codes):
+        """ 해시 배열로 청크별 CSR 인덱스 구성 """
+        offsets = np.empty((CHUNKS, (1 << CHUNK_BITS) + 1), dtype=np.int64)
+        ids = np.empty((CHUNKS, len(codes)), dtype=np.uint32)
+        for chunk in range(CHUNKS):
+            keys = ((codes >> np.uint64(chunk * CHUNK_BITS)) & np.uint64(CHUNK_MASK)).astype(np.uint16)
+            # 16비트 값이라 계수 정렬이 되는 stable argsort 사용
+            ids[chunk] = np.argsort(keys, kind="stable")
+            offsets[chunk, 0] = 0
+            np.cumsum(np.bincount(keys, minlength=1 << CHUNK_BITS), out=offsets[chunk, 1:])
+        return codes, offsets, ids
+
+    def _rebuild(self):
+        """ 고정된 버퍼를 인덱스에 합쳐 다시 구성 (락 밖에서 구성하고 교체만 락 안에서) """
+        while True:
+            with self._lock:
+                frozen, index = self._frozen, self._index
+                if not frozen:
+                    self._rebuilding = False
+                    return
+            rebuilt = self._build(np.concatenate([index[0], *frozen]))
+            with self._lock:
+                # 인덱스를 먼저 바꾼 뒤 합친 버퍼를 목록에서 뺌 (그사이 고정된 버퍼는 다음 차례에 합침)
+                self._index = rebuilt
+                self._frozen = self._frozen[len(frozen):]
+                self.rebuilds += 1
+
+    def nearest(self, code, radius):
+        """
+        거리 radius 이내에서 가장 가까운 해시 검색
+        returns: (int, int): (해시, 거리), 없으면 None
+        """
+        if not code:
+            return None
+        # 버퍼 -> 고정 버퍼 -> 인덱스 순서로 읽어야 교체 도중에도 새 해시를 놓치지 않음 (겹치는 것은 상관없음)
+        delta, delta_len = self._delta, self._delta_len
+        frozen = self._frozen
+        codes, offsets, ids = self._index
+        chunk_radius = radius // CHUNKS
+
+        candidates = []
+        for chunk in range(CHUNKS):
+            key = (code >> (chunk * CHUNK_BITS)) & CHUNK_MASK
+            for k in _neighbors(key, chunk_radius):
+                start, end = offsets[chunk, k], offsets[chunk, k + 1]
+                if end > start:
+                    candidates.append(ids[chunk, start:end])
+        # 여러 청크에서 겹친 후보는 거리 계산만 중복될 뿐 결과에 영향이 없으므로 중복 제거 생략
+        found = [codes[np.concatenate(candidates)]] if candidates else []
+        found.extend(frozen)
+        found.append(delta[:delta_len])
+        found = np.concatenate(found)
+        if not found.size:
+            return None
+
+        distances = _popcount(found ^ np.uint64(code))
+        best = int(distances.argmin())
+        if distances[best] > radius:
+            return None
+        return int(found[best]), int(distances[best])
+
+    def nbytes(self):
+        """ 인덱스와 버퍼가 차지하는 메모리 크기 (바이트) """
+        return (sum(array.nbytes for array in self._index) + self._delta.nbytes
+                + sum(frozen.nbytes for frozen in self._frozen))